@@ -27,10 +27,12 @@ export default function handler(req: Request, res: Response) {
     admin: {
       ADMIN_PASSWORD: process.env.ADMIN_PASSWORD ? 'SET' : 'NOT SET',
     },
+    // 与 server/services/storage-adapter.ts 的后端选择一致
     storage: {
-      isVercel: process.env.VERCEL === '1' || process.env.KV_REST_API_URL !== undefined,
-      willUseKV: process.env.KV_REST_API_URL !== undefined,
-      willUseJSON: process.env.KV_REST_API_URL === undefined,
+      isVercel: process.env.VERCEL === '1',
+      willUseKV: process.env.REDIS_URL !== undefined || process.env.KV_REST_API_URL !== undefined,
+      willUseJSON: process.env.REDIS_URL === undefined && process.env.KV_REST_API_URL === undefined,
+      dataDir: process.env.DATA_DIR || 'not set',
     }
   };
 
@@ -1,18 +1,22 @@
 /**
  * Vercel Serverless Function Entry Point
- * 
+ *
  * 这个文件是 Vercel 部署的入口点
  * 将 Express 应用转换为 Serverless 函数
+ *
+ * 路由和服务直接使用 server/ 下的实现（不再在 api/ 维护一份副本，.vercelignore 不能排除 server/），
+ * 存储后端由 server/services/storage-adapter.ts 按 REDIS_URL / KV_REST_API_URL 选择
  */
 
 import express, { Request, Response } from 'express';
+import os from 'node:os';
 import path from 'node:path';
-import { fileURLToPath } from 'node:url';
-import accessCodeRoutes from './routes/access-code.js';
-import adminRoutes from './routes/admin.js';
 
-const __filename = fileURLToPath(import.meta.url);
-const __dirname = path.dirname(__filename);
+// Vercel 上只有临时目录可写（上传文件、截图缓存、发送任务队列），必须在加载路由之前设置
+process.env.DATA_DIR = process.env.DATA_DIR || path.join(os.tmpdir(), 'data');
+
+const { default: accessCodeRoutes } = await import('../server/routes/access-code.js');
+const { default: adminRoutes } = await import('../server/routes/admin.js');
 
 const app = express();
 
@@ -2,7 +2,7 @@
  * 批量生成体验码页面
  */
 
-import { useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import AdminLayout from '../../components/admin/AdminLayout';
 import { useAdmin } from '../../hooks/admin/useAdmin';
 
@@ -14,6 +14,32 @@ interface GeneratedCode {
   link: string;
 }
 
+/** 批量发送任务（GET /api/admin/batch-send/jobs 返回的格式） */
+interface DeliveryJob {
+  id: string;
+  status: 'queued' | 'running' | 'completed' | 'cancelled' | 'failed';
+  webhookUrl: string;
+  options: { ratePerMinute: number; concurrency: number; maxAttempts: number };
+  total: number;
+  sent: number;
+  failed: number;
+  retries: number;
+  done: number;
+  createdAt: string;
+  finishedAt?: string;
+  error?: string;
+}
+
+const JOB_STATUS_TEXT: Record<DeliveryJob['status'], string> = {
+  queued: '排队中',
+  running: '发送中',
+  completed: '已完成',
+  cancelled: '已取消',
+  failed: '已中止'
+};
+
+const isActive = (job: DeliveryJob) => job.status === 'queued' || job.status === 'running';
+
 export default function AdminGenerate() {
   const { getToken } = useAdmin();
   const [file, setFile] = useState<File | null>(null);
@@ -24,6 +50,181 @@ export default function AdminGenerate() {
   const [webhookUrl, setWebhookUrl] = useState('');
   const [isSending, setIsSending] = useState(false);
   const [sendProgress, setSendProgress] = useState({ current: 0, total: 0 });
+  const [activeJob, setActiveJob] = useState<DeliveryJob | null>(null);
+  const [retryMessage, setRetryMessage] = useState('');
+  const [jobs, setJobs] = useState<DeliveryJob[]>([]);
+  const streamAbort = useRef<AbortController | null>(null);
+
+  /**
+   * 最近的发送任务
+   */
+  const loadJobs = async (): Promise<DeliveryJob[]> => {
+    try {
+      const response = await fetch('/api/admin/batch-send/jobs?limit=10', {
+        headers: {
+          'Authorization': `Bearer ${getToken()}`
+        }
+      });
+      const data = await response.json();
+      const list: DeliveryJob[] = data.jobs || [];
+      setJobs(list);
+      return list;
+    } catch (error: any) {
+      console.error('获取发送任务错误:', error);
+      return [];
+    }
+  };
+
+  /**
+   * 读取发送任务的 SSE 进度，直到任务结束或连接断开（断开不影响后台发送）
+   */
+  const readDeliveryStream = async (response: Response) => {
+    const reader = response.body?.getReader();
+    const decoder = new TextDecoder();
+    if (!reader) {
+      return;
+    }
+
+    // 一个事件可能被拆到两个片段里，按空行切分完整事件
+    let buffer = '';
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+
+      buffer += decoder.decode(value, { stream: true });
+      const events = buffer.split('\n\n');
+      buffer = events.pop() || '';
+
+      for (const event of events) {
+        if (!event.startsWith('data: ')) continue;
+        const data = JSON.parse(event.slice(6));
+
+        if (data.type === 'job') {
+          setActiveJob(data.job);
+          setSendProgress({ current: data.job.done, total: data.job.total });
+        } else if (data.type === 'progress') {
+          setSendProgress({ current: data.current, total: data.total });
+          setRetryMessage('');
+        } else if (data.type === 'retry') {
+          const wait = Math.max(0, Math.round((data.nextAttemptAt - Date.now()) / 1000));
+          setRetryMessage(`${data.userName} 第 ${data.attempts} 次发送失败（${data.message}），${wait} 秒后重试`);
+        } else if (data.type === 'complete') {
+          alert(`发送完成！成功: ${data.success}，失败: ${data.failed}`);
+        } else if (data.type === 'cancelled') {
+          alert(`发送已取消。成功: ${data.success}，失败: ${data.failed}`);
+        } else if (data.type === 'failed') {
+          alert(`发送已中止：${data.message}。成功: ${data.success}，失败: ${data.failed}`);
+        } else if (data.type === 'error') {
+          alert(`发送错误: ${data.message}`);
+        }
+      }
+    }
+  };
+
+  /**
+   * 订阅已有任务的进度（页面刷新后继续显示）
+   */
+  const watchJob = async (job: DeliveryJob) => {
+    streamAbort.current?.abort();
+    const controller = new AbortController();
+    streamAbort.current = controller;
+
+    setIsSending(true);
+    setActiveJob(job);
+    setRetryMessage('');
+    setSendProgress({ current: job.done, total: job.total });
+
+    try {
+      const response = await fetch(`/api/admin/batch-send/jobs/${job.id}/events`, {
+        headers: {
+          'Authorization': `Bearer ${getToken()}`
+        },
+        signal: controller.signal
+      });
+      if (!response.ok) {
+        throw new Error('获取发送进度失败');
+      }
+      await readDeliveryStream(response);
+    } catch (error: any) {
+      if (error.name !== 'AbortError') {
+        console.error('订阅发送进度错误:', error);
+      }
+    } finally {
+      if (streamAbort.current === controller) {
+        streamAbort.current = null;
+        setIsSending(false);
+        setActiveJob(null);
+        setRetryMessage('');
+        loadJobs();
+      }
+    }
+  };
+
+  // 打开页面时列出最近的任务，有未完成的任务就继续显示它的进度
+  useEffect(() => {
+    loadJobs().then(list => {
+      const running = list.find(isActive);
+      if (running) {
+        watchJob(running);
+      }
+    });
+    return () => streamAbort.current?.abort();
+  }, []);
+
+  /**
+   * 取消发送任务（已发出的消息不受影响）
+   */
+  const handleCancel = async (jobId: string) => {
+    if (!confirm('确定取消这个发送任务吗？已发出的消息不受影响')) {
+      return;
+    }
+    try {
+      const response = await fetch(`/api/admin/batch-send/jobs/${jobId}/cancel`, {
+        method: 'POST',
+        headers: {
+          'Authorization': `Bearer ${getToken()}`
+        }
+      });
+      const data = await response.json();
+      if (!data.success) {
+        alert(data.message || '取消失败');
+      }
+    } catch (error: any) {
+      console.error('取消发送任务错误:', error);
+      alert(error.message || '取消失败');
+    } finally {
+      loadJobs();
+    }
+  };
+
+  /**
+   * 继续发送中止的任务（webhook 地址不保存在服务端，用输入框里的地址）
+   */
+  const handleResume = async (job: DeliveryJob) => {
+    if (!webhookUrl) {
+      alert('请先在上方填写创建任务时使用的企业微信 Webhook 地址');
+      return;
+    }
+    try {
+      const response = await fetch(`/api/admin/batch-send/jobs/${job.id}/resume`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          'Authorization': `Bearer ${getToken()}`
+        },
+        body: JSON.stringify({ webhookUrl })
+      });
+      const data = await response.json();
+      if (!data.success) {
+        alert(data.message || '继续发送失败');
+        return;
+      }
+      watchJob(data.job);
+    } catch (error: any) {
+      console.error('继续发送任务错误:', error);
+      alert(error.message || '继续发送失败');
+    }
+  };
 
   /**
    * 处理文件选择
@@ -94,7 +295,12 @@ export default function AdminGenerate() {
       return;
     }
 
+    streamAbort.current?.abort();
+    const controller = new AbortController();
+    streamAbort.current = controller;
+
     setIsSending(true);
+    setRetryMessage('');
     setSendProgress({ current: 0, total: generatedCodes.length });
 
     try {
@@ -109,45 +315,29 @@ export default function AdminGenerate() {
         body: JSON.stringify({
           codeIds,
           webhookUrl
-        })
+        }),
+        signal: controller.signal
       });
 
       if (!response.ok) {
         throw new Error('发送失败');
       }
 
-      // 读取 SSE 流
-      const reader = response.body?.getReader();
-      const decoder = new TextDecoder();
-
-      if (reader) {
-        while (true) {
-          const { done, value } = await reader.read();
-          if (done) break;
-
-          const chunk = decoder.decode(value);
-          const lines = chunk.split('\n');
-
-          for (const line of lines) {
-            if (line.startsWith('data: ')) {
-              const data = JSON.parse(line.slice(6));
-
-              if (data.type === 'progress') {
-                setSendProgress({ current: data.current, total: data.total });
-              } else if (data.type === 'complete') {
-                alert(`发送完成！成功: ${data.success}，失败: ${data.failed}`);
-              } else if (data.type === 'error') {
-                alert(`发送错误: ${data.message}`);
-              }
-            }
-          }
-        }
-      }
+      // 读取 SSE 流（发送在服务端后台进行，刷新页面后可在下方任务列表继续查看）
+      await readDeliveryStream(response);
     } catch (error: any) {
-      console.error('批量发送错误:', error);
-      alert(error.message || '发送失败');
+      if (error.name !== 'AbortError') {
+        console.error('批量发送错误:', error);
+        alert(error.message || '发送失败');
+      }
     } finally {
-      setIsSending(false);
+      if (streamAbort.current === controller) {
+        streamAbort.current = null;
+        setIsSending(false);
+        setActiveJob(null);
+        setRetryMessage('');
+        loadJobs();
+      }
     }
   };
 
@@ -251,6 +441,39 @@ export default function AdminGenerate() {
           </button>
         </div>
 
+        {/* 发送进度（生成结果之外单独显示，刷新页面后也能看到） */}
+        {isSending && (
+          <div className="bg-gray-900 rounded-lg p-6 space-y-3">
+            <div className="flex justify-between text-sm">
+              <span>发送进度</span>
+              <span>{sendProgress.current} / {sendProgress.total}</span>
+            </div>
+            <div className="w-full bg-gray-700 rounded-full h-2">
+              <div
+                className="bg-green-500 h-2 rounded-full transition-all"
+                style={{ width: `${sendProgress.total ? (sendProgress.current / sendProgress.total) * 100 : 0}%` }}
+              ></div>
+            </div>
+            {activeJob && (
+              <div className="flex justify-between items-center text-xs text-gray-400">
+                <span>
+                  每分钟 {activeJob.options.ratePerMinute} 条，剩余约{' '}
+                  {Math.ceil((sendProgress.total - sendProgress.current) / activeJob.options.ratePerMinute)} 分钟
+                </span>
+                <button
+                  onClick={() => handleCancel(activeJob.id)}
+                  className="px-3 py-1 bg-red-900 hover:bg-red-800 text-red-200 rounded"
+                >
+                  取消发送
+                </button>
+              </div>
+            )}
+            {retryMessage && (
+              <p className="text-xs text-yellow-400">{retryMessage}</p>
+            )}
+          </div>
+        )}
+
         {/* 生成结果 */}
         {generatedCodes.length > 0 && (
           <div className="bg-gray-900 rounded-lg p-6 space-y-6">
@@ -282,20 +505,9 @@ export default function AdminGenerate() {
                 />
               </div>
 
-              {isSending && (
-                <div className="bg-gray-800 rounded-lg p-4">
-                  <div className="flex justify-between text-sm mb-2">
-                    <span>发送进度</span>
-                    <span>{sendProgress.current} / {sendProgress.total}</span>
-                  </div>
-                  <div className="w-full bg-gray-700 rounded-full h-2">
-                    <div
-                      className="bg-green-500 h-2 rounded-full transition-all"
-                      style={{ width: `${(sendProgress.current / sendProgress.total) * 100}%` }}
-                    ></div>
-                  </div>
-                </div>
-              )}
+              <p className="text-xs text-gray-500">
+                消息在服务端后台按群机器人的频率上限发送（默认每分钟 20 条，1000 人约 50 分钟），关闭或刷新页面不影响发送
+              </p>
 
               <button
                 onClick={handleSend}
@@ -342,6 +554,78 @@ export default function AdminGenerate() {
             </div>
           </div>
         )}
+
+        {/* 最近的发送任务 */}
+        {jobs.length > 0 && (
+          <div className="bg-gray-900 rounded-lg p-6 space-y-4">
+            <div className="flex justify-between items-center">
+              <h2 className="text-xl font-bold">最近的发送任务</h2>
+              <button
+                onClick={loadJobs}
+                className="px-4 py-2 bg-gray-800 hover:bg-gray-700 rounded-lg text-sm"
+              >
+                刷新
+              </button>
+            </div>
+            <div className="overflow-x-auto">
+              <table className="w-full">
+                <thead>
+                  <tr className="border-b border-gray-800">
+                    <th className="text-left py-3 px-4">创建时间</th>
+                    <th className="text-left py-3 px-4">状态</th>
+                    <th className="text-left py-3 px-4">进度</th>
+                    <th className="text-left py-3 px-4">成功 / 失败</th>
+                    <th className="text-left py-3 px-4">操作</th>
+                  </tr>
+                </thead>
+                <tbody>
+                  {jobs.map((job) => (
+                    <tr key={job.id} className="border-b border-gray-800 hover:bg-gray-800">
+                      <td className="py-3 px-4 text-sm">{new Date(job.createdAt).toLocaleString()}</td>
+                      <td className="py-3 px-4 text-sm">
+                        {JOB_STATUS_TEXT[job.status]}
+                        {job.error && <div className="text-xs text-red-400">{job.error}</div>}
+                      </td>
+                      <td className="py-3 px-4 text-sm">{job.done} / {job.total}</td>
+                      <td className="py-3 px-4 text-sm">
+                        <span className="text-green-500">{job.sent}</span>
+                        {' / '}
+                        <span className={job.failed > 0 ? 'text-red-500' : ''}>{job.failed}</span>
+                      </td>
+                      <td className="py-3 px-4 text-sm space-x-3">
+                        {isActive(job) && activeJob?.id !== job.id && (
+                          <button
+                            onClick={() => watchJob(job)}
+                            className="text-blue-400 hover:text-blue-300"
+                          >
+                            查看进度
+                          </button>
+                        )}
+                        {job.status === 'failed' && (
+                          <button
+                            onClick={() => handleResume(job)}
+                            disabled={isSending}
+                            className="text-blue-400 hover:text-blue-300 disabled:opacity-50"
+                          >
+                            继续发送
+                          </button>
+                        )}
+                        {(isActive(job) || job.status === 'failed') && (
+                          <button
+                            onClick={() => handleCancel(job.id)}
+                            className="text-red-400 hover:text-red-300"
+                          >
+                            取消
+                          </button>
+                        )}
+                      </td>
+                    </tr>
+                  ))}
+                </tbody>
+              </table>
+            </div>
+          </div>
+        )}
       </div>
     </AdminLayout>
   );
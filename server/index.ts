@@ -11,6 +11,7 @@ import { exec } from "child_process";
 import { promisify } from "util";
 import accessCodeRoutes from "./routes/access-code.js";
 import adminRoutes from "./routes/admin.js";
+import { resumeDeliveryJobs } from "./services/delivery-queue.js";
 
 const execAsync = promisify(exec);
 
@@ -83,6 +84,8 @@ async function startServer() {
 
   server.listen(port, () => {
     console.log(`Server running on http://localhost:${port}/`);
+    // 上次重启前没有发完的企业微信批量发送任务标记为中止，等管理员继续发送
+    resumeDeliveryJobs();
   });
 }
 
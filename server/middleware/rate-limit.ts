@@ -4,20 +4,21 @@
 
 import { Request, Response, NextFunction } from 'express';
 
-// 存储 IP 和请求时间的 Map
-const requestMap = new Map<string, number[]>();
+// 每个限流器各自存储 IP 和请求时间（不同接口分别计数），值为时间窗口
+const limiters = new Map<Map<string, number[]>, number>();
 
 // 清理过期记录的间隔（每小时）
 setInterval(() => {
   const now = Date.now();
-  const oneHour = 60 * 60 * 1000;
   
-  for (const [ip, timestamps] of requestMap.entries()) {
-    const validTimestamps = timestamps.filter(t => now - t < oneHour);
-    if (validTimestamps.length === 0) {
-      requestMap.delete(ip);
-    } else {
-      requestMap.set(ip, validTimestamps);
+  for (const [requestMap, windowMs] of limiters.entries()) {
+    for (const [ip, timestamps] of requestMap.entries()) {
+      const validTimestamps = timestamps.filter(t => now - t < windowMs);
+      if (validTimestamps.length === 0) {
+        requestMap.delete(ip);
+      } else {
+        requestMap.set(ip, validTimestamps);
+      }
     }
   }
 }, 60 * 60 * 1000);
@@ -26,8 +27,16 @@ setInterval(() => {
  * 频率限制中间件
  * @param maxRequests 最大请求次数
  * @param windowMs 时间窗口（毫秒）
+ * @param message 超过限制时的提示
  */
-export function rateLimit(maxRequests: number = 3, windowMs: number = 60 * 60 * 1000) {
+export function rateLimit(
+  maxRequests: number = 3,
+  windowMs: number = 60 * 60 * 1000,
+  message: string = `每小时最多申请 ${maxRequests} 次，请稍后再试`
+) {
+  const requestMap = new Map<string, number[]>();
+  limiters.set(requestMap, windowMs);
+
   return (req: Request, res: Response, next: NextFunction) => {
     const ip = req.ip || req.socket.remoteAddress || 'unknown';
     const now = Date.now();
@@ -42,7 +51,7 @@ export function rateLimit(maxRequests: number = 3, windowMs: number = 60 * 60 *
     if (timestamps.length >= maxRequests) {
       return res.status(429).json({
         error: 'Too Many Requests',
-        message: `每小时最多申请 ${maxRequests} 次，请稍后再试`
+        message
       });
     }
     
@@ -32,7 +32,7 @@ import { parseCommentTime, isCommentTimeValid, formatTimeDiff } from '../utils/t
 const router = express.Router();
 
 // 配置文件上传
-const UPLOAD_DIR = path.join(__dirname, '../data/uploads');
+const UPLOAD_DIR = path.join(process.env.DATA_DIR || path.join(__dirname, '../data'), 'uploads');
 
 // 确保上传目录存在
 if (!fs.existsSync(UPLOAD_DIR)) {
@@ -94,7 +94,7 @@ router.post('/apply-code', rateLimit(3, 60 * 60 * 1000), upload.single('screensh
           const timeDiff = formatTimeDiff(parsedTime);
           console.log(`${userName} 的评论时间过旧: ${commentTime} (${timeDiff})`);
           
-          const failedApplication = createApplication({
+          const failedApplication = await createApplication({
             userName: userName,
             wechatId: userName,
             screenshot: screenshot.filename,
@@ -121,7 +121,7 @@ router.post('/apply-code', rateLimit(3, 60 * 60 * 1000), upload.single('screensh
     if (existingCommentApp && existingCommentApp.userName !== userName) {
       console.log(`${userName} 尝试使用其他用户（${existingCommentApp.userName}）的评论`);
       
-      const failedApplication = createApplication({
+      const failedApplication = await createApplication({
         userName: userName,
         wechatId: userName,
         screenshot: screenshot.filename,
@@ -153,7 +153,7 @@ router.post('/apply-code', rateLimit(3, 60 * 60 * 1000), upload.single('screensh
         if (existingCode.status === 'used') {
           console.log(`${userName} 尝试重复使用同一条评论，但体验码已使用`);
           
-          const failedApplication = createApplication({
+          const failedApplication = await createApplication({
             userName: userName,
             wechatId: userName,
             screenshot: screenshot.filename,
@@ -177,7 +177,7 @@ router.post('/apply-code', rateLimit(3, 60 * 60 * 1000), upload.single('screensh
         if (existingCode.status === 'active') {
           console.log(`${userName} 重复使用同一条评论，返回现有体验码:`, existingCode.code);
           
-          const application = createApplication({
+          const application = await createApplication({
             userName: userName,
             wechatId: userName,
             screenshot: screenshot.filename,
@@ -203,7 +203,7 @@ router.post('/apply-code', rateLimit(3, 60 * 60 * 1000), upload.single('screensh
     // 检查评论字数
     if (comment.length < 10) {
       // 记录失败的申请
-      const failedApplication = createApplication({
+      const failedApplication = await createApplication({
         userName: userName,
         wechatId: userName,
         screenshot: screenshot.filename,
@@ -229,7 +229,7 @@ router.post('/apply-code', rateLimit(3, 60 * 60 * 1000), upload.single('screensh
     
     if (!userNameLower.includes(extractedLower) && !extractedLower.includes(userNameLower)) {
       // 记录失败的申请
-      const failedApplication = createApplication({
+      const failedApplication = await createApplication({
         userName: userName,
         wechatId: userName,
         screenshot: screenshot.filename,
@@ -264,7 +264,7 @@ router.post('/apply-code', rateLimit(3, 60 * 60 * 1000), upload.single('screensh
     await addCode(code);
     
     // 记录成功的申请
-    const application = createApplication({
+    const application = await createApplication({
       userName: userName,
       wechatId: userName,
       screenshot: screenshot.filename,
@@ -308,7 +308,7 @@ router.post('/apply-code', rateLimit(3, 60 * 60 * 1000), upload.single('screensh
  * POST /api/verify-code
  * 验证体验码
  */
-router.post('/verify-code', (req: Request, res: Response) => {
+router.post('/verify-code', async (req: Request, res: Response) => {
   try {
     const { code } = req.body;
     
@@ -326,7 +326,7 @@ router.post('/verify-code', (req: Request, res: Response) => {
       await markCodeAsUsed(code);
       
       // 记录激活行为到申请列表
-      const activationRecord = createApplication({
+      const activationRecord = await createApplication({
         userName: result.data.userName || 'unknown',
         wechatId: result.data.userId || 'unknown',
         screenshot: '', // 激活时没有截图
@@ -334,7 +334,7 @@ router.post('/verify-code', (req: Request, res: Response) => {
         code: code
         // 激活记录不需要 aiVerification 字段
       });
-      addApplication(activationRecord);
+      await addApplication(activationRecord);
       console.log('激活记录已保存:', activationRecord.id, '用户:', result.data.userName, '体验码:', code);
       
       return res.json({
@@ -365,7 +365,7 @@ router.post('/verify-code', (req: Request, res: Response) => {
  * GET /api/check-access
  * 检查访问权限
  */
-router.get('/check-access', (req: Request, res: Response) => {
+router.get('/check-access', async (req: Request, res: Response) => {
   try {
     const auth = req.headers.authorization;
     
@@ -401,7 +401,7 @@ router.get('/check-access', (req: Request, res: Response) => {
  * POST /api/verify-token
  * 验证专属链接 token
  */
-router.post('/verify-token', (req: Request, res: Response) => {
+router.post('/verify-token', async (req: Request, res: Response) => {
   try {
     const { token } = req.body;
     
@@ -427,7 +427,7 @@ router.post('/verify-token', (req: Request, res: Response) => {
     
     if (result.valid && result.data) {
       // 标记为已使用
-      markCodeAsUsed(decoded.code);
+      await markCodeAsUsed(decoded.code);
       
       return res.json({
         valid: true,
@@ -453,11 +453,14 @@ router.post('/verify-token', (req: Request, res: Response) => {
   }
 });
 
+// 截图解析不需要登录，解码和缩放在请求线程上同步进行，按 IP 限制次数（SCREENSHOT_RATE_LIMIT，默认每小时 20 次）
+const SCREENSHOT_RATE_LIMIT = Number(process.env.SCREENSHOT_RATE_LIMIT) || 20;
+
 /**
  * POST /api/analyze-screenshot
  * 解析截图（保存截图并记录解析结果）
  */
-router.post('/analyze-screenshot', upload.single('screenshot'), async (req: Request, res: Response) => {
+router.post('/analyze-screenshot', rateLimit(SCREENSHOT_RATE_LIMIT, 60 * 60 * 1000, `每小时最多解析 ${SCREENSHOT_RATE_LIMIT} 次截图，请稍后再试`), upload.single('screenshot'), async (req: Request, res: Response) => {
   try {
     if (!req.file) {
       return res.status(400).json({
@@ -472,14 +475,13 @@ router.post('/analyze-screenshot', upload.single('screenshot'), async (req: Requ
     console.log('保存路径:', req.file.filename);
     
     // 调用 AI 审核服务（不验证姓名）
-    const imageBuffer = fs.readFileSync(req.file.path);
-    const result = await verifyScreenshot(imageBuffer);
+    const result = await verifyScreenshot(req.file.path);
     
     console.log('AI 解析结果:', JSON.stringify(result, null, 2));
     console.log('========== AI 解析结束 ==========\n');
 
     // 记录解析尝试（无论成功还是失败）
-    const parseApplication = createApplication({
+    const parseApplication = await createApplication({
       userName: result.extractedName || 'unknown',
       wechatId: result.extractedName || 'unknown',
       screenshot: req.file.filename,
@@ -491,7 +493,7 @@ router.post('/analyze-screenshot', upload.single('screenshot'), async (req: Requ
         confidence: result.confidence || 0
       }
     });
-    addApplication(parseApplication);
+    await addApplication(parseApplication);
     console.log('解析记录已保存:', parseApplication.id);
 
     if (result.success) {
@@ -519,14 +521,14 @@ router.post('/analyze-screenshot', upload.single('screenshot'), async (req: Requ
     
     // 即使出错也记录
     if (req.file) {
-      const errorApplication = createApplication({
+      const errorApplication = await createApplication({
         userName: 'error',
         wechatId: 'error',
         screenshot: req.file.filename,
         status: 'rejected',
         rejectReason: `系统错误: ${error.message}`
       });
-      addApplication(errorApplication);
+      await addApplication(errorApplication);
     }
     
     return res.status(500).json({
@@ -22,9 +22,17 @@ import {
   findCodeByUserName,
   createCode,
   addCode,
-  getApplications
+  getApplications,
+  getRecentApplications
 } from '../services/storage-adapter.js';
-import { batchSendToWechat } from '../services/wechat-sender.js';
+import {
+  createDeliveryJob,
+  getDeliveryJob,
+  listDeliveryJobs,
+  cancelDeliveryJob,
+  resumeDeliveryJob,
+  onDeliveryEvent
+} from '../services/delivery-queue.js';
 import { requireAdmin } from '../middleware/auth.js';
 import { generateLink, generateCode } from '../utils/code-generator.js';
 
@@ -83,10 +91,10 @@ const upload = multer({
  * GET /api/admin/stats
  * 获取统计数据
  */
-router.get('/stats', (req: Request, res: Response) => {
+router.get('/stats', async (req: Request, res: Response) => {
   try {
     const stats = await getStats();
-    const recentApplications = getRecentApplications(10);
+    const recentApplications = await getRecentApplications(10);
     
     return res.json({
       stats,
@@ -105,7 +113,7 @@ router.get('/stats', (req: Request, res: Response) => {
  * GET /api/admin/codes
  * 获取所有体验码（支持筛选和分页）
  */
-router.get('/codes', (req: Request, res: Response) => {
+router.get('/codes', async (req: Request, res: Response) => {
   try {
     const { status, source, page, limit } = req.query;
     
@@ -130,7 +138,7 @@ router.get('/codes', (req: Request, res: Response) => {
  * GET /api/admin/applications
  * 获取所有申请记录
  */
-router.get('/applications', (req: Request, res: Response) => {
+router.get('/applications', async (req: Request, res: Response) => {
   try {
     const { status, page, limit } = req.query;
     
@@ -154,7 +162,7 @@ router.get('/applications', (req: Request, res: Response) => {
  * POST /api/admin/generate-batch
  * 批量生成体验码
  */
-router.post('/generate-batch', upload.single('file'), (req: Request, res: Response) => {
+router.post('/generate-batch', upload.single('file'), async (req: Request, res: Response) => {
   try {
     const { users: usersJson, note } = req.body;
     const file = req.file;
@@ -272,7 +280,7 @@ router.post('/generate-batch', upload.single('file'), (req: Request, res: Respon
  * POST /api/admin/generate-single
  * 单个生成体验码（只需英文名）
  */
-router.post('/generate-single', (req: Request, res: Response) => {
+router.post('/generate-single', async (req: Request, res: Response) => {
   try {
     const { userName, note } = req.body;
     
@@ -329,13 +337,13 @@ router.post('/generate-single', (req: Request, res: Response) => {
  * PUT /api/admin/codes/:id/reset
  * 重置体验码（生成新码，旧码失效）
  */
-router.put('/codes/:id/reset', (req: Request, res: Response) => {
+router.put('/codes/:id/reset', async (req: Request, res: Response) => {
   try {
     const { id } = req.params;
     
     // 查找旧体验码
-    const codes = getCodes({ limit: 10000 });
-    const oldCode = codes.codes.find(c => c.id === id);
+    const data = await loadCodes();
+    const oldCode = data.codes.find(c => c.id === id);
     
     if (!oldCode) {
       return res.status(404).json({
@@ -353,13 +361,13 @@ router.put('/codes/:id/reset', (req: Request, res: Response) => {
     });
     
     // 旧码设为失效
-    updateCode(id, {
+    await updateCode(id, {
       status: 'expired',
       note: `已重置，新码: ${newCode.code}`
     });
     
     // 添加新码
-    addCode(newCode);
+    await addCode(newCode);
     
     return res.json({
       success: true,
@@ -380,7 +388,7 @@ router.put('/codes/:id/reset', (req: Request, res: Response) => {
  * PUT /api/admin/codes/:id/adjust-uses
  * 调整体验码的最大使用次数
  */
-router.put('/codes/:id/adjust-uses', (req: Request, res: Response) => {
+router.put('/codes/:id/adjust-uses', async (req: Request, res: Response) => {
   try {
     const { id } = req.params;
     const { maxUses } = req.body;
@@ -392,7 +400,7 @@ router.put('/codes/:id/adjust-uses', (req: Request, res: Response) => {
       });
     }
     
-    const success = updateCode(id, {
+    const success = await updateCode(id, {
       maxUses: parseInt(maxUses)
     });
     
@@ -420,12 +428,12 @@ router.put('/codes/:id/adjust-uses', (req: Request, res: Response) => {
  * POST /api/admin/codes/:id/regenerate
  * 重新生成体验码（保留用户信息，生成新的 code）
  */
-router.post('/codes/:id/regenerate', (req: Request, res: Response) => {
+router.post('/codes/:id/regenerate', async (req: Request, res: Response) => {
   try {
     const { id } = req.params;
     
     // 查找现有体验码
-    const data = loadCodes();
+    const data = await loadCodes();
     const existingCode = data.codes.find(c => c.id === id);
     
     if (!existingCode) {
@@ -439,7 +447,7 @@ router.post('/codes/:id/regenerate', (req: Request, res: Response) => {
     const newCodeValue = generateCode();
     
     // 更新体验码
-    const success = updateCode(id, {
+    const success = await updateCode(id, {
       code: newCodeValue,
       status: 'active',
       currentUses: 0,
@@ -474,13 +482,48 @@ router.post('/codes/:id/regenerate', (req: Request, res: Response) => {
   }
 });
 
+/**
+ * 把任务进度以 SSE 推给客户端，直到任务结束或客户端断开（断开不影响后台发送）
+ */
+function streamDeliveryJob(req: Request, res: Response, jobId: string): void {
+  const job = getDeliveryJob(jobId)!;
+
+  // 设置 SSE 响应头
+  res.setHeader('Content-Type', 'text/event-stream');
+  res.setHeader('Cache-Control', 'no-cache');
+  res.setHeader('Connection', 'keep-alive');
+
+  res.write(`data: ${JSON.stringify({ type: 'job', job })}\n\n`);
+  if (job.status === 'completed' || job.status === 'cancelled' || job.status === 'failed') {
+    res.write(`data: ${JSON.stringify({
+      type: job.status === 'completed' ? 'complete' : job.status,
+      success: job.sent,
+      failed: job.failed,
+      message: job.error
+    })}\n\n`);
+    res.end();
+    return;
+  }
+
+  const unsubscribe = onDeliveryEvent(jobId, event => {
+    res.write(`data: ${JSON.stringify(event)}\n\n`);
+    if (event.type === 'complete' || event.type === 'cancelled' || event.type === 'failed') {
+      unsubscribe();
+      res.end();
+    }
+  });
+  req.on('close', unsubscribe);
+}
+
 /**
  * POST /api/admin/batch-send
- * 批量发送到企业微信（SSE 实时进度）
+ * 批量发送到企业微信：创建后台发送任务，默认以 SSE 推送实时进度；
+ * background=true 时直接返回任务，之后用 GET /api/admin/batch-send/jobs/:id 查询进度
+ * 可选 ratePerMinute / concurrency / maxAttempts 覆盖默认的限速、并发和重试次数
  */
 router.post('/batch-send', async (req: Request, res: Response) => {
   try {
-    const { codeIds, webhookUrl } = req.body;
+    const { codeIds, webhookUrl, background, ratePerMinute, concurrency, maxAttempts } = req.body;
     
     if (!codeIds || !Array.isArray(codeIds) || codeIds.length === 0) {
       return res.status(400).json({
@@ -497,8 +540,9 @@ router.post('/batch-send', async (req: Request, res: Response) => {
     }
     
     // 获取要发送的体验码
-    const data = loadCodes();
-    const codesToSend = data.codes.filter(c => codeIds.includes(c.id));
+    const data = await loadCodes();
+    const ids = new Set(codeIds);
+    const codesToSend = data.codes.filter(c => ids.has(c.id));
     
     if (codesToSend.length === 0) {
       return res.status(400).json({
@@ -507,54 +551,17 @@ router.post('/batch-send', async (req: Request, res: Response) => {
       });
     }
     
-    // 设置 SSE 响应头
-    res.setHeader('Content-Type', 'text/event-stream');
-    res.setHeader('Cache-Control', 'no-cache');
-    res.setHeader('Connection', 'keep-alive');
-    
     const baseUrl = process.env.BASE_URL || 'http://localhost:5000';
+    const job = createDeliveryJob(codesToSend, webhookUrl, baseUrl, { ratePerMinute, concurrency, maxAttempts });
     
-    // 批量发送
-    const items = codesToSend.map(c => ({
-      userName: c.userName,
-      code: c.code
-    }));
-    
-    await batchSendToWechat(
-      webhookUrl,
-      items,
-      baseUrl,
-      (current, total, userName, success, message) => {
-        // 发送进度事件
-        res.write(`data: ${JSON.stringify({
-          type: 'progress',
-          current,
-          total,
-          userName,
-          status: success ? 'success' : 'failed',
-          message
-        })}\n\n`);
-        
-        // 更新体验码的发送状态
-        const code = codesToSend.find(c => c.userName === userName);
-        if (code) {
-          updateCode(code.id, {
-            sentAt: new Date().toISOString(),
-            sentStatus: success ? 'success' : 'failed',
-            sentError: success ? undefined : message
-          });
-        }
-      }
-    );
-    
-    // 发送完成事件
-    res.write(`data: ${JSON.stringify({
-      type: 'complete',
-      success: codesToSend.filter(c => c.sentStatus === 'success').length,
-      failed: codesToSend.filter(c => c.sentStatus === 'failed').length
-    })}\n\n`);
+    if (background) {
+      return res.status(202).json({
+        success: true,
+        job
+      });
+    }
     
-    res.end();
+    streamDeliveryJob(req, res, job.id);
   } catch (error: any) {
     console.error('批量发送错误:', error);
     
@@ -575,16 +582,99 @@ router.post('/batch-send', async (req: Request, res: Response) => {
   }
 });
 
+/**
+ * GET /api/admin/batch-send/jobs
+ * 最近的批量发送任务
+ */
+router.get('/batch-send/jobs', (req: Request, res: Response) => {
+  const limit = req.query.limit ? parseInt(req.query.limit as string) : 20;
+  return res.json({
+    jobs: listDeliveryJobs(limit)
+  });
+});
+
+/**
+ * GET /api/admin/batch-send/jobs/:id
+ * 批量发送任务的进度，附带失败和待发送的用户
+ */
+router.get('/batch-send/jobs/:id', (req: Request, res: Response) => {
+  const job = getDeliveryJob(req.params.id, true);
+  if (!job) {
+    return res.status(404).json({
+      success: false,
+      message: '发送任务不存在'
+    });
+  }
+  return res.json({ job });
+});
+
+/**
+ * GET /api/admin/batch-send/jobs/:id/events
+ * 重新订阅任务的 SSE 进度（页面刷新后继续显示）
+ */
+router.get('/batch-send/jobs/:id/events', (req: Request, res: Response) => {
+  if (!getDeliveryJob(req.params.id)) {
+    return res.status(404).json({
+      success: false,
+      message: '发送任务不存在'
+    });
+  }
+  streamDeliveryJob(req, res, req.params.id);
+});
+
+/**
+ * POST /api/admin/batch-send/jobs/:id/cancel
+ * 取消批量发送任务（已发出的不受影响）
+ */
+router.post('/batch-send/jobs/:id/cancel', (req: Request, res: Response) => {
+  if (cancelDeliveryJob(req.params.id)) {
+    return res.json({
+      success: true,
+      message: '已取消'
+    });
+  }
+  return res.status(404).json({
+    success: false,
+    message: '发送任务不存在或已结束'
+  });
+});
+
+/**
+ * POST /api/admin/batch-send/jobs/:id/resume
+ * 继续发送中止的任务（服务重启或发送异常后），需要重新提供创建任务时的 webhookUrl
+ */
+router.post('/batch-send/jobs/:id/resume', (req: Request, res: Response) => {
+  const { webhookUrl } = req.body;
+  if (!webhookUrl) {
+    return res.status(400).json({
+      success: false,
+      message: '请提供企业微信 webhook 地址'
+    });
+  }
+  try {
+    const job = resumeDeliveryJob(req.params.id, webhookUrl);
+    return res.json({
+      success: true,
+      job
+    });
+  } catch (error: any) {
+    return res.status(400).json({
+      success: false,
+      message: error.message
+    });
+  }
+});
+
 /**
  * PUT /api/admin/codes/:id
  * 更新体验码
  */
-router.put('/codes/:id', (req: Request, res: Response) => {
+router.put('/codes/:id', async (req: Request, res: Response) => {
   try {
     const { id } = req.params;
     const updates = req.body;
     
-    const success = updateCode(id, updates);
+    const success = await updateCode(id, updates);
     
     if (success) {
       return res.json({
@@ -610,7 +700,7 @@ router.put('/codes/:id', (req: Request, res: Response) => {
  * GET /api/admin/export
  * 导出数据为 Excel
  */
-router.get('/export', (req: Request, res: Response) => {
+router.get('/export', async (req: Request, res: Response) => {
   try {
     const { format = 'xlsx', status } = req.query;
     
@@ -661,7 +751,8 @@ router.get('/export', (req: Request, res: Response) => {
 router.get('/screenshots/:filename', requireAdmin, (req: Request, res: Response) => {
   try {
     const { filename } = req.params;
-    const uploadsDir = path.join(__dirname, '../data/uploads');
+    // 与 access-code.ts 的 UPLOAD_DIR 一致（Vercel 上 DATA_DIR 指向临时目录）
+    const uploadsDir = path.join(process.env.DATA_DIR || path.join(__dirname, '../data'), 'uploads');
     const filePath = path.join(uploadsDir, filename);
     
     // 检查文件是否存在
@@ -687,7 +778,7 @@ router.get('/screenshots/:filename', requireAdmin, (req: Request, res: Response)
  * POST /api/admin/generate-code
  * 通过姓名生成体验码
  */
-router.post('/generate-code', requireAdmin, (req: Request, res: Response) => {
+router.post('/generate-code', requireAdmin, async (req: Request, res: Response) => {
   try {
     const { userName, note } = req.body;
     
@@ -4,6 +4,7 @@
 
 import fs from 'node:fs';
 import OpenAI from 'openai';
+import { fileSha256, findExactReply, prepareScreenshot, findCachedReply, cacheReply, callModelOnce } from './screenshot-pipeline.js';
 
 // 根据模型选择对应的 API 配置
 const MODEL = process.env.OPENAI_MODEL || 'gpt-4o-mini';
@@ -16,9 +17,10 @@ const API_KEY = isAPI2D
   ? (process.env.API2D_API_KEY || process.env.OPENAI_API_KEY)
   : (process.env.HAIHUB_API_KEY || process.env.OPENAI_API_KEY);
 
-const BASE_URL = isAPI2D
+// OPENAI_BASE_URL 可覆盖（本地基准测试指向模型替身）
+const BASE_URL = process.env.OPENAI_BASE_URL || (isAPI2D
   ? 'https://oa.api2d.net'
-  : 'https://api.haihub.cn/v1';
+  : 'https://api.haihub.cn/v1');
 
 // 验证 API Key
 if (!API_KEY) {
@@ -70,20 +72,8 @@ export async function verifyScreenshot(
   }
   
   try {
-    // 读取图片并转换为 base64
-    let imageBuffer: Buffer;
-    let mimeType: string;
-
-    if (Buffer.isBuffer(imageInput)) {
-      imageBuffer = imageInput;
-      mimeType = 'image/png'; // 默认 PNG
-    } else {
-      imageBuffer = fs.readFileSync(imageInput);
-      mimeType = getMimeType(imageInput);
-    }
-
-    const base64Image = imageBuffer.toString('base64');
-    const imageDataUrl = `data:${mimeType};base64,${base64Image}`;
+    const imageBuffer = Buffer.isBuffer(imageInput) ? imageInput : await fs.promises.readFile(imageInput);
+    const sha256 = fileSha256(imageBuffer);
     
     // 调用 AI 模型
     const promptText = expectedName 
@@ -108,33 +98,60 @@ export async function verifyScreenshot(
 - 如果不是评论截图，请设置 is_comment: false
 - comment_time 请尽量保持原文，如"昨天 21:58"、"11月1日"、"2天前"等`;
 
-    console.log('Using AI model:', MODEL);
-    console.log('API Key:', process.env.OPENAI_API_KEY?.substring(0, 10) + '...');
-    console.log('Base URL:', process.env.OPENAI_BASE_URL);
-    
-    const response = await openai.chat.completions.create({
-      model: MODEL,
-      messages: [
-        {
-          role: 'user',
-          content: [
-            {
-              type: 'text',
-              text: promptText
-            },
+    // 相同文件直接复用缓存的回复（不解码）；否则预处理（缩小、重新编码、计算哈希）后再查像素相同或几乎相同的截图
+    let result = findExactReply(sha256, promptText);
+    const prepared = result === null
+      ? await prepareScreenshot(imageBuffer, Buffer.isBuffer(imageInput) ? undefined : getMimeType(imageInput), sha256)
+      : null;
+    const cached = prepared && findCachedReply(prepared, promptText);
+    if (result !== null) {
+      console.log('[AI Verifier] 命中截图缓存（相同文件）');
+    } else if (cached) {
+      const matchText = cached.match === 'exact' ? '相同文件' : cached.match === 'pixels' ? '像素相同'
+        : `相似的非评论截图，距离 ${cached.distance}`;
+      console.log(`[AI Verifier] 命中截图缓存（${matchText}）`);
+      result = cached.reply;
+    } else {
+      console.log('Using AI model:', MODEL);
+      console.log(`[AI Verifier] 图片 ${prepared.originalBytes} -> ${prepared.buffer.length} bytes`);
+
+      const imageDataUrl = `data:${prepared.mimeType};base64,${prepared.buffer.toString('base64')}`;
+      result = await callModelOnce(prepared, promptText, async () => {
+        const response = await openai.chat.completions.create({
+          model: MODEL,
+          messages: [
             {
-              type: 'image_url',
-              image_url: {
-                url: imageDataUrl
-              }
+              role: 'user',
+              content: [
+                {
+                  type: 'text',
+                  text: promptText
+                },
+                {
+                  type: 'image_url',
+                  image_url: {
+                    url: imageDataUrl
+                  }
+                }
+              ]
             }
-          ]
+          ],
+          max_tokens: 500
+        });
+        const reply = response.choices[0].message.content;
+
+        // 能解析成 JSON 的回复才缓存（格式错误的回复下次重新识别）
+        if (reply) {
+          try {
+            JSON.parse(reply);
+            cacheReply(prepared, promptText, reply);
+          } catch (e) {
+            // 不缓存
+          }
         }
-      ],
-      max_tokens: 500
-    });
-    
-    const result = response.choices[0].message.content;
+        return reply;
+      });
+    }
     
     if (!result) {
       return {
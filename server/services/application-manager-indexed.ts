@@ -0,0 +1,125 @@
+/**
+ * 申请记录管理服务（带索引的追加写存储版本）
+ *
+ * 接口与 application-manager.ts 相同，数据仍在 DATA_DIR/applications.json（格式不变），
+ * 新增和修改追加到 applications.wal；按评论内容建索引，用于防重复评论检查
+ */
+
+import path from 'node:path';
+import { fileURLToPath } from 'node:url';
+import { dirname } from 'node:path';
+import { RecordStore } from './record-store.js';
+import type { Application, ApplicationsData } from './application-manager.js';
+
+export { createApplication } from './application-manager.js';
+export type { Application, ApplicationsData } from './application-manager.js';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = dirname(__filename);
+
+const DATA_DIR = process.env.DATA_DIR || path.join(__dirname, '../data');
+
+const store = new RecordStore<Application>({
+  dir: DATA_DIR,
+  file: 'applications.json',
+  key: 'applications',
+  indexes: {
+    comment: a => a.aiVerification?.comment
+  },
+  orderBy: a => a.appliedAt
+});
+
+/**
+ * 读取申请记录（全量副本）
+ */
+export function loadApplications(): ApplicationsData {
+  return { applications: store.all() };
+}
+
+/**
+ * 保存申请记录（全量替换并写快照）
+ */
+export function saveApplications(data: ApplicationsData): void {
+  store.replaceAll(data.applications);
+}
+
+/**
+ * 添加申请记录
+ */
+export function addApplication(application: Application): void {
+  store.put(application);
+}
+
+/**
+ * 更新申请记录
+ */
+export function updateApplication(id: string, updates: Partial<Application>): boolean {
+  return store.update(id, updates);
+}
+
+/**
+ * 获取所有申请记录
+ */
+export function getApplications(options?: {
+  status?: 'pending' | 'approved' | 'rejected';
+  page?: number;
+  limit?: number;
+}): { applications: Application[]; total: number; page: number; pages: number } {
+  const page = options?.page || 1;
+  const limit = options?.limit || 50;
+  const start = (page - 1) * limit;
+  const end = start + limit;
+
+  // 按时间倒序遍历，只复制当前页；不筛选时取满一页即可停止
+  const applications: Application[] = [];
+  let total = 0;
+  for (const application of store.newestFirst()) {
+    if (options?.status && application.status !== options.status) continue;
+    if (total >= start && total < end) {
+      applications.push({ ...application });
+    }
+    total++;
+    if (!options?.status && total >= end) {
+      break;
+    }
+  }
+  if (!options?.status) {
+    total = store.size;
+  }
+
+  const pages = Math.ceil(total / limit);
+  return { applications, total, page, pages };
+}
+
+/**
+ * 获取最近的申请记录
+ */
+export function getRecentApplications(limit: number = 10): Application[] {
+  const recent: Application[] = [];
+  for (const application of store.newestFirst()) {
+    if (recent.length >= limit) break;
+    recent.push({ ...application });
+  }
+  return recent;
+}
+
+/**
+ * 查找相同评论的申请记录（用于防止重复使用同一条评论）
+ * 只检查相同用户名的重复评论
+ */
+export function findApplicationByComment(userName: string, comment: string): Application | null {
+  const found = store.findAll('comment', comment).find(app =>
+    app.userName === userName &&
+    app.status === 'approved'
+  );
+  return found || null;
+}
+
+/**
+ * 查找相同评论内容的申请记录（不限用户名）
+ * 用于防止不同用户使用相同评论
+ */
+export function findApplicationByCommentContent(comment: string): Application | null {
+  const found = store.findAll('comment', comment).find(app => app.status === 'approved');
+  return found || null;
+}
@@ -1,11 +1,26 @@
 /**
  * 申请记录管理服务 (Vercel KV版本)
+ *
+ * 逐条记录布局（不再把整个数组存在一个键里）：
+ *   app:<id>                   申请记录
+ *   apps:all                   全部 id，按 appliedAt 排序的有序集合
+ *   apps:status:<status>       按状态分的有序集合（同上排序）
+ *   apps:by-comment:<sha1>     评论内容相同的 id 集合（防重复评论检查）
  */
 
+import crypto from 'node:crypto';
 import { kv } from '@vercel/kv';
 import { generateId } from '../utils/code-generator.js';
+import { mgetRecords, writeInChunks, lockedUpdate, migrationOnce, timeScore, LockedWrite } from './kv-records.js';
 
-const APPLICATIONS_KEY = 'applications';
+const APPLICATIONS_KEY = 'applications';  // 旧布局，只在迁移时读取
+const LAYOUT_KEY = 'apps:layout:v2';
+const ALL_KEY = 'apps:all';
+
+const recordKey = (id: string) => `app:${id}`;
+const statusKey = (status: string) => `apps:status:${status}`;
+const commentKey = (comment: string) => `apps:by-comment:${crypto.createHash('sha1').update(comment).digest('hex')}`;
+const lockKey = (id: string) => `lock:app:${id}`;
 
 export interface Application {
   id: string;
@@ -29,12 +44,99 @@ export interface ApplicationsData {
   applications: Application[];
 }
 
+type Transaction = ReturnType<typeof kv.multi>;
+
+/**
+ * 写入一批新记录（记录合并成一条 MSET，有序集合合并成一条 ZADD）
+ * onlyNew（迁移旧布局时）逐条 SET NX，不覆盖已存在的记录
+ */
+function insertApplications(tx: Transaction, applications: Application[], onlyNew: boolean = false): void {
+  const entries: Record<string, any> = {};
+  const zsets = new Map<string, Array<{ score: number; member: string }>>();
+  const addToZset = (key: string, score: number, member: string) => {
+    if (!zsets.has(key)) zsets.set(key, []);
+    zsets.get(key)!.push({ score, member });
+  };
+
+  for (const application of applications) {
+    entries[recordKey(application.id)] = application;
+    const score = timeScore(application.appliedAt);
+    addToZset(ALL_KEY, score, application.id);
+    addToZset(statusKey(application.status), score, application.id);
+    const comment = application.aiVerification?.comment;
+    if (comment) {
+      tx.sadd(commentKey(comment), application.id);
+    }
+  }
+
+  if (onlyNew) {
+    // 迁移：已存在的键（迁移后被修改过的记录）不覆盖
+    for (const [key, value] of Object.entries(entries)) {
+      tx.set(key, value, { nx: true });
+    }
+  } else {
+    tx.mset(entries);
+  }
+  for (const [key, members] of zsets) {
+    const [first, ...rest] = members;
+    tx.zadd(key, first, ...rest);
+  }
+}
+
+/**
+ * 写入修改后的记录，只调整变化了的索引
+ */
+function replaceApplication(tx: LockedWrite, prev: Application, next: Application): void {
+  tx.set(recordKey(next.id), next);
+  const score = timeScore(next.appliedAt);
+
+  if (prev.appliedAt !== next.appliedAt) {
+    tx.zadd(ALL_KEY, { score, member: next.id });
+  }
+  if (prev.status !== next.status || prev.appliedAt !== next.appliedAt) {
+    tx.zrem(statusKey(prev.status), prev.id);
+    tx.zadd(statusKey(next.status), { score, member: next.id });
+  }
+  const prevComment = prev.aiVerification?.comment;
+  const nextComment = next.aiVerification?.comment;
+  if (prevComment !== nextComment) {
+    if (prevComment) tx.srem(commentKey(prevComment), prev.id);
+    if (nextComment) tx.sadd(commentKey(nextComment), next.id);
+  }
+}
+
+const ensureMigrated = migrationOnce(LAYOUT_KEY, APPLICATIONS_KEY, async (legacy: Application[]) => {
+  await writeInChunks(legacy, (tx, chunk) => insertApplications(tx, chunk, true));
+});
+
+/**
+ * 按有序集合倒序取一页记录
+ */
+async function pageOf(key: string, start: number, end: number): Promise<Application[]> {
+  const ids = await kv.zrange<string[]>(key, start, end - 1, { rev: true });
+  return mgetRecords<Application>(ids.map(recordKey));
+}
+
 /**
- * 读取申请记录
+ * 评论内容相同的已通过申请
+ */
+async function approvedWithComment(comment: string): Promise<Application[]> {
+  await ensureMigrated();
+  const ids = await kv.smembers(commentKey(comment));
+  const applications = await mgetRecords<Application>(ids.map(id => recordKey(String(id))));
+  return applications
+    .filter(app => app.aiVerification?.comment === comment && app.status === 'approved')
+    .sort((a, b) => timeScore(a.appliedAt) - timeScore(b.appliedAt));
+}
+
+/**
+ * 读取申请记录（全量，按申请时间排序）
  */
 export async function loadApplications(): Promise<ApplicationsData> {
   try {
-    const applications = await kv.get<Application[]>(APPLICATIONS_KEY) || [];
+    await ensureMigrated();
+    const ids = await kv.zrange<string[]>(ALL_KEY, 0, -1);
+    const applications = await mgetRecords<Application>(ids.map(recordKey));
     return { applications };
   } catch (e) {
     console.error('Error loading applications from KV:', e);
@@ -43,11 +145,23 @@ export async function loadApplications(): Promise<ApplicationsData> {
 }
 
 /**
- * 保存申请记录
+ * 保存申请记录（全量替换：删除现有记录和索引后重新写入）
  */
 export async function saveApplications(data: ApplicationsData): Promise<void> {
   try {
-    await kv.set(APPLICATIONS_KEY, data.applications);
+    const { applications: existing } = await loadApplications();
+    const keys = new Set<string>([ALL_KEY]);
+    for (const application of existing) {
+      keys.add(recordKey(application.id));
+      keys.add(statusKey(application.status));
+      if (application.aiVerification?.comment) {
+        keys.add(commentKey(application.aiVerification.comment));
+      }
+    }
+    await writeInChunks(Array.from(keys), (tx, chunk) => {
+      tx.del(...chunk);
+    });
+    await writeInChunks(data.applications, insertApplications);
   } catch (e) {
     console.error('Error saving applications to KV:', e);
     throw e;
@@ -93,25 +207,18 @@ export function createApplication(params: {
  * 添加申请记录
  */
 export async function addApplication(application: Application): Promise<void> {
-  const data = await loadApplications();
-  data.applications.push(application);
-  await saveApplications(data);
+  await ensureMigrated();
+  await writeInChunks([application], insertApplications);
 }
 
 /**
- * 更新申请记录
+ * 更新申请记录（在记录锁内合并字段）
  */
 export async function updateApplication(id: string, updates: Partial<Application>): Promise<boolean> {
-  const data = await loadApplications();
-  const index = data.applications.findIndex(a => a.id === id);
-  
-  if (index === -1) {
-    return false;
-  }
-  
-  data.applications[index] = { ...data.applications[index], ...updates };
-  await saveApplications(data);
-  return true;
+  await ensureMigrated();
+  return lockedUpdate<Application>(lockKey(id), () => kv.get<Application>(recordKey(id)), (tx, prev) => {
+    replaceApplication(tx, prev, { ...prev, ...updates, id });
+  });
 }
 
 /**
@@ -122,27 +229,17 @@ export async function getApplications(options?: {
   page?: number;
   limit?: number;
 }): Promise<{ applications: Application[]; total: number; page: number; pages: number }> {
-  const data = await loadApplications();
-  let applications = data.applications;
-  
-  // 筛选
-  if (options?.status) {
-    applications = applications.filter(a => a.status === options.status);
-  }
-  
-  // 按时间倒序排序
-  applications.sort((a, b) => new Date(b.appliedAt).getTime() - new Date(a.appliedAt).getTime());
-  
+  await ensureMigrated();
+  const key = options?.status ? statusKey(options.status) : ALL_KEY;
+
   // 分页
   const page = options?.page || 1;
   const limit = options?.limit || 50;
-  const total = applications.length;
-  const pages = Math.ceil(total / limit);
   const start = (page - 1) * limit;
   const end = start + limit;
-  
-  applications = applications.slice(start, end);
-  
+  const [total, applications] = await Promise.all([kv.zcard(key), pageOf(key, start, end)]);
+  const pages = Math.ceil(total / limit);
+
   return { applications, total, page, pages };
 }
 
@@ -150,10 +247,8 @@ export async function getApplications(options?: {
  * 获取最近的申请记录
  */
 export async function getRecentApplications(limit: number = 10): Promise<Application[]> {
-  const data = await loadApplications();
-  return data.applications
-    .sort((a, b) => new Date(b.appliedAt).getTime() - new Date(a.appliedAt).getTime())
-    .slice(0, limit);
+  await ensureMigrated();
+  return pageOf(ALL_KEY, 0, limit);
 }
 
 /**
@@ -161,12 +256,7 @@ export async function getRecentApplications(limit: number = 10): Promise<Applica
  * 只检查相同用户名的重复评论
  */
 export async function findApplicationByComment(userName: string, comment: string): Promise<Application | null> {
-  const data = await loadApplications();
-  const found = data.applications.find(app => 
-    app.userName === userName && 
-    app.aiVerification?.comment === comment &&
-    app.status === 'approved'
-  );
+  const found = (await approvedWithComment(comment)).find(app => app.userName === userName);
   return found || null;
 }
 
@@ -175,10 +265,6 @@ export async function findApplicationByComment(userName: string, comment: string
  * 用于防止不同用户使用相同评论
  */
 export async function findApplicationByCommentContent(comment: string): Promise<Application | null> {
-  const data = await loadApplications();
-  const found = data.applications.find(app => 
-    app.aiVerification?.comment === comment &&
-    app.status === 'approved'
-  );
+  const found = (await approvedWithComment(comment))[0];
   return found || null;
 }
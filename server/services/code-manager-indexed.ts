@@ -0,0 +1,236 @@
+/**
+ * 体验码管理服务（带索引的追加写存储版本）
+ *
+ * 接口与 code-manager.ts 相同，数据仍在 DATA_DIR/codes.json（格式不变），
+ * 修改追加到 codes.wal，按 code / userName / userId 建哈希索引，统计增量维护，
+ * 验证和激活不再随体验码总数变慢
+ */
+
+import path from 'node:path';
+import { fileURLToPath } from 'node:url';
+import { dirname } from 'node:path';
+import { RecordStore } from './record-store.js';
+import type { AccessCode, CodesData } from './code-manager.js';
+
+export { createCode, createBatchCodes } from './code-manager.js';
+export type { AccessCode, CodesData } from './code-manager.js';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = dirname(__filename);
+
+const DATA_DIR = process.env.DATA_DIR || path.join(__dirname, '../data');
+
+type CodeStats = CodesData['stats'];
+
+function emptyStats(): CodeStats {
+  return {
+    total: 0,
+    active: 0,
+    used: 0,
+    expired: 0,
+    batch: 0,
+    selfApply: 0
+  };
+}
+
+let stats = emptyStats();
+
+/**
+ * 把一条记录计入（sign=1）或移出（sign=-1）统计，口径与 calculateStats 相同
+ */
+function countCode(code: AccessCode, sign: number): void {
+  stats.total += sign;
+  if (code.status === 'active') stats.active += sign;
+  if (code.status === 'used') stats.used += sign;
+  if (code.status === 'expired') stats.expired += sign;
+  if (code.source === 'batch') stats.batch += sign;
+  if (code.source === 'self_apply') stats.selfApply += sign;
+}
+
+const store = new RecordStore<AccessCode>({
+  dir: DATA_DIR,
+  file: 'codes.json',
+  key: 'codes',
+  extra: () => ({ stats }),
+  indexes: {
+    code: c => c.code,
+    userName: c => c.userName,
+    userId: c => c.userId
+  },
+  orderBy: c => c.createdAt,
+  onChange: (prev, next) => {
+    if (prev) {
+      countCode(prev, -1);
+    }
+    countCode(next, 1);
+  },
+  onReset: codes => {
+    stats = emptyStats();
+    for (const code of codes) {
+      countCode(code, 1);
+    }
+  }
+});
+
+/**
+ * 读取体验码数据（全量副本，只在导出、批量操作等需要全部数据时使用）
+ */
+export function loadCodes(): CodesData {
+  const codes = store.all();
+  return { codes, stats: { ...stats } };
+}
+
+/**
+ * 保存体验码数据（全量替换并写快照）
+ */
+export function saveCodes(data: CodesData): void {
+  store.replaceAll(data.codes);
+  data.stats = { ...stats };
+}
+
+/**
+ * 根据体验码查找
+ */
+export function findCodeByCode(code: string): AccessCode | undefined {
+  return store.findOne('code', code);
+}
+
+/**
+ * 根据用户名查找
+ */
+export function findCodeByUserName(userName: string): AccessCode | undefined {
+  return store.findOne('userName', userName);
+}
+
+/**
+ * 根据用户ID查找
+ */
+export function findCodeByUserId(userId: string): AccessCode | undefined {
+  return store.findOne('userId', userId);
+}
+
+/**
+ * 验证体验码
+ * @param code 体验码
+ * @param forActivation 是否用于激活（true=激活，false=权限检查）
+ */
+export function verifyCode(code: string, forActivation: boolean = true): { valid: boolean; message: string; data?: AccessCode } {
+  const accessCode = findCodeByCode(code);
+
+  if (!accessCode) {
+    return { valid: false, message: '体验码不存在' };
+  }
+
+  if (accessCode.status === 'expired') {
+    return { valid: false, message: '体验码已过期' };
+  }
+
+  // 如果是激活操作，检查是否已被使用
+  if (forActivation && accessCode.status === 'used' && accessCode.currentUses >= accessCode.maxUses) {
+    return { valid: false, message: '体验码已被使用' };
+  }
+
+  // 如果是权限检查，允许已使用的体验码通过验证
+  if (!forActivation && accessCode.status === 'used') {
+    return { valid: true, message: '验证成功', data: accessCode };
+  }
+
+  if (accessCode.expiresAt && new Date(accessCode.expiresAt) < new Date()) {
+    // 自动更新为过期状态
+    store.update(accessCode.id, { status: 'expired' });
+    return { valid: false, message: '体验码已过期' };
+  }
+
+  return { valid: true, message: '验证成功', data: accessCode };
+}
+
+/**
+ * 标记体验码为已使用
+ */
+export function markCodeAsUsed(code: string): boolean {
+  const accessCode = findCodeByCode(code);
+
+  if (!accessCode) {
+    return false;
+  }
+
+  accessCode.currentUses += 1;
+
+  if (accessCode.currentUses >= accessCode.maxUses) {
+    accessCode.status = 'used';
+  }
+
+  if (!accessCode.usedAt) {
+    accessCode.usedAt = new Date().toISOString();
+  }
+
+  store.put(accessCode);
+  return true;
+}
+
+/**
+ * 添加体验码
+ */
+export function addCode(code: AccessCode): void {
+  store.put(code);
+}
+
+/**
+ * 批量添加体验码
+ */
+export function addBatchCodes(codes: AccessCode[]): void {
+  store.putMany(codes);
+}
+
+/**
+ * 更新体验码
+ */
+export function updateCode(id: string, updates: Partial<AccessCode>): boolean {
+  return store.update(id, updates);
+}
+
+/**
+ * 获取所有体验码（支持筛选和分页）
+ */
+export function getCodes(options?: {
+  status?: 'active' | 'used' | 'expired';
+  source?: 'batch' | 'self_apply' | 'manual';
+  page?: number;
+  limit?: number;
+}): { codes: AccessCode[]; total: number; page: number; pages: number } {
+  const page = options?.page || 1;
+  const limit = options?.limit || 50;
+  const start = (page - 1) * limit;
+  const end = start + limit;
+
+  // 按创建时间倒序遍历，只复制当前页；不筛选时总数直接取统计，取满一页即可停止
+  const filtered = Boolean(options?.status || options?.source);
+  const codes: AccessCode[] = [];
+  let total = 0;
+  for (const code of store.newestFirst()) {
+    if (options?.status && code.status !== options.status) continue;
+    if (options?.source && code.source !== options.source) continue;
+    if (total >= start && total < end) {
+      codes.push({ ...code });
+    }
+    total++;
+    if (!filtered && total >= end) {
+      break;
+    }
+  }
+  if (!filtered) {
+    total = stats.total;
+  }
+
+  const pages = Math.ceil(total / limit);
+  return { codes, total, page, pages };
+}
+
+/**
+ * 获取统计数据
+ */
+export function getStats() {
+  // 确保已从磁盘加载
+  void store.size;
+  return { ...stats };
+}
@@ -1,12 +1,34 @@
 /**
  * 体验码管理服务 (Vercel KV版本)
+ *
+ * 逐条记录布局（不再把整个数组存在一个键里）：
+ *   code:<id>                     体验码记录
+ *   code:by-code:<code>           体验码 -> id
+ *   codes:by-user-name:<userName> 该用户名的 id 集合
+ *   codes:by-user-id:<userId>     该用户 ID 的 id 集合
+ *   codes:all                     全部 id，按 createdAt 排序的有序集合
+ *   codes:status:<status>         按状态分的有序集合（同上排序）
+ *   codes:source:<source>         按来源分的有序集合（同上排序）
+ *   codes:stats                   统计 hash，随每次写入 HINCRBY
+ * 单条修改只读写这一条记录和它的索引，请求大小与体验码总数无关
  */
 
 import { kv } from '@vercel/kv';
 import { generateCode, generateLink, generateId } from '../utils/code-generator.js';
+import { mgetRecords, writeInChunks, lockedUpdate, migrationOnce, timeScore, LockedWrite } from './kv-records.js';
 
-const CODES_KEY = 'access_codes';
-const STATS_KEY = 'access_codes_stats';
+const CODES_KEY = 'access_codes';  // 旧布局，只在迁移时读取
+const LAYOUT_KEY = 'codes:layout:v2';
+const STATS_KEY = 'codes:stats';
+const ALL_KEY = 'codes:all';
+
+const recordKey = (id: string) => `code:${id}`;
+const codeKey = (code: string) => `code:by-code:${code}`;
+const userNameKey = (userName: string) => `codes:by-user-name:${userName}`;
+const userIdKey = (userId: string) => `codes:by-user-id:${userId}`;
+const statusKey = (status: string) => `codes:status:${status}`;
+const sourceKey = (source: string) => `codes:source:${source}`;
+const lockKey = (id: string) => `lock:code:${id}`;
 
 export interface AccessCode {
   id: string;
@@ -38,61 +60,195 @@ export interface CodesData {
   };
 }
 
+type CodeStats = CodesData['stats'];
+
+type Transaction = ReturnType<typeof kv.multi>;
+
+function emptyStats(): CodeStats {
+  return {
+    total: 0,
+    active: 0,
+    used: 0,
+    expired: 0,
+    batch: 0,
+    selfApply: 0
+  };
+}
+
+/**
+ * 一条记录对统计的贡献（口径与 calculateStats 相同）
+ */
+function statsOf(code: AccessCode): CodeStats {
+  return {
+    total: 1,
+    active: code.status === 'active' ? 1 : 0,
+    used: code.status === 'used' ? 1 : 0,
+    expired: code.status === 'expired' ? 1 : 0,
+    batch: code.source === 'batch' ? 1 : 0,
+    selfApply: code.source === 'self_apply' ? 1 : 0
+  };
+}
+
+/**
+ * 写入一批新记录（记录和唯一索引合并成一条 MSET，有序集合合并成一条 ZADD，统计一次 HINCRBY）
+ * onlyNew（迁移旧布局时）逐条 SET NX，不覆盖已存在的记录
+ */
+function insertCodes(tx: Transaction, codes: AccessCode[], onlyNew: boolean = false): void {
+  const entries: Record<string, any> = {};
+  const zsets = new Map<string, Array<{ score: number; member: string }>>();
+  const addToZset = (key: string, score: number, member: string) => {
+    if (!zsets.has(key)) zsets.set(key, []);
+    zsets.get(key)!.push({ score, member });
+  };
+  const delta = emptyStats();
+
+  for (const code of codes) {
+    entries[recordKey(code.id)] = code;
+    entries[codeKey(code.code)] = code.id;
+    const score = timeScore(code.createdAt);
+    addToZset(ALL_KEY, score, code.id);
+    addToZset(statusKey(code.status), score, code.id);
+    addToZset(sourceKey(code.source), score, code.id);
+    tx.sadd(userNameKey(code.userName), code.id);
+    tx.sadd(userIdKey(code.userId), code.id);
+    const contribution = statsOf(code);
+    for (const field of Object.keys(delta) as Array<keyof CodeStats>) {
+      delta[field] += contribution[field];
+    }
+  }
+
+  if (onlyNew) {
+    // 迁移：已存在的键（迁移后被修改过的记录）不覆盖
+    for (const [key, value] of Object.entries(entries)) {
+      tx.set(key, value, { nx: true });
+    }
+  } else {
+    tx.mset(entries);
+  }
+  for (const [key, members] of zsets) {
+    const [first, ...rest] = members;
+    tx.zadd(key, first, ...rest);
+  }
+  for (const field of Object.keys(delta) as Array<keyof CodeStats>) {
+    if (delta[field] !== 0) {
+      tx.hincrby(STATS_KEY, field, delta[field]);
+    }
+  }
+}
+
+/**
+ * 写入修改后的记录，只调整变化了的索引和统计字段
+ */
+function replaceCode(tx: LockedWrite, prev: AccessCode, next: AccessCode): void {
+  tx.set(recordKey(next.id), next);
+  const score = timeScore(next.createdAt);
+
+  if (prev.code !== next.code) {
+    tx.del(codeKey(prev.code));
+    tx.set(codeKey(next.code), next.id);
+  }
+  if (prev.userName !== next.userName) {
+    tx.srem(userNameKey(prev.userName), prev.id);
+    tx.sadd(userNameKey(next.userName), next.id);
+  }
+  if (prev.userId !== next.userId) {
+    tx.srem(userIdKey(prev.userId), prev.id);
+    tx.sadd(userIdKey(next.userId), next.id);
+  }
+  if (prev.createdAt !== next.createdAt) {
+    tx.zadd(ALL_KEY, { score, member: next.id });
+  }
+  if (prev.status !== next.status || prev.createdAt !== next.createdAt) {
+    tx.zrem(statusKey(prev.status), prev.id);
+    tx.zadd(statusKey(next.status), { score, member: next.id });
+  }
+  if (prev.source !== next.source || prev.createdAt !== next.createdAt) {
+    tx.zrem(sourceKey(prev.source), prev.id);
+    tx.zadd(sourceKey(next.source), { score, member: next.id });
+  }
+
+  const before = statsOf(prev);
+  const after = statsOf(next);
+  for (const field of Object.keys(after) as Array<keyof CodeStats>) {
+    if (after[field] !== before[field]) {
+      tx.hincrby(STATS_KEY, field, after[field] - before[field]);
+    }
+  }
+}
+
+const ensureMigrated = migrationOnce(LAYOUT_KEY, CODES_KEY, async (legacy: AccessCode[]) => {
+  await writeInChunks(legacy, (tx, chunk) => insertCodes(tx, chunk, true));
+  // 统计按旧数据重算一遍（迁移可能重复执行，不能累加）
+  const stats = emptyStats();
+  for (const code of legacy) {
+    const contribution = statsOf(code);
+    for (const field of Object.keys(stats) as Array<keyof CodeStats>) {
+      stats[field] += contribution[field];
+    }
+  }
+  await kv.hset(STATS_KEY, stats);
+});
+
+async function getById(id: string): Promise<AccessCode | null> {
+  await ensureMigrated();
+  return await kv.get<AccessCode>(recordKey(id));
+}
+
+/**
+ * 按有序集合倒序取一页 id 对应的记录
+ */
+async function pageOf(key: string, start: number, end: number): Promise<AccessCode[]> {
+  const ids = await kv.zrange<string[]>(key, start, end - 1, { rev: true });
+  return mgetRecords<AccessCode>(ids.map(recordKey));
+}
+
 /**
- * 读取体验码数据
+ * 读取体验码数据（全量，按创建时间排序；只在导出、批量发送等需要全部数据时使用）
  */
 export async function loadCodes(): Promise<CodesData> {
   try {
-    const codes = await kv.get<AccessCode[]>(CODES_KEY) || [];
-    const stats = calculateStats(codes);
-    return { codes, stats };
+    await ensureMigrated();
+    const ids = await kv.zrange<string[]>(ALL_KEY, 0, -1);
+    const codes = await mgetRecords<AccessCode>(ids.map(recordKey));
+    return { codes, stats: await getStats() };
   } catch (e) {
     console.error('Error loading codes from KV:', e);
     return {
       codes: [],
-      stats: {
-        total: 0,
-        active: 0,
-        used: 0,
-        expired: 0,
-        batch: 0,
-        selfApply: 0
-      }
+      stats: emptyStats()
     };
   }
 }
 
 /**
- * 保存体验码数据
+ * 保存体验码数据（全量替换：删除现有记录和索引后重新写入）
  */
 export async function saveCodes(data: CodesData): Promise<void> {
   try {
-    // 更新统计数据
-    data.stats = calculateStats(data.codes);
-    
-    // 保存到 KV
-    await kv.set(CODES_KEY, data.codes);
-    await kv.set(STATS_KEY, data.stats);
+    await ensureMigrated();
+    const ids = await kv.zrange<string[]>(ALL_KEY, 0, -1);
+    const existing = await mgetRecords<AccessCode>(ids.map(recordKey));
+    const keys = new Set<string>([STATS_KEY, ALL_KEY]);
+    for (const code of existing) {
+      keys.add(recordKey(code.id));
+      keys.add(codeKey(code.code));
+      keys.add(userNameKey(code.userName));
+      keys.add(userIdKey(code.userId));
+      keys.add(statusKey(code.status));
+      keys.add(sourceKey(code.source));
+    }
+    const allKeys = Array.from(keys);
+    await writeInChunks(allKeys, (tx, chunk) => {
+      tx.del(...chunk);
+    });
+    await writeInChunks(data.codes, insertCodes);
+    data.stats = await getStats();
   } catch (e) {
     console.error('Error saving codes to KV:', e);
     throw e;
   }
 }
 
-/**
- * 计算统计数据
- */
-function calculateStats(codes: AccessCode[]) {
-  return {
-    total: codes.length,
-    active: codes.filter(c => c.status === 'active').length,
-    used: codes.filter(c => c.status === 'used').length,
-    expired: codes.filter(c => c.status === 'expired').length,
-    batch: codes.filter(c => c.source === 'batch').length,
-    selfApply: codes.filter(c => c.source === 'self_apply').length
-  };
-}
-
 /**
  * 创建新的体验码
  */
@@ -116,7 +272,7 @@ export function createCode(params: {
     source: params.source,
     note: params.note
   };
-  
+
   return code;
 }
 
@@ -125,7 +281,7 @@ export function createCode(params: {
  */
 export function createBatchCodes(users: Array<{ userName: string; userId: string }>, note?: string): AccessCode[] {
   const codes: AccessCode[] = [];
-  
+
   for (const user of users) {
     const code = createCode({
       userName: user.userName,
@@ -135,7 +291,7 @@ export function createBatchCodes(users: Array<{ userName: string; userId: string
     });
     codes.push(code);
   }
-  
+
   return codes;
 }
 
@@ -143,24 +299,34 @@ export function createBatchCodes(users: Array<{ userName: string; userId: string
  * 根据体验码查找
  */
 export async function findCodeByCode(code: string): Promise<AccessCode | undefined> {
-  const data = await loadCodes();
-  return data.codes.find(c => c.code === code);
+  await ensureMigrated();
+  const id = await kv.get<string>(codeKey(code));
+  return id ? (await getById(String(id))) || undefined : undefined;
+}
+
+/**
+ * 取索引集合里最早创建的一条（与原来按数组顺序 find 的结果一致）
+ */
+async function firstOfSet(key: string): Promise<AccessCode | undefined> {
+  await ensureMigrated();
+  const ids = await kv.smembers(key);
+  const codes = await mgetRecords<AccessCode>(ids.map(id => recordKey(String(id))));
+  codes.sort((a, b) => timeScore(a.createdAt) - timeScore(b.createdAt));
+  return codes[0];
 }
 
 /**
  * 根据用户名查找
  */
 export async function findCodeByUserName(userName: string): Promise<AccessCode | undefined> {
-  const data = await loadCodes();
-  return data.codes.find(c => c.userName === userName);
+  return firstOfSet(userNameKey(userName));
 }
 
 /**
  * 根据用户ID查找
  */
 export async function findCodeByUserId(userId: string): Promise<AccessCode | undefined> {
-  const data = await loadCodes();
-  return data.codes.find(c => c.userId === userId);
+  return firstOfSet(userIdKey(userId));
 }
 
 /**
@@ -170,93 +336,82 @@ export async function findCodeByUserId(userId: string): Promise<AccessCode | und
  */
 export async function verifyCode(code: string, forActivation: boolean = true): Promise<{ valid: boolean; message: string; data?: AccessCode }> {
   const accessCode = await findCodeByCode(code);
-  
+
   if (!accessCode) {
     return { valid: false, message: '体验码不存在' };
   }
-  
+
   if (accessCode.status === 'expired') {
     return { valid: false, message: '体验码已过期' };
   }
-  
+
   // 如果是激活操作，检查是否已被使用
   if (forActivation && accessCode.status === 'used' && accessCode.currentUses >= accessCode.maxUses) {
     return { valid: false, message: '体验码已被使用' };
   }
-  
+
   // 如果是权限检查，允许已使用的体验码通过验证
   if (!forActivation && accessCode.status === 'used') {
     return { valid: true, message: '验证成功', data: accessCode };
   }
-  
+
   if (accessCode.expiresAt && new Date(accessCode.expiresAt) < new Date()) {
     // 自动更新为过期状态
-    accessCode.status = 'expired';
-    const data = await loadCodes();
-    await saveCodes(data);
+    await updateCode(accessCode.id, { status: 'expired' });
     return { valid: false, message: '体验码已过期' };
   }
-  
+
   return { valid: true, message: '验证成功', data: accessCode };
 }
 
 /**
- * 标记体验码为已使用
+ * 标记体验码为已使用（在记录锁内读-改-写，并发激活不会丢失次数）
  */
 export async function markCodeAsUsed(code: string): Promise<boolean> {
-  const data = await loadCodes();
-  const accessCode = data.codes.find(c => c.code === code);
-  
-  if (!accessCode) {
+  await ensureMigrated();
+  const id = await kv.get<string>(codeKey(code));
+  if (!id) {
     return false;
   }
-  
-  accessCode.currentUses += 1;
-  
-  if (accessCode.currentUses >= accessCode.maxUses) {
-    accessCode.status = 'used';
-  }
-  
-  if (!accessCode.usedAt) {
-    accessCode.usedAt = new Date().toISOString();
-  }
-  
-  await saveCodes(data);
-  return true;
+
+  return lockedUpdate<AccessCode>(lockKey(String(id)), () => getById(String(id)), (tx, prev) => {
+    const next = { ...prev, currentUses: prev.currentUses + 1 };
+
+    if (next.currentUses >= next.maxUses) {
+      next.status = 'used';
+    }
+
+    if (!next.usedAt) {
+      next.usedAt = new Date().toISOString();
+    }
+
+    replaceCode(tx, prev, next);
+  });
 }
 
 /**
  * 添加体验码
  */
 export async function addCode(code: AccessCode): Promise<void> {
-  const data = await loadCodes();
-  data.codes.push(code);
-  await saveCodes(data);
+  await addBatchCodes([code]);
 }
 
 /**
- * 批量添加体验码
+ * 批量添加体验码（每 KV_BATCH_SIZE 条一个事务请求）
  */
 export async function addBatchCodes(codes: AccessCode[]): Promise<void> {
-  const data = await loadCodes();
-  data.codes.push(...codes);
-  await saveCodes(data);
+  await ensureMigrated();
+  await writeInChunks(codes, insertCodes);
 }
 
 /**
- * 更新体验码
+ * 更新体验码（在记录锁内合并字段）
  */
 export async function updateCode(id: string, updates: Partial<AccessCode>): Promise<boolean> {
-  const data = await loadCodes();
-  const index = data.codes.findIndex(c => c.id === id);
-  
-  if (index === -1) {
-    return false;
-  }
-  
-  data.codes[index] = { ...data.codes[index], ...updates };
-  await saveCodes(data);
-  return true;
+  await ensureMigrated();
+  return lockedUpdate<AccessCode>(lockKey(id), () => getById(id), (tx, prev) => {
+    replaceCode(tx, prev, { ...prev, ...updates, id });
+  });
 }
 
 /**
@@ -268,31 +423,36 @@ export async function getCodes(options?: {
   page?: number;
   limit?: number;
 }): Promise<{ codes: AccessCode[]; total: number; page: number; pages: number }> {
-  const data = await loadCodes();
-  let codes = data.codes;
-  
-  // 筛选
-  if (options?.status) {
-    codes = codes.filter(c => c.status === options.status);
-  }
-  
-  if (options?.source) {
-    codes = codes.filter(c => c.source === options.source);
-  }
-  
-  // 按创建时间倒序排列（最新的在最前面）
-  codes.sort((a, b) => new Date(b.createdAt).getTime() - new Date(a.createdAt).getTime());
-  
-  // 分页
+  await ensureMigrated();
   const page = options?.page || 1;
   const limit = options?.limit || 50;
-  const total = codes.length;
-  const pages = Math.ceil(total / limit);
   const start = (page - 1) * limit;
   const end = start + limit;
-  
-  codes = codes.slice(start, end);
-  
+
+  let codes: AccessCode[];
+  let total: number;
+  if (options?.status && options?.source) {
+    // 两个条件同时筛选：按状态的有序集合分块倒序读取，再按来源过滤
+    const key = statusKey(options.status);
+    const size = await kv.zcard(key);
+    codes = [];
+    total = 0;
+    for (let offset = 0; offset < size; offset += 1000) {
+      for (const code of await pageOf(key, offset, offset + 1000)) {
+        if (code.source !== options.source) continue;
+        if (total >= start && total < end) {
+          codes.push(code);
+        }
+        total++;
+      }
+    }
+  } else {
+    const key = options?.status ? statusKey(options.status)
+      : options?.source ? sourceKey(options.source) : ALL_KEY;
+    [total, codes] = await Promise.all([kv.zcard(key), pageOf(key, start, end)]);
+  }
+
+  const pages = Math.ceil(total / limit);
   return { codes, total, page, pages };
 }
 
@@ -300,6 +460,11 @@ export async function getCodes(options?: {
  * 获取统计数据
  */
 export async function getStats() {
-  const data = await loadCodes();
-  return data.stats;
+  await ensureMigrated();
+  const stored = await kv.hgetall<Record<string, number>>(STATS_KEY) || {};
+  const stats = emptyStats();
+  for (const field of Object.keys(stats) as Array<keyof CodeStats>) {
+    stats[field] = Number(stored[field] || 0);
+  }
+  return stats;
 }
@@ -11,7 +11,8 @@ import { generateCode, generateLink, generateId } from '../utils/code-generator.
 const __filename = fileURLToPath(import.meta.url);
 const __dirname = dirname(__filename);
 
-const DATA_DIR = path.join(__dirname, '../data');
+// DATA_DIR 可覆盖数据目录（基准测试用隔离的数据目录，不动 server/data）
+const DATA_DIR = process.env.DATA_DIR || path.join(__dirname, '../data');
 const CODES_FILE = path.join(DATA_DIR, 'codes.json');
 
 export interface AccessCode {
@@ -0,0 +1,357 @@
+/**
+ * 企业微信批量发送的后台任务队列
+ *
+ * 每次批量发送建一个任务，任务和每条消息的状态存在 DATA_DIR 下的 delivery-jobs.json /
+ * delivery-tasks.json（record-store.ts，每次状态变化追加一行 WAL）。
+ * 发送本身用 wechat-sender.ts 的 deliverAll：按 webhook 限速、并发、失败退避重试
+ *
+ * webhook 的 key 能直接往群里发消息，不写到磁盘上：文件里只存打码后的地址，完整地址只在内存里。
+ * 所以服务重启后未完成的任务、以及发送异常中止的任务都标记为 failed（未发送的消息仍是 pending），
+ * 管理员重新填写 webhook 后用 resumeDeliveryJob 继续发送（重启时正在发送的那几条会再发一次）
+ *
+ * 默认速率是群机器人的频率上限每分钟 20 条（WECHAT_SEND_RATE_PER_MIN），1000 人约 50 分钟，
+ * 比原来在请求里每秒发一条（1000 人约 17 分钟）慢：原来的速率超过上限，超出的部分会被企业微信拒绝（45009）。
+ * 所以发送放在后台任务里，管理后台（AdminGenerate）可以关闭页面、刷新后重新订阅进度或取消任务
+ */
+
+import path from 'node:path';
+import { EventEmitter } from 'node:events';
+import { fileURLToPath } from 'node:url';
+import { dirname } from 'node:path';
+import { RecordStore } from './record-store.js';
+import { deliverAll, defaultDeliveryOptions, DeliveryOptions, SendResult } from './wechat-sender.js';
+import { updateCode } from './storage-adapter.js';
+import { generateId } from '../utils/code-generator.js';
+import type { AccessCode } from './storage-adapter.js';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = dirname(__filename);
+
+const DATA_DIR = process.env.DATA_DIR || path.join(__dirname, '../data');
+
+export interface DeliveryJob {
+  id: string;
+  status: 'queued' | 'running' | 'completed' | 'cancelled' | 'failed';
+  /** 打码后的 webhook 地址（完整地址见 webhooks） */
+  webhookUrl: string;
+  baseUrl: string;
+  options: DeliveryOptions;
+  total: number;
+  sent: number;
+  failed: number;
+  retries: number;
+  createdAt: string;
+  startedAt?: string;
+  finishedAt?: string;
+  /** failed 的原因 */
+  error?: string;
+}
+
+export interface DeliveryTask {
+  id: string;
+  jobId: string;
+  codeId: string;
+  userName: string;
+  code: string;
+  status: 'pending' | 'success' | 'failed';
+  attempts: number;
+  nextAttemptAt: number | null;
+  lastError?: string;
+  finishedAt?: string;
+}
+
+/** 推给订阅者的进度事件（与原来 batch-send 的 SSE 事件格式一致） */
+export type DeliveryEvent =
+  | { type: 'progress'; current: number; total: number; userName: string; status: 'success' | 'failed'; message: string }
+  | { type: 'retry'; userName: string; attempts: number; nextAttemptAt: number; message: string }
+  | { type: 'complete'; success: number; failed: number }
+  | { type: 'cancelled'; success: number; failed: number }
+  | { type: 'failed'; success: number; failed: number; message: string };
+
+const jobs = new RecordStore<DeliveryJob>({
+  dir: DATA_DIR,
+  file: 'delivery-jobs.json',
+  key: 'jobs',
+  orderBy: j => j.createdAt
+});
+
+const tasks = new RecordStore<DeliveryTask>({
+  dir: DATA_DIR,
+  file: 'delivery-tasks.json',
+  key: 'tasks',
+  indexes: {
+    jobId: t => t.jobId
+  }
+});
+
+const events = new EventEmitter();
+events.setMaxListeners(0);
+
+/** 正在运行的任务 -> 取消用的 AbortController */
+const running = new Map<string, AbortController>();
+
+/** 任务 -> 完整的 webhook 地址（只在内存里，任务结束后删除） */
+const webhooks = new Map<string, string>();
+
+/**
+ * 隐藏 webhook 里的 key（保留前 4 位，用来核对继续发送时填的是不是同一个 webhook）
+ */
+function maskWebhook(webhookUrl: string): string {
+  return webhookUrl.replace(/([?&]key=)([^&]{4})[^&]*/, '$1$2****');
+}
+
+function publicJob(job: DeliveryJob) {
+  return { ...job, done: job.sent + job.failed };
+}
+
+function emit(jobId: string, event: DeliveryEvent): void {
+  events.emit(jobId, event);
+}
+
+/**
+ * 任务中止：未发送的消息保持 pending，之后可以用 resumeDeliveryJob 继续
+ */
+function failJob(jobId: string, message: string): void {
+  webhooks.delete(jobId);
+  jobs.update(jobId, { status: 'failed', error: message, finishedAt: new Date().toISOString() });
+  const job = jobs.get(jobId)!;
+  emit(jobId, { type: 'failed', success: job.sent, failed: job.failed, message });
+  console.error(`[Delivery] 任务 ${jobId} 中止: ${message}（已完成 ${job.sent + job.failed}/${job.total}）`);
+}
+
+/**
+ * 执行（或继续执行）一个任务里还没有结果的消息
+ */
+async function runJob(jobId: string): Promise<void> {
+  const job = jobs.get(jobId);
+  if (!job || running.has(jobId)) {
+    return;
+  }
+  const webhookUrl = webhooks.get(jobId);
+  if (!webhookUrl) {
+    failJob(jobId, 'webhook 地址不在内存中（服务已重启），请重新填写 webhook 后继续发送');
+    return;
+  }
+  const controller = new AbortController();
+  running.set(jobId, controller);
+  jobs.update(jobId, { status: 'running', startedAt: job.startedAt || new Date().toISOString() });
+
+  const pending = tasks.findAll('jobId', jobId).filter(t => t.status === 'pending');
+  console.log(`[Delivery] 任务 ${jobId}: 待发送 ${pending.length}/${job.total}`);
+
+  const recordResult = async (task: DeliveryTask, result: SendResult) => {
+    const finishedAt = new Date().toISOString();
+    tasks.put({
+      ...task,
+      status: result.success ? 'success' : 'failed',
+      lastError: result.success ? undefined : result.message,
+      finishedAt
+    });
+    const current = jobs.get(jobId)!;
+    const counts = result.success ? { sent: current.sent + 1 } : { failed: current.failed + 1 };
+    jobs.update(jobId, counts);
+    const updated = { ...current, ...counts };
+
+    emit(jobId, {
+      type: 'progress',
+      current: updated.sent + updated.failed,
+      total: updated.total,
+      userName: task.userName,
+      status: result.success ? 'success' : 'failed',
+      message: result.message
+    });
+
+    // 更新体验码的发送状态
+    try {
+      await updateCode(task.codeId, {
+        sentAt: finishedAt,
+        sentStatus: result.success ? 'success' : 'failed',
+        sentError: result.success ? undefined : result.message
+      });
+    } catch (e: any) {
+      console.error(`[Delivery] 更新体验码 ${task.codeId} 发送状态失败:`, e.message);
+    }
+  };
+
+  try {
+    await deliverAll(webhookUrl, pending, job.baseUrl, job.options, {
+      onRetry: (task, result) => {
+        tasks.put({ ...task, lastError: result.message });
+        jobs.update(jobId, { retries: jobs.get(jobId)!.retries + 1 });
+        emit(jobId, {
+          type: 'retry',
+          userName: task.userName,
+          attempts: task.attempts,
+          nextAttemptAt: task.nextAttemptAt!,
+          message: result.message
+        });
+      },
+      onDone: recordResult,
+      signal: controller.signal
+    });
+  } catch (e: any) {
+    running.delete(jobId);
+    failJob(jobId, `发送异常中止: ${e.message}`);
+    return;
+  }
+
+  running.delete(jobId);
+  webhooks.delete(jobId);
+  const finished = jobs.get(jobId)!;
+  const status = controller.signal.aborted ? 'cancelled' : 'completed';
+  jobs.update(jobId, { status, finishedAt: new Date().toISOString() });
+  emit(jobId, { type: status === 'completed' ? 'complete' : 'cancelled', success: finished.sent, failed: finished.failed });
+  console.log(`[Delivery] 任务 ${jobId} ${status === 'completed' ? '完成' : '已取消'}: 成功 ${finished.sent}，失败 ${finished.failed}`);
+}
+
+/**
+ * 创建批量发送任务并在后台开始发送
+ * @param options 覆盖默认的限速、并发和重试参数
+ */
+export function createDeliveryJob(
+  codes: AccessCode[],
+  webhookUrl: string,
+  baseUrl: string,
+  options?: Partial<DeliveryOptions>
+) {
+  const defaults = defaultDeliveryOptions();
+  const job: DeliveryJob = {
+    id: generateId(),
+    status: 'queued',
+    webhookUrl: maskWebhook(webhookUrl),
+    baseUrl,
+    options: {
+      ratePerMinute: Number(options?.ratePerMinute) || defaults.ratePerMinute,
+      burst: Number(options?.burst) || defaults.burst,
+      concurrency: Number(options?.concurrency) || defaults.concurrency,
+      maxAttempts: Number(options?.maxAttempts) || defaults.maxAttempts,
+      retryBaseMs: Number(options?.retryBaseMs) || defaults.retryBaseMs
+    },
+    total: codes.length,
+    sent: 0,
+    failed: 0,
+    retries: 0,
+    createdAt: new Date().toISOString()
+  };
+
+  tasks.putMany(codes.map((code, index) => ({
+    id: `${job.id}:${index}`,
+    jobId: job.id,
+    codeId: code.id,
+    userName: code.userName,
+    code: code.code,
+    status: 'pending' as const,
+    attempts: 0,
+    nextAttemptAt: null
+  })));
+  jobs.put(job);
+  webhooks.set(job.id, webhookUrl);
+
+  void runJob(job.id);
+  return publicJob(jobs.get(job.id)!);
+}
+
+/**
+ * 任务状态；withTasks 时附带失败和待发送的消息
+ */
+export function getDeliveryJob(id: string, withTasks: boolean = false) {
+  const job = jobs.get(id);
+  if (!job) {
+    return null;
+  }
+  if (!withTasks) {
+    return publicJob(job);
+  }
+  const jobTasks = tasks.findAll('jobId', id);
+  return {
+    ...publicJob(job),
+    failures: jobTasks
+      .filter(t => t.status === 'failed')
+      .map(t => ({ codeId: t.codeId, userName: t.userName, attempts: t.attempts, error: t.lastError })),
+    pending: jobTasks
+      .filter(t => t.status === 'pending')
+      .map(t => ({ codeId: t.codeId, userName: t.userName, attempts: t.attempts, nextAttemptAt: t.nextAttemptAt }))
+  };
+}
+
+/**
+ * 最近的任务（新的在前）
+ */
+export function listDeliveryJobs(limit: number = 20) {
+  const recent = [];
+  for (const job of jobs.newestFirst()) {
+    if (recent.length >= limit) break;
+    recent.push(publicJob(job));
+  }
+  return recent;
+}
+
+/**
+ * 取消任务：不再开始新的发送，已在发送中的消息会等结果
+ */
+export function cancelDeliveryJob(id: string): boolean {
+  const job = jobs.get(id);
+  if (!job || job.status === 'completed' || job.status === 'cancelled') {
+    return false;
+  }
+  const controller = running.get(id);
+  if (controller) {
+    controller.abort();
+  } else {
+    webhooks.delete(id);
+    jobs.update(id, { status: 'cancelled', finishedAt: new Date().toISOString() });
+  }
+  return true;
+}
+
+/**
+ * 继续发送中止（failed）的任务里还没有结果的消息
+ * @param webhookUrl 完整的 webhook 地址，必须和创建任务时的是同一个
+ */
+export function resumeDeliveryJob(id: string, webhookUrl: string) {
+  const job = jobs.get(id);
+  if (!job) {
+    throw new Error('发送任务不存在');
+  }
+  if (job.status !== 'failed') {
+    throw new Error('只能继续已中止的任务');
+  }
+  if (maskWebhook(webhookUrl) !== job.webhookUrl) {
+    throw new Error('webhook 地址与创建任务时的不一致');
+  }
+  webhooks.set(id, webhookUrl);
+  jobs.update(id, { status: 'queued', error: undefined, finishedAt: undefined });
+  void runJob(id);
+  return publicJob(jobs.get(id)!);
+}
+
+/**
+ * 订阅任务进度，返回取消订阅函数
+ */
+export function onDeliveryEvent(id: string, listener: (event: DeliveryEvent) => void): () => void {
+  events.on(id, listener);
+  return () => {
+    events.off(id, listener);
+  };
+}
+
+/**
+ * 服务启动时处理上次没有完成的任务：webhook 地址没有保存，标记为中止，等管理员继续发送
+ */
+export function resumeDeliveryJobs(): void {
+  let legacy = false;
+  for (const job of Array.from(jobs.newestFirst())) {
+    // 旧版本存下的完整地址改成打码的
+    if (maskWebhook(job.webhookUrl) !== job.webhookUrl) {
+      jobs.update(job.id, { webhookUrl: maskWebhook(job.webhookUrl) });
+      legacy = true;
+    }
+    if (job.status === 'queued' || job.status === 'running') {
+      failJob(job.id, '服务已重启，webhook 地址没有保存，请重新填写 webhook 后继续发送');
+    }
+  }
+  if (legacy) {
+    // 立即重写快照，旧快照和 WAL 里的完整地址不留在磁盘上
+    jobs.compact();
+  }
+}
@@ -0,0 +1,238 @@
+/**
+ * KV 逐条记录存储的公共工具
+ *
+ * 每条记录一个键，批量读写按 KV_BATCH_SIZE 分块、多条命令合并成一次 pipeline / multi 请求；
+ * 单条记录的读-改-写先用 SET NX PX 抢记录锁（值为本次的随机 token），修改记录成写命令列表，
+ * 由一个 Lua 脚本先确认锁仍是自己的 token 再执行并删锁：锁已过期被别人拿走时整次修改不写入、报错，
+ * 释放锁也只删自己的 token，多个实例同时修改同一条记录时不会互相覆盖
+ */
+
+import { kv } from '@vercel/kv';
+
+/** 每条 MGET / MSET 命令最多带的记录数 */
+export const KV_BATCH_SIZE = 500;
+
+/** 一次 pipeline 请求最多合并的 MGET 命令数 */
+const PIPELINE_COMMANDS = 10;
+
+const LOCK_TTL_MS = 5000;
+const LOCK_RETRIES = 50;
+const LOCK_RETRY_DELAY_MS = 20;
+
+// 迁移旧布局时持有的锁（大数据量迁移可能要几分钟），等待别的实例迁移时的轮询间隔
+const MIGRATION_LOCK_TTL_MS = 5 * 60 * 1000;
+const MIGRATION_POLL_MS = 200;
+
+type Transaction = ReturnType<typeof kv.multi>;
+
+/** 锁仍是自己的 token 才删除 */
+const RELEASE_SCRIPT = `
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0`;
+
+/** 锁仍是自己的 token 才依次执行写命令（第 i 条命令的键是 KEYS[i + 1]），最后删锁；返回 0 表示锁已丢失、什么都没写 */
+const LOCKED_WRITE_SCRIPT = `
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+  return 0
+end
+for i, command in ipairs(cjson.decode(ARGV[2])) do
+  redis.call(command[1], KEYS[i + 1], unpack(command, 2))
+end
+redis.call('DEL', KEYS[1])
+return 1`;
+
+/** 与 @vercel/kv 写入时的序列化一致：字符串原样，其他转 JSON（读取时 kv.get 自动解析） */
+function serialize(value: unknown): string {
+  return typeof value === 'string' ? value : JSON.stringify(value);
+}
+
+/**
+ * lockedUpdate 里的写命令：先记录下来，持锁校验通过后在同一个脚本里执行
+ */
+export class LockedWrite {
+  readonly keys: string[] = [];
+  readonly commands: string[][] = [];
+
+  private add(name: string, key: string, ...args: unknown[]): void {
+    this.keys.push(key);
+    this.commands.push([name, ...args.map(serialize)]);
+  }
+
+  set(key: string, value: unknown): void {
+    this.add('SET', key, value);
+  }
+
+  del(...keys: string[]): void {
+    for (const key of keys) {
+      this.add('DEL', key);
+    }
+  }
+
+  sadd(key: string, ...members: string[]): void {
+    this.add('SADD', key, ...members);
+  }
+
+  srem(key: string, ...members: string[]): void {
+    this.add('SREM', key, ...members);
+  }
+
+  zadd(key: string, ...members: Array<{ score: number; member: string }>): void {
+    this.add('ZADD', key, ...members.flatMap(({ score, member }) => [score, member]));
+  }
+
+  zrem(key: string, ...members: string[]): void {
+    this.add('ZREM', key, ...members);
+  }
+
+  hincrby(key: string, field: string, increment: number): void {
+    this.add('HINCRBY', key, field, increment);
+  }
+}
+
+async function acquireLock(lockKey: string, token: string, ttlMs: number): Promise<boolean> {
+  return Boolean(await kv.set(lockKey, token, { nx: true, px: ttlMs }));
+}
+
+async function releaseLock(lockKey: string, token: string): Promise<void> {
+  await kv.eval(RELEASE_SCRIPT, [lockKey], [token]);
+}
+
+function lockToken(): string {
+  return `${Date.now()}-${Math.random().toString(36).substring(2, 9)}`;
+}
+
+/**
+ * 时间字符串转有序集合的分数（毫秒）
+ */
+export function timeScore(iso: string | null | undefined): number {
+  const ms = iso ? Date.parse(iso) : NaN;
+  return Number.isNaN(ms) ? 0 : ms;
+}
+
+/**
+ * 按键批量读取记录（分块 MGET，多块合并到一次 pipeline），跳过已不存在的键，保持键的顺序
+ */
+export async function mgetRecords<T>(keys: string[]): Promise<T[]> {
+  const records: T[] = [];
+  for (let offset = 0; offset < keys.length; offset += KV_BATCH_SIZE * PIPELINE_COMMANDS) {
+    const pipeline = kv.pipeline();
+    const end = Math.min(offset + KV_BATCH_SIZE * PIPELINE_COMMANDS, keys.length);
+    for (let start = offset; start < end; start += KV_BATCH_SIZE) {
+      pipeline.mget(...keys.slice(start, Math.min(start + KV_BATCH_SIZE, end)));
+    }
+    const chunks = await pipeline.exec() as Array<Array<T | null>>;
+    for (const chunk of chunks) {
+      for (const record of chunk) {
+        if (record) {
+          records.push(record);
+        }
+      }
+    }
+  }
+  return records;
+}
+
+/**
+ * 分块执行写事务：每块 KV_BATCH_SIZE 条记录一个 multi 请求（块内原子）
+ */
+export async function writeInChunks<T>(items: T[], write: (tx: Transaction, chunk: T[]) => void): Promise<void> {
+  for (let start = 0; start < items.length; start += KV_BATCH_SIZE) {
+    const tx = kv.multi();
+    write(tx, items.slice(start, start + KV_BATCH_SIZE));
+    await tx.exec();
+  }
+}
+
+/**
+ * 原子地读-改-写一条记录：抢锁 -> load -> write(写命令, 旧记录) -> 确认仍持有锁再写入并删锁
+ * 记录不存在时返回 false；锁在写入前过期（被别的实例拿走）时不写入并抛错
+ */
+export async function lockedUpdate<T>(
+  lockKey: string,
+  load: () => Promise<T | null>,
+  write: (tx: LockedWrite, prev: T) => void
+): Promise<boolean> {
+  const token = lockToken();
+  let acquired = false;
+  for (let attempt = 0; attempt < LOCK_RETRIES; attempt++) {
+    if (await acquireLock(lockKey, token, LOCK_TTL_MS)) {
+      acquired = true;
+      break;
+    }
+    await new Promise(resolve => setTimeout(resolve, LOCK_RETRY_DELAY_MS * (attempt + 1)));
+  }
+  if (!acquired) {
+    throw new Error(`记录正在被修改，请稍后重试: ${lockKey}`);
+  }
+
+  let written = false;
+  try {
+    const prev = await load();
+    if (!prev) {
+      return false;
+    }
+    const tx = new LockedWrite();
+    write(tx, prev);
+    written = Boolean(await kv.eval(
+      LOCKED_WRITE_SCRIPT,
+      [lockKey, ...tx.keys],
+      [token, JSON.stringify(tx.commands)]
+    ));
+    if (!written) {
+      throw new Error(`记录锁已过期，修改未写入，请重试: ${lockKey}`);
+    }
+    return true;
+  } finally {
+    // 写入脚本成功时已删锁；其他情况只删自己的 token
+    if (!written) {
+      await releaseLock(lockKey, token).catch(() => undefined);
+    }
+  }
+}
+
+/**
+ * 一次性把旧布局（整个数组存在一个键里）迁移成逐条记录。旧键保留不删，作为备份
+ * 迁移在锁内进行，拿到锁后重新检查迁移标记：别的实例已迁移完（之后记录可能已被修改）就不再写入；
+ * migrate 写记录时应使用 NX，锁超时的极端情况下也不会覆盖迁移后修改过的记录
+ */
+export function migrationOnce(markerKey: string, legacyKey: string,
+                              migrate: (legacy: any[]) => Promise<void>): () => Promise<void> {
+  let done: Promise<void> | null = null;
+  return () => {
+    if (!done) {
+      done = (async () => {
+        const lockKey = `lock:${markerKey}`;
+        const token = lockToken();
+        // 等别的实例迁移完，或者自己拿到迁移锁
+        while (true) {
+          if (await kv.get(markerKey)) {
+            return;
+          }
+          if (await acquireLock(lockKey, token, MIGRATION_LOCK_TTL_MS)) {
+            break;
+          }
+          await new Promise(resolve => setTimeout(resolve, MIGRATION_POLL_MS));
+        }
+        try {
+          if (await kv.get(markerKey)) {
+            return;
+          }
+          const legacy = await kv.get<any[]>(legacyKey);
+          if (Array.isArray(legacy) && legacy.length > 0) {
+            console.log(`[KV] 迁移 ${legacyKey}（${legacy.length} 条）到逐条记录布局...`);
+            await migrate(legacy);
+          }
+          await kv.set(markerKey, new Date().toISOString());
+        } finally {
+          await releaseLock(lockKey, token).catch(() => undefined);
+        }
+      })().catch(e => {
+        done = null;
+        throw e;
+      });
+    }
+    return done;
+  };
+}
@@ -0,0 +1,504 @@
+/**
+ * 带索引的追加写记录存储
+ *
+ * 记录全部常驻内存（Map 按插入顺序保存，与原 JSON 数组顺序一致），按字段建哈希索引；
+ * 每次写入只往 <name>.wal 追加一行 {"op":"put","record":...}，不再整文件重写；
+ * WAL 行数超过快照记录数的一半（至少 COMPACT_MIN_ENTRIES 行）时在后台压缩，不占用触发它的请求：
+ * 下一个事件循环先把 WAL 轮换成 <name>.old.wal（之后的写入进新 WAL），取当时全部记录的引用
+ * （记录只会被整条替换，不会原地修改），再分块异步写临时文件、rename 成新快照，最后删掉 .old.wal。
+ * 快照格式与原来的 codes.json / applications.json 相同，旧数据可直接读取；
+ * 启动时读快照再依次重放 .old.wal 和 WAL，put 是整条记录覆盖，重放多次结果不变（压缩中途崩溃也安全），
+ * 最后一行写了一半的 WAL 会在启动时截掉。
+ * orderBy 顺序增量维护：新记录通常追加到末尾，乱序的新增或时间字段变化时二分查找位置插入
+ */
+
+import fs from 'node:fs';
+import path from 'node:path';
+
+const COMPACT_MIN_ENTRIES = Number(process.env.STORE_COMPACT_MIN_ENTRIES) || 1000;
+const COMPACT_RATIO = 0.5;
+
+type KeyFn<T> = (record: T) => string | null | undefined;
+
+export interface RecordStoreOptions<T> {
+  dir: string;
+  /** 快照文件名（如 codes.json），WAL 为同名的 .wal 文件 */
+  file: string;
+  /** 快照里记录数组的字段名（如 codes） */
+  key: string;
+  /** 快照里记录数组之后的其他字段（如 stats） */
+  extra?: () => Record<string, any>;
+  /** 索引名 -> 取索引键 */
+  indexes?: Record<string, KeyFn<T>>;
+  /** 按该时间字段维护从旧到新的顺序，用于倒序分页 */
+  orderBy?: KeyFn<T>;
+  /** 记录变化时回调（prev 为空表示新增），用于增量维护统计 */
+  onChange?: (prev: T | undefined, next: T) => void;
+  /** 全量替换或加载后回调，用于重算统计 */
+  onReset?: (records: Iterable<T>) => void;
+}
+
+export class RecordStore<T extends { id: string }> {
+  private readonly options: RecordStoreOptions<T>;
+  private readonly snapshotFile: string;
+  private readonly walFile: string;
+  private readonly oldWalFile: string;
+  private records = new Map<string, T>();
+  private indexes = new Map<string, Map<string, string[]>>();
+  private seq = new Map<string, number>();
+  private nextSeq = 0;
+  private ordered: string[] = [];
+  private walEntries = 0;
+  private walFd: number | null = null;
+  private loaded = false;
+  /** 正在进行的后台压缩 */
+  private compacting: Promise<void> | null = null;
+  /** 同步压缩或全量替换时加一，使进行中的后台压缩作废 */
+  private generation = 0;
+
+  constructor(options: RecordStoreOptions<T>) {
+    this.options = options;
+    this.snapshotFile = path.join(options.dir, options.file);
+    this.walFile = this.snapshotFile.replace(/\.json$/, '') + '.wal';
+    this.oldWalFile = this.snapshotFile.replace(/\.json$/, '') + '.old.wal';
+    for (const name of Object.keys(options.indexes || {})) {
+      this.indexes.set(name, new Map());
+    }
+  }
+
+  /**
+   * 按 id 取记录（返回副本，修改后需 put 回来）
+   */
+  get(id: string): T | undefined {
+    this.ensureLoaded();
+    const record = this.records.get(id);
+    return record ? { ...record } : undefined;
+  }
+
+  /**
+   * 按索引取第一条（插入顺序最早的）记录，与原来 Array.find 的结果一致
+   */
+  findOne(index: string, key: string): T | undefined {
+    const ids = this.lookup(index, key);
+    return ids.length > 0 ? { ...this.records.get(ids[0])! } : undefined;
+  }
+
+  /**
+   * 按索引取全部记录（插入顺序）
+   */
+  findAll(index: string, key: string): T[] {
+    return this.lookup(index, key).map(id => ({ ...this.records.get(id)! }));
+  }
+
+  get size(): number {
+    this.ensureLoaded();
+    return this.records.size;
+  }
+
+  /**
+   * 全部记录（插入顺序，副本）
+   */
+  all(): T[] {
+    this.ensureLoaded();
+    return Array.from(this.records.values(), record => ({ ...record }));
+  }
+
+  /**
+   * 按 orderBy 字段从新到旧遍历（不复制，调用方只读）
+   */
+  *newestFirst(): IterableIterator<T> {
+    this.ensureLoaded();
+    for (let i = this.ordered.length - 1; i >= 0; i--) {
+      yield this.records.get(this.ordered[i])!;
+    }
+  }
+
+  /**
+   * 新增或整条覆盖记录
+   */
+  put(record: T): void {
+    this.putMany([record]);
+  }
+
+  /**
+   * 批量新增或覆盖（WAL 一次写入）
+   */
+  putMany(records: T[]): void {
+    if (records.length === 0) {
+      return;
+    }
+    this.ensureLoaded();
+    this.appendWal(records);
+    for (const record of records) {
+      this.apply({ ...record });
+    }
+    this.maybeCompact();
+  }
+
+  /**
+   * 按 id 合并部分字段，返回是否找到记录
+   */
+  update(id: string, updates: Partial<T>): boolean {
+    this.ensureLoaded();
+    const existing = this.records.get(id);
+    if (!existing) {
+      return false;
+    }
+    this.put({ ...existing, ...updates, id });
+    return true;
+  }
+
+  /**
+   * 全量替换（兼容原来的 saveXxx(data)），直接写快照
+   */
+  replaceAll(records: T[]): void {
+    this.ensureLoaded();
+    this.reset(records);
+    this.compact();
+  }
+
+  /**
+   * 立即把当前全部记录写成快照并清空 WAL（同步；进行中的后台压缩作废）
+   */
+  compact(): void {
+    this.ensureLoaded();
+    this.generation++;
+    fs.mkdirSync(this.options.dir, { recursive: true });
+    const tmpFile = `${this.snapshotFile}.tmp`;
+    const fd = fs.openSync(tmpFile, 'w');
+    try {
+      for (const chunk of this.snapshotChunks(this.records.values(), this.snapshotTail())) {
+        fs.writeSync(fd, chunk);
+      }
+    } finally {
+      fs.closeSync(fd);
+    }
+    fs.renameSync(tmpFile, this.snapshotFile);
+    fs.rmSync(this.oldWalFile, { force: true });
+    fs.ftruncateSync(this.openWal(), 0);
+    this.walEntries = 0;
+  }
+
+  /**
+   * 等待进行中的后台压缩结束（测试和退出前使用）
+   */
+  async flush(): Promise<void> {
+    await this.compacting;
+  }
+
+  private lookup(index: string, key: string): string[] {
+    this.ensureLoaded();
+    const byKey = this.indexes.get(index);
+    if (!byKey) {
+      throw new Error(`未定义的索引: ${index}`);
+    }
+    return byKey.get(key) || [];
+  }
+
+  private ensureLoaded(): void {
+    if (this.loaded) {
+      return;
+    }
+    this.loaded = true;
+
+    let records: T[] = [];
+    try {
+      records = JSON.parse(fs.readFileSync(this.snapshotFile, 'utf-8'))[this.options.key] || [];
+    } catch (e) {
+      // 快照不存在时从空数据开始
+    }
+    this.reset(records);
+
+    // 上次后台压缩没做完：先重放轮换出来的旧 WAL，再重放新 WAL，然后立即写一份完整快照
+    const interrupted = fs.existsSync(this.oldWalFile);
+    if (interrupted) {
+      this.replayWal(this.oldWalFile);
+    }
+    this.replayWal(this.walFile);
+    if (interrupted) {
+      console.warn(`[Store] 上次压缩未完成，重新写快照: ${this.snapshotFile}`);
+      this.compact();
+    }
+  }
+
+  private replayWal(file: string): void {
+    let wal: Buffer;
+    try {
+      wal = fs.readFileSync(file);
+    } catch (e) {
+      return;
+    }
+    // 截掉写了一半的最后一行，否则下一条追加会接在它后面
+    const end = wal.lastIndexOf(0x0a) + 1;
+    if (end < wal.length) {
+      console.warn(`[Store] 截掉未写完的 WAL 行: ${file}`);
+      fs.truncateSync(file, end);
+    }
+    for (const line of wal.subarray(0, end).toString('utf-8').split('\n')) {
+      if (!line) {
+        continue;
+      }
+      try {
+        const entry = JSON.parse(line);
+        if (entry.op === 'put') {
+          this.apply(entry.record);
+          this.walEntries += 1;
+        }
+      } catch (e) {
+        console.warn(`[Store] 忽略损坏的 WAL 行: ${file}`);
+      }
+    }
+  }
+
+  private reset(records: T[]): void {
+    this.records = new Map();
+    this.seq = new Map();
+    this.nextSeq = 0;
+    this.ordered = [];
+    for (const byKey of this.indexes.values()) {
+      byKey.clear();
+    }
+    for (const record of records) {
+      this.insert(record, false);
+    }
+    // 加载时排一次序，之后增量维护
+    if (this.options.orderBy) {
+      this.ordered = Array.from(this.records.keys()).sort((a, b) => this.compareOrder(a, b));
+    }
+    this.options.onReset?.(this.records.values());
+  }
+
+  private apply(record: T): void {
+    const prev = this.records.get(record.id);
+    if (prev) {
+      this.reindex(prev, record);
+      const orderBy = this.options.orderBy;
+      const moved = orderBy && (orderBy(prev) || '') !== (orderBy(record) || '');
+      if (moved) {
+        // 先按旧的时间找到并移除，再按新的时间插入
+        this.ordered.splice(this.orderPosition(orderBy(prev) || '', this.seq.get(prev.id)!), 1);
+      }
+      this.records.set(record.id, record);
+      if (moved) {
+        this.insertOrdered(record.id);
+      }
+    } else {
+      this.insert(record);
+    }
+    this.options.onChange?.(prev, record);
+  }
+
+  private insert(record: T, ordered: boolean = true): void {
+    this.records.set(record.id, record);
+    this.seq.set(record.id, this.nextSeq++);
+    for (const [name, keyFn] of Object.entries(this.options.indexes || {})) {
+      this.addKey(name, keyFn(record), record.id);
+    }
+    if (ordered && this.options.orderBy) {
+      this.insertOrdered(record.id);
+    }
+  }
+
+  private orderKey(id: string): string {
+    return this.options.orderBy!(this.records.get(id)!) || '';
+  }
+
+  /** 先按时间再按插入顺序（时间相同的保持插入顺序，与稳定排序一致） */
+  private compareOrder(a: string, b: string): number {
+    const ka = this.orderKey(a);
+    const kb = this.orderKey(b);
+    return ka < kb ? -1 : ka > kb ? 1 : this.seq.get(a)! - this.seq.get(b)!;
+  }
+
+  /** ordered 中第一个不早于 (key, seq) 的位置（二分查找） */
+  private orderPosition(key: string, seq: number): number {
+    let lo = 0;
+    let hi = this.ordered.length;
+    while (lo < hi) {
+      const mid = (lo + hi) >>> 1;
+      const other = this.ordered[mid];
+      const otherKey = this.orderKey(other);
+      if (otherKey < key || (otherKey === key && this.seq.get(other)! < seq)) {
+        lo = mid + 1;
+      } else {
+        hi = mid;
+      }
+    }
+    return lo;
+  }
+
+  private insertOrdered(id: string): void {
+    const last = this.ordered[this.ordered.length - 1];
+    // 常见情况：新记录时间最新，直接追加
+    if (last === undefined || this.compareOrder(last, id) < 0) {
+      this.ordered.push(id);
+      return;
+    }
+    this.ordered.splice(this.orderPosition(this.orderKey(id), this.seq.get(id)!), 0, id);
+  }
+
+  private reindex(prev: T, next: T): void {
+    for (const [name, keyFn] of Object.entries(this.options.indexes || {})) {
+      const oldKey = keyFn(prev);
+      const newKey = keyFn(next);
+      if (oldKey !== newKey) {
+        this.removeKey(name, oldKey, prev.id);
+        this.addKey(name, newKey, next.id);
+      }
+    }
+  }
+
+  private addKey(name: string, key: string | null | undefined, id: string): void {
+    if (key == null) {
+      return;
+    }
+    const byKey = this.indexes.get(name)!;
+    const ids = byKey.get(key);
+    if (!ids) {
+      byKey.set(key, [id]);
+      return;
+    }
+    // 同一个键下按插入顺序排列
+    const seq = this.seq.get(id)!;
+    let i = ids.length;
+    while (i > 0 && this.seq.get(ids[i - 1])! > seq) {
+      i--;
+    }
+    ids.splice(i, 0, id);
+  }
+
+  private removeKey(name: string, key: string | null | undefined, id: string): void {
+    if (key == null) {
+      return;
+    }
+    const byKey = this.indexes.get(name)!;
+    const ids = byKey.get(key);
+    if (!ids) {
+      return;
+    }
+    if (ids.length === 1) {
+      if (ids[0] === id) {
+        byKey.delete(key);
+      }
+      return;
+    }
+    // 同一个键下按插入顺序排列，二分查找位置
+    const seq = this.seq.get(id)!;
+    let lo = 0;
+    let hi = ids.length;
+    while (lo < hi) {
+      const mid = (lo + hi) >>> 1;
+      if (this.seq.get(ids[mid])! < seq) {
+        lo = mid + 1;
+      } else {
+        hi = mid;
+      }
+    }
+    if (ids[lo] === id) {
+      ids.splice(lo, 1);
+    }
+  }
+
+  /**
+   * 快照数组之后的其他字段（压缩开始时序列化，与记录是同一时刻的）
+   */
+  private snapshotTail(): string {
+    const indent = (json: string, pad: string) => json.replace(/\n/g, `\n${pad}`);
+    const extra = this.options.extra?.() || {};
+    return Object.entries(extra)
+      .map(([name, value]) => `,\n  ${JSON.stringify(name)}: ${indent(JSON.stringify(value, null, 2), '  ')}`)
+      .join('');
+  }
+
+  /**
+   * 逐条序列化快照（每块 1000 条），拼起来与 JSON.stringify(data, null, 2) 相同，
+   * 但不用把上百万条记录拼成一个字符串
+   */
+  private *snapshotChunks(records: Iterable<T>, tail: string): IterableIterator<string> {
+    const key = JSON.stringify(this.options.key);
+    let chunk: string[] = [];
+    let first = true;
+    for (const record of records) {
+      chunk.push(`${first ? `{\n  ${key}: [\n` : ',\n'}    ${JSON.stringify(record, null, 2).replace(/\n/g, '\n    ')}`);
+      first = false;
+      if (chunk.length >= 1000) {
+        yield chunk.join('');
+        chunk = [];
+      }
+    }
+    yield first ? `{\n  ${key}: []${tail}\n}` : `${chunk.join('')}\n  ]${tail}\n}`;
+  }
+
+  private maybeCompact(): void {
+    if (this.compacting || this.walEntries < Math.max(COMPACT_MIN_ENTRIES, this.records.size * COMPACT_RATIO)) {
+      return;
+    }
+    this.compacting = this.compactInBackground()
+      .catch(e => console.error(`[Store] 后台压缩失败，WAL 保留到下次压缩: ${this.snapshotFile}`, e))
+      .finally(() => {
+        this.compacting = null;
+      });
+  }
+
+  /**
+   * 后台压缩：轮换 WAL、取记录引用，之后分块异步写快照，每块之间让出事件循环
+   */
+  private async compactInBackground(): Promise<void> {
+    await new Promise(resolve => setImmediate(resolve));
+    const generation = this.generation;
+
+    this.closeWal();
+    if (fs.existsSync(this.oldWalFile)) {
+      // 上一次后台压缩失败留下的旧 WAL：接上当前 WAL，保持重放顺序
+      fs.appendFileSync(this.oldWalFile, fs.readFileSync(this.walFile));
+      fs.rmSync(this.walFile, { force: true });
+    } else {
+      fs.renameSync(this.walFile, this.oldWalFile);
+    }
+    this.walEntries = 0;
+    const records = Array.from(this.records.values());
+    const tail = this.snapshotTail();
+
+    const tmpFile = `${this.snapshotFile}.compacting.tmp`;
+    const handle = await fs.promises.open(tmpFile, 'w');
+    try {
+      for (const chunk of this.snapshotChunks(records, tail)) {
+        if (generation !== this.generation) {
+          break;
+        }
+        await handle.write(chunk);
+      }
+    } finally {
+      await handle.close();
+    }
+    if (generation !== this.generation) {
+      // 期间有同步压缩或全量替换，它写的快照更新
+      await fs.promises.rm(tmpFile, { force: true });
+      return;
+    }
+    // 检查与 rename 之间不能再让出事件循环，否则可能覆盖同步压缩刚写的快照
+    fs.renameSync(tmpFile, this.snapshotFile);
+    fs.rmSync(this.oldWalFile, { force: true });
+  }
+
+  private closeWal(): void {
+    if (this.walFd !== null) {
+      fs.closeSync(this.walFd);
+      this.walFd = null;
+    }
+  }
+
+  private openWal(): number {
+    if (this.walFd === null) {
+      fs.mkdirSync(this.options.dir, { recursive: true });
+      this.walFd = fs.openSync(this.walFile, 'a');
+    }
+    return this.walFd;
+  }
+
+  private appendWal(records: T[]): void {
+    const lines = records.map(record => JSON.stringify({ op: 'put', record })).join('\n') + '\n';
+    fs.writeSync(this.openWal(), lines);
+    this.walEntries += records.length;
+  }
+}
@@ -0,0 +1,436 @@
+/**
+ * 评论截图预处理和审核结果缓存（ai-verifier.ts 调用模型前后使用）
+ *
+ * - 先按原文件的 SHA-256 查缓存，命中就不解码；未命中才预处理
+ * - 预处理：PNG 解码后按视觉模型的上限缩小（长边 2048、短边 768，超出部分模型端也会缩掉），
+ *   再无损重新编码（灰度 / 调色板 / RGB 里选最小的），只有变小才替换原图。
+ *   解码和编码是纯 JS 的 CPU 密集计算，放在 worker 线程池里（screenshot-worker.ts），同一文件同时只处理一次。
+ *   JPEG / WebP / GIF 不解码（没有对应的解码器），原图发送，只按文件 SHA-256 缓存，不做像素和近似去重
+ * - 去重：缓存按“截图 + 提示词”区分（带期望英文名的审核和不带的解析，回复不同）。
+ *   文件 SHA-256 相同，或解码后的像素 SHA-256 相同（重新编码、去掉元数据的同一张截图）时复用缓存的模型回复；
+ *   回复里的英文名、评论内容只能来自内容完全相同的截图。
+ *   256 位差值哈希（dHash）只用来找尺寸相同、几乎相同的截图，复用“不是评论截图”的结论（不含任何提取字段）；
+ *   dHash 分 8 段建索引，查找时只比较至少有一段相同的记录，不遍历整个缓存。
+ *   缓存存在 DATA_DIR/screenshot-cache.json（record-store.ts）
+ * - 同一张截图正在审核时，后来的请求等同一个结果；同时进行的模型调用数有上限
+ *
+ * 环境变量：SCREENSHOT_PIPELINE=off 关闭预处理和缓存（对比基准用），SCREENSHOT_HASH_DISTANCE 近似判定的
+ * 最大汉明距离（默认 6，最大 7），SCREENSHOT_MAX_CONCURRENCY 同时调用模型的数量（默认 4），
+ * SCREENSHOT_WORKERS 预处理 worker 线程数（默认 2）
+ */
+
+import crypto from 'node:crypto';
+import path from 'node:path';
+import { Worker } from 'node:worker_threads';
+import { fileURLToPath } from 'node:url';
+import { dirname } from 'node:path';
+import { RecordStore } from './record-store.js';
+import { processScreenshot, ProcessedScreenshot } from './screenshot-worker.js';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = dirname(__filename);
+
+const DATA_DIR = process.env.DATA_DIR || path.join(__dirname, '../data');
+
+export const PIPELINE_ENABLED = process.env.SCREENSHOT_PIPELINE !== 'off';
+
+// 差值哈希（256 位，见 screenshot-worker.ts）分成 8 段、每段 32 位建索引：汉明距离不超过 7 的两个哈希至少有一段完全相同
+const HASH_BANDS = 8;
+const HASH_DISTANCE = Math.min(HASH_BANDS - 1, Number(process.env.SCREENSHOT_HASH_DISTANCE ?? 6));
+
+// 近似命中时返回的回复：只有结论，不带被比较截图里的任何字段
+const REJECTED_REPLY = JSON.stringify({ is_comment: false });
+
+const MAX_CONCURRENCY = Number(process.env.SCREENSHOT_MAX_CONCURRENCY) || 4;
+const WORKER_COUNT = Number(process.env.SCREENSHOT_WORKERS) || 2;
+
+export interface PreparedScreenshot {
+  buffer: Buffer;
+  mimeType: string;
+  sha256: string;
+  /** 解码后像素（含宽高）的 SHA-256，无法解码的格式为 null */
+  pixelSha256: string | null;
+  /** 差值哈希（十六进制），无法解码的格式为 null */
+  hash: string | null;
+  width: number | null;
+  height: number | null;
+  originalBytes: number;
+}
+
+interface CacheEntry {
+  /** `${sha256}:${prompt}` */
+  id: string;
+  sha256: string;
+  pixelSha256: string | null;
+  /** 提示词的哈希（promptKey） */
+  prompt: string;
+  hash: string | null;
+  width: number | null;
+  height: number | null;
+  /** 模型的原始回复（能解析成 JSON 的才缓存） */
+  reply: string;
+  /** 模型判定不是评论截图（is_comment: false） */
+  rejected: boolean;
+  createdAt: string;
+  hits: number;
+  lastHitAt?: string;
+}
+
+/** 近似查找的分段索引键：尺寸相同、第 band 段哈希相同（只索引“不是评论截图”的记录） */
+function bandKey(hash: string, width: number, height: number, band: number): string {
+  const size = hash.length / HASH_BANDS;
+  return `${width}x${height}:${hash.slice(band * size, (band + 1) * size)}`;
+}
+
+const bandIndexes: Record<string, (e: CacheEntry) => string | null> = {};
+for (let band = 0; band < HASH_BANDS; band++) {
+  bandIndexes[`band${band}`] = e => (e.rejected && e.hash && e.width && e.height ? bandKey(e.hash, e.width, e.height, band) : null);
+}
+
+const cache = new RecordStore<CacheEntry>({
+  dir: DATA_DIR,
+  file: 'screenshot-cache.json',
+  key: 'entries',
+  indexes: {
+    pixels: e => (e.pixelSha256 && e.prompt ? `${e.pixelSha256}:${e.prompt}` : null),
+    ...bandIndexes
+  },
+  orderBy: e => e.createdAt
+});
+
+/**
+ * 提示词的短哈希，作为缓存键的一部分
+ */
+function promptKey(prompt: string): string {
+  return crypto.createHash('sha256').update(prompt).digest('hex').slice(0, 16);
+}
+
+/**
+ * 按文件头判断图片类型（上传的 .jpg 实际可能是 PNG）
+ */
+export function sniffMimeType(buffer: Buffer, fallback: string = 'image/png'): string {
+  if (buffer.length >= 8 && buffer.readUInt32BE(0) === 0x89504e47) return 'image/png';
+  if (buffer.length >= 3 && buffer[0] === 0xff && buffer[1] === 0xd8 && buffer[2] === 0xff) return 'image/jpeg';
+  if (buffer.length >= 6 && buffer.toString('latin1', 0, 3) === 'GIF') return 'image/gif';
+  if (buffer.length >= 12 && buffer.toString('latin1', 0, 4) === 'RIFF' && buffer.toString('latin1', 8, 12) === 'WEBP') {
+    return 'image/webp';
+  }
+  return fallback;
+}
+
+function hammingDistance(a: string, b: string): number {
+  const x = Buffer.from(a, 'hex');
+  const y = Buffer.from(b, 'hex');
+  let distance = 0;
+  for (let i = 0; i < x.length; i++) {
+    let v = x[i] ^ y[i];
+    while (v) {
+      distance += v & 1;
+      v >>= 1;
+    }
+  }
+  return distance;
+}
+
+interface WorkerJob {
+  buffer: Buffer;
+  resolve: (result: ProcessedScreenshot | null) => void;
+  reject: (e: Error) => void;
+}
+
+/**
+ * 预处理用的 worker 线程池：每个 worker 同时处理一张图，其余排队
+ */
+class ScreenshotWorkers {
+  private idle: Worker[] = [];
+  private size = 0;
+  private queue: WorkerJob[] = [];
+  private online = new WeakSet<Worker>();
+  private broken = false;
+  private nextId = 0;
+
+  run(buffer: Buffer): Promise<ProcessedScreenshot | null> {
+    if (this.broken) {
+      return Promise.resolve(processScreenshot(buffer));
+    }
+    return new Promise((resolve, reject) => {
+      this.queue.push({ buffer, resolve, reject });
+      this.dispatch();
+    });
+  }
+
+  private dispatch(): void {
+    while (this.queue.length > 0) {
+      let worker = this.idle.pop();
+      if (!worker) {
+        if (this.size >= WORKER_COUNT) return;
+        worker = this.spawn();
+        if (!worker) return;
+      }
+      this.process(worker, this.queue.shift()!);
+    }
+  }
+
+  private spawn(): Worker | undefined {
+    try {
+      // 开发时（tsx）是 .ts，编译后是 .js
+      const file = new URL(`./screenshot-worker${path.extname(__filename)}`, import.meta.url);
+      const worker = new Worker(file, { workerData: { screenshotWorker: true } });
+      // 模块加载完后 worker 先发一条 ready（'online' 事件在加载模块之前就触发）
+      worker.once('message', () => this.online.add(worker));
+      worker.unref();
+      this.size++;
+      return worker;
+    } catch (e: any) {
+      this.fallBack(e.message);
+      return undefined;
+    }
+  }
+
+  private fallBack(reason: string): void {
+    if (!this.broken) {
+      console.warn('[Screenshot] 无法启动预处理 worker，改在主线程处理:', reason);
+      this.broken = true;
+    }
+    for (const job of this.queue.splice(0)) {
+      job.resolve(processScreenshot(job.buffer));
+    }
+  }
+
+  private process(worker: Worker, job: WorkerJob): void {
+    const id = this.nextId++;
+    const cleanup = () => {
+      worker.off('message', onMessage);
+      worker.off('error', onFailure);
+      worker.off('exit', onFailure);
+    };
+    const onMessage = (message: { id: number; result?: any; error?: string }) => {
+      if (message.id !== id) return;
+      cleanup();
+      this.idle.push(worker);
+      this.dispatch();
+      if (message.error) {
+        job.reject(new Error(message.error));
+      } else {
+        const result = message.result;
+        job.resolve(result && { ...result, encoded: result.encoded && Buffer.from(result.encoded) });
+      }
+    };
+    const onFailure = (e: Error | number) => {
+      cleanup();
+      this.size--;
+      void worker.terminate();
+      if (!this.online.has(worker)) {
+        // worker 没能启动（例如部署包里缺 screenshot-worker 文件）：以后都在主线程处理
+        this.fallBack(e instanceof Error ? e.message : String(e));
+        job.resolve(processScreenshot(job.buffer));
+        return;
+      }
+      // worker 崩溃或退出（例如内存不足）：丢弃它，下次按需重建
+      job.reject(e instanceof Error ? e : new Error(`预处理 worker 已退出（${e}）`));
+      this.dispatch();
+    };
+    worker.on('message', onMessage);
+    worker.on('error', onFailure);
+    worker.on('exit', onFailure);
+    worker.postMessage({ id, buffer: job.buffer });
+  }
+}
+
+const workers = new ScreenshotWorkers();
+const preparing = new Map<string, Promise<PreparedScreenshot>>();
+
+/**
+ * 原文件的 SHA-256（缓存的精确键）
+ */
+export function fileSha256(buffer: Buffer): string {
+  return crypto.createHash('sha256').update(buffer).digest('hex');
+}
+
+/**
+ * 只按原文件查缓存，不解码（命中时不需要预处理）
+ */
+export function findExactReply(sha256: string, prompt: string): string | null {
+  if (!PIPELINE_ENABLED) {
+    return null;
+  }
+  const found = cache.get(`${sha256}:${promptKey(prompt)}`);
+  if (!found) {
+    return null;
+  }
+  cache.update(found.id, { hits: found.hits + 1, lastHitAt: new Date().toISOString() });
+  return found.reply;
+}
+
+/**
+ * 预处理截图：PNG 在 worker 里计算哈希、缩小并重新编码（变小才替换）；其他格式原样返回
+ */
+export function prepareScreenshot(original: Buffer, mimeType?: string, sha256: string = fileSha256(original)): Promise<PreparedScreenshot> {
+  const prepared: PreparedScreenshot = {
+    buffer: original,
+    mimeType: sniffMimeType(original, mimeType),
+    sha256,
+    pixelSha256: null,
+    hash: null,
+    width: null,
+    height: null,
+    originalBytes: original.length
+  };
+  if (!PIPELINE_ENABLED) {
+    return Promise.resolve(prepared);
+  }
+  if (prepared.mimeType !== 'image/png') {
+    console.log(`[Screenshot] ${prepared.mimeType} 不解码，原图发送（只按文件 SHA-256 缓存）`);
+    return Promise.resolve(prepared);
+  }
+
+  // 同一文件同时上传多次时只处理一次
+  const pending = preparing.get(sha256);
+  if (pending) {
+    return pending;
+  }
+  const run = workers.run(original).then(processed => {
+    if (processed) {
+      prepared.pixelSha256 = processed.pixelSha256;
+      prepared.hash = processed.hash;
+      prepared.width = processed.width;
+      prepared.height = processed.height;
+      if (processed.encoded) {
+        prepared.buffer = processed.encoded;
+      }
+    }
+    return prepared;
+  }, (e: Error) => {
+    console.warn('[Screenshot] 预处理失败，使用原图:', e.message);
+    return prepared;
+  });
+  preparing.set(sha256, run);
+  run.finally(() => preparing.delete(sha256));
+  return run;
+}
+
+/**
+ * 查找缓存的回复：exact 文件相同，pixels 像素相同（复用完整回复）；
+ * similar 尺寸相同、几乎相同且缓存的结论是“不是评论截图”（只复用这个结论）
+ */
+export function findCachedReply(
+  prepared: PreparedScreenshot,
+  prompt: string
+): { reply: string; match: 'exact' | 'pixels' | 'similar'; distance: number } | null {
+  if (!PIPELINE_ENABLED) {
+    return null;
+  }
+
+  const key = promptKey(prompt);
+  let found: CacheEntry | undefined = cache.get(`${prepared.sha256}:${key}`);
+  let match: 'exact' | 'pixels' | 'similar' = 'exact';
+  let distance = 0;
+
+  if (!found && prepared.pixelSha256) {
+    found = cache.findOne('pixels', `${prepared.pixelSha256}:${key}`);
+    match = 'pixels';
+  }
+
+  if (!found && prepared.hash && HASH_DISTANCE > 0) {
+    // 只比较至少有一段哈希相同的记录
+    const seen = new Set<string>();
+    let best = HASH_DISTANCE + 1;
+    for (let band = 0; band < HASH_BANDS; band++) {
+      for (const entry of cache.findAll(`band${band}`, bandKey(prepared.hash, prepared.width!, prepared.height!, band))) {
+        if (seen.has(entry.id)) continue;
+        seen.add(entry.id);
+        const d = hammingDistance(prepared.hash, entry.hash!);
+        if (d < best) {
+          best = d;
+          found = entry;
+        }
+      }
+    }
+    match = 'similar';
+    distance = best;
+  }
+
+  if (!found) {
+    return null;
+  }
+  cache.update(found.id, { hits: found.hits + 1, lastHitAt: new Date().toISOString() });
+  return { reply: match === 'similar' ? REJECTED_REPLY : found.reply, match, distance };
+}
+
+/**
+ * 缓存模型回复（按截图 + 提示词）
+ */
+export function cacheReply(prepared: PreparedScreenshot, prompt: string, reply: string): void {
+  if (!PIPELINE_ENABLED) {
+    return;
+  }
+  let rejected = false;
+  try {
+    rejected = JSON.parse(reply).is_comment === false;
+  } catch (e) {
+    // 调用方只缓存能解析的回复
+  }
+  const key = promptKey(prompt);
+  cache.put({
+    id: `${prepared.sha256}:${key}`,
+    sha256: prepared.sha256,
+    pixelSha256: prepared.pixelSha256,
+    prompt: key,
+    hash: prepared.hash,
+    width: prepared.width,
+    height: prepared.height,
+    reply,
+    rejected,
+    createdAt: new Date().toISOString(),
+    hits: 0
+  });
+}
+
+const inFlight = new Map<string, Promise<string | null>>();
+const waiting: Array<() => void> = [];
+let active = 0;
+
+async function acquireSlot(): Promise<void> {
+  if (active < MAX_CONCURRENCY) {
+    active++;
+    return;
+  }
+  await new Promise<void>(resolve => waiting.push(resolve));
+}
+
+function releaseSlot(): void {
+  const next = waiting.shift();
+  if (next) {
+    next();
+  } else {
+    active--;
+  }
+}
+
+/**
+ * 调用模型（限制并发；同一张截图用同一个提示词正在审核时等待同一个结果）
+ */
+export function callModelOnce(
+  prepared: PreparedScreenshot,
+  prompt: string,
+  call: () => Promise<string | null>
+): Promise<string | null> {
+  const key = `${prepared.sha256}:${promptKey(prompt)}`;
+  const pending = PIPELINE_ENABLED ? inFlight.get(key) : undefined;
+  if (pending) {
+    return pending;
+  }
+  const run = (async () => {
+    await acquireSlot();
+    try {
+      return await call();
+    } finally {
+      releaseSlot();
+    }
+  })();
+  if (PIPELINE_ENABLED) {
+    inFlight.set(key, run);
+    run.then(() => inFlight.delete(key), () => inFlight.delete(key));
+  }
+  return run;
+}
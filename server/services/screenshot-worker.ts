@@ -0,0 +1,96 @@
+/**
+ * 截图解码、哈希和重新编码（纯 JS，CPU 密集），在 worker 线程里执行，不阻塞请求处理
+ *
+ * screenshot-pipeline.ts 用 worker 池调用 processScreenshot；worker 起不来时（例如部署包里缺这个文件）
+ * 退回到主线程直接调用
+ */
+
+import crypto from 'node:crypto';
+import { parentPort, workerData } from 'node:worker_threads';
+import { decodePng, encodePng, resizeImage, RgbImage } from '../utils/png.js';
+
+// 视觉模型对图片的尺寸上限（high detail：先缩到 2048 以内，再把短边缩到 768）
+const MAX_LONG_SIDE = 2048;
+const MAX_SHORT_SIDE = 768;
+
+// 差值哈希 17x16 -> 256 位；现有上传截图里不同截图之间至少差 26 位
+const HASH_SIZE = 16;
+
+export interface ProcessedScreenshot {
+  /** 解码后像素（含宽高）的 SHA-256 */
+  pixelSha256: string;
+  /** 差值哈希（十六进制） */
+  hash: string;
+  width: number;
+  height: number;
+  /** 缩小并重新编码后的 PNG（比原图小才有） */
+  encoded: Buffer | null;
+}
+
+/**
+ * 差值哈希：灰度图缩到 (HASH_SIZE+1) x HASH_SIZE，每行相邻像素比较亮度
+ */
+function differenceHash(image: RgbImage): string {
+  const small = resizeImage(image, HASH_SIZE + 1, HASH_SIZE);
+  const bits = Buffer.alloc((HASH_SIZE * HASH_SIZE) / 8);
+  let bit = 0;
+  for (let y = 0; y < HASH_SIZE; y++) {
+    for (let x = 0; x < HASH_SIZE; x++) {
+      const left = (y * (HASH_SIZE + 1) + x) * 3;
+      const right = left + 3;
+      const luma = (i: number) => 0.299 * small.data[i] + 0.587 * small.data[i + 1] + 0.114 * small.data[i + 2];
+      if (luma(left) < luma(right)) {
+        bits[bit >> 3] |= 0x80 >> (bit & 7);
+      }
+      bit++;
+    }
+  }
+  return bits.toString('hex');
+}
+
+/**
+ * 视觉模型上限内的目标尺寸
+ */
+function targetSize(width: number, height: number): { width: number; height: number } {
+  const scale = Math.min(1, MAX_LONG_SIDE / Math.max(width, height), MAX_SHORT_SIDE / Math.min(width, height));
+  return { width: Math.max(1, Math.round(width * scale)), height: Math.max(1, Math.round(height * scale)) };
+}
+
+/**
+ * 解码 PNG，计算像素哈希和差值哈希，缩小并重新编码；无法解码时返回 null
+ */
+export function processScreenshot(original: Buffer): ProcessedScreenshot | null {
+  let image: RgbImage | null = null;
+  try {
+    image = decodePng(original);
+  } catch (e: any) {
+    console.warn('[Screenshot] PNG 解码失败，使用原图:', e.message);
+  }
+  if (!image) {
+    return null;
+  }
+
+  const size = targetSize(image.width, image.height);
+  const resized = size.width < image.width ? resizeImage(image, size.width, size.height) : image;
+  const encoded = encodePng(resized);
+  return {
+    pixelSha256: crypto.createHash('sha256').update(`${image.width}x${image.height}:`).update(image.data).digest('hex'),
+    hash: differenceHash(image),
+    width: image.width,
+    height: image.height,
+    encoded: encoded.length < original.length ? encoded : null
+  };
+}
+
+// 作为 worker 启动时（workerData 由 screenshot-pipeline.ts 传入）处理主线程发来的图片
+if (parentPort && workerData?.screenshotWorker) {
+  const port = parentPort;
+  port.on('message', ({ id, buffer }: { id: number; buffer: Uint8Array }) => {
+    try {
+      port.postMessage({ id, result: processScreenshot(Buffer.from(buffer.buffer, buffer.byteOffset, buffer.byteLength)) });
+    } catch (e: any) {
+      port.postMessage({ id, error: e.message });
+    }
+  });
+  port.postMessage({ ready: true });
+}
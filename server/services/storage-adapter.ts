@@ -1,13 +1,16 @@
 /**
  * 存储适配器 - 自动检测环境并使用对应的存储方式
- * - 本地开发：使用 JSON 文件
+ * - 本地开发：默认使用带索引的追加写存储（数据文件仍是 JSON），STORAGE_ENGINE=json 时用原来的整文件读写
  * - 生产环境（Vercel/Render）：使用 Redis/KV
  */
 
 // 检测是否在生产环境（有 Redis 连接）
 const isProduction = process.env.REDIS_URL !== undefined || process.env.KV_REST_API_URL !== undefined;
 
-console.log(`[Storage] Environment: ${isProduction ? 'Production (Redis/KV)' : 'Local (JSON)'}`);
+// 本地存储引擎：indexed（默认）或 json
+const localEngine = process.env.STORAGE_ENGINE === 'json' ? 'json' : 'indexed';
+
+console.log(`[Storage] Environment: ${isProduction ? 'Production (Redis/KV)' : `Local (${localEngine === 'json' ? 'JSON' : 'indexed JSON + WAL'})`}`);
 console.log(`[Storage] REDIS_URL: ${process.env.REDIS_URL ? 'set' : 'not set'}`);
 console.log(`[Storage] KV_REST_API_URL: ${process.env.KV_REST_API_URL ? 'set' : 'not set'}`);
 
@@ -27,6 +30,15 @@ function getStorageModule() {
           ...codeManagerKV,
           ...applicationManagerKV
         };
+      } else if (localEngine === 'indexed') {
+        console.log('[Storage] Loading indexed storage modules...');
+        const codeManagerIndexed = await import('./code-manager-indexed.js');
+        const applicationManagerIndexed = await import('./application-manager-indexed.js');
+        
+        return {
+          ...codeManagerIndexed,
+          ...applicationManagerIndexed
+        };
       } else {
         console.log('[Storage] Loading JSON file storage modules...');
         // 使用 JSON 文件版本
@@ -154,6 +166,11 @@ export async function updateApplication(id: string, updates: any) {
   return module.updateApplication(id, updates);
 }
 
+export async function getRecentApplications(limit?: number) {
+  const module = await getStorageModule();
+  return module.getRecentApplications(limit);
+}
+
 // 类型导出
 export type { AccessCode, CodesData } from './code-manager.js';
 export type { Application, ApplicationsData } from './application-manager.js';
@@ -1,5 +1,8 @@
 /**
  * 企业微信发送服务
+ *
+ * 批量发送按 webhook 限速（令牌桶，默认 20 条/分钟，即群机器人的频率上限），
+ * 多条并发发送，频率超限、系统繁忙和网络错误按指数退避重试
  */
 
 import axios from 'axios';
@@ -8,6 +11,112 @@ import { generateLink } from '../utils/code-generator.js';
 export interface SendResult {
   success: boolean;
   message: string;
+  /** 失败是否值得重试（频率超限、系统繁忙、网络错误、5xx） */
+  retryable?: boolean;
+}
+
+/** 群机器人返回的可重试错误码：-1 系统繁忙，45009 接口调用超过限制 */
+const RETRYABLE_ERRCODES = new Set([-1, 45009]);
+
+export interface DeliveryOptions {
+  /** 每分钟最多发送条数（同一 webhook 共用） */
+  ratePerMinute: number;
+  /** 令牌桶容量，1 表示严格匀速 */
+  burst: number;
+  /** 同时进行的发送数 */
+  concurrency: number;
+  /** 每条最多尝试次数（含第一次） */
+  maxAttempts: number;
+  /** 第一次重试的等待时间，之后每次翻倍（上限 RETRY_MAX_DELAY_MS） */
+  retryBaseMs: number;
+}
+
+const RETRY_MAX_DELAY_MS = 5 * 60 * 1000;
+
+/**
+ * 默认发送参数（环境变量 WECHAT_SEND_RATE_PER_MIN / WECHAT_SEND_BURST / WECHAT_SEND_CONCURRENCY /
+ * WECHAT_SEND_MAX_ATTEMPTS / WECHAT_SEND_RETRY_BASE_MS）
+ */
+export function defaultDeliveryOptions(): DeliveryOptions {
+  return {
+    ratePerMinute: Number(process.env.WECHAT_SEND_RATE_PER_MIN) || 20,
+    burst: Number(process.env.WECHAT_SEND_BURST) || 1,
+    concurrency: Number(process.env.WECHAT_SEND_CONCURRENCY) || 4,
+    maxAttempts: Number(process.env.WECHAT_SEND_MAX_ATTEMPTS) || 5,
+    retryBaseMs: Number(process.env.WECHAT_SEND_RETRY_BASE_MS) || 2000
+  };
+}
+
+/**
+ * 令牌桶限速器，acquire 按调用顺序排队
+ */
+export class RateLimiter {
+  private ratePerMs: number;
+  private burst: number;
+  private tokens: number;
+  private last = Date.now();
+  private tail: Promise<void> = Promise.resolve();
+
+  constructor(ratePerMinute: number, burst: number = 1) {
+    this.ratePerMs = ratePerMinute / 60000;
+    this.burst = Math.max(1, burst);
+    this.tokens = this.burst;
+  }
+
+  /**
+   * 调整速率（同一 webhook 的新任务用新的参数）
+   */
+  configure(ratePerMinute: number, burst: number): void {
+    this.refill();
+    this.ratePerMs = ratePerMinute / 60000;
+    this.burst = Math.max(1, burst);
+    this.tokens = Math.min(this.tokens, this.burst);
+  }
+
+  acquire(): Promise<void> {
+    const turn = this.tail.then(() => this.take());
+    this.tail = turn;
+    return turn;
+  }
+
+  private refill(): void {
+    const now = Date.now();
+    this.tokens = Math.min(this.burst, this.tokens + (now - this.last) * this.ratePerMs);
+    this.last = now;
+  }
+
+  private async take(): Promise<void> {
+    this.refill();
+    if (this.tokens < 1) {
+      await sleep(Math.ceil((1 - this.tokens) / this.ratePerMs));
+      this.refill();
+    }
+    this.tokens -= 1;
+  }
+}
+
+const limiters = new Map<string, RateLimiter>();
+
+/**
+ * 取某个 webhook 的限速器（同一个群机器人的所有批量任务共用一个频率上限）
+ */
+export function limiterFor(webhookUrl: string, options: DeliveryOptions): RateLimiter {
+  let limiter = limiters.get(webhookUrl);
+  if (!limiter) {
+    limiter = new RateLimiter(options.ratePerMinute, options.burst);
+    limiters.set(webhookUrl, limiter);
+  } else {
+    limiter.configure(options.ratePerMinute, options.burst);
+  }
+  return limiter;
+}
+
+/**
+ * 第 attempts 次失败后的重试等待（指数退避，加 0~20% 抖动）
+ */
+export function retryDelay(attempts: number, retryBaseMs: number): number {
+  const delay = Math.min(RETRY_MAX_DELAY_MS, retryBaseMs * 2 ** (attempts - 1));
+  return Math.round(delay * (1 + Math.random() * 0.2));
 }
 
 /**
@@ -58,65 +167,153 @@ export async function sendToWechat(
     } else {
       return {
         success: false,
-        message: result.errmsg || '发送失败'
+        message: result.errmsg || '发送失败',
+        retryable: RETRYABLE_ERRCODES.has(result.errcode)
       };
     }
   } catch (error: any) {
-    console.error('企业微信发送错误:', error);
+    console.error('企业微信发送错误:', error.message);
+    const status = error.response?.status;
     return {
       success: false,
-      message: error.message || '网络错误'
+      message: error.message || '网络错误',
+      retryable: !status || status === 429 || status >= 500
     };
   }
 }
 
 /**
- * 批量发送到企业微信
+ * 待发送的一条消息；attempts / nextAttemptAt 在重试时更新，恢复中断的任务时带上已有的值
+ */
+export interface DeliveryItem {
+  userName: string;
+  code: string;
+  attempts: number;
+  nextAttemptAt?: number | null;
+}
+
+/**
+ * 按限速和并发发送一批消息，可重试的失败按退避时间重新排队
+ * @param onRetry 一次失败后将重试时回调（item.attempts / nextAttemptAt 已更新）
+ * @param onDone 一条消息最终成功或放弃时回调
+ * @param signal 取消后不再开始新的发送（未发送的消息留在原状态）
+ */
+export async function deliverAll<T extends DeliveryItem>(
+  webhookUrl: string,
+  items: T[],
+  baseUrl: string,
+  options: DeliveryOptions,
+  hooks: {
+    onRetry?: (item: T, result: SendResult) => void | Promise<void>;
+    onDone?: (item: T, result: SendResult) => void | Promise<void>;
+    signal?: AbortSignal;
+  } = {}
+): Promise<void> {
+  const limiter = limiterFor(webhookUrl, options);
+  const ready: T[] = [];
+  const timers = new Set<ReturnType<typeof setTimeout>>();
+  const waiters: Array<() => void> = [];
+  let remaining = items.length;
+
+  const wake = () => {
+    for (const resolve of waiters.splice(0)) resolve();
+  };
+  const schedule = (item: T) => {
+    const wait = (item.nextAttemptAt || 0) - Date.now();
+    if (wait <= 0) {
+      ready.push(item);
+      wake();
+      return;
+    }
+    const timer = setTimeout(() => {
+      timers.delete(timer);
+      ready.push(item);
+      wake();
+    }, wait);
+    timers.add(timer);
+  };
+  const stopped = () => remaining === 0 || Boolean(hooks.signal?.aborted);
+
+  hooks.signal?.addEventListener('abort', wake);
+  items.forEach(schedule);
+
+  const worker = async () => {
+    while (!stopped()) {
+      const item = ready.shift();
+      if (!item) {
+        await new Promise<void>(resolve => waiters.push(resolve));
+        continue;
+      }
+
+      await limiter.acquire();
+      if (hooks.signal?.aborted) break;
+      const result = await sendToWechat(webhookUrl, item.userName, item.code, baseUrl);
+      item.attempts += 1;
+
+      if (!result.success && result.retryable && item.attempts < options.maxAttempts) {
+        item.nextAttemptAt = Date.now() + retryDelay(item.attempts, options.retryBaseMs);
+        await hooks.onRetry?.(item, result);
+        schedule(item);
+      } else {
+        item.nextAttemptAt = null;
+        remaining--;
+        await hooks.onDone?.(item, result);
+        if (remaining === 0) wake();
+      }
+    }
+    wake();
+  };
+
+  try {
+    await Promise.all(Array.from({ length: Math.max(1, options.concurrency) }, worker));
+  } finally {
+    for (const timer of timers) clearTimeout(timer);
+    hooks.signal?.removeEventListener('abort', wake);
+  }
+}
+
+/**
+ * 批量发送到企业微信（在当前请求内等待全部发送完成；后台任务见 delivery-queue.ts）
  * @param webhookUrl 企业微信群机器人 Webhook URL
  * @param items 发送项目列表
  * @param baseUrl 网站域名
  * @param onProgress 进度回调
+ * @param options 限速、并发和重试参数，默认见 defaultDeliveryOptions
  */
 export async function batchSendToWechat(
   webhookUrl: string,
   items: Array<{ userName: string; code: string }>,
   baseUrl: string,
-  onProgress?: (current: number, total: number, userName: string, success: boolean, message: string) => void
+  onProgress?: (current: number, total: number, userName: string, success: boolean, message: string) => void,
+  options: DeliveryOptions = defaultDeliveryOptions()
 ): Promise<{ success: number; failed: number; results: Array<{ userName: string; success: boolean; message: string }> }> {
   const total = items.length;
   let successCount = 0;
   let failedCount = 0;
   const results: Array<{ userName: string; success: boolean; message: string }> = [];
-  
-  for (let i = 0; i < items.length; i++) {
-    const item = items[i];
-    const current = i + 1;
-    
-    const result = await sendToWechat(webhookUrl, item.userName, item.code, baseUrl);
-    
-    if (result.success) {
-      successCount++;
-    } else {
-      failedCount++;
-    }
-    
-    results.push({
-      userName: item.userName,
-      success: result.success,
-      message: result.message
-    });
-    
-    // 调用进度回调
-    if (onProgress) {
-      onProgress(current, total, item.userName, result.success, result.message);
-    }
-    
-    // 间隔 1 秒，避免频率限制
-    if (i < items.length - 1) {
-      await sleep(1000);
+
+  const pending = items.map(item => ({ ...item, attempts: 0 }));
+  await deliverAll(webhookUrl, pending, baseUrl, options, {
+    onDone: (item, result) => {
+      if (result.success) {
+        successCount++;
+      } else {
+        failedCount++;
+      }
+
+      results.push({
+        userName: item.userName,
+        success: result.success,
+        message: result.message
+      });
+
+      // 调用进度回调
+      if (onProgress) {
+        onProgress(results.length, total, item.userName, result.success, result.message);
+      }
     }
-  }
-  
+  });
+
   return {
     success: successCount,
     failed: failedCount,
@@ -0,0 +1,335 @@
+/**
+ * PNG 解码 / 编码和缩放（只用 node:zlib，不依赖图像库）
+ *
+ * 解码支持非隔行的全部颜色类型和位深，透明像素按白色背景合成，统一输出 8 位 RGB；
+ * 编码时按内容自动选最小的无损格式：灰度 -> 调色板（不超过 256 色）-> RGB，逐行选滤波方式。
+ * 上传的文件不可信：像素数超过 MAX_DECODE_PIXELS 的图不解码（在分配任何缓冲区之前判断），
+ * 解压时按 IHDR 算出的大小限制输出，防止压缩炸弹
+ */
+
+import zlib from 'node:zlib';
+
+export interface RgbImage {
+  width: number;
+  height: number;
+  /** 每像素 3 字节 RGB，逐行存放 */
+  data: Uint8Array;
+}
+
+const PNG_SIGNATURE = Buffer.from([0x89, 0x50, 0x4e, 0x47, 0x0d, 0x0a, 0x1a, 0x0a]);
+
+const CHANNELS: Record<number, number> = { 0: 1, 2: 3, 3: 1, 4: 2, 6: 4 };
+const BIT_DEPTHS = new Set([1, 2, 4, 8, 16]);
+
+/** 解码的像素数上限（约 16MP，手机长截图 1290x12000 以内），解码后约占 width*height*10 字节内存 */
+export const MAX_DECODE_PIXELS = 16_000_000;
+
+export function isPng(buffer: Buffer): boolean {
+  return buffer.length > 8 && buffer.subarray(0, 8).equals(PNG_SIGNATURE);
+}
+
+/**
+ * 解码 PNG；隔行扫描、格式不支持或超过 MAX_DECODE_PIXELS 时返回 null（调用方直接使用原图）
+ */
+export function decodePng(buffer: Buffer): RgbImage | null {
+  if (!isPng(buffer)) {
+    return null;
+  }
+
+  let width = 0;
+  let height = 0;
+  let bitDepth = 0;
+  let colorType = -1;
+  let interlace = 0;
+  let palette: Buffer | null = null;
+  let paletteAlpha: Buffer | null = null;
+  const idat: Buffer[] = [];
+
+  let pos = 8;
+  while (pos + 8 <= buffer.length) {
+    const length = buffer.readUInt32BE(pos);
+    const type = buffer.toString('latin1', pos + 4, pos + 8);
+    const data = buffer.subarray(pos + 8, pos + 8 + length);
+    pos += 12 + length;
+    if (type === 'IHDR') {
+      width = data.readUInt32BE(0);
+      height = data.readUInt32BE(4);
+      bitDepth = data[8];
+      colorType = data[9];
+      interlace = data[12];
+    } else if (type === 'PLTE') {
+      palette = data;
+    } else if (type === 'tRNS' && colorType === 3) {
+      paletteAlpha = data;
+    } else if (type === 'IDAT') {
+      idat.push(data);
+    } else if (type === 'IEND') {
+      break;
+    }
+  }
+
+  const channels = CHANNELS[colorType];
+  if (!channels || !BIT_DEPTHS.has(bitDepth) || interlace !== 0 || width === 0 || height === 0 || (colorType === 3 && !palette)) {
+    return null;
+  }
+  if (width * height > MAX_DECODE_PIXELS) {
+    return null;
+  }
+
+  const bitsPerPixel = channels * bitDepth;
+  const bpp = Math.max(1, bitsPerPixel >> 3);
+  const stride = Math.ceil((width * bitsPerPixel) / 8);
+  const rawLength = height * (stride + 1);
+
+  // 解压输出超过图像本身需要的大小直接失败（maxOutputLength 超出时抛 RangeError）
+  let raw: Buffer;
+  try {
+    raw = zlib.inflateSync(Buffer.concat(idat), { maxOutputLength: rawLength });
+  } catch (e) {
+    return null;
+  }
+  if (raw.length < rawLength) {
+    return null;
+  }
+
+  // 逐行反滤波
+  const pixels = new Uint8Array(height * stride);
+  for (let y = 0; y < height; y++) {
+    const filter = raw[y * (stride + 1)];
+    const src = y * (stride + 1) + 1;
+    const row = y * stride;
+    const prev = row - stride;
+    for (let i = 0; i < stride; i++) {
+      const a = i >= bpp ? pixels[row + i - bpp] : 0;
+      const b = y > 0 ? pixels[prev + i] : 0;
+      const c = i >= bpp && y > 0 ? pixels[prev + i - bpp] : 0;
+      let predictor = 0;
+      switch (filter) {
+        case 0: predictor = 0; break;
+        case 1: predictor = a; break;
+        case 2: predictor = b; break;
+        case 3: predictor = (a + b) >> 1; break;
+        case 4: predictor = paeth(a, b, c); break;
+        default: return null;
+      }
+      pixels[row + i] = (raw[src + i] + predictor) & 0xff;
+    }
+  }
+
+  // 取样本（16 位取高字节，低于 8 位的灰度按比例放大），透明度按白色背景合成
+  const maxSample = (1 << bitDepth) - 1;
+  const sample = (row: number, index: number): number => {
+    if (bitDepth === 8) return pixels[row + index];
+    if (bitDepth === 16) return pixels[row + index * 2];
+    const bit = index * bitDepth;
+    return (pixels[row + (bit >> 3)] >> (8 - bitDepth - (bit & 7))) & maxSample;
+  };
+  const scale = (value: number) => (bitDepth < 8 ? Math.round((value * 255) / maxSample) : value);
+  const blend = (value: number, alpha: number) => Math.round((value * alpha + 255 * (255 - alpha)) / 255);
+
+  const data = new Uint8Array(width * height * 3);
+  for (let y = 0; y < height; y++) {
+    const row = y * stride;
+    for (let x = 0; x < width; x++) {
+      const out = (y * width + x) * 3;
+      let r: number, g: number, b: number, alpha = 255;
+      if (colorType === 3) {
+        const index = sample(row, x);
+        r = palette![index * 3] || 0;
+        g = palette![index * 3 + 1] || 0;
+        b = palette![index * 3 + 2] || 0;
+        alpha = paletteAlpha && index < paletteAlpha.length ? paletteAlpha[index] : 255;
+      } else if (channels <= 2) {
+        r = g = b = scale(sample(row, x * channels));
+        if (channels === 2) alpha = scale(sample(row, x * 2 + 1));
+      } else {
+        r = scale(sample(row, x * channels));
+        g = scale(sample(row, x * channels + 1));
+        b = scale(sample(row, x * channels + 2));
+        if (channels === 4) alpha = scale(sample(row, x * 4 + 3));
+      }
+      if (alpha < 255) {
+        r = blend(r, alpha);
+        g = blend(g, alpha);
+        b = blend(b, alpha);
+      }
+      data[out] = r;
+      data[out + 1] = g;
+      data[out + 2] = b;
+    }
+  }
+  return { width, height, data };
+}
+
+/**
+ * 按面积平均缩小（每个目标像素取对应源区域的平均值），只用于缩小
+ */
+export function resizeImage(image: RgbImage, width: number, height: number): RgbImage {
+  const { width: srcWidth, height: srcHeight, data: src } = image;
+  const xs = Array.from({ length: width + 1 }, (_, i) => Math.floor((i * srcWidth) / width));
+  const ys = Array.from({ length: height + 1 }, (_, i) => Math.floor((i * srcHeight) / height));
+
+  // 先横向再纵向，两次一维平均
+  const columns = new Float64Array(srcHeight * width * 3);
+  for (let y = 0; y < srcHeight; y++) {
+    for (let x = 0; x < width; x++) {
+      const x0 = xs[x];
+      const x1 = Math.max(xs[x + 1], x0 + 1);
+      for (let c = 0; c < 3; c++) {
+        let sum = 0;
+        for (let sx = x0; sx < x1; sx++) sum += src[(y * srcWidth + sx) * 3 + c];
+        columns[(y * width + x) * 3 + c] = sum / (x1 - x0);
+      }
+    }
+  }
+  const data = new Uint8Array(width * height * 3);
+  for (let y = 0; y < height; y++) {
+    const y0 = ys[y];
+    const y1 = Math.max(ys[y + 1], y0 + 1);
+    for (let x = 0; x < width; x++) {
+      for (let c = 0; c < 3; c++) {
+        let sum = 0;
+        for (let sy = y0; sy < y1; sy++) sum += columns[(sy * width + x) * 3 + c];
+        data[(y * width + x) * 3 + c] = Math.round(sum / (y1 - y0));
+      }
+    }
+  }
+  return { width, height, data };
+}
+
+/**
+ * 编码为 PNG，自动选灰度 / 调色板 / RGB 中最紧凑的无损表示
+ */
+export function encodePng(image: RgbImage): Buffer {
+  const { width, height, data } = image;
+  const pixelCount = width * height;
+
+  let gray = true;
+  for (let i = 0; i < pixelCount && gray; i++) {
+    gray = data[i * 3] === data[i * 3 + 1] && data[i * 3] === data[i * 3 + 2];
+  }
+
+  let colorType: number;
+  let channels: number;
+  let samples: Uint8Array;
+  let plte: Buffer | null = null;
+  if (gray) {
+    colorType = 0;
+    channels = 1;
+    samples = new Uint8Array(pixelCount);
+    for (let i = 0; i < pixelCount; i++) samples[i] = data[i * 3];
+  } else {
+    const indexes = paletteIndexes(data, pixelCount);
+    if (indexes) {
+      colorType = 3;
+      channels = 1;
+      samples = indexes.samples;
+      plte = indexes.palette;
+    } else {
+      colorType = 2;
+      channels = 3;
+      samples = data;
+    }
+  }
+
+  const stride = width * channels;
+  const filtered = Buffer.alloc(height * (stride + 1));
+  const candidate = new Uint8Array(stride);
+  for (let y = 0; y < height; y++) {
+    const row = y * stride;
+    const out = y * (stride + 1);
+    // 调色板图按规范建议不做滤波；其他逐行选绝对值和最小的滤波方式
+    let bestScore = Infinity;
+    for (let filter = 0; filter <= (colorType === 3 ? 0 : 4); filter++) {
+      let score = 0;
+      for (let i = 0; i < stride; i++) {
+        const a = i >= channels ? samples[row + i - channels] : 0;
+        const b = y > 0 ? samples[row - stride + i] : 0;
+        const c = i >= channels && y > 0 ? samples[row - stride + i - channels] : 0;
+        const predictor = filter === 0 ? 0 : filter === 1 ? a : filter === 2 ? b
+          : filter === 3 ? (a + b) >> 1 : paeth(a, b, c);
+        const value = (samples[row + i] - predictor) & 0xff;
+        candidate[i] = value;
+        score += value < 128 ? value : 256 - value;
+      }
+      if (score < bestScore) {
+        bestScore = score;
+        filtered[out] = filter;
+        filtered.set(candidate, out + 1);
+      }
+    }
+  }
+
+  const ihdr = Buffer.alloc(13);
+  ihdr.writeUInt32BE(width, 0);
+  ihdr.writeUInt32BE(height, 4);
+  ihdr[8] = 8;
+  ihdr[9] = colorType;
+
+  const chunks = [PNG_SIGNATURE, chunk('IHDR', ihdr)];
+  if (plte) chunks.push(chunk('PLTE', plte));
+  chunks.push(chunk('IDAT', zlib.deflateSync(filtered, { level: 6, memLevel: 9 })));
+  chunks.push(chunk('IEND', Buffer.alloc(0)));
+  return Buffer.concat(chunks);
+}
+
+/**
+ * 不超过 256 种颜色时返回调色板和每个像素的索引
+ */
+function paletteIndexes(data: Uint8Array, pixelCount: number): { palette: Buffer; samples: Uint8Array } | null {
+  const colors = new Map<number, number>();
+  const samples = new Uint8Array(pixelCount);
+  for (let i = 0; i < pixelCount; i++) {
+    const color = (data[i * 3] << 16) | (data[i * 3 + 1] << 8) | data[i * 3 + 2];
+    let index = colors.get(color);
+    if (index === undefined) {
+      if (colors.size === 256) {
+        return null;
+      }
+      index = colors.size;
+      colors.set(color, index);
+    }
+    samples[i] = index;
+  }
+  const palette = Buffer.alloc(colors.size * 3);
+  for (const [color, index] of colors) {
+    palette[index * 3] = color >> 16;
+    palette[index * 3 + 1] = (color >> 8) & 0xff;
+    palette[index * 3 + 2] = color & 0xff;
+  }
+  return { palette, samples };
+}
+
+function paeth(a: number, b: number, c: number): number {
+  const p = a + b - c;
+  const pa = Math.abs(p - a);
+  const pb = Math.abs(p - b);
+  const pc = Math.abs(p - c);
+  if (pa <= pb && pa <= pc) return a;
+  return pb <= pc ? b : c;
+}
+
+const CRC_TABLE = Array.from({ length: 256 }, (_, n) => {
+  let c = n;
+  for (let k = 0; k < 8; k++) {
+    c = c & 1 ? 0xedb88320 ^ (c >>> 1) : c >>> 1;
+  }
+  return c >>> 0;
+});
+
+function crc32(buffer: Buffer): number {
+  let crc = 0xffffffff;
+  for (let i = 0; i < buffer.length; i++) {
+    crc = CRC_TABLE[(crc ^ buffer[i]) & 0xff] ^ (crc >>> 8);
+  }
+  return (crc ^ 0xffffffff) >>> 0;
+}
+
+function chunk(type: string, data: Buffer): Buffer {
+  const out = Buffer.alloc(12 + data.length);
+  out.writeUInt32BE(data.length, 0);
+  out.write(type, 4, 'latin1');
+  data.copy(out, 8);
+  out.writeUInt32BE(crc32(out.subarray(4, 8 + data.length)), 8 + data.length);
+  return out;
+}
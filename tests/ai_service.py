@@ -1,44 +1,30 @@
 """Python版本的AI服务，用于测试"""
 import os
-import requests
-import json
+import sys
+sys.path.append(os.path.dirname(__file__))
+
+from http_client import get_client
+from prompt_registry import build_production_messages, PRODUCTION_MAX_TOKENS
 
 class AIService:
     def __init__(self):
-        self.api_url = "https://api.deepseek.com/v1"
-        self.api_key = "sk-83f3cb9e7ecc486b84626ce35aa7213b"
-        self.model = "deepseek-chat"
+        self.client = get_client()
     
     def chat(self, philosopher_id: str, user_message: str, conversation_history: list):
         """发送聊天请求"""
-        # 构建消息
-        messages = conversation_history + [
-            {"role": "user", "content": user_message}
-        ]
-        
-        # 调用API
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        data = {
-            "model": self.model,
-            "messages": messages,
-            "temperature": 1.0,
-            "max_tokens": 150,
-            "frequency_penalty": 0.7,
-            "presence_penalty": 0.4
-        }
-        
-        response = requests.post(
-            f"{self.api_url}/chat/completions",
-            headers=headers,
-            json=data,
-            timeout=30
+        # 按生产环境的方式构建消息（系统提示词、历史截断、动态 temperature）
+        messages, temperature = build_production_messages(
+            philosopher_id,
+            conversation_history + [{"role": "user", "content": user_message}]
         )
         
-        response.raise_for_status()
-        result = response.json()
+        # 调用API（共享连接池）
+        result = self.client.chat(
+            messages,
+            temperature=temperature,
+            max_tokens=PRODUCTION_MAX_TOKENS,
+            frequency_penalty=0.7,
+            presence_penalty=0.4
+        )
         
-        return result['choices'][0]['message']['content'].strip()
+        return result['content'].strip()
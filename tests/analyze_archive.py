@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+测试结果归档分析
+扫描目录下的所有测试结果（.json / 流式 .jsonl），用进程池并行解析和汇总，
+输出按哲学家 / 测试用例 / 提示词版本 / 日期的趋势表（长度合规率、重复率与近似重复率、延迟分位数）
+
+用法:
+    python analyze_archive.py tests/ --output archive-report.md
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+import argparse
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from result_formats import find_result_files, open_result_file, suite_start_time, suite_prompt_version, collect_responses
+from latency_stats import LatencyProfile, format_latency_section
+from repetition import RepetitionAnalysis
+
+# 金句式长度要求
+DEFAULT_MIN_CHARS = 15
+DEFAULT_MAX_CHARS = 30
+
+
+def analyze_file(path: str, min_chars: int = DEFAULT_MIN_CHARS, max_chars: int = DEFAULT_MAX_CHARS) -> List[Dict[str, Any]]:
+    """解析单个结果文件，返回每个对话的统计（在工作进程中执行；JSONL 逐个对话读取）"""
+    try:
+        data, conversations = open_result_file(path)
+    except (OSError, ValueError):
+        return []
+
+    start_time = suite_start_time(data)
+    version = suite_prompt_version(data)
+    summaries = []
+    for conversation in conversations:
+        responses = collect_responses(conversation)
+        if not responses:
+            continue
+        lengths = [len(r) for r in responses]
+        latency = LatencyProfile()
+        latency.add_rounds(conversation["rounds"])
+        summaries.append({
+            "file": path,
+            "date": (conversation["start_time"] or start_time or "")[:10] or "unknown",
+            "philosopher": conversation["philosopher"],
+            "test": conversation["test_id"],
+            "prompt_version": version,
+            "rounds": len(responses),
+            "compliant": sum(1 for l in lengths if min_chars <= l <= max_chars),
+            "total_length": sum(lengths),
+            "repeated": len(responses) - len(set(responses)),
+            "near_repeated": int(RepetitionAnalysis(responses).repeat_flags().sum()),
+            "latency": latency.to_dict(),  # 草图而非原始样本，进程间传输和汇总都是常数大小
+        })
+    return summaries
+
+
+def _analyze_file_args(args):
+    return analyze_file(*args)
+
+
+def aggregate(summaries: List[Dict[str, Any]], key: str) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, LatencyProfile]]:
+    """按 key 汇总对话统计，同时返回各分组合并后的延迟草图"""
+    groups: Dict[str, Dict[str, Any]] = {}
+    for summary in summaries:
+        group = groups.setdefault(summary[key], {
+            "files": set(), "conversations": 0, "rounds": 0, "compliant": 0,
+            "total_length": 0, "repeated": 0, "near_repeated": 0, "latency": LatencyProfile(),
+        })
+        group["files"].add(summary["file"])
+        group["conversations"] += 1
+        group["rounds"] += summary["rounds"]
+        group["compliant"] += summary["compliant"]
+        group["total_length"] += summary["total_length"]
+        group["repeated"] += summary["repeated"]
+        group["near_repeated"] += summary["near_repeated"]
+        group["latency"].merge(LatencyProfile.from_dict(summary["latency"]))
+
+    table = {}
+    profiles = {}
+    for name, group in groups.items():
+        latency = group["latency"].overall.summary()
+        profiles[name] = group["latency"]
+        table[name] = {
+            "files": len(group["files"]),
+            "conversations": group["conversations"],
+            "rounds": group["rounds"],
+            "avg_length": round(group["total_length"] / group["rounds"], 1),
+            "length_compliance": round(group["compliant"] / group["rounds"] * 100, 1),
+            "repetition_rate": round(group["repeated"] / group["rounds"] * 100, 1),
+            "near_repetition_rate": round(group["near_repeated"] / group["rounds"] * 100, 1),
+            "p50_response_time": latency.get("p50"),
+            "p90_response_time": latency.get("p90"),
+            "p95_response_time": latency.get("p95"),
+            "p99_response_time": latency.get("p99"),
+            "max_response_time": latency.get("max"),
+        }
+    return table, profiles
+
+
+def format_table(title: str, label: str, table: Dict[str, Dict[str, Any]]) -> str:
+    """渲染 Markdown 表格"""
+    def fmt(value):
+        return "-" if value is None else f"{value:.2f}秒"
+
+    lines = [f"## {title}\n",
+             f"| {label} | 文件数 | 对话数 | 轮数 | 平均字数 | 长度合规率 | 重复率 | 近似重复率 | p50 | p90 | p95 | p99 | 最大 |",
+             "|:---|:---:|:---:|:---:|:---:|:---:|:---:|:---:|:---:|:---:|:---:|:---:|:---:|"]
+    for name in sorted(table):
+        row = table[name]
+        lines.append(f"| {name} | {row['files']} | {row['conversations']} | {row['rounds']} | "
+                     f"{row['avg_length']}字 | {row['length_compliance']}% | {row['repetition_rate']}% | {row['near_repetition_rate']}% | "
+                     f"{fmt(row['p50_response_time'])} | {fmt(row['p90_response_time'])} | "
+                     f"{fmt(row['p95_response_time'])} | {fmt(row['p99_response_time'])} | {fmt(row['max_response_time'])} |")
+    return "\n".join(lines) + "\n"
+
+
+def analyze_archive(paths: List[str], workers: Optional[int] = None, min_chars: int = DEFAULT_MIN_CHARS,
+                    max_chars: int = DEFAULT_MAX_CHARS) -> Dict[str, Any]:
+    """并行解析所有结果文件并生成各维度的汇总表"""
+    summaries: List[Dict[str, Any]] = []
+    chunksize = max(1, len(paths) // ((workers or os.cpu_count() or 1) * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for file_summaries in pool.map(_analyze_file_args, [(p, min_chars, max_chars) for p in paths],
+                                       chunksize=chunksize):
+            summaries.extend(file_summaries)
+
+    for summary in summaries:
+        summary["philosopher_date"] = f"{summary['philosopher']} @ {summary['date']}"
+
+    by_philosopher, philosopher_profiles = aggregate(summaries, "philosopher")
+    overall = LatencyProfile()
+    for profile in philosopher_profiles.values():
+        overall.merge(profile)
+
+    return {
+        "files": len(paths),
+        "conversations": len(summaries),
+        "by_philosopher": by_philosopher,
+        "by_test": aggregate(summaries, "test")[0],
+        "by_prompt_version": aggregate(summaries, "prompt_version")[0],
+        "by_date": aggregate(summaries, "date")[0],
+        "by_philosopher_date": aggregate(summaries, "philosopher_date")[0],
+        "latency": {
+            "overall": overall.overall.summary(),
+            "histogram": overall.overall.histogram(),
+            "by_round": {round_num: sketch.summary() for round_num, sketch in sorted(overall.by_round.items())},
+        },
+        # 渲染报告用（不写入 JSON）
+        "_latency_profiles": (philosopher_profiles, overall),
+    }
+
+
+def render_report(report: Dict[str, Any], min_chars: int, max_chars: int) -> str:
+    """生成 Markdown 趋势报告"""
+    parts = [
+        "# 金句式超级毒舌系统 - 历史测试趋势\n",
+        f"**结果文件**: {report['files']} 个, **对话**: {report['conversations']} 个, "
+        f"**长度要求**: {min_chars}-{max_chars}字\n",
+        format_table("按哲学家", "哲学家", report["by_philosopher"]),
+        format_table("按测试用例", "测试用例", report["by_test"]),
+        format_table("按提示词版本", "提示词版本", report["by_prompt_version"]),
+        format_table("按日期", "日期", report["by_date"]),
+        format_table("按哲学家和日期", "哲学家 @ 日期", report["by_philosopher_date"]),
+        format_latency_section(*report["_latency_profiles"]),
+    ]
+    return "\n".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="并行分析测试结果归档，输出趋势表")
+    parser.add_argument("directory", nargs="?", default=os.path.dirname(os.path.abspath(__file__)),
+                        help="结果文件所在目录（默认 tests/）")
+    parser.add_argument("--no-recursive", action="store_true", help="不扫描子目录")
+    parser.add_argument("--workers", type=int, default=None, help="工作进程数（默认 CPU 核数）")
+    parser.add_argument("--min-chars", type=int, default=DEFAULT_MIN_CHARS)
+    parser.add_argument("--max-chars", type=int, default=DEFAULT_MAX_CHARS)
+    parser.add_argument("--output", help="Markdown 报告输出路径（默认打印到终端）")
+    parser.add_argument("--json", dest="json_output", help="同时输出 JSON 汇总")
+    args = parser.parse_args()
+
+    start = time.time()
+    paths = find_result_files(args.directory, recursive=not args.no_recursive)
+    report = analyze_archive(paths, args.workers, args.min_chars, args.max_chars)
+    elapsed = time.time() - start
+
+    markdown = render_report(report, args.min_chars, args.max_chars)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(markdown)
+        print(f"趋势报告已保存到: {args.output}")
+    else:
+        print(markdown)
+
+    if args.json_output:
+        with open(args.json_output, 'w', encoding='utf-8') as f:
+            json.dump({k: v for k, v in report.items() if not k.startswith('_')}, f, ensure_ascii=False, indent=2)
+        print(f"JSON 汇总已保存到: {args.json_output}")
+
+    print(f"分析完成: {len(paths)} 个文件, 耗时 {elapsed:.2f} 秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+反重复提示对比基准
+同一组问题分别用两种方式拼装系统提示词跑长对话：
+  full    - 生产现状，最近 100 条 AI 回复全部贴进 "严格禁止重复" 块
+  indexed - 增量索引，只放最近几条 + 与当前问题最相似的几条
+对比 prompt token、延迟、提示词拼装耗时、近似重复率和事后检查命中率
+
+用法:
+    python anti_repetition_benchmark.py --mock --rounds 100
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List
+
+from http_client import get_client, add_client_arguments, configure_client_from_args
+from prompt_registry import PHILOSOPHER_NAMES, build_production_messages, prompt_version
+from latency_stats import LatencySketch
+from token_profiler import usage_fields
+from repetition import DEFAULT_THRESHOLD, RepetitionAnalysis
+from anti_repetition_index import DEFAULT_RECENT, DEFAULT_SIMILAR, AntiRepetitionIndex, IndexedPromptBuilder
+from long_conversation_benchmark import (
+    PRODUCTION_MIN_CHARS,
+    PRODUCTION_MAX_CHARS,
+    synthesize_questions,
+    run_long_conversation,
+)
+from run_tests import TESTS_DIR
+
+DEFAULT_ROUNDS = 100
+MODES = ("full", "indexed")
+
+
+class TimedBuilder:
+    """记录每轮提示词拼装耗时和系统提示词长度"""
+
+    def __init__(self, build):
+        self.build = build
+        self.build_times: List[float] = []
+        self.system_chars: List[int] = []
+
+    def __call__(self, history):
+        start = time.perf_counter()
+        messages, temperature = self.build(history)
+        self.build_times.append(time.perf_counter() - start)
+        self.system_chars.append(len(messages[0]["content"]))
+        return messages, temperature
+
+
+def post_check_hits(replies: List[str], threshold: float) -> int:
+    """按时间顺序对每条回复做事后检查（先检查再入库），统计与旧回复近似重复的条数"""
+    index = AntiRepetitionIndex()
+    hits = 0
+    for reply in replies:
+        if index.check(reply, threshold) is not None:
+            hits += 1
+        index.add(reply)
+    return hits
+
+
+def summarize_mode(conversation: Dict[str, Any], builder: TimedBuilder, threshold: float) -> Dict[str, Any]:
+    """汇总一种拼装方式的指标"""
+    rounds = [r for r in conversation["rounds"] if not r["ai_response"].startswith("[API错误")]
+    replies = [r["ai_response"] for r in rounds]
+    latency = LatencySketch()
+    latency.extend(r["response_time"] for r in rounds)
+    usage = usage_fields(rounds)
+    return {
+        "rounds": len(rounds),
+        "avg_prompt_tokens": round(usage["total_prompt_tokens"] / len(rounds)) if usage else None,
+        "max_prompt_tokens": usage.get("max_prompt_tokens"),
+        "estimated_cost": usage.get("estimated_cost"),
+        "avg_system_prompt_chars": round(sum(builder.system_chars) / len(builder.system_chars)),
+        "max_system_prompt_chars": max(builder.system_chars),
+        "avg_build_ms": round(sum(builder.build_times) / len(builder.build_times) * 1000, 3),
+        "p50_response_time": latency.quantile(50),
+        "p90_response_time": latency.quantile(90),
+        "near_repetition_rate": RepetitionAnalysis(replies, threshold).repetition_rate(),
+        "post_check_hits": post_check_hits(replies, threshold),
+        "length_compliance": round(sum(1 for r in replies if PRODUCTION_MIN_CHARS <= len(r) <= PRODUCTION_MAX_CHARS)
+                                   / len(replies) * 100, 1),
+    }
+
+
+def run_comparison(philosopher_id: str, rounds: int, recent: int, similar: int, threshold: float
+                   ) -> Dict[str, Any]:
+    """同一组问题分别跑 full / indexed 两种拼装方式"""
+    questions = synthesize_questions(philosopher_id, rounds)
+    builders = {
+        "full": TimedBuilder(lambda history: build_production_messages(philosopher_id, history)),
+        "indexed": TimedBuilder(IndexedPromptBuilder(philosopher_id, recent, similar)),
+    }
+    with ThreadPoolExecutor(max_workers=len(MODES)) as pool:
+        futures = {mode: pool.submit(run_long_conversation, philosopher_id, questions, builders[mode])
+                   for mode in MODES}
+        conversations = {mode: future.result() for mode, future in futures.items()}
+
+    for mode, conversation in conversations.items():
+        conversation["test_id"] = f"{philosopher_id}_anti_repetition_{mode}"
+        conversation["test_name"] = f"{rounds}轮反重复对比（{mode}）"
+        conversation["analysis"] = summarize_mode(conversation, builders[mode], threshold)
+    return conversations
+
+
+def generate_report(results: Dict[str, Any], report_file: str):
+    """生成对比报告"""
+    with open(report_file, 'w', encoding='utf-8') as f:
+        f.write("# 金句式超级毒舌系统 - 反重复提示对比\n\n")
+        f.write(f"**测试时间**: {results['start_time']} ~ {results['end_time']}\n\n")
+        f.write(f"**配置**: {results['rounds']} 轮, indexed = 最近 {results['recent']} 条 + 最相似 {results['similar']} 条, "
+                f"近似重复阈值 {results['threshold']}\n\n")
+        f.write("| 哲学家 | 方式 | 平均 prompt tokens | 最大 prompt tokens | 系统提示词平均字数 | 拼装耗时 | p50 | p90 | "
+                "费用 | 近似重复率 | 事后检查命中 | 长度合规率 |\n")
+        f.write("|:---|:---|:---:|:---:|:---:|:---:|:---:|:---:|:---:|:---:|:---:|:---:|\n")
+        for data in results["philosophers"].values():
+            for conversation in data["results"]:
+                a = conversation["analysis"]
+                mode = conversation["test_id"].rsplit("_", 1)[-1]
+                f.write(f"| {data['name']} | {mode} | {a['avg_prompt_tokens']} | {a['max_prompt_tokens']} | "
+                        f"{a['avg_system_prompt_chars']} | {a['avg_build_ms']}ms | {a['p50_response_time']:.2f}秒 | "
+                        f"{a['p90_response_time']:.2f}秒 | {a['estimated_cost']}元 | {a['near_repetition_rate']}% | "
+                        f"{a['post_check_hits']}/{a['rounds']} | {a['length_compliance']}% |\n")
+    print(f"对比报告已保存到: {report_file}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比生产反重复提示（100 条）与增量索引挑选的效果")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS, help=f"每段对话的轮数，默认 {DEFAULT_ROUNDS}")
+    parser.add_argument("--philosophers", nargs="+", choices=list(PHILOSOPHER_NAMES), default=list(PHILOSOPHER_NAMES))
+    parser.add_argument("--recent", type=int, default=DEFAULT_RECENT, help="indexed 模式保留的最近回复数")
+    parser.add_argument("--similar", type=int, default=DEFAULT_SIMILAR, help="indexed 模式挑选的相似回复数")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="近似重复的 Jaccard 阈值")
+    parser.add_argument("--concurrency", type=int, default=5, help="同时比较的哲学家数")
+    add_client_arguments(parser)
+    args = parser.parse_args()
+
+    if args.abort_over_limit:
+        parser.error("生产提示词要求 20-50 字，不能使用 --abort-over-limit")
+    configure_client_from_args(args, pool_size=args.concurrency * len(MODES))
+
+    results = {
+        "test_suite": "金句式超级毒舌系统 - 反重复提示对比",
+        "version": "1.0",
+        "prompt_version": prompt_version(),
+        "start_time": datetime.now().isoformat(),
+        "rounds": args.rounds,
+        "recent": args.recent,
+        "similar": args.similar,
+        "threshold": args.threshold,
+        "philosophers": {},
+    }
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        comparisons = list(pool.map(
+            lambda pid: run_comparison(pid, args.rounds, args.recent, args.similar, args.threshold),
+            args.philosophers))
+
+    for philosopher_id, conversations in zip(args.philosophers, comparisons):
+        results["philosophers"][philosopher_id] = {
+            "name": PHILOSOPHER_NAMES[philosopher_id],
+            "test_count": len(conversations),
+            "results": [conversations[mode] for mode in MODES],
+        }
+    results["end_time"] = datetime.now().isoformat()
+    results["http"] = get_client().stats()
+
+    output_file = os.path.join(TESTS_DIR, f'anti-repetition-{datetime.now().strftime("%Y%m%d-%H%M%S")}.json')
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存到: {output_file}")
+    generate_report(results, output_file.replace('.json', '-summary.md'))
+
+
+if __name__ == "__main__":
+    main()
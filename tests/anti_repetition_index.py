@@ -0,0 +1,122 @@
+"""
+增量反重复索引（参考实现）
+生产环境每轮用 extractRecentAIReplies(history, 100) + getAntiRepetitionPrompt 把最多 100 条旧回复贴进系统提示词；
+这里为每个对话维护一个 MinHash 索引，每条回复入库时只计算一次签名，用于：
+  (a) 只挑选最近几条和与当前话题最相似的几条旧回复放进反重复提示
+  (b) 对新生成的候选回复做事后检查，发现与旧回复近似重复时可以重新生成
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from prompt_registry import build_production_messages
+from repetition import DEFAULT_THRESHOLD, LSH_BANDS, MinHasher, jaccard, normalize, DEFAULT_HASHER
+
+# 默认放进反重复提示的回复数：最近 3 条 + 最相似的 5 条
+DEFAULT_RECENT = 3
+DEFAULT_SIMILAR = 5
+
+
+class AntiRepetitionIndex:
+    """单个对话的增量近似重复索引"""
+
+    def __init__(self, hasher: Optional[MinHasher] = None, bands: int = LSH_BANDS):
+        self.hasher = hasher or DEFAULT_HASHER
+        self.bands = bands
+        self.rows_per_band = self.hasher.num_perm // bands
+        self.replies: List[str] = []
+        self._exact: Dict[str, int] = {}
+        self._signatures = np.empty((16, self.hasher.num_perm), dtype=np.uint32)
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+
+    def __len__(self) -> int:
+        return len(self.replies)
+
+    def _signature(self, text: str) -> np.ndarray:
+        return self.hasher.signatures([text])[0]
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[b * self.rows_per_band:(b + 1) * self.rows_per_band].tobytes() for b in range(self.bands)]
+
+    def add(self, reply: str) -> int:
+        """加入一条回复，返回其编号"""
+        reply_id = len(self.replies)
+        signature = self._signature(reply)
+        if reply_id == len(self._signatures):
+            self._signatures = np.concatenate([self._signatures, np.empty_like(self._signatures)])
+        self._signatures[reply_id] = signature
+        for band, key in enumerate(self._band_keys(signature)):
+            self._buckets[band].setdefault(key, []).append(reply_id)
+        self._exact.setdefault(normalize(reply), reply_id)
+        self.replies.append(reply)
+        return reply_id
+
+    def similarities(self, text: str) -> np.ndarray:
+        """text 与每条已入库回复的估算 Jaccard 相似度"""
+        if not self.replies:
+            return np.empty(0)
+        return (self._signatures[:len(self.replies)] == self._signature(text)).mean(axis=1)
+
+    def select(self, query: str, recent: int = DEFAULT_RECENT, similar: int = DEFAULT_SIMILAR) -> List[str]:
+        """挑选放进反重复提示的回复：最近 recent 条 + 与 query 最相似的 similar 条（按时间顺序返回）"""
+        n = len(self.replies)
+        chosen = set(range(max(0, n - recent), n))
+        seen = {normalize(self.replies[i]) for i in chosen}
+        if similar > 0 and n > len(chosen):
+            scores = self.similarities(query)
+            picked = 0
+            for reply_id in np.argsort(-scores, kind='stable').tolist():
+                if picked >= similar:
+                    break
+                key = normalize(self.replies[reply_id])
+                if key in seen:
+                    continue  # 相同的回复只放一次
+                seen.add(key)
+                chosen.add(reply_id)
+                picked += 1
+        return [self.replies[i] for i in sorted(chosen)]
+
+    def check(self, candidate: str, threshold: float = DEFAULT_THRESHOLD) -> Optional[Tuple[int, float]]:
+        """
+        事后检查候选回复：与某条旧回复相同或精确 Jaccard >= threshold 时返回 (旧回复编号, 相似度)，否则返回 None
+        只验证 LSH 同桶的候选，不必和所有旧回复比较
+        """
+        exact = self._exact.get(normalize(candidate))
+        if exact is not None:
+            return exact, 1.0
+
+        candidates = set()
+        for band, key in enumerate(self._band_keys(self._signature(candidate))):
+            candidates.update(self._buckets[band].get(key, ()))
+        best = None
+        for reply_id in candidates:
+            similarity = jaccard(candidate, self.replies[reply_id], self.hasher.shingle_size)
+            if similarity >= threshold and (best is None or similarity > best[1]):
+                best = (reply_id, similarity)
+        return best
+
+
+class IndexedPromptBuilder:
+    """
+    build_production_messages 的替代：反重复提示只包含索引挑选出的回复
+    每次调用时把历史中新出现的 AI 回复加入索引，每条回复只计算一次签名
+    """
+
+    def __init__(self, philosopher_id: str, recent: int = DEFAULT_RECENT, similar: int = DEFAULT_SIMILAR):
+        self.philosopher_id = philosopher_id
+        self.recent = recent
+        self.similar = similar
+        self.index = AntiRepetitionIndex()
+
+    def sync(self, conversation_history: List[Dict[str, str]]):
+        """把历史中尚未入库的 AI 回复加入索引"""
+        replies = [m['content'] for m in conversation_history if m['role'] == 'assistant']
+        for reply in replies[len(self.index):]:
+            self.index.add(reply)
+
+    def __call__(self, conversation_history: List[Dict[str, str]]) -> Tuple[List[Dict[str, str]], float]:
+        self.sync(conversation_history)
+        query = conversation_history[-1]['content'] if conversation_history else ''
+        selected = self.index.select(query, self.recent, self.similar)
+        return build_production_messages(self.philosopher_id, conversation_history, recent_ai_replies=selected)
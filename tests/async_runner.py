@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+金句式超级毒舌系统 - 并发测试执行器
+不同测试用例（各自独立的对话）并发执行，同一用例内的各轮仍按顺序执行；
+统一执行器的 conversation 调度，等价于 python -m runner --concurrency 5（其余参数原样传入，可覆盖默认值）
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+from runner import main
+
+# 默认同时进行的对话数
+DEFAULT_CONCURRENCY = 5
+
+if __name__ == "__main__":
+    main(["--preset", "full", "--concurrency", str(DEFAULT_CONCURRENCY)] + sys.argv[1:])
@@ -0,0 +1,137 @@
+"""
+测试断点续跑
+每完成一轮就向 JSONL 断点文件追加一行，进程中途退出（API 错误、电脑休眠）后可以用 --resume 从断点继续：
+已完成的 (哲学家, 测试用例, 轮次) 直接从文件恢复并重建对话历史，只重跑剩下的轮次
+
+文件格式（每行一个 JSON 对象）:
+    {"type": "header", "prompt_version": ..., "start_time": ...}
+    {"type": "round", "philosopher": ..., "test_id": ..., "record": {make_round_record 的结果}}
+"""
+
+import argparse
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from prompt_registry import prompt_version
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CHECKPOINT_DIR = os.path.join(TESTS_DIR, '.checkpoints')
+
+
+def is_failed_round(record: Dict[str, Any]) -> bool:
+    """API 出错的轮次不算完成，续跑时从这一轮重新开始"""
+    return record["ai_response"].startswith("[API错误")
+
+
+class Checkpoint:
+    """追加写入的断点文件；同一轮出现多次时以最后一次为准"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.header: Dict[str, Any] = {}
+        self._rounds: Dict[Tuple[str, str], Dict[int, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            self._load()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+        if self._file.tell() and not self._ends_with_newline():
+            self._file.write("\n")  # 补齐被中断的最后一行，避免和新记录粘在一起
+        if not self.header:
+            self.header = {"type": "header", "prompt_version": prompt_version(),
+                           "start_time": datetime.now().isoformat()}
+            self._write(self.header)
+
+    def _load(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # 写到一半被中断的最后一行
+                if entry.get("type") == "header":
+                    self.header = entry
+                elif entry.get("type") == "round":
+                    key = (entry["philosopher"], entry["test_id"])
+                    self._rounds.setdefault(key, {})[entry["record"]["round"]] = entry["record"]
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _write(self, entry: Dict[str, Any]):
+        with self._lock:
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    @property
+    def saved_rounds(self) -> int:
+        return sum(len(rounds) for rounds in self._rounds.values())
+
+    @property
+    def start_time(self) -> str:
+        return self.header["start_time"]
+
+    def completed_rounds(self, philosopher_id: str, test_case: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """从第 1 轮开始连续完成、且问题与当前测试用例一致的轮次"""
+        saved = self._rounds.get((philosopher_id, test_case['test_id']), {})
+        completed = []
+        for round_num, question in enumerate(test_case['questions'], 1):
+            record = saved.get(round_num)
+            if record is None or record["user_input"] != question or is_failed_round(record):
+                break
+            completed.append(record)
+        return completed
+
+    def restore(self, philosopher_id: str, test_case: Dict[str, Any], results: Dict[str, Any],
+                conversation_history: List[Dict[str, str]]) -> int:
+        """把已完成的轮次放回 results["rounds"] 并重建对话历史，返回恢复的轮数"""
+        completed = self.completed_rounds(philosopher_id, test_case)
+        for record in completed:
+            results["rounds"].append(record)
+            conversation_history.append({"role": "user", "content": record["user_input"]})
+            conversation_history.append({"role": "assistant", "content": record["ai_response"]})
+        return len(completed)
+
+    def append(self, philosopher_id: str, test_id: str, record: Dict[str, Any]):
+        """记录一轮已完成的对话（立即写盘）"""
+        self._write({"type": "round", "philosopher": philosopher_id, "test_id": test_id, "record": record})
+
+    def restore_suite(self, all_results: Dict[str, Any]):
+        """续跑时沿用第一次运行的开始时间"""
+        all_results["start_time"] = self.start_time
+        all_results["checkpoint"] = self.path
+
+    def close(self):
+        self._file.close()
+
+
+def add_checkpoint_arguments(parser: argparse.ArgumentParser):
+    """为测试脚本添加断点续跑相关的命令行参数"""
+    group = parser.add_argument_group("断点续跑")
+    group.add_argument("--resume", metavar="PATH", help="从指定的断点文件继续（跳过已完成的轮次）")
+    group.add_argument("--checkpoint-dir", default=DEFAULT_CHECKPOINT_DIR, help="新断点文件的保存目录")
+    group.add_argument("--no-checkpoint", action="store_true", help="不写断点文件")
+
+
+def open_checkpoint_from_args(args: argparse.Namespace) -> Optional[Checkpoint]:
+    """根据 add_checkpoint_arguments 解析出的参数打开（或新建）断点文件"""
+    if args.resume:
+        if not os.path.exists(args.resume):
+            raise SystemExit(f"断点文件不存在: {args.resume}")
+        checkpoint = Checkpoint(args.resume)
+        print(f"从断点继续: {args.resume}（已保存 {checkpoint.saved_rounds} 轮）")
+        if checkpoint.header.get("prompt_version") != prompt_version():
+            print(f"警告: 断点文件的提示词版本 {checkpoint.header.get('prompt_version')} "
+                  f"与当前版本 {prompt_version()} 不一致")
+        return checkpoint
+    if args.no_checkpoint:
+        return None
+    path = os.path.join(args.checkpoint_dir, f'checkpoint-{datetime.now().strftime("%Y%m%d-%H%M%S")}.jsonl')
+    print(f"断点文件: {path}（中断后用 --resume {path} 继续）")
+    return Checkpoint(path)
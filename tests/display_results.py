@@ -1,90 +1,119 @@
 #!/usr/bin/env python3
 """
 展示完整测试结果
+支持各测试脚本的结果 JSON 和流式结果 JSONL，对话逐个读取，不会把整个结果文件载入内存
+
+用法:
+    python display_results.py [结果文件 ...]   # 默认展示精简版测试和弗洛伊德修复验证的结果
 """
 
-import json
-
-# 读取测试结果
-with open('/home/ubuntu/the-toxic-philosopher/tests/streamlined-test-results-20251028-094036.json', 'r', encoding='utf-8') as f:
-    results = json.load(f)
-
-# 读取弗洛伊德修复后的测试结果
-with open('/home/ubuntu/the-toxic-philosopher/tests/freud-fix-test-result.json', 'r', encoding='utf-8') as f:
-    freud_fixed = json.load(f)
-
-print("="*100)
-print(" 金句式超级毒舌系统 - 完整测试结果")
-print("="*100)
-print()
-
-# 总体统计
-print("## 总体统计")
-print()
-print(f"{'哲学家':<12} {'测试用例':<20} {'平均字数':<10} {'长度合规率':<12} {'重复率':<10} {'平均响应时间':<12}")
-print("-" * 100)
-
-for philosopher in results['philosophers']:
-    print(f"{philosopher['philosopher_name']:<10} {philosopher['test_name']:<18} "
-          f"{philosopher['analysis']['avg_response_length']:<10.1f} "
-          f"{philosopher['analysis']['length_compliance']:<12.1f}% "
-          f"{philosopher['analysis']['repetition_rate']:<10.1f}% "
-          f"{philosopher['analysis']['avg_response_time']:<12.2f}秒")
-
-# 添加修复后的弗洛伊德
-print(f"{'弗洛伊德(修复后)':<10} {'自我欺骗测试':<18} "
-      f"{freud_fixed['analysis']['avg_response_length']:<10.1f} "
-      f"{freud_fixed['analysis']['length_compliance']:<12.1f}% "
-      f"{freud_fixed['analysis']['repetition_rate']:<10.1f}% "
-      f"{freud_fixed['analysis']['avg_response_time']:<12.2f}秒")
-
-print()
-print("="*100)
-print()
-
-# 详细对话记录
-for philosopher in results['philosophers']:
-    print(f"## {philosopher['philosopher_name']} - {philosopher['test_name']}")
-    print(f"**描述**: {philosopher['description']}")
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+import argparse
+
+from latency_stats import LatencyProfile, latency_summary, merge_profiles, format_latency_section
+from prompt_registry import PHILOSOPHER_NAMES
+from result_formats import load_conversations
+from run_tests import TESTS_DIR, analyze_rounds
+
+DEFAULT_FILES = [
+    # 精简版测试结果
+    os.path.join(TESTS_DIR, 'streamlined-test-results-20251028-094036.json'),
+    # 弗洛伊德修复后的测试结果
+    os.path.join(TESTS_DIR, 'freud-fix-test-result.json'),
+]
+
+
+def latency_of(result):
+    """从轮次记录计算延迟分位数（兼容没有分位数字段的旧结果文件）"""
+    return latency_summary(r['response_time'] for r in result['rounds'] if r.get('response_time'))
+
+
+def iter_results(paths):
+    """逐个产出 (哲学家名, 对话)，没有分析结果的对话当场补算"""
+    for path in paths:
+        for conversation in load_conversations(path):
+            if not conversation['rounds']:
+                continue
+            if not conversation['analysis']:
+                conversation['analysis'] = analyze_rounds(conversation['rounds'])
+            yield PHILOSOPHER_NAMES.get(conversation['philosopher'], conversation['philosopher']), conversation
+
+
+def print_overview(paths):
+    """总体统计表和延迟分布（第一遍读取）"""
+    print("## 总体统计")
     print()
-    
-    for round_data in philosopher['rounds']:
-        print(f"**第 {round_data['round']} 轮**:")
-        print(f"👤 用户: {round_data['user_input']}")
-        print(f"🤖 {philosopher['philosopher_name']}: {round_data['ai_response']}")
-        print(f"   (字数: {round_data['response_length']}, 响应时间: {round_data['response_time']}秒, Temperature: {round_data['temperature']})")
-        print()
-    
-    print(f"**分析结果**:")
-    print(f"- 平均字数: {philosopher['analysis']['avg_response_length']} 字")
-    print(f"- 字数范围: {philosopher['analysis']['min_response_length']}-{philosopher['analysis']['max_response_length']} 字")
-    print(f"- 长度合规率: {philosopher['analysis']['length_compliance']}% (15-30字)")
-    print(f"- 平均响应时间: {philosopher['analysis']['avg_response_time']} 秒")
-    print(f"- 重复率: {philosopher['analysis']['repetition_rate']}%")
-    print(f"- 唯一回复数: {philosopher['analysis']['unique_responses']}/{philosopher['analysis']['total_responses']}")
+    print(f"{'哲学家':<12} {'测试用例':<20} {'平均字数':<10} {'长度合规率':<12} {'重复率':<10} {'平均响应时间':<12} "
+          f"{'p90':<8} {'p99':<8} {'最大':<8}")
+    print("-" * 100)
+
+    groups = {}
+    for name, conversation in iter_results(paths):
+        analysis = conversation['analysis']
+        latency = latency_of(conversation)
+        print(f"{name:<10} {conversation['test_name']:<18} "
+              f"{analysis['avg_response_length']:<10.1f} "
+              f"{analysis['length_compliance']:<12.1f}% "
+              f"{analysis['repetition_rate']:<10.1f}% "
+              f"{analysis['avg_response_time']:<12.2f}秒 "
+              f"{latency['p90']:<7.2f}秒 {latency['p99']:<7.2f}秒 {latency['max']:<7.2f}秒")
+        groups.setdefault(f"{name} / {conversation['test_name']}", LatencyProfile()).add_rounds(conversation['rounds'])
+
     print()
+    print(format_latency_section(groups, merge_profiles(groups.values())))
+
+
+def print_details(paths):
+    """详细对话记录（第二遍读取，每次只保留一个对话）"""
+    for name, conversation in iter_results(paths):
+        analysis = conversation['analysis']
+        print(f"## {name} - {conversation['test_name']}")
+        print(f"**描述**: {conversation['description']}")
+        print()
+
+        for round_data in conversation['rounds']:
+            print(f"**第 {round_data['round']} 轮**:")
+            print(f"👤 用户: {round_data['user_input']}")
+            print(f"🤖 {name}: {round_data['ai_response']}")
+            print(f"   (字数: {round_data['response_length']}, 响应时间: {round_data['response_time']}秒, "
+                  f"Temperature: {round_data.get('temperature', '-')})")
+            print()
+
+        print(f"**分析结果**:")
+        print(f"- 平均字数: {analysis['avg_response_length']} 字")
+        print(f"- 字数范围: {analysis['min_response_length']}-{analysis['max_response_length']} 字")
+        print(f"- 长度合规率: {analysis['length_compliance']}% (15-30字)")
+        print(f"- 平均响应时间: {analysis['avg_response_time']} 秒")
+        latency = latency_of(conversation)
+        print(f"- 响应时间分位数: p50 {latency['p50']}秒 / p90 {latency['p90']}秒 / p99 {latency['p99']}秒 / 最大 {latency['max']}秒")
+        print(f"- 重复率: {analysis['repetition_rate']}%")
+        print(f"- 唯一回复数: {analysis['unique_responses']}/{analysis['total_responses']}")
+        print()
+        print("="*100)
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="展示完整测试结果")
+    parser.add_argument("paths", nargs="*", default=DEFAULT_FILES, help="结果文件（.json / .jsonl）")
+    args = parser.parse_args()
+
+    print("="*100)
+    print(" 金句式超级毒舌系统 - 完整测试结果")
     print("="*100)
     print()
 
-# 弗洛伊德修复后的结果
-print(f"## 弗洛伊德(修复后) - 自我欺骗测试")
-print(f"**描述**: 测试弗洛伊德揭露潜意识自欺的能力")
-print()
+    print_overview(args.paths)
 
-for round_data in freud_fixed['rounds']:
-    print(f"**第 {round_data['round']} 轮**:")
-    print(f"👤 用户: {round_data['user_input']}")
-    print(f"🤖 弗洛伊德: {round_data['ai_response']}")
-    print(f"   (字数: {round_data['response_length']}, 响应时间: {round_data['response_time']}秒, Temperature: {round_data['temperature']})")
     print()
+    print("="*100)
+    print()
+
+    print_details(args.paths)
 
-print(f"**分析结果**:")
-print(f"- 平均字数: {freud_fixed['analysis']['avg_response_length']} 字")
-print(f"- 字数范围: {freud_fixed['analysis']['min_response_length']}-{freud_fixed['analysis']['max_response_length']} 字")
-print(f"- 长度合规率: {freud_fixed['analysis']['length_compliance']}% (15-30字)")
-print(f"- 平均响应时间: {freud_fixed['analysis']['avg_response_time']} 秒")
-print(f"- 重复率: {freud_fixed['analysis']['repetition_rate']}%")
-print(f"- 唯一回复数: {freud_fixed['analysis']['unique_responses']}/{freud_fixed['analysis']['total_responses']}")
-print()
-print("="*100)
 
+if __name__ == "__main__":
+    main()
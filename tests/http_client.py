@@ -0,0 +1,371 @@
+"""
+共享 DeepSeek HTTP 客户端
+使用连接池复用 TCP+TLS 连接（keep-alive），并把每个请求的耗时拆分为 connect / TTFB / total；
+流式模式（与生产环境 getPhilosopherResponseStream 一致的 stream: true）额外记录首 token 时间和 token 间隔
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from rate_limiter import RateLimiter, get_rate_limiter, estimate_request_tokens
+from response_cache import ResponseCache, CACHE_MODES, DEFAULT_CACHE_DIR, DEFAULT_MAX_ENTRIES
+from span_recorder import span, record_span
+
+# DeepSeek API 配置
+DEFAULT_API_URL = "https://api.deepseek.com/v1"
+DEFAULT_API_KEY = "sk-83f3cb9e7ecc486b84626ce35aa7213b"
+DEFAULT_MODEL = "deepseek-chat"
+
+# 本地替身服务地址（mock_deepseek_server.py 的默认端口）
+MOCK_API_URL = "http://127.0.0.1:8787/v1"
+
+# 连接池与超时默认值
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 30.0
+
+# 金句字数上限，流式模式下超过即可提前中止
+JINJU_MAX_CHARS = 30
+
+# 当前线程内建立新连接所花的时间（复用连接时为 0）
+_connect_time = threading.local()
+
+
+class _TimedConnectionMixin:
+    """记录建立连接（含 TLS 握手）的耗时"""
+
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _connect_time.value = getattr(_connect_time, "value", 0.0) + time.perf_counter() - start
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """使用带计时连接的连接池"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+
+class DeepSeekClient:
+    """带连接池的 DeepSeek Chat Completions 客户端（线程安全）"""
+
+    def __init__(self, api_url: str = DEFAULT_API_URL, api_key: str = DEFAULT_API_KEY, model: str = DEFAULT_MODEL,
+                 pool_size: int = DEFAULT_POOL_SIZE, connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout: float = DEFAULT_READ_TIMEOUT, rate_limiter: Optional[RateLimiter] = None,
+                 stream: bool = False, abort_over_chars: Optional[int] = None,
+                 cache: Optional[ResponseCache] = None):
+        self.api_url = api_url.rstrip("/")
+        self.api_key = api_key
+        self.model = model
+        self.pool_size = pool_size
+        self.stream = stream
+        self.abort_over_chars = abort_over_chars
+        self.cache = cache
+        self.timeout = (connect_timeout, read_timeout)
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+
+        self.session = requests.Session()
+        adapter = TimedHTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}",
+        })
+
+        self._lock = threading.Lock()
+        self._timings: List[Dict[str, float]] = []
+
+    def build_payload(self, messages: List[Dict[str, str]], temperature: float = 1.0, max_tokens: int = 80,
+                      frequency_penalty: float = 0.7, presence_penalty: float = 0.4) -> Dict[str, Any]:
+        """构建请求体"""
+        return {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "frequency_penalty": frequency_penalty,
+            "presence_penalty": presence_penalty,
+        }
+
+    def chat(self, messages: List[Dict[str, str]], temperature: float = 1.0, max_tokens: int = 80,
+             frequency_penalty: float = 0.7, presence_penalty: float = 0.4,
+             cancel_event: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """
+        发送一次请求（先查回复缓存；客户端开启 stream 时走流式接口）
+        返回 {"content", "usage", "timing"}，timing 单位为秒：
+        connect 为建立新连接的耗时（复用连接时为 0），ttfb 为收到响应头的耗时（含 connect），total 为读完响应体的耗时；
+        命中缓存时 timing 为空，并带 cached=True；
+        cancel_event 被设置时流式请求立即断开（aborted=True），非流式请求无法中途取消
+        """
+        payload = self.build_payload(messages, temperature, max_tokens, frequency_penalty, presence_penalty)
+        if self.cache:
+            with span("cache_lookup"):
+                cached = self.cache.lookup(payload)
+            if cached is not None:
+                return dict(cached, timing={}, cached=True)
+
+        if self.stream:
+            result = self.chat_stream(messages, temperature, max_tokens, frequency_penalty, presence_penalty,
+                                      abort_over_chars=self.abort_over_chars, cancel_event=cancel_event)
+        else:
+            result = self._chat_once(payload, messages, max_tokens)
+
+        # 被提前中止的回复不完整，不写入缓存
+        if self.cache and not result.get("aborted"):
+            self.cache.store(payload, {"content": result["content"], "usage": result["usage"]})
+        return result
+
+    def _chat_once(self, payload: Dict[str, Any], messages: List[Dict[str, str]], max_tokens: int) -> Dict[str, Any]:
+        """发送一次非流式请求"""
+        estimated_tokens = estimate_request_tokens(messages, max_tokens)
+        timing = {}
+
+        def send():
+            _connect_time.value = 0.0
+            start = time.perf_counter()
+            response = self.session.post(f"{self.api_url}/chat/completions", json=payload,
+                                         timeout=self.timeout, stream=True)
+            timing["ttfb"] = time.perf_counter() - start
+            response.content  # 读完响应体，连接随即归还连接池
+            timing["total"] = time.perf_counter() - start
+            timing["connect"] = _connect_time.value
+            record_span("send", start, start + timing["ttfb"], status=response.status_code)
+            record_span("body", start + timing["ttfb"], start + timing["total"])
+            return response
+
+        response = self.rate_limiter.send(send, estimated_tokens)
+        self._record_timing(timing)
+        response.raise_for_status()
+
+        with span("parse"):
+            data = response.json()
+        self.rate_limiter.record_usage(estimated_tokens, data.get("usage"))
+        return {
+            "content": data["choices"][0]["message"]["content"],
+            "usage": data.get("usage"),
+            "timing": {k: round(v, 3) for k, v in timing.items()},
+        }
+
+    def chat_stream(self, messages: List[Dict[str, str]], temperature: float = 1.0, max_tokens: int = 80,
+                    frequency_penalty: float = 0.7, presence_penalty: float = 0.4,
+                    abort_over_chars: Optional[int] = None,
+                    cancel_event: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """
+        发送一次流式（SSE）请求，逐行解析 data: 事件
+        返回值在 chat() 的基础上增加 aborted，timing 增加：
+        ttft 为收到首个内容片段的耗时，avg_gap / max_gap 为相邻内容片段的间隔，chunks 为内容片段数；
+        abort_over_chars 不为空时，回复超过该字数即断开连接（aborted=True）；
+        cancel_event 被设置后在下一个片段到达时断开连接（aborted=True）
+        """
+        payload = self.build_payload(messages, temperature, max_tokens, frequency_penalty, presence_penalty)
+        payload["stream"] = True
+        payload["stream_options"] = {"include_usage": True}  # 流式响应默认不带 usage
+        estimated_tokens = estimate_request_tokens(messages, max_tokens)
+        timing = {}
+
+        def send():
+            _connect_time.value = 0.0
+            timing["start"] = time.perf_counter()
+            response = self.session.post(f"{self.api_url}/chat/completions", json=payload,
+                                         timeout=self.timeout, stream=True)
+            timing["ttfb"] = time.perf_counter() - timing["start"]
+            timing["connect"] = _connect_time.value
+            record_span("send", timing["start"], timing["start"] + timing["ttfb"], status=response.status_code)
+            if response.status_code != 200:
+                response.content  # 错误响应体很短，读完以归还连接
+            return response
+
+        response = self.rate_limiter.send(send, estimated_tokens)
+        start = timing.pop("start")
+        if response.status_code != 200:
+            timing["total"] = time.perf_counter() - start
+            self._record_timing(timing)
+            response.raise_for_status()
+
+        content = ""
+        usage = None
+        aborted = False
+        done = False
+        chunk_times = []
+        try:
+            # 收到 [DONE] 后仍把流读到结尾（中途 break 会让 urllib3 关闭连接，无法复用）
+            for line in response.iter_lines():
+                if cancel_event is not None and cancel_event.is_set() and not done:
+                    aborted = True
+                    break
+                if done or not line.startswith(b"data: "):
+                    continue
+                data = line[6:].decode("utf-8")
+                if data == "[DONE]":
+                    done = True
+                    continue
+                try:
+                    parsed = json.loads(data)
+                except ValueError:
+                    continue  # 忽略解析错误（与前端一致）
+                usage = parsed.get("usage") or usage
+                choices = parsed.get("choices") or [{}]
+                delta = (choices[0].get("delta") or {}).get("content")
+                if not delta:
+                    continue
+                chunk_times.append(time.perf_counter() - start)
+                content += delta
+                if abort_over_chars is not None and len(content.strip()) > abort_over_chars:
+                    aborted = True
+                    break
+        except Exception:
+            response.close()
+            raise
+
+        if aborted:
+            response.close()  # 断开连接，服务端随即停止生成
+
+        timing["total"] = time.perf_counter() - start
+        record_span("stream", start + timing["ttfb"], start + timing["total"], chunks=len(chunk_times),
+                    aborted=aborted)
+        if chunk_times:
+            timing["ttft"] = chunk_times[0]
+            gaps = [b - a for a, b in zip(chunk_times, chunk_times[1:])]
+            if gaps:
+                timing["avg_gap"] = sum(gaps) / len(gaps)
+                timing["max_gap"] = max(gaps)
+        self._record_timing(timing)
+        if usage:
+            self.rate_limiter.record_usage(estimated_tokens, usage)
+
+        rounded = {k: round(v, 3) for k, v in timing.items()}
+        rounded["chunks"] = len(chunk_times)
+        return {
+            "content": content,
+            "usage": usage,
+            "timing": rounded,
+            "aborted": aborted,
+        }
+
+    def _record_timing(self, timing: Dict[str, float]):
+        with self._lock:
+            self._timings.append(dict(timing))
+
+    def stats(self) -> Dict[str, Any]:
+        """本次运行的连接与耗时统计"""
+        with self._lock:
+            timings = list(self._timings)
+
+        stats = {
+            "requests": len(timings),
+            "new_connections": sum(1 for t in timings if t.get("connect", 0) > 0),
+            "pool_size": self.pool_size,
+            "stream": self.stream,
+        }
+        for key in ("connect", "ttfb", "ttft", "total"):
+            values = [t[key] for t in timings if key in t]
+            if values:
+                stats[f"avg_{key}"] = round(sum(values) / len(values), 3)
+                stats[f"max_{key}"] = round(max(values), 3)
+        stats["rate_limit"] = self.rate_limiter.stats()
+        if self.cache:
+            stats["cache"] = self.cache.stats()
+        return stats
+
+    def print_stats(self):
+        """打印连接与耗时统计"""
+        stats = self.stats()
+        print("HTTP 统计:")
+        print(f"- 请求数: {stats['requests']} (新建连接 {stats['new_connections']} 个, 连接池大小 {stats['pool_size']})")
+        if stats["requests"]:
+            print(f"- 平均耗时: connect {stats['avg_connect']}秒 / TTFB {stats['avg_ttfb']}秒 / total {stats['avg_total']}秒")
+        if "avg_ttft" in stats:
+            print(f"- 平均首 token 时间: {stats['avg_ttft']}秒 (最大 {stats['max_ttft']}秒)")
+        self.rate_limiter.print_stats()
+        if self.cache:
+            self.cache.print_stats()
+
+    def close(self):
+        self.session.close()
+
+
+_client: Optional[DeepSeekClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> DeepSeekClient:
+    """获取全局共享客户端（连接池大小读取 DEEPSEEK_POOL_SIZE 环境变量）"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = DeepSeekClient(pool_size=int(os.environ.get("DEEPSEEK_POOL_SIZE", DEFAULT_POOL_SIZE)))
+        return _client
+
+
+def configure_client(**kwargs) -> DeepSeekClient:
+    """用指定参数重建全局共享客户端（参数同 DeepSeekClient）"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = DeepSeekClient(**kwargs)
+        return _client
+
+
+def add_client_arguments(parser: argparse.ArgumentParser):
+    """为测试脚本添加客户端相关的命令行参数"""
+    group = parser.add_argument_group("API 客户端")
+    group.add_argument("--api-url", default=os.environ.get("DEEPSEEK_API_URL", DEFAULT_API_URL),
+                       help="Chat Completions 接口地址（也可用 DEEPSEEK_API_URL 环境变量指定）")
+    group.add_argument("--mock", action="store_true",
+                       help=f"使用本地替身服务 {MOCK_API_URL}（先运行 mock_deepseek_server.py）")
+    group.add_argument("--stream", action="store_true",
+                       help="使用流式接口（与生产环境一致），记录首 token 时间和 token 间隔")
+    group.add_argument("--abort-over-limit", action="store_true",
+                       help=f"流式模式下回复超过 {JINJU_MAX_CHARS} 字即提前中止")
+    group.add_argument("--cache", choices=CACHE_MODES, default=os.environ.get("DEEPSEEK_CACHE", "bypass"),
+                       help="回复缓存模式：record 先查缓存并写入新回复，replay 只用缓存（离线），bypass 不使用（默认）")
+    group.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="回复缓存目录")
+    group.add_argument("--cache-max-entries", type=int, default=DEFAULT_MAX_ENTRIES,
+                       help=f"回复缓存条目上限，超过后按 LRU 淘汰，默认 {DEFAULT_MAX_ENTRIES}")
+
+
+def configure_client_from_args(args: argparse.Namespace, **kwargs) -> DeepSeekClient:
+    """根据 add_client_arguments 解析出的参数重建全局共享客户端"""
+    if args.abort_over_limit and not args.stream:
+        raise SystemExit("--abort-over-limit 需要同时指定 --stream")
+    kwargs.setdefault("pool_size", int(os.environ.get("DEEPSEEK_POOL_SIZE", DEFAULT_POOL_SIZE)))
+    if args.cache != "bypass":
+        kwargs.setdefault("cache", ResponseCache(args.cache_dir, args.cache, args.cache_max_entries))
+    return configure_client(
+        api_url=MOCK_API_URL if args.mock else args.api_url,
+        stream=args.stream,
+        abort_over_chars=JINJU_MAX_CHARS if args.abort_over_limit else None,
+        **kwargs
+    )
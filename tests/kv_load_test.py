@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+KV 存储负载测试
+用 mock_kv_server.py 在本机起一个 Upstash Redis REST 替身，服务端通过 KV_REST_API_URL 连上它
+（storage-adapter.ts 选 code-manager-kv.ts / application-manager-kv.ts）。体验码数量按 --sizes 逐级增长
+（通过 generate-batch，每批最多 --grow-batch 个），每个数据量依次压测：
+  stats         - GET /api/admin/stats
+  codes_page    - GET /api/admin/codes?page=1&limit=50
+  verify_code   - POST /api/verify-code（每次用一个新生成的体验码，会修改体验码并写入申请记录）
+  adjust_uses   - PUT /api/admin/codes/:id/adjust-uses（单条记录的读-改-写）
+  generate_batch- POST /api/admin/generate-batch（每次 --batch-size 个用户）
+每个接口除吞吐和延迟分位数外，还从替身的 /__stats 取平均每次操作的 KV 请求数、命令数和收发字节数；
+逐条记录存储下这些数都不应随数据量增长，报告给出相对最小数据量的倍数
+
+用法:
+    python kv_load_test.py                                     # 默认 1000 10000 50000
+    python kv_load_test.py --sizes 1000 100000 --kv-latency 2 --concurrency 8
+    python kv_load_test.py --ops verify_code adjust_uses --requests 500
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+import argparse
+import json
+import subprocess
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from span_recorder import span, add_trace_arguments, configure_tracing_from_args, export_trace
+from load_generator import (
+    DEFAULT_ADMIN_PASSWORD,
+    ServerClient,
+    start_local_server,
+    wait_for_server,
+    _ms,
+)
+from store_benchmark import run_operation, _ratio
+from run_tests import TESTS_DIR, result_path
+
+DEFAULT_SIZES = (1_000, 10_000, 50_000)
+DEFAULT_PORT = 3100  # 避开开发服务端的 3000
+DEFAULT_KV_PORT = 8790  # mock_kv_server.py 的默认端口
+DEFAULT_KV_TOKEN = "local"
+DEFAULT_REQUESTS = 200
+DEFAULT_DURATION = 30.0
+DEFAULT_BATCH_SIZE = 20
+DEFAULT_GROW_BATCH = 5000
+
+# 只读接口在前，改数据的接口在后
+OPERATIONS = ("stats", "codes_page", "verify_code", "adjust_uses", "generate_batch")
+
+
+class KVStandIn:
+    """mock_kv_server.py 子进程和它的统计接口"""
+
+    def __init__(self, port: int, token: str, latency_ms: float):
+        self.url = f"http://127.0.0.1:{port}"
+        self.token = token
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.join(TESTS_DIR, "mock_kv_server.py"), "--port", str(port),
+             "--token", token, "--latency", str(latency_ms)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+        deadline = time.time() + 10
+        while time.time() < deadline:
+            try:
+                self.stats()
+                return
+            except requests.RequestException:
+                if self.process.poll() is not None:
+                    raise SystemExit(f"KV 替身启动失败（退出码 {self.process.returncode}）")
+                time.sleep(0.2)
+        raise SystemExit(f"10 秒内没有连上 KV 替身 {self.url}")
+
+    def stats(self) -> Dict[str, Any]:
+        response = requests.get(f"{self.url}/__stats", timeout=5)
+        response.raise_for_status()
+        return response.json()
+
+    def reset_stats(self):
+        requests.post(f"{self.url}/__stats/reset", timeout=5).raise_for_status()
+
+    def close(self):
+        self.process.terminate()
+        self.process.wait(timeout=10)
+
+
+def kv_traffic(stats: Dict[str, Any], operations: int) -> Dict[str, Any]:
+    """一段时间内的 KV 流量，以及平均每次操作的请求数、命令数和字节数"""
+    per_op = max(operations, 1)
+    return {
+        "requests": stats["requests"],
+        "commands": stats["commands"],
+        "bytes_in": stats["bytes_in"],
+        "bytes_out": stats["bytes_out"],
+        "errors": stats["errors"],
+        "commands_by_name": stats["commands_by_name"],
+        "requests_per_op": round(stats["requests"] / per_op, 2),
+        "commands_per_op": round(stats["commands"] / per_op, 2),
+        "bytes_per_op": round((stats["bytes_in"] + stats["bytes_out"]) / per_op),
+    }
+
+
+def code_total(server: ServerClient, token: str) -> int:
+    """服务端当前的体验码总数（/api/admin/stats 的 stats.total）"""
+    return server.stats(token)["stats"]["total"]
+
+
+def grow_codes(server: ServerClient, token: str, kv: KVStandIn, current: int, target: int, grow_batch: int,
+               run_id: str) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+    """通过 generate-batch 把体验码数量从 current 增加到 target，返回新码（id / code）和写入开销"""
+    created: List[Dict[str, str]] = []
+    kv.reset_stats()
+    start = time.perf_counter()
+    while current + len(created) < target:
+        count = min(grow_batch, target - current - len(created))
+        offset = current + len(created)
+        names = [f"kv-{run_id}-{offset + j:07d}" for j in range(count)]
+        with span("grow", batch=count):
+            data = server.generate_batch(token, names, "KV 负载测试")
+        created.extend({"id": c["id"], "code": c["code"]} for c in data["codes"])
+    elapsed = time.perf_counter() - start
+    growth = kv_traffic(kv.stats(), len(created))
+    growth.update({"records": len(created), "seconds": round(elapsed, 2),
+                   "records_per_sec": round(len(created) / elapsed, 1) if elapsed > 0 else None})
+    return created, growth
+
+
+def operation_calls(server: ServerClient, token: str, fresh_codes: List[Dict[str, str]],
+                    all_codes: List[Dict[str, str]], batch_size: int, run_id: str
+                    ) -> Dict[str, Tuple[Callable[[int], Dict[str, Any]], Optional[Callable]]]:
+    """各接口的调用方式和结果检查"""
+    def verify(index: int) -> Dict[str, Any]:
+        return server.verify_code(fresh_codes[index]["code"])
+
+    def adjust(index: int) -> Dict[str, Any]:
+        # 在全部体验码里跳着取，覆盖新旧记录
+        record = all_codes[(index * 7919) % len(all_codes)]
+        return server.adjust_uses(token, record["id"], 2 + index % 3)
+
+    def generate(index: int) -> Dict[str, Any]:
+        names = [f"batch-{run_id}-{index:05d}-{j:03d}" for j in range(batch_size)]
+        return server.generate_batch(token, names, "KV 负载测试")
+
+    return {
+        "stats": (lambda index: server.stats(token), None),
+        "codes_page": (lambda index: server.list_codes(token, page=1, limit=50), None),
+        "verify_code": (verify, lambda data: None if data.get("valid") else f"invalid: {data.get('message')}"),
+        "adjust_uses": (adjust, lambda data: None if data.get("success") else "not adjusted"),
+        "generate_batch": (generate, lambda data: None if data.get("count") == batch_size else "short batch"),
+    }
+
+
+def run_size(size: int, server: ServerClient, token: str, kv: KVStandIn, fresh_codes: List[Dict[str, str]],
+             all_codes: List[Dict[str, str]], args: argparse.Namespace, run_id: str) -> Dict[str, Dict[str, Any]]:
+    """在当前数据量下依次压测各接口，每个接口前后各取一次 KV 统计"""
+    calls = operation_calls(server, token, fresh_codes, all_codes, args.batch_size, f"{run_id}-{size}")
+    operations = {}
+    for op in args.ops:
+        budget = min(args.requests, len(fresh_codes)) if op == "verify_code" else args.requests
+        call, check = calls[op]
+        kv.reset_stats()
+        with span("operation", size=size, op=op):
+            stats = run_operation(op, call, budget, args.duration, args.concurrency, check)
+        stats["kv"] = kv_traffic(kv.stats(), stats["count"])
+        operations[op] = stats
+        print(f"  {op:<15} {stats['ops_per_sec']:>9}/s  p50 {_ms(stats['latency'].get('p50')):>9}  "
+              f"p99 {_ms(stats['latency'].get('p99')):>9}  KV {stats['kv']['requests_per_op']:>5} 请求 "
+              f"{stats['kv']['bytes_per_op']:>8}B /次  错误 {stats['errors']}")
+    return operations
+
+
+def flatness_table(results: List[Dict[str, Any]], ops: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """各接口 p50、p99 和每次操作 KV 字节数相对最小数据量的倍数"""
+    flatness = {}
+    for op in ops:
+        rows = [(r["size"], r["operations"].get(op)) for r in results]
+        rows = [(size, stats) for size, stats in rows if stats and stats["latency"].get("count")]
+        if not rows:
+            continue
+        base = rows[0][1]
+        flatness[op] = [{
+            "size": size,
+            "p50_ratio": _ratio(stats["latency"]["p50"], base["latency"]["p50"], 2),
+            "p99_ratio": _ratio(stats["latency"]["p99"], base["latency"]["p99"], 2),
+            "bytes_ratio": _ratio(stats["kv"]["bytes_per_op"], base["kv"]["bytes_per_op"], 2),
+            "requests_ratio": _ratio(stats["kv"]["requests_per_op"], base["kv"]["requests_per_op"], 2),
+        } for size, stats in rows]
+    return flatness
+
+
+def generate_summary_report(report: Dict[str, Any], json_file: str):
+    """生成 KV 负载测试总结报告（Markdown）"""
+    report_file = os.path.splitext(json_file)[0] + '-summary.md'
+    config = report["config"]
+
+    with open(report_file, 'w', encoding='utf-8') as f:
+        f.write("# 金句式超级毒舌系统 - KV 存储负载测试\n\n")
+        f.write(f"**测试时间**: {report['start_time']} ~ {report['end_time']}\n\n")
+        f.write(f"**配置**: KV 替身模拟延迟 {config['kv_latency']}ms / 请求，每个接口最多 {config['requests']} 次 / "
+                f"{config['duration']} 秒，并发 {config['concurrency']}，每批生成 {config['batch_size']} 个，"
+                f"数据增长每批 {config['grow_batch']} 个\n\n")
+        f.write("---\n\n")
+
+        f.write("## 数据增长（generate-batch 写入）\n\n")
+        f.write("| 增长到 | 新增记录 | 耗时 | 记录/秒 | KV 请求 | 字节/记录 |\n")
+        f.write("|:---:|:---:|:---:|:---:|:---:|:---:|\n")
+        for result in report["results"]:
+            growth = result["growth"]
+            f.write(f"| {result['size']} | {growth['records']} | {growth['seconds']}秒 | {growth['records_per_sec']} | "
+                    f"{growth['requests']} | {growth['bytes_per_op']}B |\n")
+        f.write("\n")
+
+        f.write("## 各接口统计\n\n")
+        f.write("| 接口 | 记录数 | 次数 | 错误 | 吞吐 (次/秒) | p50 | p90 | p99 | KV 请求/次 | KV 命令/次 | KV 字节/次 |\n")
+        f.write("|:---|:---:|:---:|:---:|:---:|:---:|:---:|:---:|:---:|:---:|:---:|\n")
+        for op in config["ops"]:
+            for result in report["results"]:
+                stats = result["operations"].get(op)
+                if not stats:
+                    continue
+                latency, kv = stats["latency"], stats["kv"]
+                f.write(f"| {op} | {result['size']} | {stats['count']} | {stats['errors']} | {stats['ops_per_sec']} | "
+                        f"{_ms(latency.get('p50'))} | {_ms(latency.get('p90'))} | {_ms(latency.get('p99'))} | "
+                        f"{kv['requests_per_op']} | {kv['commands_per_op']} | {kv['bytes_per_op']}B |\n")
+        f.write("\n")
+
+        if report["flatness"]:
+            f.write("## 随数据量的变化（相对最小数据量，接近 1 即不随数据量增长）\n\n")
+            f.write("| 接口 | 记录数 | p50 倍数 | p99 倍数 | KV 请求倍数 | KV 字节倍数 |\n")
+            f.write("|:---|:---:|:---:|:---:|:---:|:---:|\n")
+            for op, rows in report["flatness"].items():
+                for row in rows:
+                    f.write(f"| {op} | {row['size']} | {row['p50_ratio']} | {row['p99_ratio']} | "
+                            f"{row['requests_ratio']} | {row['bytes_ratio']} |\n")
+            f.write("\n")
+
+        errors = [(op, result["size"], kind, count) for result in report["results"]
+                  for op, stats in result["operations"].items() for kind, count in stats["error_kinds"].items()]
+        if errors:
+            f.write("## 错误\n\n")
+            f.write("| 接口 | 记录数 | 错误 | 次数 |\n")
+            f.write("|:---|:---:|:---|:---:|\n")
+            for op, size, kind, count in errors:
+                f.write(f"| {op} | {size} | {kind} | {count} |\n")
+
+    print(f"总结报告已保存到: {report_file}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KV 存储随数据量的吞吐、延迟和 KV 流量负载测试（本地 KV 替身）")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="体验码数量逐级增长到的规模，默认 1000 10000 50000")
+    parser.add_argument("--ops", nargs="+", choices=OPERATIONS, default=list(OPERATIONS),
+                        help="要压测的接口（按 只读 -> 改数据 的固定顺序执行），默认全部")
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS,
+                        help=f"每个接口最多请求次数，默认 {DEFAULT_REQUESTS}")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION,
+                        help=f"每个接口最长压测时间（秒），默认 {DEFAULT_DURATION:.0f}")
+    parser.add_argument("--concurrency", type=int, default=4, help="并发请求数，默认 4")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"generate_batch 每次生成的体验码数，默认 {DEFAULT_BATCH_SIZE}")
+    parser.add_argument("--grow-batch", type=int, default=DEFAULT_GROW_BATCH,
+                        help=f"数据增长时每次 generate-batch 的体验码数，默认 {DEFAULT_GROW_BATCH}")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"本地服务端端口，默认 {DEFAULT_PORT}")
+    parser.add_argument("--kv-port", type=int, default=DEFAULT_KV_PORT, help=f"KV 替身端口，默认 {DEFAULT_KV_PORT}")
+    parser.add_argument("--kv-latency", type=float, default=0,
+                        help="KV 替身每个请求的模拟网络延迟（毫秒），默认 0")
+    parser.add_argument("--timeout", type=float, default=120.0, help="单次请求超时（秒），默认 120")
+    parser.add_argument("--admin-password", default=os.environ.get("ADMIN_PASSWORD", DEFAULT_ADMIN_PASSWORD),
+                        help="管理员密码（默认读取 ADMIN_PASSWORD）")
+    parser.add_argument("--output-dir", default=os.environ.get("TEST_OUTPUT_DIR", TESTS_DIR),
+                        help="结果文件和总结报告的输出目录")
+    add_trace_arguments(parser)
+    args = parser.parse_args()
+
+    if any(size < 1 for size in args.sizes):
+        parser.error("--sizes 必须 >= 1")
+    if args.requests < 1 or args.concurrency < 1 or args.batch_size < 1 or args.grow_batch < 1:
+        parser.error("--requests / --concurrency / --batch-size / --grow-batch 必须 >= 1")
+    args.sizes = sorted(set(args.sizes))
+    args.ops = [op for op in OPERATIONS if op in args.ops]
+    configure_tracing_from_args(args)
+
+    print("="*80)
+    print(" 金句式超级毒舌系统 - KV 存储负载测试")
+    print("="*80)
+    print()
+
+    start_time = datetime.now().isoformat()
+    run_id = datetime.now().strftime("%Y%m%d%H%M%S")
+    kv = KVStandIn(args.kv_port, DEFAULT_KV_TOKEN, args.kv_latency)
+    server = ServerClient(f"http://127.0.0.1:{args.port}", pool_size=args.concurrency, timeout=args.timeout)
+    process = start_local_server(args.port, {"KV_REST_API_URL": kv.url, "KV_REST_API_TOKEN": kv.token})
+    results = []
+    try:
+        wait_for_server(server, process)
+        token = server.login(args.admin_password)
+        all_codes: List[Dict[str, str]] = []
+        for size in args.sizes:
+            # verify_code 消耗的新码也在增长阶段多生成出来，不计入上一级的数据量
+            target = size + (args.requests if "verify_code" in args.ops else 0)
+            current = code_total(server, token)
+            print(f"体验码 {current} -> {target}")
+            with span("grow_to", size=size):
+                created, growth = grow_codes(server, token, kv, current, target, args.grow_batch, run_id)
+            print(f"  新增 {growth['records']} 条，{growth['records_per_sec']} 条/秒，"
+                  f"每条 KV {growth['bytes_per_op']}B")
+            fresh = created[-args.requests:] if "verify_code" in args.ops else []
+            all_codes.extend(created)
+            operations = run_size(size, server, token, kv, fresh, all_codes, args, run_id)
+            results.append({"size": size, "growth": growth, "operations": operations,
+                            "kv_keys": kv.stats()["keys"]})
+    finally:
+        server.close()
+        process.terminate()
+        process.wait(timeout=10)
+        kv.close()
+
+    report = {
+        "test_suite": "KV 存储负载测试",
+        "start_time": start_time,
+        "end_time": datetime.now().isoformat(),
+        "config": {"sizes": args.sizes, "ops": args.ops, "requests": args.requests, "duration": args.duration,
+                   "concurrency": args.concurrency, "batch_size": args.batch_size, "grow_batch": args.grow_batch,
+                   "kv_latency": args.kv_latency},
+        "results": results,
+        "flatness": flatness_table(results, args.ops),
+    }
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_file = result_path(args.output_dir, "kv-load-test", "json")
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"\n结果已保存到: {output_file}")
+    generate_summary_report(report, output_file)
+    export_trace(output_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+延迟统计 - 流式分位数草图
+用对数分桶（DDSketch 思路）在常数内存内估算 p50/p90/p95/p99，相对误差不超过 relative_accuracy，
+草图可以合并（跨进程、跨文件），也可以直接导出直方图；另提供按轮次的延迟曲线和 Markdown 报告片段
+"""
+
+import math
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+REPORT_PERCENTILES = (50, 90, 95, 99)
+
+# 直方图默认分桶边界（秒）
+DEFAULT_HISTOGRAM_EDGES = (0.5, 1, 1.5, 2, 3, 5, 8, 13, 20, 30)
+
+
+class LatencySketch:
+    """可合并的对数分桶分位数草图"""
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float):
+        """记录一个延迟样本（秒）"""
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value <= 0:
+            self.zero_count += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.bins[index] = self.bins.get(index, 0) + 1
+
+    def extend(self, values: Iterable[float]):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "LatencySketch"):
+        """合并另一个草图（相对精度需一致）"""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("只能合并相对精度相同的草图")
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def _bin_value(self, index: int) -> float:
+        # 桶 (gamma^(i-1), gamma^i] 的代表值，保证相对误差 <= relative_accuracy
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """q 为百分位（0-100），返回估算值；没有样本时返回 None"""
+        if self.count == 0:
+            return None
+        if q >= 100:
+            return self.max
+        if q <= 0:
+            return self.min
+        rank = q / 100 * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        seen = self.zero_count
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                return min(self.max, max(self.min, self._bin_value(index)))
+        return self.max
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def summary(self, digits: int = 2) -> Dict[str, Any]:
+        """{count, avg, p50, p90, p95, p99, max}"""
+        if self.count == 0:
+            return {"count": 0}
+        summary = {"count": self.count, "avg": round(self.mean, digits)}
+        for q in REPORT_PERCENTILES:
+            summary[f"p{q}"] = round(self.quantile(q), digits)
+        summary["max"] = round(self.max, digits)
+        return summary
+
+    def histogram(self, edges: Iterable[float] = DEFAULT_HISTOGRAM_EDGES) -> List[Dict[str, Any]]:
+        """按边界汇总为直方图：[{"upper": 边界或 None（溢出桶）, "count": n}]"""
+        edges = list(edges)
+        counts = [0] * (len(edges) + 1)
+        counts[0] += self.zero_count
+        for index, count in self.bins.items():
+            value = self._bin_value(index)
+            slot = next((i for i, edge in enumerate(edges) if value <= edge), len(edges))
+            counts[slot] += count
+        return [{"upper": edges[i] if i < len(edges) else None, "count": counts[i]} for i in range(len(counts))]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化（用于跨进程传递或写入结果文件）"""
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "bins": {str(k): v for k, v in self.bins.items()},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "total": self.total,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencySketch":
+        sketch = cls(data["relative_accuracy"])
+        sketch.bins = {int(k): v for k, v in data["bins"].items()}
+        sketch.zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        sketch.total = data["total"]
+        if sketch.count:
+            sketch.min = data["min"]
+            sketch.max = data["max"]
+        return sketch
+
+
+class LatencyProfile:
+    """整体延迟、按轮次延迟（即延迟随对话历史长度的变化）的草图集合"""
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.overall = LatencySketch(relative_accuracy)
+        self.by_round: Dict[int, LatencySketch] = {}
+
+    def add(self, round_num: int, response_time: float):
+        self.overall.add(response_time)
+        sketch = self.by_round.get(round_num)
+        if sketch is None:
+            sketch = self.by_round[round_num] = LatencySketch(self.relative_accuracy)
+        sketch.add(response_time)
+
+    def add_rounds(self, rounds: Iterable[Dict[str, Any]]):
+        """记录结果文件中的轮次（跳过没有响应时间的轮次，如缓存命中或出错）"""
+        for round_data in rounds:
+            if round_data.get("response_time"):
+                self.add(round_data["round"], round_data["response_time"])
+
+    def merge(self, other: "LatencyProfile"):
+        self.overall.merge(other.overall)
+        for round_num, sketch in other.by_round.items():
+            if round_num in self.by_round:
+                self.by_round[round_num].merge(sketch)
+            else:
+                self.by_round[round_num] = LatencySketch.from_dict(sketch.to_dict())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "overall": self.overall.to_dict(),
+            "by_round": {str(k): v.to_dict() for k, v in self.by_round.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencyProfile":
+        profile = cls(data["overall"]["relative_accuracy"])
+        profile.overall = LatencySketch.from_dict(data["overall"])
+        profile.by_round = {int(k): LatencySketch.from_dict(v) for k, v in data["by_round"].items()}
+        return profile
+
+
+def latency_summary(values: Iterable[float]) -> Dict[str, Any]:
+    """对一组延迟样本计算 {count, avg, p50, p90, p95, p99, max}"""
+    sketch = LatencySketch()
+    sketch.extend(values)
+    return sketch.summary()
+
+
+def response_time_fields(values: Iterable[float]) -> Dict[str, Any]:
+    """分析结果中的延迟分位数字段：p50/p90/p95/p99/max_response_time"""
+    summary = latency_summary(values)
+    return {f"{key}_response_time": summary.get(key) for key in ("p50", "p90", "p95", "p99", "max")}
+
+
+def build_latency_profiles(conversations: Iterable[Tuple[str, List[Dict[str, Any]]]]
+                           ) -> Tuple[Dict[str, LatencyProfile], LatencyProfile]:
+    """按分组（通常是哲学家）汇总 (分组名, 轮次列表)，返回 (各分组的草图, 整体草图)"""
+    groups: Dict[str, LatencyProfile] = {}
+    for name, rounds in conversations:
+        groups.setdefault(name, LatencyProfile()).add_rounds(rounds)
+    return groups, merge_profiles(groups.values())
+
+
+def merge_profiles(profiles: Iterable[LatencyProfile]) -> LatencyProfile:
+    """合并多个分组的草图"""
+    overall = LatencyProfile()
+    for profile in profiles:
+        overall.merge(profile)
+    return overall
+
+
+def _fmt(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.2f}秒"
+
+
+def format_histogram(sketch: LatencySketch, edges: Iterable[float] = DEFAULT_HISTOGRAM_EDGES, width: int = 40) -> str:
+    """用字符条形图渲染直方图（代码块形式）"""
+    buckets = sketch.histogram(edges)
+    peak = max((b["count"] for b in buckets), default=0) or 1
+    lines = ["```"]
+    lower = 0
+    for bucket in buckets:
+        label = f"{lower:>5}-{bucket['upper']:<5}秒" if bucket["upper"] is not None else f"{lower:>5}+     秒"
+        bar = "█" * round(bucket["count"] / peak * width)
+        lines.append(f"{label} | {bar} {bucket['count']}")
+        if bucket["upper"] is not None:
+            lower = bucket["upper"]
+    lines.append("```")
+    return "\n".join(lines)
+
+
+def format_latency_section(groups: Dict[str, LatencyProfile], overall: LatencyProfile) -> str:
+    """生成报告中的 "延迟分布" 章节：分组分位数表、整体直方图、延迟随轮次（历史长度）变化的曲线"""
+    lines = ["## 延迟分布\n",
+             "| 分组 | 样本数 | 平均 | p50 | p90 | p95 | p99 | 最大 |",
+             "|:---|:---:|:---:|:---:|:---:|:---:|:---:|:---:|"]
+    for name, profile in list(groups.items()) + [("全部", overall)]:
+        s = profile.overall.summary()
+        if not s["count"]:
+            continue
+        lines.append(f"| {name} | {s['count']} | {_fmt(s['avg'])} | {_fmt(s['p50'])} | {_fmt(s['p90'])} | "
+                     f"{_fmt(s['p95'])} | {_fmt(s['p99'])} | {_fmt(s['max'])} |")
+
+    lines.append("\n**整体延迟直方图**:\n")
+    lines.append(format_histogram(overall.overall))
+
+    lines.append("\n**延迟随对话轮次（历史长度）的变化**:\n")
+    lines.append("| 轮次 | 历史消息数 | 样本数 | p50 | p90 | 最大 |")
+    lines.append("|:---:|:---:|:---:|:---:|:---:|:---:|")
+    for round_num in sorted(overall.by_round):
+        s = overall.by_round[round_num].summary()
+        lines.append(f"| {round_num} | {(round_num - 1) * 2} | {s['count']} | {_fmt(s['p50'])} | "
+                     f"{_fmt(s['p90'])} | {_fmt(s['max'])} |")
+    return "\n".join(lines) + "\n"
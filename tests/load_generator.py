@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+"""
+负载生成 - 模拟 N 个并发用户走完整的使用流程
+每个用户：POST /api/verify-code 激活体验码 -> GET /api/check-access 带码检查权限 ->
+按生产方式（aiService.ts 的提示词拼装、流式输出）跑完一段 test-cases.json 的对话；
+用户按爬坡曲线陆续上线，最后汇总各操作的吞吐、延迟分位数、错误和逐秒时间线
+
+体验码默认先用管理端接口（/api/admin/login + /api/admin/generate-single）逐个生成，
+也可以用 --codes-file 指定现成的体验码（每行一个）。注意 verify-code 会把体验码标记为已使用，
+每个用户都需要一个新码
+
+用法:
+    python mock_deepseek_server.py &                          # 本地模型替身
+    DEEPSEEK_RPM=0 python load_generator.py --mock --start-server --users 50 --profile linear --ramp-up 30
+    DEEPSEEK_RPM=0 python load_generator.py --mock --server-url http://127.0.0.1:3000 --users 200 --rounds 3
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+import argparse
+import json
+import subprocess
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_client import get_client, add_client_arguments, configure_client_from_args
+from latency_stats import LatencySketch
+from prompt_registry import build_production_messages
+from span_recorder import span, add_trace_arguments, configure_tracing_from_args, export_trace
+from run_tests import TESTS_DIR, TEST_CASES, result_path
+from runner.presets import PRODUCTION_CHAT_OPTIONS
+
+REPO_ROOT = os.path.dirname(TESTS_DIR)
+
+DEFAULT_SERVER_PORT = 3000  # server/index.ts 的默认 PORT
+DEFAULT_SERVER_URL = f"http://127.0.0.1:{DEFAULT_SERVER_PORT}"
+DEFAULT_ADMIN_PASSWORD = "admin123456"  # server/middleware/auth.ts 的默认 ADMIN_PASSWORD
+SERVER_STARTUP_TIMEOUT = 60.0
+
+# constant: 全部用户同时上线；linear: 在 ramp-up 秒内匀速上线；step: 分 --steps 批上线
+RAMP_PROFILES = ("constant", "linear", "step")
+
+OPERATIONS = ("verify_code", "check_access", "chat")
+
+
+def start_offsets(profile: str, users: int, ramp_up: float, steps: int = 4) -> List[float]:
+    """每个用户相对压测开始的上线时间（秒）"""
+    if profile == "constant" or users <= 1 or ramp_up <= 0:
+        return [0.0] * users
+    if profile == "linear":
+        return [ramp_up * i / (users - 1) for i in range(users)]
+    steps = max(1, min(steps, users))
+    return [ramp_up * (i * steps // users) / max(1, steps - 1) for i in range(users)]
+
+
+def error_kind(error: Exception) -> str:
+    """错误分类：HTTP 状态码或异常类型"""
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return f"HTTP {error.response.status_code}"
+    return type(error).__name__
+
+
+class ServerClient:
+    """被测服务端的 HTTP 客户端（连接池大小与并发用户数一致）"""
+
+    def __init__(self, base_url: str, pool_size: int, timeout: float = 30.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _request(self, method: str, path: str, **kwargs) -> Dict[str, Any]:
+        response = self.session.request(method, f"{self.base_url}{path}", timeout=self.timeout, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    def login(self, password: str) -> str:
+        return self._request("POST", "/api/admin/login", json={"password": password})["token"]
+
+    def generate_code(self, admin_token: str, user_name: str) -> str:
+        data = self._request("POST", "/api/admin/generate-single",
+                             json={"userName": user_name, "note": "负载测试"},
+                             headers={"Authorization": f"Bearer {admin_token}"})
+        return data["code"]["code"]
+
+    def verify_code(self, code: str) -> Dict[str, Any]:
+        return self._request("POST", "/api/verify-code", json={"code": code})
+
+    def check_access(self, code: str) -> Dict[str, Any]:
+        return self._request("GET", "/api/check-access", headers={"Authorization": f"Bearer {code}"})
+
+    def generate_batch(self, admin_token: str, user_names: List[str], note: str) -> Dict[str, Any]:
+        """POST /api/admin/generate-batch（multipart 表单，users 字段为 JSON 字符串数组）"""
+        form = {"users": (None, json.dumps(user_names, ensure_ascii=False)), "note": (None, note)}
+        return self._request("POST", "/api/admin/generate-batch", files=form,
+                             headers={"Authorization": f"Bearer {admin_token}"})
+
+    def adjust_uses(self, admin_token: str, code_id: str, max_uses: int) -> Dict[str, Any]:
+        return self._request("PUT", f"/api/admin/codes/{code_id}/adjust-uses", json={"maxUses": max_uses},
+                             headers={"Authorization": f"Bearer {admin_token}"})
+
+    def batch_send(self, admin_token: str, code_ids: List[str], webhook_url: str, **options) -> Dict[str, Any]:
+        """POST /api/admin/batch-send（background=true，直接返回后台发送任务）"""
+        return self._request("POST", "/api/admin/batch-send",
+                             json={"codeIds": code_ids, "webhookUrl": webhook_url, "background": True, **options},
+                             headers={"Authorization": f"Bearer {admin_token}"})
+
+    def delivery_job(self, admin_token: str, job_id: str) -> Dict[str, Any]:
+        return self._request("GET", f"/api/admin/batch-send/jobs/{job_id}",
+                             headers={"Authorization": f"Bearer {admin_token}"})
+
+    def analyze_screenshot(self, filename: str, content: bytes, mime_type: str) -> requests.Response:
+        """POST /api/analyze-screenshot（识别失败时返回 400，由调用方判断状态码）"""
+        return self.session.post(f"{self.base_url}/api/analyze-screenshot", timeout=self.timeout,
+                                 files={"screenshot": (filename, content, mime_type)})
+
+    def stats(self, admin_token: str) -> Dict[str, Any]:
+        return self._request("GET", "/api/admin/stats", headers={"Authorization": f"Bearer {admin_token}"})
+
+    def list_codes(self, admin_token: str, **params) -> Dict[str, Any]:
+        return self._request("GET", "/api/admin/codes", params=params,
+                             headers={"Authorization": f"Bearer {admin_token}"})
+
+    def is_up(self) -> bool:
+        try:
+            self.session.get(f"{self.base_url}/api/check-access", timeout=2)
+            return True
+        except requests.RequestException:
+            return False
+
+    def close(self):
+        self.session.close()
+
+
+class LoadStats:
+    """各操作的延迟草图、错误计数和逐秒时间线（线程安全）"""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self.latency = {op: LatencySketch() for op in OPERATIONS}
+        self.ttft = LatencySketch()
+        self.ok = Counter()
+        self.errors = Counter()
+        self.error_kinds = Counter()
+        self.timeline: Dict[int, Counter] = {}
+        self.sessions: List[Tuple[float, float, bool]] = []
+
+    def observe(self, op: str, start: float, end: float, error: Optional[str] = None, ttft: Optional[float] = None):
+        """记录一次操作（start / end 为 time.perf_counter() 的值）"""
+        second = int(end - self.origin)
+        with self._lock:
+            self.latency[op].add(end - start)
+            bucket = self.timeline.setdefault(second, Counter())
+            if error is None:
+                self.ok[op] += 1
+                bucket["completed"] += 1
+                if ttft is not None:
+                    self.ttft.add(ttft)
+            else:
+                self.errors[op] += 1
+                self.error_kinds[f"{op}: {error}"] += 1
+                bucket["errors"] += 1
+
+    def session(self, start: float, end: float, completed: bool):
+        with self._lock:
+            self.sessions.append((start - self.origin, end - self.origin, completed))
+
+    def report(self, wall_clock: float) -> Dict[str, Any]:
+        operations = {}
+        for op in OPERATIONS:
+            total = self.ok[op] + self.errors[op]
+            operations[op] = {
+                "count": total,
+                "errors": self.errors[op],
+                "error_rate": round(self.errors[op] / total * 100, 2) if total else 0,
+                "throughput": round(self.ok[op] / wall_clock, 2) if wall_clock > 0 else 0,
+                "latency": self.latency[op].summary(digits=4),
+            }
+
+        timeline = []
+        for second in range(int(wall_clock) + 1):
+            bucket = self.timeline.get(second, Counter())
+            active = sum(1 for start, end, _ in self.sessions if start < second + 1 and end >= second)
+            timeline.append({"second": second, "active_users": active,
+                             "completed": bucket["completed"], "errors": bucket["errors"]})
+
+        return {
+            "wall_clock": round(wall_clock, 2),
+            "users": {"started": len(self.sessions), "completed": sum(1 for s in self.sessions if s[2])},
+            "operations": operations,
+            "chat_ttft": self.ttft.summary(digits=4),
+            "errors": dict(self.error_kinds.most_common()),
+            "timeline": timeline,
+        }
+
+
+def _timed(stats: LoadStats, op: str, call: Callable[..., Dict[str, Any]], *args,
+           check: Optional[Callable[[Dict[str, Any]], Optional[str]]] = None) -> Optional[Dict[str, Any]]:
+    """执行一次服务端操作并记录耗时；check 返回错误描述时按失败计；失败时返回 None"""
+    start = time.perf_counter()
+    try:
+        with span(op):
+            result = call(*args)
+        error = check(result) if check else None
+    except Exception as e:
+        result, error = None, error_kind(e)
+    stats.observe(op, start, time.perf_counter(), error)
+    return None if error else result
+
+
+def stream_chat(philosopher_id: str, history: List[Dict[str, str]], question: str) -> Dict[str, Any]:
+    """与前端 getPhilosopherResponseStream 相同的流式请求（生产提示词拼装和参数）"""
+    messages, temperature = build_production_messages(philosopher_id,
+                                                      history + [{"role": "user", "content": question}])
+    return get_client().chat_stream(messages, temperature, **PRODUCTION_CHAT_OPTIONS)
+
+
+def run_user(code: str, philosopher_id: str, test_case: Dict[str, Any], server: ServerClient, stats: LoadStats,
+             start_at: float, think_time: float) -> bool:
+    """一个用户的完整会话：激活体验码 -> 检查权限 -> 多轮流式对话；返回是否走完全程"""
+    delay = start_at - time.perf_counter()
+    if delay > 0:
+        time.sleep(delay)
+    session_start = time.perf_counter()
+    completed = False
+    try:
+        if _timed(stats, "verify_code", server.verify_code, code,
+                  check=lambda data: None if data.get("valid") else f"invalid: {data.get('message')}") is None:
+            return False
+        if _timed(stats, "check_access", server.check_access, code,
+                  check=lambda data: None if data.get("hasAccess") else "no access") is None:
+            return False
+
+        history: List[Dict[str, str]] = []
+        for round_num, question in enumerate(test_case['questions'], 1):
+            if round_num > 1 and think_time > 0:
+                time.sleep(think_time)
+            start = time.perf_counter()
+            try:
+                with span("chat", philosopher=philosopher_id, round=round_num):
+                    result = stream_chat(philosopher_id, history, question)
+            except Exception as e:
+                stats.observe("chat", start, time.perf_counter(), error_kind(e))
+                return False
+            stats.observe("chat", start, time.perf_counter(), ttft=result["timing"].get("ttft"))
+            history.append({"role": "user", "content": question})
+            history.append({"role": "assistant", "content": result["content"].strip()})
+        completed = True
+        return True
+    finally:
+        stats.session(session_start, time.perf_counter(), completed)
+
+
+def user_conversations(users: int, rounds: Optional[int]) -> List[Tuple[str, Dict[str, Any]]]:
+    """按 test-cases.json 的顺序轮流给每个用户分配一段对话"""
+    cases = [(pid, case) for pid, test_cases in TEST_CASES.items() for case in test_cases]
+    assigned = []
+    for i in range(users):
+        pid, case = cases[i % len(cases)]
+        assigned.append((pid, dict(case, questions=case['questions'][:rounds]) if rounds else case))
+    return assigned
+
+
+def provision_codes(server: ServerClient, users: int, admin_password: str) -> List[str]:
+    """用管理端接口为每个用户生成一个体验码（不计入压测时间）"""
+    token = server.login(admin_password)
+    run_id = datetime.now().strftime("%Y%m%d%H%M%S")
+    return [server.generate_code(token, f"loadtest-{run_id}-{i:05d}") for i in range(users)]
+
+
+def load_codes(path: str, users: int) -> List[str]:
+    with open(path, 'r', encoding='utf-8') as f:
+        codes = [line.strip() for line in f if line.strip()]
+    if len(codes) < users:
+        raise SystemExit(f"{path} 只有 {len(codes)} 个体验码，少于用户数 {users}")
+    return codes[:users]
+
+
+def run_load(server: ServerClient, codes: List[str], profile: str, ramp_up: float, steps: int,
+             rounds: Optional[int], think_time: float) -> Dict[str, Any]:
+    """按爬坡曲线启动全部用户并等待结束，返回统计结果"""
+    users = len(codes)
+    stats = LoadStats()
+    offsets = start_offsets(profile, users, ramp_up, steps)
+    conversations = user_conversations(users, rounds)
+
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        futures = [pool.submit(run_user, code, pid, case, server, stats, stats.origin + offset, think_time)
+                   for code, (pid, case), offset in zip(codes, conversations, offsets)]
+        for future in futures:
+            future.result()
+
+    return stats.report(time.perf_counter() - stats.origin)
+
+
+def start_local_server(port: int, env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+    """在仓库根目录用 tsx 启动 server/index.ts（需要先 pnpm install）；env 为额外的环境变量"""
+    env = dict(os.environ, **(env or {}), PORT=str(port))
+    return subprocess.Popen(["npx", "tsx", "server/index.ts"], cwd=REPO_ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+
+
+def wait_for_server(server: ServerClient, process: Optional[subprocess.Popen] = None,
+                    timeout: float = SERVER_STARTUP_TIMEOUT):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if server.is_up():
+            return
+        if process is not None and process.poll() is not None:
+            raise SystemExit(f"服务端启动失败（退出码 {process.returncode}）")
+        time.sleep(0.5)
+    raise SystemExit(f"{timeout:.0f} 秒内没有连上 {server.base_url}")
+
+
+def _ms(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value * 1000:.1f}ms"
+
+
+def generate_summary_report(report: Dict[str, Any], json_file: str):
+    """生成负载测试总结报告（Markdown）"""
+    report_file = os.path.splitext(json_file)[0] + '-summary.md'
+    config = report["config"]
+
+    with open(report_file, 'w', encoding='utf-8') as f:
+        f.write("# 金句式超级毒舌系统 - 负载测试报告\n\n")
+        f.write(f"**测试时间**: {report['start_time']} ~ {report['end_time']}\n\n")
+        f.write(f"**服务端**: {config['server_url']}，**模型接口**: {config['api_url']}\n\n")
+        f.write(f"**用户**: {config['users']} 个（{config['profile']}，爬坡 {config['ramp_up']} 秒），"
+                f"走完全程 {report['users']['completed']} 个，墙钟时间 {report['wall_clock']} 秒\n\n")
+        f.write("---\n\n")
+
+        f.write("## 各操作统计\n\n")
+        f.write("| 操作 | 次数 | 错误 | 错误率 | 吞吐 (次/秒) | 平均 | p50 | p90 | p99 | 最大 |\n")
+        f.write("|:---|:---:|:---:|:---:|:---:|:---:|:---:|:---:|:---:|:---:|\n")
+        for op, stats in report["operations"].items():
+            latency = stats["latency"]
+            f.write(f"| {op} | {stats['count']} | {stats['errors']} | {stats['error_rate']}% | "
+                    f"{stats['throughput']} | {_ms(latency.get('avg'))} | {_ms(latency.get('p50'))} | "
+                    f"{_ms(latency.get('p90'))} | {_ms(latency.get('p99'))} | {_ms(latency.get('max'))} |\n")
+        ttft = report["chat_ttft"]
+        f.write(f"\n流式首 token: p50 {_ms(ttft.get('p50'))} / p90 {_ms(ttft.get('p90'))} / "
+                f"p99 {_ms(ttft.get('p99'))}\n\n")
+
+        if report["errors"]:
+            f.write("## 错误\n\n")
+            f.write("| 操作: 错误 | 次数 |\n")
+            f.write("|:---|:---:|\n")
+            for kind, count in report["errors"].items():
+                f.write(f"| {kind} | {count} |\n")
+            f.write("\n")
+
+        f.write("## 时间线\n\n")
+        f.write("| 秒 | 在线用户 | 完成操作 | 错误 |\n")
+        f.write("|:---:|:---:|:---:|:---:|\n")
+        for point in report["timeline"]:
+            f.write(f"| {point['second']} | {point['active_users']} | {point['completed']} | {point['errors']} |\n")
+
+    print(f"总结报告已保存到: {report_file}\n")
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"用户: 启动 {report['users']['started']} 个，走完全程 {report['users']['completed']} 个，"
+          f"墙钟时间 {report['wall_clock']} 秒")
+    print(f"{'操作':<14} {'次数':>6} {'错误':>6} {'吞吐':>10} {'p50':>10} {'p90':>10} {'p99':>10}")
+    for op, stats in report["operations"].items():
+        latency = stats["latency"]
+        print(f"{op:<14} {stats['count']:>6} {stats['errors']:>6} {stats['throughput']:>8}/s "
+              f"{_ms(latency.get('p50')):>10} {_ms(latency.get('p90')):>10} {_ms(latency.get('p99')):>10}")
+    for kind, count in report["errors"].items():
+        print(f"- {kind}: {count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模拟并发用户：激活体验码 + 流式对话")
+    parser.add_argument("--server-url", default=os.environ.get("SERVER_URL", DEFAULT_SERVER_URL),
+                        help=f"被测服务端地址，默认 {DEFAULT_SERVER_URL}（也可用 SERVER_URL 指定）")
+    parser.add_argument("--start-server", action="store_true",
+                        help="在本地启动 server/index.ts（npx tsx），压测结束后关闭")
+    parser.add_argument("--users", type=int, default=10, help="并发用户数，默认 10")
+    parser.add_argument("--profile", choices=RAMP_PROFILES, default="linear", help="用户上线曲线，默认 linear")
+    parser.add_argument("--ramp-up", type=float, default=10.0, help="爬坡时长（秒），默认 10")
+    parser.add_argument("--steps", type=int, default=4, help="step 曲线的批数，默认 4")
+    parser.add_argument("--rounds", type=int, help="每个用户的对话轮数（默认用例的全部轮数）")
+    parser.add_argument("--think-time", type=float, default=0.0, help="两轮对话之间的思考时间（秒），默认 0")
+    parser.add_argument("--codes-file", help="现成的体验码（每行一个）；不指定时用管理端接口生成")
+    parser.add_argument("--admin-password", default=os.environ.get("ADMIN_PASSWORD", DEFAULT_ADMIN_PASSWORD),
+                        help="生成体验码用的管理员密码（默认读取 ADMIN_PASSWORD）")
+    parser.add_argument("--output-dir", default=os.environ.get("TEST_OUTPUT_DIR", TESTS_DIR),
+                        help="结果文件和总结报告的输出目录")
+    add_client_arguments(parser)
+    add_trace_arguments(parser)
+    args = parser.parse_args()
+
+    if args.users < 1:
+        parser.error("--users 必须 >= 1")
+    if args.rounds is not None and args.rounds < 1:
+        parser.error("--rounds 必须 >= 1")
+
+    client = configure_client_from_args(args, pool_size=args.users)
+    configure_tracing_from_args(args)
+    server = ServerClient(args.server_url, pool_size=args.users)
+
+    print("="*80)
+    print(" 金句式超级毒舌系统 - 负载测试")
+    print("="*80)
+    print()
+
+    process = None
+    if args.start_server:
+        port = urlparse(args.server_url).port or DEFAULT_SERVER_PORT
+        print(f"启动本地服务端（PORT={port}）...")
+        process = start_local_server(port)
+    try:
+        wait_for_server(server, process)
+        codes = load_codes(args.codes_file, args.users) if args.codes_file \
+            else provision_codes(server, args.users, args.admin_password)
+        print(f"{len(codes)} 个体验码就绪，开始压测（{args.profile}，爬坡 {args.ramp_up} 秒）...\n")
+
+        start_time = datetime.now().isoformat()
+        report = run_load(server, codes, args.profile, args.ramp_up, args.steps, args.rounds, args.think_time)
+    finally:
+        server.close()
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+    report = {
+        "test_suite": "金句式超级毒舌系统负载测试",
+        "start_time": start_time,
+        "end_time": datetime.now().isoformat(),
+        "config": {"server_url": args.server_url, "api_url": client.api_url, "users": args.users,
+                   "profile": args.profile, "ramp_up": args.ramp_up, "steps": args.steps,
+                   "rounds": args.rounds, "think_time": args.think_time},
+        **report,
+        "http": client.stats(),
+    }
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_file = result_path(args.output_dir, "load-test", "json")
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print_report(report)
+    print(f"\n结果已保存到: {output_file}")
+    generate_summary_report(report, output_file)
+    export_trace(output_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+金句式超级毒舌系统 - 长对话压力基准
+现有测试脚本只跑 10 轮、只保留最近 30 条历史，而生产环境保留 200 条历史并注入最多 100 条之前的回复；
+这里按生产环境的提示词拼装（build_production_messages）把每位哲学家的对话跑到 50 / 100 / 200 轮，
+按轮次分段统计延迟、prompt token、重复率和长度合规率，找出随历史增长性能开始恶化的位置
+
+用户问题默认从 test-cases.json 中该哲学家的所有问题循环合成，也可以用 --replay 回放已有结果文件中的用户输入
+
+用法:
+    python long_conversation_benchmark.py --mock --rounds 50 100 200
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from http_client import get_client, add_client_arguments, configure_client_from_args
+from prompt_registry import PHILOSOPHER_NAMES, PRODUCTION_MAX_TOKENS, build_production_messages, prompt_version
+from result_formats import load_conversations
+from latency_stats import LatencySketch, build_latency_profiles, format_latency_section
+from token_profiler import Thresholds, round_usage, usage_fields, profile_rounds, format_token_section
+from run_tests import TESTS_DIR, TEST_CASES, make_round_record
+
+DEFAULT_CHECKPOINTS = [50, 100, 200]
+DEFAULT_BUCKET_SIZE = 10
+DEFAULT_CONCURRENCY = 5
+
+# 生产提示词要求的回复长度（getPhilosopherResponseStream 中的 "20-50字"）
+PRODUCTION_MIN_CHARS = 20
+PRODUCTION_MAX_CHARS = 50
+
+# 某个分段的 p90 延迟或平均 prompt token 达到第一段的多少倍时视为 "拐点"
+CLIFF_FACTOR = 2.0
+
+
+def synthesize_questions(philosopher_id: str, rounds: int) -> List[str]:
+    """循环使用 test-cases.json 中该哲学家的全部问题，凑足 rounds 轮"""
+    pool = [q for case in TEST_CASES[philosopher_id] for q in case['questions']]
+    return [pool[i % len(pool)] for i in range(rounds)]
+
+
+def replay_questions(path: str, philosopher_id: str, rounds: int) -> List[str]:
+    """按顺序取结果文件中该哲学家的用户输入，不足时循环"""
+    pool = [r["user_input"] for c in load_conversations(path) if c["philosopher"] == philosopher_id
+            for r in c["rounds"] if r["user_input"]]
+    if not pool:
+        raise SystemExit(f"{path} 中没有 {philosopher_id} 的对话")
+    return [pool[i % len(pool)] for i in range(rounds)]
+
+
+def request_production_round(messages: List[Dict[str, str]], temperature: float) -> Dict[str, Any]:
+    """按生产参数（max_tokens=150）请求一轮"""
+    try:
+        result = get_client().chat(messages, temperature=temperature, max_tokens=PRODUCTION_MAX_TOKENS)
+        return dict(result, usage=round_usage(messages, result["content"], result.get("usage")))
+    except Exception as e:
+        return {"content": f"[API错误: {str(e)}]", "usage": None, "timing": {}}
+
+
+MessageBuilder = Callable[[List[Dict[str, str]]], Tuple[List[Dict[str, str]], float]]
+
+
+def run_long_conversation(philosopher_id: str, questions: List[str],
+                          build_messages: Optional[MessageBuilder] = None) -> Dict[str, Any]:
+    """按生产提示词拼装（或 build_messages 指定的拼装方式）跑完一整段长对话"""
+    name = PHILOSOPHER_NAMES[philosopher_id]
+    if build_messages is None:
+        def build_messages(history):
+            return build_production_messages(philosopher_id, history)
+
+    history: List[Dict[str, str]] = []
+    seen = set()
+    results = {
+        "test_id": f"{philosopher_id}_long_{len(questions)}",
+        "philosopher": philosopher_id,
+        "test_name": f"{len(questions)}轮长对话",
+        "description": "按生产环境提示词拼装的长对话压力测试",
+        "start_time": datetime.now().isoformat(),
+        "rounds": [],
+    }
+
+    for round_num, question in enumerate(questions, 1):
+        history.append({"role": "user", "content": question})
+        messages, temperature = build_messages(history)
+
+        start_time = time.time()
+        result = request_production_round(messages, temperature)
+        response_time = time.time() - start_time
+        response = result["content"]
+        history.append({"role": "assistant", "content": response})
+
+        record = make_round_record(round_num, question, response, response_time, temperature,
+                                   result["timing"], result.get("aborted", False), result["usage"])
+        record["history_messages"] = len(messages) - 1
+        record["repeated"] = response in seen
+        seen.add(response)
+        results["rounds"].append(record)
+
+        if round_num % DEFAULT_BUCKET_SIZE == 0:
+            print(f"[{name}] 第 {round_num}/{len(questions)} 轮, 历史 {record['history_messages']} 条, "
+                  f"延迟 {response_time:.2f}秒")
+
+    results["end_time"] = datetime.now().isoformat()
+    return results
+
+
+def analyze_buckets(rounds: List[Dict[str, Any]], bucket_size: int) -> List[Dict[str, Any]]:
+    """按轮次分段统计：延迟分位数、prompt token、重复率（与之前任意一轮完全相同）、长度合规率"""
+    buckets = []
+    for start in range(0, len(rounds), bucket_size):
+        chunk = [r for r in rounds[start:start + bucket_size] if not r["ai_response"].startswith("[API错误")]
+        if not chunk:
+            continue
+        latency = LatencySketch()
+        latency.extend(r["response_time"] for r in chunk)
+        summary = latency.summary()
+        buckets.append({
+            "rounds": f"{chunk[0]['round']}-{chunk[-1]['round']}",
+            "history_messages": chunk[-1]["history_messages"],
+            "samples": len(chunk),
+            "p50_response_time": summary["p50"],
+            "p90_response_time": summary["p90"],
+            "max_response_time": summary["max"],
+            "avg_prompt_tokens": round(sum(r["usage"]["prompt_tokens"] for r in chunk if r.get("usage")) / len(chunk)),
+            "repetition_rate": round(sum(1 for r in chunk if r["repeated"]) / len(chunk) * 100, 1),
+            "length_compliance": round(sum(1 for r in chunk if PRODUCTION_MIN_CHARS <= r["response_length"]
+                                           <= PRODUCTION_MAX_CHARS) / len(chunk) * 100, 1),
+        })
+    return buckets
+
+
+def find_cliff(buckets: List[Dict[str, Any]], factor: float = CLIFF_FACTOR) -> Optional[Dict[str, Any]]:
+    """第一个 p90 延迟或平均 prompt token 达到首段 factor 倍的分段"""
+    if not buckets:
+        return None
+    base = buckets[0]
+    for bucket in buckets[1:]:
+        if (bucket["p90_response_time"] >= base["p90_response_time"] * factor
+                or bucket["avg_prompt_tokens"] >= base["avg_prompt_tokens"] * factor):
+            return bucket
+    return None
+
+
+def checkpoint_summary(rounds: List[Dict[str, Any]], checkpoints: List[int]) -> Dict[int, Dict[str, Any]]:
+    """到第 N 轮为止的累计指标"""
+    summary = {}
+    for checkpoint in checkpoints:
+        upto = rounds[:checkpoint]
+        if len(upto) < checkpoint:
+            continue
+        latency = LatencySketch()
+        latency.extend(r["response_time"] for r in upto)
+        summary[checkpoint] = {
+            **latency.summary(),
+            **usage_fields(upto),
+            "repetition_rate": round(sum(1 for r in upto if r["repeated"]) / len(upto) * 100, 1),
+            "length_compliance": round(sum(1 for r in upto if PRODUCTION_MIN_CHARS <= r["response_length"]
+                                           <= PRODUCTION_MAX_CHARS) / len(upto) * 100, 1),
+        }
+    return summary
+
+
+def run_benchmark(philosopher_ids: List[str], checkpoints: List[int], concurrency: int,
+                  replay: Optional[str] = None, bucket_size: int = DEFAULT_BUCKET_SIZE) -> Dict[str, Any]:
+    """每位哲学家跑一段 max(checkpoints) 轮的对话（哲学家之间并发），结果格式与 run_tests.py 一致"""
+    total_rounds = max(checkpoints)
+    all_results = {
+        "test_suite": "金句式超级毒舌系统 - 长对话压力基准",
+        "version": "1.0",
+        "prompt_version": prompt_version(),
+        "start_time": datetime.now().isoformat(),
+        "checkpoints": checkpoints,
+        "philosophers": {},
+    }
+
+    def run(philosopher_id):
+        if replay:
+            questions = replay_questions(replay, philosopher_id, total_rounds)
+        else:
+            questions = synthesize_questions(philosopher_id, total_rounds)
+        return run_long_conversation(philosopher_id, questions)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        conversations = list(pool.map(run, philosopher_ids))
+
+    for philosopher_id, conversation in zip(philosopher_ids, conversations):
+        buckets = analyze_buckets(conversation["rounds"], bucket_size)
+        conversation["analysis"] = {
+            "checkpoints": checkpoint_summary(conversation["rounds"], checkpoints),
+            "buckets": buckets,
+            "cliff": find_cliff(buckets),
+        }
+        all_results["philosophers"][philosopher_id] = {
+            "name": PHILOSOPHER_NAMES[philosopher_id],
+            "test_count": 1,
+            "results": [conversation],
+        }
+
+    all_results["end_time"] = datetime.now().isoformat()
+    all_results["http"] = get_client().stats()
+    return all_results
+
+
+def generate_report(results: Dict[str, Any], report_file: str):
+    """生成长对话基准报告"""
+    with open(report_file, 'w', encoding='utf-8') as f:
+        f.write("# 金句式超级毒舌系统 - 长对话压力基准\n\n")
+        f.write(f"**测试时间**: {results['start_time']} ~ {results['end_time']}\n\n")
+        f.write(f"**提示词版本**: {results['prompt_version']}\n\n")
+        f.write(f"**长度要求**: {PRODUCTION_MIN_CHARS}-{PRODUCTION_MAX_CHARS}字（生产提示词）\n\n")
+        f.write("---\n\n")
+
+        f.write("## 检查点汇总\n\n")
+        f.write("| 哲学家 | 轮数 | p50 | p90 | p99 | 最大 | 单轮最大 prompt tokens | 费用 | 重复率 | 长度合规率 |\n")
+        f.write("|:---|:---:|:---:|:---:|:---:|:---:|:---:|:---:|:---:|:---:|\n")
+        for data in results["philosophers"].values():
+            analysis = data["results"][0]["analysis"]
+            for checkpoint, row in analysis["checkpoints"].items():
+                f.write(f"| {data['name']} | {checkpoint} | {row['p50']}秒 | {row['p90']}秒 | {row['p99']}秒 | "
+                        f"{row['max']}秒 | {row.get('max_prompt_tokens', '-')} | {row.get('estimated_cost', '-')}元 | "
+                        f"{row['repetition_rate']}% | {row['length_compliance']}% |\n")
+        f.write("\n")
+
+        f.write(f"## 性能拐点（p90 延迟或 prompt token 达到首段的 {CLIFF_FACTOR} 倍）\n\n")
+        for data in results["philosophers"].values():
+            cliff = data["results"][0]["analysis"]["cliff"]
+            if cliff:
+                f.write(f"- {data['name']}: 第 {cliff['rounds']} 轮（历史 {cliff['history_messages']} 条, "
+                        f"p90 {cliff['p90_response_time']}秒, prompt {cliff['avg_prompt_tokens']} tokens）\n")
+            else:
+                f.write(f"- {data['name']}: 未出现\n")
+        f.write("\n")
+
+        for data in results["philosophers"].values():
+            f.write(f"## {data['name']} - 分段统计\n\n")
+            f.write("| 轮次 | 历史消息数 | p50 | p90 | 最大 | 平均 prompt tokens | 重复率 | 长度合规率 |\n")
+            f.write("|:---:|:---:|:---:|:---:|:---:|:---:|:---:|:---:|\n")
+            for bucket in data["results"][0]["analysis"]["buckets"]:
+                f.write(f"| {bucket['rounds']} | {bucket['history_messages']} | {bucket['p50_response_time']}秒 | "
+                        f"{bucket['p90_response_time']}秒 | {bucket['max_response_time']}秒 | "
+                        f"{bucket['avg_prompt_tokens']} | {bucket['repetition_rate']}% | {bucket['length_compliance']}% |\n")
+            f.write("\n")
+
+        groups, overall = build_latency_profiles(
+            (data['name'], data["results"][0]["rounds"]) for data in results["philosophers"].values()
+        )
+        f.write(format_latency_section(groups, overall))
+        f.write("\n")
+        thresholds = Thresholds.from_env()
+        f.write(format_token_section([
+            {"name": data['name'], "profile": profile_rounds(data["results"][0]["rounds"], thresholds)}
+            for data in results["philosophers"].values()
+        ], thresholds))
+
+    print(f"基准报告已保存到: {report_file}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按生产提示词拼装运行 50/100/200 轮长对话基准")
+    parser.add_argument("--rounds", type=int, nargs="+", default=DEFAULT_CHECKPOINTS,
+                        help="统计检查点（轮数），对话会跑到其中的最大值，默认 50 100 200")
+    parser.add_argument("--philosophers", nargs="+", choices=list(PHILOSOPHER_NAMES), default=list(PHILOSOPHER_NAMES))
+    parser.add_argument("--replay", help="从已有结果文件回放用户输入（默认从 test-cases.json 合成）")
+    parser.add_argument("--bucket-size", type=int, default=DEFAULT_BUCKET_SIZE, help="分段统计的轮数")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="同时进行的对话数")
+    add_client_arguments(parser)
+    args = parser.parse_args()
+
+    if min(args.rounds) < 1:
+        parser.error("--rounds 必须 >= 1")
+    if args.abort_over_limit:
+        parser.error("生产提示词要求 20-50 字，不能使用 --abort-over-limit")
+
+    configure_client_from_args(args, pool_size=args.concurrency)
+
+    checkpoints = sorted(set(args.rounds))
+    print("="*80)
+    print(" 金句式超级毒舌系统 - 长对话压力基准")
+    print("="*80)
+    print(f"- 哲学家: {', '.join(PHILOSOPHER_NAMES[p] for p in args.philosophers)}")
+    print(f"- 检查点: {checkpoints} 轮")
+    print(f"- 问题来源: {args.replay or 'test-cases.json（循环合成）'}")
+    print()
+
+    suite_start = time.time()
+    results = run_benchmark(args.philosophers, checkpoints, args.concurrency, args.replay, args.bucket_size)
+    print(f"\n总耗时: {time.time() - suite_start:.1f} 秒")
+
+    output_file = os.path.join(TESTS_DIR, f'long-conversation-{datetime.now().strftime("%Y%m%d-%H%M%S")}.json')
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存到: {output_file}")
+    get_client().print_stats()
+    generate_report(results, output_file.replace('.json', '-summary.md'))
+
+
+if __name__ == "__main__":
+    main()
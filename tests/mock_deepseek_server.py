@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+本地 DeepSeek 替身服务 - 用于确定性的压测和延迟基准测试
+实现 /v1/chat/completions（JSON 和 SSE 流式），支持可配置的延迟分布、错误/429 注入，
+回复可以来自内置金句，也可以从历史测试结果（如 streamlined-test-results-*.json）中播种
+
+用法:
+    python mock_deepseek_server.py --replies-from streamlined-test-results-20251028-094036.json
+    python streamlined_test.py --mock
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from rate_limiter import TokenBucket
+from result_formats import load_rounds
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8787
+
+# 内置金句（与前端 getMockResponse 的降级回复同风格）
+CANNED_REPLIES = [
+    "你确定你真的理解自己在说什么吗？",
+    "你连自己的前提都没想清楚，就要下结论？",
+    "你的'迷茫'不过是懒惰的遮羞布。",
+    "你在用'现实'当借口，逃避真正的挑战。",
+    "你在滥用'意义'这个词，却从不定义它。",
+    "你的行为能成为普遍法则吗？显然不能。",
+    "你在为自私找一个体面的借口。",
+    "你的潜意识比你的嘴诚实得多。",
+    "你在用忙碌逃避内心的空虚。",
+    "你说想清楚了，可你连问题都没看清。",
+]
+
+
+def load_recorded_replies(paths: List[str]) -> Dict[str, List[str]]:
+    """从历史测试结果中收集 用户输入 -> AI 回复 列表"""
+    replies: Dict[str, List[str]] = {}
+    for path in paths:
+        for round_data in load_rounds(path):
+            user_input, ai_response = round_data["user_input"], round_data["ai_response"]
+            if user_input and ai_response and not ai_response.startswith(("[API错误", "ERROR:")):
+                replies.setdefault(user_input, []).append(ai_response)
+    return replies
+
+
+class MockConfig:
+    """替身服务的行为配置"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.latency = args.latency
+        self.latency_mean = args.latency_mean / 1000.0
+        self.latency_stddev = args.latency_stddev / 1000.0
+        self.token_interval = args.token_interval / 1000.0
+        self.error_rate = args.error_rate
+        self.throttle_rate = args.throttle_rate
+        self.retry_after = args.retry_after
+        self.rpm_bucket = TokenBucket(args.rpm) if args.rpm > 0 else None
+        self.recorded = load_recorded_replies(args.replies_from) if args.replies_from else {}
+
+        self.rng = random.Random(args.seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "stream_requests": 0, "throttled": 0, "errors": 0}
+
+    def sample_latency(self) -> float:
+        """按配置的分布采样首字节延迟（秒）"""
+        with self.lock:
+            if self.latency == "fixed":
+                value = self.latency_mean
+            elif self.latency == "uniform":
+                value = self.rng.uniform(self.latency_mean - self.latency_stddev, self.latency_mean + self.latency_stddev)
+            elif self.latency == "normal":
+                value = self.rng.gauss(self.latency_mean, self.latency_stddev)
+            else:
+                # 对数正态：长尾，更接近真实 API
+                sigma2 = math.log(1 + (self.latency_stddev / self.latency_mean) ** 2) if self.latency_mean > 0 else 0
+                mu = math.log(self.latency_mean) - sigma2 / 2 if self.latency_mean > 0 else 0
+                value = self.rng.lognormvariate(mu, math.sqrt(sigma2)) if self.latency_mean > 0 else 0
+        return max(0.0, value)
+
+    def inject_failure(self):
+        """决定本次请求是否注入故障，返回 (status, retry_after) 或 None"""
+        with self.lock:
+            self.stats["requests"] += 1
+            if self.rpm_bucket and self.rpm_bucket.reserve(1, time.monotonic()) > 0:
+                self.rpm_bucket.refund(1)
+                self.stats["throttled"] += 1
+                return 429, max(1, math.ceil(1 / self.rpm_bucket.rate))
+            roll = self.rng.random()
+            if roll < self.throttle_rate:
+                self.stats["throttled"] += 1
+                return 429, self.retry_after
+            if roll < self.throttle_rate + self.error_rate:
+                self.stats["errors"] += 1
+                return 500, None
+        return None
+
+    def pick_reply(self, messages: List[Dict[str, str]]) -> str:
+        """按请求内容确定性地选择回复（同一请求总是得到同一回复）"""
+        user_input = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+        candidates = self.recorded.get(user_input) or CANNED_REPLIES
+        digest = hashlib.sha256(json.dumps(messages, ensure_ascii=False).encode("utf-8")).digest()
+        return candidates[int.from_bytes(digest[:4], "big") % len(candidates)]
+
+
+def make_handler(config: MockConfig):
+    class MockHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, body: Dict[str, Any], headers: Dict[str, str] = None):
+            payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _write_chunk(self, data: bytes):
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        def do_POST(self):
+            if self.path.rstrip("/") not in ("/v1/chat/completions", "/chat/completions"):
+                self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+                return
+
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                request = json.loads(self.rfile.read(length) or b"{}")
+                messages = request["messages"]
+            except (ValueError, KeyError):
+                self._send_json(400, {"error": {"message": "Invalid request body"}})
+                return
+
+            failure = config.inject_failure()
+            if failure:
+                status, retry_after = failure
+                headers = {"Retry-After": str(retry_after)} if retry_after is not None else None
+                message = "Rate limit reached" if status == 429 else "Injected server error"
+                self._send_json(status, {"error": {"message": message}}, headers)
+                return
+
+            reply = config.pick_reply(messages)
+            prompt_tokens = sum(len(m["content"]) for m in messages)
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(reply),
+                "total_tokens": prompt_tokens + len(reply),
+            }
+            time.sleep(config.sample_latency())
+
+            model = request.get("model", "deepseek-chat")
+            if request.get("stream"):
+                with config.lock:
+                    config.stats["stream_requests"] += 1
+                # 与真实接口一致：只有请求 stream_options.include_usage 时最后一个片段才带 usage
+                include_usage = (request.get("stream_options") or {}).get("include_usage", False)
+                self._stream_reply(model, reply, usage if include_usage else None)
+            else:
+                self._send_json(200, {
+                    "id": f"mock-{time.time_ns()}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                    "usage": usage,
+                })
+
+        def _stream_reply(self, model: str, reply: str, usage: Optional[Dict[str, int]]):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def event(delta: Dict[str, Any], finish_reason=None, include_usage=False) -> bytes:
+                chunk = {
+                    "id": "mock-stream",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                }
+                if include_usage:
+                    chunk["usage"] = usage
+                return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8")
+
+            try:
+                self._write_chunk(event({"role": "assistant", "content": ""}))
+                for char in reply:
+                    self._write_chunk(event({"content": char}))
+                    if config.token_interval:
+                        time.sleep(config.token_interval)
+                self._write_chunk(event({}, "stop", include_usage=usage is not None))
+                self._write_chunk(b"data: [DONE]\n\n")
+                self._write_chunk(b"")
+            except (BrokenPipeError, ConnectionResetError):
+                # 客户端提前中止（如 --abort-over-limit）
+                self.close_connection = True
+
+    return MockHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 DeepSeek 替身服务")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", choices=["fixed", "uniform", "normal", "lognormal"], default="lognormal",
+                        help="首字节延迟分布，默认 lognormal")
+    parser.add_argument("--latency-mean", type=float, default=800, help="首字节延迟均值（毫秒），默认 800")
+    parser.add_argument("--latency-stddev", type=float, default=300, help="首字节延迟标准差（毫秒），默认 300")
+    parser.add_argument("--token-interval", type=float, default=30, help="流式输出每个字之间的间隔（毫秒），默认 30")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="注入 500 错误的概率")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="注入 429 的概率")
+    parser.add_argument("--retry-after", type=int, default=1, help="注入 429 时的 Retry-After 秒数")
+    parser.add_argument("--rpm", type=float, default=0, help="模拟服务端 RPM 配额，超出返回 429（0 为不限制）")
+    parser.add_argument("--replies-from", nargs="*", default=[], help="从历史测试结果 JSON 中播种回复")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    args = parser.parse_args()
+
+    config = MockConfig(args)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(config))
+    server.daemon_threads = True
+
+    print("="*80)
+    print(" DeepSeek 替身服务")
+    print("="*80)
+    print(f"地址: http://{args.host}:{args.port}/v1")
+    print(f"延迟: {args.latency} (均值 {args.latency_mean}ms, 标准差 {args.latency_stddev}ms), 流式间隔 {args.token_interval}ms")
+    print(f"故障注入: 500 {args.error_rate * 100:.1f}% / 429 {args.throttle_rate * 100:.1f}%, RPM 配额 {args.rpm or '不限'}")
+    print(f"录制回复: {sum(len(v) for v in config.recorded.values())} 条 ({len(config.recorded)} 个问题)")
+    print()
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\n请求统计: {config.stats}")
+
+
+if __name__ == "__main__":
+    main()
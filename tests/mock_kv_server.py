@@ -0,0 +1,502 @@
+#!/usr/bin/env python3
+"""
+本地 KV 替身服务 - 用于在本机测试和压测 Vercel KV 版本的存储（code-manager-kv.ts / application-manager-kv.ts）
+@vercel/kv 底层是 Upstash Redis 的 REST 协议：POST / 执行一条命令，POST /pipeline 批量执行，
+POST /multi-exec 作为事务执行（本替身所有命令都在一把锁里串行执行，事务天然原子）。
+实现了存储层用到的 Redis 命令（字符串、集合、有序集合、hash、过期时间），
+并统计每个接口的请求数、命令数、请求和响应字节数，供负载测试按操作计算 KV 流量：
+    GET  /__stats         当前统计和键数
+    POST /__stats/reset   清零统计
+
+用法:
+    python mock_kv_server.py --port 8790 --latency 2
+    KV_REST_API_URL=http://127.0.0.1:8790 KV_REST_API_TOKEN=local npx tsx server/index.ts
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+import argparse
+import base64
+import bisect
+import fnmatch
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8790
+DEFAULT_TOKEN = "local"
+
+
+class CommandError(Exception):
+    """Redis 命令错误（按 Upstash 的格式返回 {"error": ...}）"""
+
+
+class SortedSet:
+    """有序集合：member -> score，另维护按 (score, member) 排好序的列表，按下标取区间是 O(log n + k)"""
+
+    def __init__(self):
+        self.scores: Dict[str, float] = {}
+        self.ordered: List[Tuple[float, str]] = []
+
+    def add(self, member: str, score: float) -> bool:
+        old = self.scores.get(member)
+        if old is not None:
+            if old == score:
+                return False
+            del self.ordered[bisect.bisect_left(self.ordered, (old, member))]
+        self.scores[member] = score
+        bisect.insort(self.ordered, (score, member))
+        return old is None
+
+    def remove(self, member: str) -> bool:
+        score = self.scores.pop(member, None)
+        if score is None:
+            return False
+        del self.ordered[bisect.bisect_left(self.ordered, (score, member))]
+        return True
+
+    def __len__(self):
+        return len(self.scores)
+
+
+def _str(value: Any) -> str:
+    """命令参数转成 Redis 里的字符串（JSON 数字、布尔值和字符串）"""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _score(value: float) -> str:
+    return _str(value) if float(value).is_integer() else repr(float(value))
+
+
+def _range(start: int, stop: int, length: int) -> Tuple[int, int]:
+    """Redis 风格的闭区间下标（支持负数）转成切片 [start, stop)"""
+    if start < 0:
+        start = max(length + start, 0)
+    if stop < 0:
+        stop = length + stop
+    return start, min(stop, length - 1) + 1
+
+
+class KVStore:
+    """内存里的 Redis 子集，所有命令在一把锁里串行执行"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data: Dict[str, Any] = {}
+        self.expires: Dict[str, float] = {}
+
+    # ---- 键空间 ----
+
+    def _alive(self, key: str) -> bool:
+        expire_at = self.expires.get(key)
+        if expire_at is not None and expire_at <= time.monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    def _get(self, key: str, kind: type) -> Any:
+        if not self._alive(key):
+            return None
+        value = self.data[key]
+        if not isinstance(value, kind):
+            raise CommandError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def _get_or_create(self, key: str, kind: type) -> Any:
+        value = self._get(key, kind)
+        if value is None:
+            value = self.data[key] = kind()
+        return value
+
+    def _delete(self, key: str) -> bool:
+        existed = self._alive(key)
+        self.data.pop(key, None)
+        self.expires.pop(key, None)
+        return existed
+
+    def _drop_if_empty(self, key: str):
+        if key in self.data and not self.data[key]:
+            self._delete(key)
+
+    # ---- 命令 ----
+
+    def execute(self, command: List[Any]) -> Any:
+        if not command:
+            raise CommandError("ERR empty command")
+        name, args = str(command[0]).upper(), command[1:]
+        handler = getattr(self, f"cmd_{name.lower()}", None)
+        if handler is None:
+            raise CommandError(f"ERR unknown command '{name}'")
+        try:
+            return handler(*args)
+        except TypeError:
+            raise CommandError(f"ERR wrong number of arguments for '{name.lower()}' command")
+
+    def cmd_ping(self, message=None):
+        return "PONG" if message is None else _str(message)
+
+    def cmd_echo(self, message):
+        return _str(message)
+
+    def cmd_dbsize(self):
+        return sum(1 for key in list(self.data) if self._alive(key))
+
+    def cmd_flushall(self, *args):
+        self.data.clear()
+        self.expires.clear()
+        return "OK"
+
+    cmd_flushdb = cmd_flushall
+
+    def cmd_keys(self, pattern):
+        return [key for key in list(self.data) if self._alive(key) and fnmatch.fnmatchcase(key, _str(pattern))]
+
+    def cmd_exists(self, *keys):
+        return sum(1 for key in keys if self._alive(_str(key)))
+
+    def cmd_del(self, *keys):
+        if not keys:
+            raise TypeError
+        return sum(1 for key in keys if self._delete(_str(key)))
+
+    def cmd_type(self, key):
+        if not self._alive(_str(key)):
+            return "none"
+        return {str: "string", set: "set", SortedSet: "zset", dict: "hash"}[type(self.data[_str(key)])]
+
+    def cmd_pexpire(self, key, milliseconds):
+        if not self._alive(_str(key)):
+            return 0
+        self.expires[_str(key)] = time.monotonic() + int(milliseconds) / 1000
+        return 1
+
+    def cmd_expire(self, key, seconds):
+        return self.cmd_pexpire(key, int(seconds) * 1000)
+
+    def cmd_get(self, key):
+        return self._get(_str(key), str)
+
+    def cmd_set(self, key, value, *options):
+        key = _str(key)
+        nx = xx = get = False
+        expire_ms = None
+        opts = [_str(o).upper() for o in options]
+        i = 0
+        while i < len(opts):
+            if opts[i] == "NX":
+                nx = True
+            elif opts[i] == "XX":
+                xx = True
+            elif opts[i] == "GET":
+                get = True
+            elif opts[i] in ("EX", "PX") and i + 1 < len(opts):
+                expire_ms = int(opts[i + 1]) * (1000 if opts[i] == "EX" else 1)
+                i += 1
+            else:
+                raise CommandError("ERR syntax error")
+            i += 1
+        old = self._get(key, str) if get else None
+        exists = self._alive(key)
+        if (nx and exists) or (xx and not exists):
+            return old if get else None
+        self.data[key] = _str(value)
+        self.expires.pop(key, None)
+        if expire_ms is not None:
+            self.expires[key] = time.monotonic() + expire_ms / 1000
+        return old if get else "OK"
+
+    def cmd_mget(self, *keys):
+        if not keys:
+            raise TypeError
+        return [self._get(_str(key), str) for key in keys]
+
+    def cmd_mset(self, *pairs):
+        if not pairs or len(pairs) % 2:
+            raise TypeError
+        for key, value in zip(pairs[::2], pairs[1::2]):
+            self.data[_str(key)] = _str(value)
+            self.expires.pop(_str(key), None)
+        return "OK"
+
+    def cmd_incrby(self, key, amount):
+        value = int(self._get(_str(key), str) or 0) + int(amount)
+        self.data[_str(key)] = str(value)
+        return value
+
+    def cmd_incr(self, key):
+        return self.cmd_incrby(key, 1)
+
+    def cmd_sadd(self, key, *members):
+        if not members:
+            raise TypeError
+        values = self._get_or_create(_str(key), set)
+        before = len(values)
+        values.update(_str(m) for m in members)
+        return len(values) - before
+
+    def cmd_srem(self, key, *members):
+        values = self._get(_str(key), set)
+        if values is None:
+            return 0
+        removed = sum(1 for m in members if _str(m) in values and not values.discard(_str(m)))
+        self._drop_if_empty(_str(key))
+        return removed
+
+    def cmd_smembers(self, key):
+        return sorted(self._get(_str(key), set) or ())
+
+    def cmd_scard(self, key):
+        return len(self._get(_str(key), set) or ())
+
+    def cmd_sismember(self, key, member):
+        return int(_str(member) in (self._get(_str(key), set) or ()))
+
+    def cmd_zadd(self, key, *args):
+        args = list(args)
+        while args and _str(args[0]).upper() in ("NX", "XX", "GT", "LT", "CH", "INCR"):
+            raise CommandError(f"ERR ZADD option {_str(args[0]).upper()} is not supported by the stand-in")
+        if not args or len(args) % 2:
+            raise TypeError
+        zset = self._get_or_create(_str(key), SortedSet)
+        return sum(1 for score, member in zip(args[::2], args[1::2]) if zset.add(_str(member), float(score)))
+
+    def cmd_zrem(self, key, *members):
+        zset = self._get(_str(key), SortedSet)
+        if zset is None:
+            return 0
+        removed = sum(1 for m in members if zset.remove(_str(m)))
+        self._drop_if_empty(_str(key))
+        return removed
+
+    def cmd_zcard(self, key):
+        return len(self._get(_str(key), SortedSet) or ())
+
+    def cmd_zscore(self, key, member):
+        zset = self._get(_str(key), SortedSet)
+        score = zset.scores.get(_str(member)) if zset else None
+        return None if score is None else _score(score)
+
+    def cmd_zrange(self, key, start, stop, *options):
+        opts = [_str(o).upper() for o in options]
+        if any(o not in ("REV", "WITHSCORES") for o in opts):
+            raise CommandError("ERR only index ranges with REV / WITHSCORES are supported by the stand-in")
+        zset = self._get(_str(key), SortedSet)
+        if zset is None:
+            return []
+        ordered = zset.ordered
+        begin, end = _range(int(start), int(stop), len(ordered))
+        if "REV" in opts:
+            n = len(ordered)
+            items = [ordered[n - 1 - i] for i in range(begin, end)] if begin < end else []
+        else:
+            items = ordered[begin:end] if begin < end else []
+        if "WITHSCORES" in opts:
+            return [value for score, member in items for value in (member, _score(score))]
+        return [member for _, member in items]
+
+    def cmd_zrevrange(self, key, start, stop, *options):
+        return self.cmd_zrange(key, start, stop, "REV", *options)
+
+    def cmd_hset(self, key, *pairs):
+        if not pairs or len(pairs) % 2:
+            raise TypeError
+        values = self._get_or_create(_str(key), dict)
+        added = 0
+        for field, value in zip(pairs[::2], pairs[1::2]):
+            added += _str(field) not in values
+            values[_str(field)] = _str(value)
+        return added
+
+    def cmd_hget(self, key, field):
+        return (self._get(_str(key), dict) or {}).get(_str(field))
+
+    def cmd_hgetall(self, key):
+        return [value for pair in (self._get(_str(key), dict) or {}).items() for value in pair]
+
+    def cmd_hincrby(self, key, field, amount):
+        values = self._get_or_create(_str(key), dict)
+        value = int(values.get(_str(field), 0)) + int(amount)
+        values[_str(field)] = str(value)
+        return value
+
+    def cmd_eval(self, script, numkeys, *rest):
+        """不解释 Lua，只按内容识别 kv-records.ts 用到的两个脚本：持锁写入、按 token 释放锁"""
+        script = _str(script)
+        keys = [_str(k) for k in rest[:int(numkeys)]]
+        args = [_str(a) for a in rest[int(numkeys):]]
+        if self.cmd_get(keys[0]) != args[0]:
+            return 0
+        if "cjson.decode" in script:
+            for i, command in enumerate(json.loads(args[1])):
+                self.execute([command[0], keys[i + 1], *command[1:]])
+            self._delete(keys[0])
+            return 1
+        if "redis.call('DEL', KEYS[1])" in script:
+            return int(self._delete(keys[0]))
+        raise CommandError("ERR unsupported script (mock KV only runs the storage layer's scripts)")
+
+
+class ServerStats:
+    """按接口统计请求数、命令数和字节数"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = Counter()
+        self.commands = Counter()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.errors = 0
+
+    def observe(self, endpoint: str, commands: List[List[Any]], bytes_in: int, bytes_out: int, errors: int):
+        with self.lock:
+            self.requests[endpoint] += 1
+            for command in commands:
+                if command:
+                    self.commands[str(command[0]).upper()] += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.errors += errors
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return {"requests": sum(self.requests.values()), "requests_by_endpoint": dict(self.requests),
+                    "commands": sum(self.commands.values()), "commands_by_name": dict(self.commands),
+                    "bytes_in": self.bytes_in, "bytes_out": self.bytes_out, "errors": self.errors}
+
+
+def _encode(value: Any) -> Any:
+    """Upstash-Encoding: base64 时字符串结果按 base64 返回（数字和 null 原样）"""
+    if isinstance(value, str):
+        return base64.b64encode(value.encode("utf-8")).decode("ascii")
+    if isinstance(value, list):
+        return [_encode(v) for v in value]
+    return value
+
+
+def make_handler(store: KVStore, stats: ServerStats, token: Optional[str], latency: float):
+    class KVHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, body: Any) -> int:
+            payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return len(payload)
+
+        def _run(self, command: List[Any], base64_results: bool) -> Dict[str, Any]:
+            try:
+                result = store.execute(command)
+                return {"result": _encode(result) if base64_results else result}
+            except CommandError as e:
+                return {"error": str(e)}
+            except (ValueError, TypeError):
+                return {"error": "ERR value is not an integer or out of range"}
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/__stats":
+                with store.lock:
+                    keys = store.cmd_dbsize()
+                self._send_json(200, dict(stats.snapshot(), keys=keys))
+            else:
+                self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            raw = self.rfile.read(length)
+            path = self.path.split("?")[0].rstrip("/") or "/"
+
+            if path == "/__stats/reset":
+                stats.reset()
+                self._send_json(200, {"result": "OK"})
+                return
+            if token and self.headers.get("Authorization") != f"Bearer {token}":
+                self._send_json(401, {"error": "Unauthorized"})
+                return
+            try:
+                body = json.loads(raw or b"null")
+            except ValueError:
+                self._send_json(400, {"error": "ERR invalid JSON body"})
+                return
+            if latency:
+                time.sleep(latency)
+
+            base64_results = self.headers.get("Upstash-Encoding", "").lower() == "base64"
+            if path in ("/pipeline", "/multi-exec"):
+                if not isinstance(body, list) or not all(isinstance(c, list) for c in body):
+                    self._send_json(400, {"error": "ERR expected an array of commands"})
+                    return
+                commands = body
+                with store.lock:
+                    results = [self._run(command, base64_results) for command in commands]
+                status, response = 200, results
+            elif path == "/":
+                if not isinstance(body, list):
+                    self._send_json(400, {"error": "ERR expected a command array"})
+                    return
+                commands = [body]
+                with store.lock:
+                    response = self._run(body, base64_results)
+                status = 400 if "error" in response else 200
+            else:
+                self._send_json(404, {"error": f"Unknown path {self.path}"})
+                return
+
+            errors = sum(1 for r in (response if isinstance(response, list) else [response]) if "error" in r)
+            sent = self._send_json(status, response)
+            stats.observe(path, commands, length, sent, errors)
+
+    return KVHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 KV 替身服务（Upstash Redis REST 协议）")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--token", default=os.environ.get("KV_REST_API_TOKEN", DEFAULT_TOKEN),
+                        help=f"要求的 Bearer token（默认读取 KV_REST_API_TOKEN，否则为 {DEFAULT_TOKEN}；空字符串不校验）")
+    parser.add_argument("--latency", type=float, default=0, help="每个 HTTP 请求的模拟网络延迟（毫秒），默认 0")
+    args = parser.parse_args()
+
+    store = KVStore()
+    stats = ServerStats()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(store, stats, args.token, args.latency / 1000.0))
+    server.daemon_threads = True
+
+    print("="*80)
+    print(" KV 替身服务（Upstash Redis REST）")
+    print("="*80)
+    print(f"地址: http://{args.host}:{args.port}  （KV_REST_API_URL）")
+    print(f"Token: {args.token or '不校验'}  （KV_REST_API_TOKEN）")
+    print(f"模拟延迟: {args.latency}ms / 请求")
+    print()
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\n请求统计: {stats.snapshot()}")
+
+
+if __name__ == "__main__":
+    main()
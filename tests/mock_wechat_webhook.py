@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+本地企业微信群机器人 Webhook 替身 - 用于测试批量发送任务（delivery-queue.ts）的吞吐、限速和重试
+接口同群机器人：POST /cgi-bin/webhook/send?key=<key>，成功返回 {"errcode": 0, "errmsg": "ok"}
+  - 每个 key 在 --rate-window 秒内超过 --rate-limit 条时返回 errcode 45009（群机器人默认 20 条/分钟）
+  - --fail-rate 的概率返回 errcode -1（系统繁忙），--http-error-rate 的概率返回 HTTP 502
+按 mentioned_list 里的用户统计送达次数（重复送达说明重试或恢复时发了两遍），另统计最大并发、
+任意一个窗口内的最多送达数：
+    GET  /__stats         当前统计
+    POST /__stats/reset   清零统计
+
+用法:
+    python mock_wechat_webhook.py --port 8791
+    python mock_wechat_webhook.py --rate-limit 20 --rate-window 60 --fail-rate 0.05 --latency 80
+    Webhook URL: http://127.0.0.1:8791/cgi-bin/webhook/send?key=local
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+import argparse
+import bisect
+import json
+import random
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, List
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8791
+SEND_PATH = "/cgi-bin/webhook/send"
+
+
+class WebhookState:
+    """限速窗口和送达统计（线程安全）"""
+
+    def __init__(self, rate_limit: int, rate_window: float, fail_rate: float, http_error_rate: float, seed: int):
+        self.lock = threading.Lock()
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.fail_rate = fail_rate
+        self.http_error_rate = http_error_rate
+        self.random = random.Random(seed)
+        self.reset()
+
+    def reset(self):
+        self.windows: Dict[str, Deque[float]] = defaultdict(deque)
+        self.deliveries: Counter = Counter()
+        self.delivered_at: List[float] = []
+        self.requests = 0
+        self.rate_limited = 0
+        self.busy = 0
+        self.http_errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.started = time.time()
+
+    def begin(self):
+        with self.lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def end(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def decide(self, key: str, user: str) -> Dict[str, Any]:
+        """决定这次请求的结果：HTTP 错误、限速、系统繁忙或送达"""
+        with self.lock:
+            roll = self.random.random()
+            if roll < self.http_error_rate:
+                self.http_errors += 1
+                return {"http_status": 502}
+            now = time.time()
+            window = self.windows[key]
+            while window and window[0] <= now - self.rate_window:
+                window.popleft()
+            if self.rate_limit and len(window) >= self.rate_limit:
+                self.rate_limited += 1
+                return {"errcode": 45009, "errmsg": "api freq out of limit"}
+            window.append(now)
+            if roll < self.http_error_rate + self.fail_rate:
+                self.busy += 1
+                return {"errcode": -1, "errmsg": "system busy"}
+            self.deliveries[user] += 1
+            self.delivered_at.append(now)
+            return {"errcode": 0, "errmsg": "ok"}
+
+    def max_per_window(self) -> int:
+        """任意 rate_window 秒内的最多送达条数"""
+        times = self.delivered_at
+        return max((bisect.bisect_left(times, t + self.rate_window) - i for i, t in enumerate(times)), default=0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            delivered = sum(self.deliveries.values())
+            span = self.delivered_at[-1] - self.delivered_at[0] if len(self.delivered_at) > 1 else 0
+            return {
+                "requests": self.requests,
+                "delivered": delivered,
+                "unique_users": len(self.deliveries),
+                "duplicates": delivered - len(self.deliveries),
+                "rate_limited": self.rate_limited,
+                "busy": self.busy,
+                "http_errors": self.http_errors,
+                "max_in_flight": self.max_in_flight,
+                "max_per_window": self.max_per_window(),
+                "rate_limit": self.rate_limit,
+                "rate_window": self.rate_window,
+                "delivery_span": round(span, 3),
+                "delivered_per_sec": round((delivered - 1) / span, 2) if span > 0 else None,
+            }
+
+
+def make_handler(state: WebhookState, latency: float):
+    class WebhookHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, body: Dict[str, Any]):
+            payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/__stats":
+                self._send_json(200, state.snapshot())
+            else:
+                self._send_json(404, {"errcode": 404, "errmsg": f"Unknown path {self.path}"})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            raw = self.rfile.read(length)
+            url = urlparse(self.path)
+
+            if url.path.rstrip("/") == "/__stats/reset":
+                state.reset()
+                self._send_json(200, {"errcode": 0, "errmsg": "ok"})
+                return
+            if url.path != SEND_PATH:
+                self._send_json(404, {"errcode": 404, "errmsg": f"Unknown path {self.path}"})
+                return
+            key = parse_qs(url.query).get("key", [""])[0]
+            if not key:
+                self._send_json(200, {"errcode": 93000, "errmsg": "invalid webhook url"})
+                return
+            try:
+                message = json.loads(raw or b"{}")
+                text = message.get(message.get("msgtype", "text"), {})
+                user = (text.get("mentioned_list") or [text.get("content", "")])[0]
+            except (ValueError, AttributeError):
+                self._send_json(200, {"errcode": 40008, "errmsg": "invalid message type"})
+                return
+
+            state.begin()
+            try:
+                if latency:
+                    time.sleep(latency)
+                result = state.decide(key, user)
+            finally:
+                state.end()
+            if "http_status" in result:
+                self._send_json(result["http_status"], {"errcode": -1, "errmsg": "bad gateway"})
+            else:
+                self._send_json(200, result)
+
+    return WebhookHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地企业微信群机器人 Webhook 替身")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--rate-limit", type=int, default=20, help="每个 key 在窗口内最多送达条数，0 为不限，默认 20")
+    parser.add_argument("--rate-window", type=float, default=60.0, help="限速窗口（秒），默认 60")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="返回 errcode -1（系统繁忙）的概率，默认 0")
+    parser.add_argument("--http-error-rate", type=float, default=0.0, help="返回 HTTP 502 的概率，默认 0")
+    parser.add_argument("--latency", type=float, default=0, help="每个请求的模拟处理时间（毫秒），默认 0")
+    parser.add_argument("--seed", type=int, default=0, help="失败注入的随机种子，默认 0")
+    args = parser.parse_args()
+
+    state = WebhookState(args.rate_limit, args.rate_window, args.fail_rate, args.http_error_rate, args.seed)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state, args.latency / 1000.0))
+    server.daemon_threads = True
+
+    print("="*80)
+    print(" 企业微信群机器人 Webhook 替身")
+    print("="*80)
+    print(f"Webhook URL: http://{args.host}:{args.port}{SEND_PATH}?key=local")
+    print(f"限速: {args.rate_limit or '不限'} 条 / {args.rate_window} 秒")
+    print(f"失败注入: 系统繁忙 {args.fail_rate:.0%}，HTTP 502 {args.http_error_rate:.0%}；模拟处理时间 {args.latency}ms")
+    print()
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\n送达统计: {state.snapshot()}")
+
+
+if __name__ == "__main__":
+    main()
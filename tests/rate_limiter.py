@@ -0,0 +1,206 @@
+"""
+共享限流层 - 令牌桶限流器
+同时按每分钟请求数（RPM）和每分钟 token 数（TPM）限速，
+遇到 429 时按 Retry-After（或指数退避）暂停并临时降低速率，成功后逐步恢复
+"""
+
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from span_recorder import span
+
+# 默认配额，可用环境变量覆盖（0 表示不限制）
+DEFAULT_RPM = 60
+DEFAULT_TPM = 0
+
+
+class TokenBucket:
+    """令牌桶：容量为一分钟的配额，按秒匀速补充"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """预留 amount 个令牌（允许透支），返回需要等待的秒数"""
+        self._refill(now)
+        self.tokens -= amount
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+    def refund(self, amount: float):
+        """归还多扣的令牌（预估值大于实际用量时）"""
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class RateLimiter:
+    """线程安全的 RPM/TPM 限流器，带 429 自适应退避"""
+
+    def __init__(self, requests_per_minute: float = DEFAULT_RPM, tokens_per_minute: float = DEFAULT_TPM,
+                 max_retries: int = 5, base_backoff: float = 1.0, max_backoff: float = 60.0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._lock = threading.Lock()
+        self._request_bucket = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self._token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self._blocked_until = 0.0
+        self._consecutive_throttles = 0
+
+        self._stats = {
+            "requests": 0,
+            "throttled": 0,
+            "retries": 0,
+            "wait_time": 0.0,
+            "backoff_time": 0.0,
+        }
+
+    def acquire(self, estimated_tokens: int = 0) -> float:
+        """阻塞直到可以发出一个请求，返回实际等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._blocked_until - now)
+            backoff_wait = wait
+            if self._request_bucket:
+                wait = max(wait, self._request_bucket.reserve(1, now))
+            if self._token_bucket and estimated_tokens:
+                wait = max(wait, self._token_bucket.reserve(estimated_tokens, now))
+            self._stats["requests"] += 1
+            self._stats["wait_time"] += wait - backoff_wait
+            self._stats["backoff_time"] += backoff_wait
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def record_usage(self, estimated_tokens: int, usage: Optional[Dict[str, Any]]):
+        """用 API 返回的真实 usage 校正 TPM 令牌桶"""
+        if not self._token_bucket or not usage:
+            return
+        actual = usage.get("total_tokens")
+        if actual is None:
+            return
+        with self._lock:
+            if actual < estimated_tokens:
+                self._token_bucket.refund(estimated_tokens - actual)
+            else:
+                self._token_bucket.tokens -= actual - estimated_tokens
+
+    def on_throttled(self, retry_after: Optional[float] = None) -> float:
+        """收到 429：暂停所有请求并降低速率，返回退避秒数"""
+        with self._lock:
+            self._consecutive_throttles += 1
+            self._stats["throttled"] += 1
+            if retry_after is None:
+                backoff = self.base_backoff * (2 ** (self._consecutive_throttles - 1))
+                backoff = min(self.max_backoff, backoff) * random.uniform(0.8, 1.2)
+            else:
+                backoff = min(self.max_backoff, retry_after)
+            self._blocked_until = max(self._blocked_until, time.monotonic() + backoff)
+
+            # 乘性减速：服务端已经告诉我们超限了
+            for bucket in (self._request_bucket, self._token_bucket):
+                if bucket:
+                    bucket.rate = max(bucket.capacity / 600.0, bucket.rate * 0.7)
+            return backoff
+
+    def on_success(self):
+        """请求成功：加性恢复到配置的速率"""
+        with self._lock:
+            self._consecutive_throttles = 0
+            for bucket in (self._request_bucket, self._token_bucket):
+                if bucket:
+                    bucket.rate = min(bucket.capacity / 60.0, bucket.rate + bucket.capacity / 600.0)
+
+    def send(self, send_request: Callable[[], Any], estimated_tokens: int = 0):
+        """
+        按限流规则发送请求，遇到 429 自动退避重试
+        send_request 是无参函数，返回带 status_code / headers 的响应对象
+        """
+        response = None
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                with self._lock:
+                    self._stats["retries"] += 1
+            with span("rate_limit_wait" if attempt == 0 else "backoff"):  # 429 之后的等待计为退避
+                self.acquire(estimated_tokens)
+            response = send_request()
+            if response.status_code != 429:
+                self.on_success()
+                return response
+            self.on_throttled(parse_retry_after(response.headers.get("Retry-After")))
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        """本次运行的限流统计"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["wait_time"] = round(stats["wait_time"], 2)
+            stats["backoff_time"] = round(stats["backoff_time"], 2)
+            stats["requests_per_minute"] = self.requests_per_minute
+            stats["tokens_per_minute"] = self.tokens_per_minute
+            if self._request_bucket:
+                stats["current_rpm"] = round(self._request_bucket.rate * 60, 1)
+            return stats
+
+    def print_stats(self):
+        """打印限流统计"""
+        stats = self.stats()
+        print("限流统计:")
+        print(f"- 请求数: {stats['requests']} (重试 {stats['retries']} 次, 429 {stats['throttled']} 次)")
+        print(f"- 限速等待: {stats['wait_time']} 秒")
+        print(f"- 429 退避: {stats['backoff_time']} 秒")
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 头（秒数或 HTTP 日期）"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def estimate_request_tokens(messages: List[Dict[str, str]], max_tokens: int) -> int:
+    """粗略估算一次请求消耗的 token 数（中文约每字 1 token，按上限估计）"""
+    return sum(len(m["content"]) for m in messages) + max_tokens
+
+
+_rate_limiter: Optional[RateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """获取全局共享的限流器（配额读取 DEEPSEEK_RPM / DEEPSEEK_TPM 环境变量）"""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter(
+                requests_per_minute=float(os.environ.get("DEEPSEEK_RPM", DEFAULT_RPM)),
+                tokens_per_minute=float(os.environ.get("DEEPSEEK_TPM", DEFAULT_TPM)),
+            )
+        return _rate_limiter
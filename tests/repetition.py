@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+近似重复检测
+原来的重复率只统计完全相同的字符串，换个标点或改一两个字的重复得 0%；
+这里对每条回复取字符 n-gram（shingle），用 NumPy 批量计算 MinHash 签名，
+对话内直接两两比较，整个归档用 LSH 分桶找候选对，再用并查集聚成近似重复簇
+
+用法:
+    python repetition.py tests/ --threshold 0.5 --output repetition-report.md
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+import argparse
+import re
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from result_formats import find_result_files, iter_conversations, load_conversations, collect_responses
+
+SHINGLE_SIZE = 2          # 中文金句很短，用字符 bigram
+NUM_PERM = 64             # MinHash 签名长度
+LSH_BANDS = 16            # 16 段 x 4 行，相似度约 0.5 以上的对大概率落入同一个桶
+DEFAULT_THRESHOLD = 0.5   # 估算 Jaccard 相似度达到该值视为近似重复
+PAIRWISE_LIMIT = 500      # 不超过该数量时直接两两比较，否则走 LSH
+
+_SHINGLE_CHUNK = 65536    # 每批计算的 shingle 数（控制临时矩阵的内存）
+_STRIP = re.compile(r'[\s\W_]+', re.UNICODE)
+
+
+def normalize(text: str) -> str:
+    """去掉空白和标点，统一小写"""
+    return _STRIP.sub('', text).lower()
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> List[str]:
+    """字符 n-gram（短于 size 的文本整体作为一个 shingle）"""
+    text = normalize(text)
+    if len(text) <= size:
+        return [text]
+    return list({text[i:i + size] for i in range(len(text) - size + 1)})
+
+
+def jaccard(a: str, b: str, size: int = SHINGLE_SIZE) -> float:
+    """两条文本的精确 Jaccard 相似度（用于抽查 MinHash 估算值）"""
+    sa, sb = set(shingles(a, size)), set(shingles(b, size))
+    return len(sa & sb) / len(sa | sb)
+
+
+class MinHasher:
+    """批量 MinHash：h_i(x) = (a_i * x + b_i) mod 2^64 的高 32 位（multiply-shift 哈希族）"""
+
+    def __init__(self, num_perm: int = NUM_PERM, shingle_size: int = SHINGLE_SIZE, seed: int = 1):
+        if not 1 <= shingle_size <= 3:
+            raise ValueError("shingle_size 必须在 1-3 之间（每个 shingle 编码为一个 uint64）")
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+
+    def shingle_values(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        所有文本的 shingle 编码（每个字符 21 位码点拼成一个 uint64，size <= 3），
+        返回 (values, starts)：starts[i] 为第 i 个文本的第一个 shingle 在 values 中的位置
+        """
+        size = self.shingle_size
+        normalized = [normalize(t).ljust(size, '\0') for t in texts]
+        codes = np.frombuffer(''.join(normalized).encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+        lengths = np.fromiter((len(t) for t in normalized), dtype=np.int64, count=len(normalized))
+        text_starts = np.cumsum(lengths) - lengths
+
+        # 在整个拼接串上计算滑动窗口编码，再去掉跨越文本边界的窗口
+        window = codes[:len(codes) - size + 1].copy()
+        for offset in range(1, size):
+            window |= codes[offset:len(codes) - size + 1 + offset] << np.uint64(21 * offset)
+        counts = lengths - size + 1
+        starts = np.cumsum(counts) - counts
+        positions = np.repeat(text_starts - starts, counts) + np.arange(counts.sum())
+        return window[positions], starts
+
+    def signatures(self, texts: Sequence[str]) -> np.ndarray:
+        """返回 (len(texts), num_perm) 的 uint32 签名矩阵"""
+        result = np.empty((len(texts), self.num_perm), dtype=np.uint32)
+        if not len(texts):
+            return result
+        values, starts = self.shingle_values(texts)
+
+        # 按文本边界切批，每批对所有 shingle 同时计算全部哈希函数，再按文本分段取最小值
+        ends = np.append(starts[1:], len(values))
+        first = 0
+        while first < len(texts):
+            last = int(np.searchsorted(ends, starts[first] + _SHINGLE_CHUNK, side='right'))
+            last = max(last, first + 1)
+            lo, hi = starts[first], ends[last - 1]
+            with np.errstate(over='ignore'):
+                hashed = ((values[lo:hi, None] * self.a + self.b) >> np.uint64(32)).astype(np.uint32)
+            result[first:last] = np.minimum.reduceat(hashed, starts[first:last] - lo, axis=0)
+            first = last
+        return result
+
+
+DEFAULT_HASHER = MinHasher()
+
+
+def _pairwise_pairs(signatures: np.ndarray, threshold: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """两两比较全部签名，返回相似度 >= threshold 的 (i, j, sim)，i < j"""
+    n = len(signatures)
+    rows, cols, sims = [], [], []
+    block = max(1, 4_000_000 // max(1, n * signatures.shape[1]))
+    for start in range(0, n, block):
+        chunk = signatures[start:start + block]
+        similarity = (chunk[:, None, :] == signatures[None, :, :]).mean(axis=2)
+        i, j = np.nonzero(similarity >= threshold)
+        i += start
+        keep = i < j
+        rows.append(i[keep])
+        cols.append(j[keep])
+        sims.append(similarity[i[keep] - start, j[keep]])
+    if not rows:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0)
+    return np.concatenate(rows), np.concatenate(cols), np.concatenate(sims)
+
+
+def _lsh_pairs(signatures: np.ndarray, threshold: float, bands: int = LSH_BANDS
+               ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """LSH 分桶找候选对，再用完整签名验证，返回 (i, j, sim)，i < j"""
+    n, num_perm = signatures.shape
+    rows_per_band = num_perm // bands
+    weights = np.arange(1, rows_per_band + 1, dtype=np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+    candidates = []
+    for band in range(bands):
+        part = signatures[:, band * rows_per_band:(band + 1) * rows_per_band].astype(np.uint64)
+        with np.errstate(over='ignore'):
+            keys = (part * weights).sum(axis=1)
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        # 同一个桶在排序后连续：依次比较相隔 1、2、3... 的元素，直到没有同桶的对为止
+        offset = 1
+        while offset < n:
+            same = np.flatnonzero(sorted_keys[:-offset] == sorted_keys[offset:])
+            if not len(same):
+                break
+            candidates.append(np.stack([order[same], order[same + offset]], axis=1))
+            offset += 1
+
+    if not candidates:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0)
+    pairs = np.concatenate(candidates)
+    pairs.sort(axis=1)
+    pairs = np.unique(pairs[:, 0] * n + pairs[:, 1])
+    i, j = pairs // n, pairs % n
+    sims = (signatures[i] == signatures[j]).mean(axis=1)
+    keep = sims >= threshold
+    return i[keep], j[keep], sims[keep]
+
+
+def similar_pairs(signatures: np.ndarray, threshold: float = DEFAULT_THRESHOLD
+                  ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """估算相似度 >= threshold 的签名对（数量少时两两比较，否则 LSH）"""
+    if len(signatures) <= PAIRWISE_LIMIT:
+        return _pairwise_pairs(signatures, threshold)
+    return _lsh_pairs(signatures, threshold)
+
+
+def _components(n: int, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+    """并查集求连通分量，返回每个节点的根"""
+    parent = np.arange(n)
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in zip(i.tolist(), j.tolist()):
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+    return np.array([find(x) for x in range(n)])
+
+
+class RepetitionAnalysis:
+    """一组回复（按时间顺序）的近似重复分析结果"""
+
+    def __init__(self, texts: Sequence[str], threshold: float = DEFAULT_THRESHOLD,
+                 hasher: Optional[MinHasher] = None):
+        self.texts = list(texts)
+        self.threshold = threshold
+        hasher = hasher or DEFAULT_HASHER
+
+        # 完全相同（规范化后）的回复先合并，只对不同的文本计算签名
+        keys = [normalize(t) for t in self.texts]
+        unique_keys, self.first_index, self.unique_id = np.unique(np.array(keys, dtype=object),
+                                                                  return_index=True, return_inverse=True)
+        unique_texts = [self.texts[k] for k in self.first_index]
+        self.signatures = hasher.signatures(unique_texts)
+        self.pair_i, self.pair_j, self.pair_sim = similar_pairs(self.signatures, threshold)
+
+    def repeat_flags(self) -> np.ndarray:
+        """每条回复是否与更早的某条回复相同或近似"""
+        n = len(self.texts)
+        positions = np.arange(n)
+        first = self.first_index
+        # 每个文本的近似邻居中最早出现的位置
+        earliest_neighbor = np.full(len(first), n, dtype=np.int64)
+        np.minimum.at(earliest_neighbor, self.pair_i, first[self.pair_j])
+        np.minimum.at(earliest_neighbor, self.pair_j, first[self.pair_i])
+        exact = first[self.unique_id] < positions
+        near = earliest_neighbor[self.unique_id] < positions
+        return exact | near
+
+    def repetition_rate(self) -> float:
+        """近似重复率（%）：与之前某条回复相同或近似的回复占比"""
+        if not self.texts:
+            return 0.0
+        return round(float(self.repeat_flags().mean()) * 100, 1)
+
+    def clusters(self, min_size: int = 2) -> List[List[int]]:
+        """近似重复簇（回复下标列表），按簇大小降序"""
+        roots = _components(len(self.first_index), self.pair_i, self.pair_j)[self.unique_id]
+        groups: Dict[int, List[int]] = {}
+        for index, root in enumerate(roots.tolist()):
+            groups.setdefault(root, []).append(index)
+        return sorted((g for g in groups.values() if len(g) >= min_size), key=len, reverse=True)
+
+
+def near_repetition_rate(texts: Sequence[str], threshold: float = DEFAULT_THRESHOLD) -> float:
+    """对话内的近似重复率（%）"""
+    return RepetitionAnalysis(texts, threshold).repetition_rate()
+
+
+def analyze_results(data: Dict[str, Any], threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """逐个对话计算近似重复率"""
+    return [
+        {
+            "philosopher": c["philosopher"],
+            "test_id": c["test_id"],
+            "near_repetition_rate": near_repetition_rate(collect_responses(c), threshold),
+        }
+        for c in iter_conversations(data)
+    ]
+
+
+def load_replies(paths: Sequence[str]) -> List[Dict[str, Any]]:
+    """读取多个结果文件中的全部有效回复（附带来源）"""
+    replies = []
+    for path in paths:
+        try:
+            for conversation in load_conversations(path):
+                for round_data in conversation["rounds"]:
+                    text = round_data["ai_response"]
+                    if text and not text.startswith(("[API错误", "ERROR:")):
+                        replies.append({
+                            "text": text,
+                            "file": os.path.basename(path),
+                            "philosopher": conversation["philosopher"],
+                            "test_id": conversation["test_id"],
+                            "round": round_data.get("round"),
+                        })
+        except (OSError, ValueError):
+            continue
+    return replies
+
+
+def render_report(replies: List[Dict[str, Any]], analysis: RepetitionAnalysis, top: int = 20) -> str:
+    """生成归档级近似重复报告"""
+    clusters = analysis.clusters()
+    flags = analysis.repeat_flags()
+    lines = [
+        "# 金句式超级毒舌系统 - 近似重复分析\n",
+        f"**回复数**: {len(replies)}, **不同回复**: {len(analysis.first_index)}, "
+        f"**近似重复率**: {analysis.repetition_rate()}%, **阈值**: Jaccard >= {analysis.threshold}\n",
+        "## 按哲学家\n",
+        "| 哲学家 | 回复数 | 近似重复率 |",
+        "|:---|:---:|:---:|",
+    ]
+    by_philosopher: Dict[str, List[bool]] = {}
+    for reply, flag in zip(replies, flags.tolist()):
+        by_philosopher.setdefault(reply["philosopher"], []).append(flag)
+    for philosopher, values in sorted(by_philosopher.items()):
+        lines.append(f"| {philosopher} | {len(values)} | {sum(values) / len(values) * 100:.1f}% |")
+
+    lines.append(f"\n## 最大的 {min(top, len(clusters))} 个近似重复簇（共 {len(clusters)} 个）\n")
+    for rank, cluster in enumerate(clusters[:top], 1):
+        variants = {}
+        for index in cluster:
+            variants.setdefault(replies[index]["text"], []).append(replies[index])
+        philosophers = sorted({replies[index]["philosopher"] for index in cluster})
+        lines.append(f"### 簇 {rank}: {len(cluster)} 条回复, {len(variants)} 种写法, 哲学家: {', '.join(philosophers)}\n")
+        for text, sources in sorted(variants.items(), key=lambda item: -len(item[1]))[:5]:
+            lines.append(f"- ({len(sources)}次) {text}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检测结果归档中的近似重复回复")
+    parser.add_argument("paths", nargs="*", default=[os.path.dirname(os.path.abspath(__file__))],
+                        help="结果文件（.json / .jsonl）或目录（默认 tests/）")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="估算 Jaccard 相似度阈值")
+    parser.add_argument("--top", type=int, default=20, help="报告中展示的簇数")
+    parser.add_argument("--output", help="Markdown 报告输出路径（默认打印到终端）")
+    args = parser.parse_args()
+
+    files = []
+    for path in args.paths:
+        files.extend(find_result_files(path) if os.path.isdir(path) else [path])
+
+    start = time.time()
+    replies = load_replies(files)
+    loaded = time.time()
+    analysis = RepetitionAnalysis([r["text"] for r in replies], args.threshold)
+    markdown = render_report(replies, analysis, args.top)
+    elapsed = time.time() - loaded
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(markdown)
+        print(f"近似重复报告已保存到: {args.output}")
+    else:
+        print(markdown)
+    print(f"分析完成: {len(files)} 个文件, {len(replies)} 条回复, 读取 {loaded - start:.2f} 秒, 分析 {elapsed:.2f} 秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+回复缓存 - 按请求内容寻址的磁盘缓存，用于离线重放测试对话
+缓存键是 (model, messages（含系统提示词和历史）, temperature, max_tokens, penalties) 的 SHA-256，
+条目数超过上限时按最近使用时间（LRU）淘汰
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".response-cache")
+DEFAULT_MAX_ENTRIES = 5000
+
+# 参与缓存键计算的请求字段（stream 不影响回复内容，不参与）
+KEY_FIELDS = ("model", "messages", "temperature", "max_tokens", "frequency_penalty", "presence_penalty")
+
+# record: 先查缓存，未命中时调用 API 并写入
+# replay: 只读缓存，未命中直接报错（离线、确定性）
+# bypass: 不读也不写
+CACHE_MODES = ("record", "replay", "bypass")
+
+
+class CacheMissError(Exception):
+    """replay 模式下缓存未命中"""
+
+
+class ResponseCache:
+    """线程安全的磁盘回复缓存"""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, mode: str = "record", max_entries: int = DEFAULT_MAX_ENTRIES):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"未知的缓存模式: {mode}（可选 {', '.join(CACHE_MODES)}）")
+        self.cache_dir = cache_dir
+        self.mode = mode
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._entry_count = None
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+    @staticmethod
+    def make_key(payload: Dict[str, Any]) -> str:
+        """计算请求的缓存键"""
+        material = {field: payload.get(field) for field in KEY_FIELDS}
+        encoded = json.dumps(material, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def lookup(self, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """查找缓存的回复；bypass 模式总是返回 None，replay 模式未命中时抛出 CacheMissError"""
+        if self.mode == "bypass":
+            return None
+
+        key = self.make_key(payload)
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)  # 刷新最近使用时间，供 LRU 淘汰
+        except (OSError, ValueError):
+            with self._lock:
+                self._stats["misses"] += 1
+            if self.mode == "replay":
+                raise CacheMissError(f"缓存未命中: {key[:12]}")
+            return None
+
+        with self._lock:
+            self._stats["hits"] += 1
+        return entry["result"]
+
+    def store(self, payload: Dict[str, Any], result: Dict[str, Any]):
+        """写入一条回复（仅 record 模式）"""
+        if self.mode != "record":
+            return
+
+        key = self.make_key(payload)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"key": key, "request": {field: payload.get(field) for field in KEY_FIELDS}, "result": result},
+                      f, ensure_ascii=False)
+        existed = os.path.exists(path)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._stats["writes"] += 1
+            if self._entry_count is None:
+                self._entry_count = len(self._entry_paths())
+            elif not existed:
+                self._entry_count += 1
+            if self._entry_count > self.max_entries:
+                self._evict()
+
+    def _entry_paths(self):
+        paths = []
+        if not os.path.isdir(self.cache_dir):
+            return paths
+        for shard in os.listdir(self.cache_dir):
+            shard_dir = os.path.join(self.cache_dir, shard)
+            if os.path.isdir(shard_dir):
+                paths.extend(os.path.join(shard_dir, name) for name in os.listdir(shard_dir) if name.endswith(".json"))
+        return paths
+
+    def _evict(self):
+        """淘汰最久未使用的条目，一次淘汰到上限的 90%，避免每次写入都扫描目录"""
+        entries = []
+        for path in self._entry_paths():
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except OSError:
+                continue
+        entries.sort()
+        target = int(self.max_entries * 0.9)
+        for _, path in entries[:max(0, len(entries) - target)]:
+            try:
+                os.remove(path)
+                self._stats["evictions"] += 1
+            except OSError:
+                pass
+        self._entry_count = min(len(entries), target)
+
+    def stats(self) -> Dict[str, Any]:
+        """本次运行的缓存统计"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["mode"] = self.mode
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups * 100, 1) if lookups else 0.0
+        return stats
+
+    def print_stats(self):
+        """打印缓存统计"""
+        stats = self.stats()
+        print(f"缓存统计 ({stats['mode']}):")
+        print(f"- 命中: {stats['hits']} / 未命中: {stats['misses']} (命中率 {stats['hit_rate']}%)")
+        print(f"- 写入: {stats['writes']} / 淘汰: {stats['evictions']}")
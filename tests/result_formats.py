@@ -0,0 +1,145 @@
+"""
+测试结果格式适配
+各测试脚本输出的 JSON 结构不同（run_tests / streamlined_test / quick_test / test_freud_only / test_10_rounds），
+这里统一成 "对话 -> 轮次" 的迭代接口，供替身服务、归档分析等工具使用；
+JSONL 流式结果（result_stream.py）逐个对话读取，不会把整个文件载入内存
+"""
+
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from prompt_registry import PHILOSOPHER_NAMES
+from result_stream import iter_tests, read_header, read_footer
+
+
+def find_result_files(directory: str, recursive: bool = True) -> List[str]:
+    """查找目录下的结果文件（.json / .jsonl，排除测试用例定义和 -summary 报告）"""
+    paths = []
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = [d for d in dirs if not d.startswith('.') and d != 'node_modules']
+        for name in files:
+            if name.endswith(('.json', '.jsonl')) and name != 'test-cases.json':
+                paths.append(os.path.join(root, name))
+        if not recursive:
+            break
+    return sorted(paths)
+
+
+def normalize_round(round_data: Dict[str, Any]) -> Dict[str, Any]:
+    """统一单轮记录的字段名（test_10_rounds.py 使用 user / ai / char_count）"""
+    response = round_data.get("ai_response", round_data.get("ai", ""))
+    normalized = dict(round_data)
+    normalized["user_input"] = round_data.get("user_input", round_data.get("user", ""))
+    normalized["ai_response"] = response
+    normalized["response_length"] = round_data.get("response_length", round_data.get("char_count", len(response)))
+    normalized["response_time"] = round_data.get("response_time", 0)
+    return normalized
+
+
+def _guess_philosopher(test_name: str) -> Optional[str]:
+    """quick_test / test_freud_only 的结果只有中文测试名，按名字前缀推断哲学家"""
+    for philosopher_id, name in PHILOSOPHER_NAMES.items():
+        if test_name.startswith(name):
+            return philosopher_id
+    return None
+
+
+def _conversation(philosopher_id, test_id, test_name, rounds, start_time=None, source=None) -> Dict[str, Any]:
+    """source 为原始的测试结果（带 description / analysis 时一并保留）"""
+    source = source or {}
+    return {
+        "philosopher": philosopher_id or "unknown",
+        "test_id": test_id or test_name or "unknown",
+        "test_name": test_name or test_id or "unknown",
+        "description": source.get("description", ""),
+        "start_time": start_time,
+        "rounds": [normalize_round(r) for r in rounds],
+        "analysis": source.get("analysis") or {},
+    }
+
+
+def iter_conversations(data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """遍历任意格式结果文件中的对话，每个对话为 {philosopher, test_id, test_name, start_time, rounds}"""
+    philosophers = data.get("philosophers")
+
+    if isinstance(philosophers, dict):
+        # run_tests.py / async_runner.py / wave_scheduler.py
+        for philosopher_id, philosopher in philosophers.items():
+            for result in philosopher["results"]:
+                yield _conversation(philosopher_id, result.get("test_id"), result.get("test_name"),
+                                    result["rounds"], result.get("start_time"), result)
+    elif isinstance(philosophers, list):
+        # streamlined_test.py
+        for result in philosophers:
+            yield _conversation(result.get("philosopher_id"), result.get("test_id"), result.get("test_name"),
+                                result["rounds"], result.get("start_time"), result)
+    elif "rounds" in data:
+        # quick_test.py / test_freud_only.py
+        test_name = data.get("test_name", "")
+        yield _conversation(_guess_philosopher(test_name), None, test_name, data["rounds"], data.get("test_time"), data)
+    else:
+        # test_10_rounds.py：{philosopher_id: {"details": [...]}}
+        for philosopher_id, value in data.items():
+            if isinstance(value, dict) and "details" in value:
+                yield _conversation(philosopher_id, None, "10轮对话测试", value["details"], source=value)
+
+
+def _iter_stream_conversations(path: str) -> Iterator[Dict[str, Any]]:
+    for test in iter_tests(path):
+        yield _conversation(test["philosopher"], test["test_id"], test.get("test_name"), test["rounds"],
+                            test.get("start_time"), test)
+
+
+def open_result_file(path: str) -> Tuple[Dict[str, Any], Iterator[Dict[str, Any]]]:
+    """
+    打开任意格式的结果文件，返回 (整体信息, 对话迭代器)
+    JSONL 只读 header / footer，对话逐个流式读取；JSON 整体解析一次
+    整体信息可以直接传给 suite_start_time / suite_prompt_version
+    """
+    if path.endswith('.jsonl'):
+        return {**read_header(path), **read_footer(path)}, _iter_stream_conversations(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        return {}, iter(())
+    return data, iter_conversations(data)
+
+
+def load_conversations(path: str) -> Iterator[Dict[str, Any]]:
+    """逐个读取结果文件中的对话"""
+    return open_result_file(path)[1]
+
+
+def load_rounds(path: str) -> Iterator[Dict[str, Any]]:
+    """逐轮读取结果文件（附带所属的哲学家和测试用例）"""
+    for conversation in load_conversations(path):
+        for round_data in conversation["rounds"]:
+            yield dict(round_data, philosopher=conversation["philosopher"], test_id=conversation["test_id"])
+
+
+def suite_start_time(data: Dict[str, Any]) -> Optional[str]:
+    """结果文件的开始时间（ISO 格式），没有时返回 None"""
+    return data.get("start_time") or data.get("test_time")
+
+
+def suite_prompt_version(data: Dict[str, Any]) -> str:
+    """结果文件对应的提示词版本（旧文件没有 prompt_version 时退回测试版本号）"""
+    if data.get("prompt_version"):
+        return data["prompt_version"]
+    if data.get("version"):
+        return f"v{data['version']}"
+    return "unknown"
+
+
+def iter_rounds(data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """遍历结果文件中的所有轮次（附带所属的哲学家和测试用例）"""
+    for conversation in iter_conversations(data):
+        for round_data in conversation["rounds"]:
+            yield dict(round_data, philosopher=conversation["philosopher"], test_id=conversation["test_id"])
+
+
+def collect_responses(conversation: Dict[str, Any]) -> List[str]:
+    """对话中所有有效的 AI 回复（排除 API 错误）"""
+    return [r["ai_response"] for r in conversation["rounds"]
+            if r["ai_response"] and not r["ai_response"].startswith(("[API错误", "ERROR:"))]
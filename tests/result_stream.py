@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+流式测试结果（JSONL）
+测试过程中每完成一轮写一行，不再把整套结果拼成一个嵌套 dict 最后再 json.dump；
+读取端都是生成器，总结报告、display_results.py、analyze_archive.py 等工具逐行消费，
+内存只与同时进行的对话数有关，与结果文件大小无关。需要旧格式时用 export 导出嵌套 JSON
+
+文件格式（每行一个 JSON 对象；header / round 行与断点文件相同，断点文件也能直接读取）:
+    {"type": "header", "test_suite": ..., "version": ..., "prompt_version": ..., "start_time": ...}
+    {"type": "test", "philosopher": ..., "test": {new_test_result 去掉 rounds / analysis 的部分}}
+    {"type": "round", "philosopher": ..., "test_id": ..., "record": {make_round_record 的结果}}
+    {"type": "analysis", "philosopher": ..., "test_id": ..., "analysis": {...}, "end_time": ...}
+    {"type": "footer", "end_time": ..., "http": {...}, ...}
+
+用法:
+    python result_stream.py export test-results-20251028-094036.jsonl -o test-results-20251028-094036.json
+    python result_stream.py convert test-results-20251028-094036.json -o test-results-20251028-094036.jsonl
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+import argparse
+import json
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from prompt_registry import PHILOSOPHER_NAMES
+
+RESULT_FORMATS = ("json", "jsonl")
+
+# 写在 header 里的整套测试字段，其余字段（end_time、http、scheduler 等）在结束时写进 footer
+HEADER_KEYS = ("test_suite", "version", "prompt_version", "start_time", "checkpoint", "preset", "length_range")
+
+# 找 footer 时从文件末尾读取的字节数
+_TAIL_BYTES = 64 * 1024
+
+
+def add_result_arguments(parser: argparse.ArgumentParser):
+    """为测试脚本添加结果输出格式参数"""
+    group = parser.add_argument_group("结果输出")
+    group.add_argument("--format", choices=RESULT_FORMATS, default="json",
+                       help="json 为结束时一次写出的嵌套 JSON（默认）；jsonl 为边跑边写的流式结果，"
+                            "可用 result_stream.py export 导出为 json")
+
+
+def _dumps(entry: Dict[str, Any]) -> str:
+    return json.dumps(entry, ensure_ascii=False) + "\n"
+
+
+class ResultWriter:
+    """逐行写入测试结果（线程安全，每行立即写盘）"""
+
+    def __init__(self, path: str, suite: Dict[str, Any]):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'w', encoding='utf-8')
+        self._write({"type": "header", **{k: v for k, v in suite.items() if k != "philosophers"}})
+
+    def _write(self, entry: Dict[str, Any]):
+        with self._lock:
+            self._file.write(_dumps(entry))
+            self._file.flush()
+
+    def begin_test(self, test_result: Dict[str, Any]):
+        """记录测试用例开始（new_test_result 的骨架）"""
+        self._write({"type": "test", "philosopher": test_result["philosopher"],
+                     "test": {k: v for k, v in test_result.items() if k not in ("rounds", "analysis")}})
+
+    def write_round(self, philosopher_id: str, test_id: str, record: Dict[str, Any]):
+        self._write({"type": "round", "philosopher": philosopher_id, "test_id": test_id, "record": record})
+
+    def end_test(self, test_result: Dict[str, Any]):
+        """记录测试用例的分析结果"""
+        self._write({"type": "analysis", "philosopher": test_result["philosopher"], "test_id": test_result["test_id"],
+                     "analysis": test_result["analysis"], "end_time": test_result.get("end_time")})
+
+    def close(self, **footer):
+        """写入 footer（结束时间、HTTP 统计等）并关闭文件"""
+        self._write({"type": "footer", **footer})
+        self._file.close()
+
+
+def read_records(path: str) -> Iterator[Dict[str, Any]]:
+    """逐行读取记录（跳过写到一半被中断的行）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def read_header(path: str) -> Dict[str, Any]:
+    for record in read_records(path):
+        return record if record.get("type") == "header" else {}
+    return {}
+
+
+def read_footer(path: str) -> Dict[str, Any]:
+    """只读文件末尾找 footer，不扫描整个文件；没有 footer（运行被中断）时返回 {}"""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - _TAIL_BYTES))
+        lines = f.read().splitlines()
+    for line in reversed(lines):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        return record if record.get("type") == "footer" else {}
+    return {}
+
+
+def _skeleton(philosopher_id: str, test_id: str) -> Dict[str, Any]:
+    """没有 test 行（断点文件）时的测试用例骨架"""
+    return {"test_id": test_id, "philosopher": philosopher_id, "test_name": test_id, "description": "",
+            "start_time": None}
+
+
+def _finish(test: Dict[str, Any], rounds: Dict[int, Dict[str, Any]], analysis: Optional[Dict[str, Any]]):
+    test["rounds"] = [rounds[n] for n in sorted(rounds)]  # 续跑时同一轮可能写了多次，以最后一次为准
+    test["analysis"] = analysis["analysis"] if analysis else {}
+    if analysis and analysis.get("end_time"):
+        test["end_time"] = analysis["end_time"]
+    return test
+
+
+def iter_tests(path: str, philosopher_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    按完成顺序逐个产出测试用例结果（与 new_test_result 的结构相同，含 rounds 和 analysis）
+    只缓存尚未结束的对话；文件末尾仍未结束的对话（运行被中断）最后产出，analysis 为空
+    """
+    tests: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    rounds: Dict[Tuple[str, str], Dict[int, Dict[str, Any]]] = {}
+
+    for record in read_records(path):
+        kind = record.get("type")
+        if kind not in ("test", "round", "analysis"):
+            continue
+        if philosopher_id is not None and record["philosopher"] != philosopher_id:
+            continue
+        test_id = record["test"]["test_id"] if kind == "test" else record["test_id"]
+        key = (record["philosopher"], test_id)
+        if kind == "test":
+            tests[key] = dict(record["test"])
+            rounds.setdefault(key, {})
+        elif kind == "round":
+            rounds.setdefault(key, {})[record["record"]["round"]] = record["record"]
+        else:
+            test = tests.pop(key, None) or _skeleton(*key)
+            yield _finish(test, rounds.pop(key, {}), record)
+
+    for key, test_rounds in rounds.items():
+        yield _finish(tests.get(key) or _skeleton(*key), test_rounds, None)
+
+
+def philosopher_ids(path: str) -> List[str]:
+    """文件中出现的哲学家（按首次出现的顺序）"""
+    seen: Dict[str, None] = {}
+    for record in read_records(path):
+        if record.get("type") in ("test", "round", "analysis"):
+            seen.setdefault(record["philosopher"], None)
+    return list(seen)
+
+
+class StreamedSuite:
+    """JSONL 结果文件的只读视图：info 为 header + footer，tests() 每次调用都重新流式读取文件"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.info = {k: v for k, v in {**read_header(path), **read_footer(path)}.items() if k != "type"}
+        self.info.setdefault("end_time", None)
+
+    def philosophers(self) -> List[str]:
+        return philosopher_ids(self.path)
+
+    def tests(self, philosopher_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        return iter_tests(self.path, philosopher_id)
+
+
+class NestedSuite:
+    """旧的嵌套结果 dict（run_tests.py 格式），提供与 StreamedSuite 相同的接口"""
+
+    def __init__(self, data: Dict[str, Any]):
+        self.data = data
+        self.info = {k: v for k, v in data.items() if k != "philosophers"}
+
+    def philosophers(self) -> List[str]:
+        return list(self.data["philosophers"])
+
+    def tests(self, philosopher_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        for pid, philosopher in self.data["philosophers"].items():
+            if philosopher_id is None or pid == philosopher_id:
+                yield from philosopher["results"]
+
+
+def as_suite(results):
+    """结果 dict、JSONL 路径或已经包装好的 suite 统一成 suite 接口"""
+    if isinstance(results, (StreamedSuite, NestedSuite)):
+        return results
+    if isinstance(results, str):
+        return StreamedSuite(results)
+    return NestedSuite(results)
+
+
+def export_legacy(path: str) -> Dict[str, Any]:
+    """把 JSONL 结果导出为 run_tests.py 的嵌套格式（需要把整套结果放进内存）"""
+    suite = StreamedSuite(path)
+    data = {k: v for k, v in suite.info.items() if k in HEADER_KEYS}
+    data["philosophers"] = {}
+    for philosopher_id in suite.philosophers():
+        results = list(suite.tests(philosopher_id))
+        data["philosophers"][philosopher_id] = {
+            "name": PHILOSOPHER_NAMES.get(philosopher_id, philosopher_id),
+            "test_count": len(results),
+            "results": results,
+        }
+    data.update((k, v) for k, v in suite.info.items() if k not in HEADER_KEYS)
+    return data
+
+
+def convert_legacy(data: Dict[str, Any], path: str):
+    """把 run_tests.py 格式的嵌套结果写成 JSONL"""
+    suite = NestedSuite(data)
+    writer = ResultWriter(path, {k: v for k, v in suite.info.items() if k in HEADER_KEYS})
+    for test in suite.tests():
+        writer.begin_test(test)
+        for record in test["rounds"]:
+            writer.write_round(test["philosopher"], test["test_id"], record)
+        writer.end_test(test)
+    writer.close(**{k: v for k, v in suite.info.items() if k not in HEADER_KEYS})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSONL 流式结果与旧的嵌套 JSON 结果互相转换")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export = subparsers.add_parser("export", help="JSONL -> 嵌套 JSON")
+    export.add_argument("path")
+    export.add_argument("-o", "--output", help="输出路径（默认同名 .json）")
+    convert = subparsers.add_parser("convert", help="嵌套 JSON（run_tests.py 格式）-> JSONL")
+    convert.add_argument("path")
+    convert.add_argument("-o", "--output", help="输出路径（默认同名 .jsonl）")
+    args = parser.parse_args()
+
+    stem = os.path.splitext(args.path)[0]
+    if args.command == "export":
+        output = args.output or stem + ".json"
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(export_legacy(args.path), f, ensure_ascii=False, indent=2)
+    else:
+        with open(args.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if not isinstance(data.get("philosophers"), dict):
+            raise SystemExit("只支持 run_tests.py / async_runner.py / wave_scheduler.py 格式的结果文件")
+        output = args.output or stem + ".jsonl"
+        convert_legacy(data, output)
+    print(f"已保存到: {output}")
+
+
+if __name__ == "__main__":
+    main()
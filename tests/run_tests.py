@@ -1,96 +1,82 @@
 #!/usr/bin/env python3
 """
 金句式超级毒舌系统 - 自动化测试脚本
-运行所有测试用例并生成详细报告
+测试用例、单轮请求、分析和总结报告等公共部分；执行循环在 runner 包（统一执行器）里，
+直接运行本文件等价于 python -m runner --preset full
 """
 
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
 import json
-import requests
-import time
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Sequence
+
+from http_client import get_client
+from response_cache import CacheMissError
+from prompt_registry import build_jinju_system_prompt, prompt_version
+from latency_stats import LatencyProfile, response_time_fields, merge_profiles, format_latency_section
+from token_profiler import Thresholds, round_usage, usage_fields, profile_rounds, format_token_section
+from repetition import near_repetition_rate
+from checkpoint import Checkpoint
+from result_stream import HEADER_KEYS, ResultWriter, StreamedSuite, as_suite
+from span_recorder import span, export_trace
 
-# DeepSeek API 配置
-DEEPSEEK_API_URL = "https://api.deepseek.com/v1"
-DEEPSEEK_API_KEY = "sk-83f3cb9e7ecc486b84626ce35aa7213b"
-DEEPSEEK_MODEL = "deepseek-chat"
+# 路径配置（相对于本文件，兼容 /home/ubuntu/the-toxic-philosopher 之外的检出位置）
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # 加载测试用例
-with open('/home/ubuntu/the-toxic-philosopher/tests/test-cases.json', 'r', encoding='utf-8') as f:
+with open(os.path.join(TESTS_DIR, 'test-cases.json'), 'r', encoding='utf-8') as f:
     TEST_CASES = json.load(f)
 
-# 加载哲学家提示词
-with open('/home/ubuntu/the-toxic-philosopher/client/src/lib/ai-service.ts', 'r', encoding='utf-8') as f:
-    content = f.read()
-    # 提取提示词（简化版，实际会从代码中解析）
-    PHILOSOPHER_PROMPTS = {
-        'socrates': '苏格拉底',
-        'nietzsche': '尼采',
-        'wittgenstein': '维特根斯坦',
-        'kant': '康德',
-        'freud': '弗洛伊德'
-    }
+# 哲学家名称
+PHILOSOPHER_PROMPTS = {
+    'socrates': '苏格拉底',
+    'nietzsche': '尼采',
+    'wittgenstein': '维特根斯坦',
+    'kant': '康德',
+    'freud': '弗洛伊德'
+}
 
 
 def call_deepseek_api(messages: List[Dict[str, str]], temperature: float = 1.0) -> str:
     """调用 DeepSeek API"""
+    return request_round(messages, temperature)["content"]
+
+
+def request_round(messages: List[Dict[str, str]], temperature: float = 1.0, **chat_options) -> Dict[str, Any]:
+    """
+    调用 DeepSeek API，返回回复内容、token 用量（API 没有返回时本地估算）及 connect/TTFB/total 耗时拆分
+    chat_options 原样传给 DeepSeekClient.chat（max_tokens、frequency_penalty 等）
+    --cache replay 下缓存未命中不算模型错误，CacheMissError 直接抛出，由执行器中止整次运行
+    """
     try:
-        response = requests.post(
-            f"{DEEPSEEK_API_URL}/chat/completions",
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {DEEPSEEK_API_KEY}"
-            },
-            json={
-                "model": DEEPSEEK_MODEL,
-                "messages": messages,
-                "temperature": temperature,
-                "max_tokens": 80,
-                "frequency_penalty": 0.7,
-                "presence_penalty": 0.4
-            },
-            timeout=30
-        )
-        response.raise_for_status()
-        return response.json()['choices'][0]['message']['content']
+        with span("request"):
+            result = get_client().chat(messages, temperature=temperature, **chat_options)
+        return dict(result, usage=round_usage(messages, result["content"], result.get("usage")))
+    except CacheMissError:
+        raise
     except Exception as e:
-        return f"[API错误: {str(e)}]"
+        return {"content": f"[API错误: {str(e)}]", "usage": None, "timing": {}}
 
 
-def run_single_test(philosopher_id: str, test_case: Dict[str, Any]) -> Dict[str, Any]:
-    """运行单个测试用例"""
-    print(f"\n{'='*80}")
-    print(f"测试: {test_case['name']} ({test_case['test_id']})")
-    print(f"哲学家: {PHILOSOPHER_PROMPTS[philosopher_id]}")
-    print(f"{'='*80}\n")
-    
-    # 读取完整的系统提示词
-    with open('/home/ubuntu/the-toxic-philosopher/client/src/lib/ai-service.ts', 'r', encoding='utf-8') as f:
-        content = f.read()
-        # 提取对应哲学家的提示词（简化处理）
-        start_marker = f'{philosopher_id}: `'
-        end_marker = '`,'
-        start_idx = content.find(start_marker)
-        if start_idx != -1:
-            start_idx += len(start_marker)
-            end_idx = content.find(end_marker, start_idx)
-            system_prompt = content[start_idx:end_idx]
-        else:
-            system_prompt = f"你是{PHILOSOPHER_PROMPTS[philosopher_id]}"
-    
-    # 添加金句式回复要求
-    full_system_prompt = f"""{system_prompt}
-
-**金句式回复要求**：
-- **严格控制在15-30字**，一句话说完，不拖泥带水
-- 短、狠、准，像匕首一样一刀见血
-- 攻击思维、选择、行为、自欺，不侮辱人格
-- 每次回复都要让对方感到刺痛，但无法反驳
-- 绝对不要重复之前的表述
-- **禁止使用人身攻击词汇**（废物、蠢货、白痴等）"""
-    
-    conversation_history = []
-    results = {
+def load_system_prompt(philosopher_id: str) -> str:
+    """获取哲学家的生产系统提示词，并附加金句式回复要求（提示词注册表已缓存，不会重复读文件）"""
+    return build_jinju_system_prompt(philosopher_id)
+
+
+def build_messages(system_prompt: str, conversation_history: List[Dict[str, str]], question: str) -> List[Dict[str, str]]:
+    """构建一轮请求的消息列表"""
+    messages = [{"role": "system", "content": system_prompt}]
+    messages.extend(conversation_history[-30:])  # 保留最近15轮（30条消息）
+    messages.append({"role": "user", "content": question})
+    return messages
+
+
+def new_test_result(philosopher_id: str, test_case: Dict[str, Any]) -> Dict[str, Any]:
+    """创建单个测试用例的结果骨架"""
+    return {
         "test_id": test_case['test_id'],
         "philosopher": philosopher_id,
         "test_name": test_case['name'],
@@ -99,177 +85,279 @@ def run_single_test(philosopher_id: str, test_case: Dict[str, Any]) -> Dict[str,
         "rounds": [],
         "analysis": {}
     }
-    
-    # 运行10轮对话
-    for round_num, question in enumerate(test_case['questions'], 1):
-        print(f"第 {round_num} 轮:")
-        print(f"用户: {question}")
-        
-        # 构建消息历史
-        messages = [{"role": "system", "content": full_system_prompt}]
-        messages.extend(conversation_history[-30:])  # 保留最近15轮（30条消息）
-        messages.append({"role": "user", "content": question})
-        
-        # 计算动态 temperature
-        if len(conversation_history) <= 6:
-            temperature = 0.9
-        elif len(conversation_history) <= 12:
-            temperature = 1.0
-        elif len(conversation_history) <= 20:
-            temperature = 1.1
-        else:
-            temperature = 1.2
-        
-        # 调用 API
-        start_time = time.time()
-        response = call_deepseek_api(messages, temperature)
-        response_time = time.time() - start_time
-        
-        print(f"{PHILOSOPHER_PROMPTS[philosopher_id]}: {response}")
-        print(f"(响应时间: {response_time:.2f}秒, 字数: {len(response)}字, Temperature: {temperature})\n")
-        
-        # 记录对话
-        conversation_history.append({"role": "user", "content": question})
-        conversation_history.append({"role": "assistant", "content": response})
-        
-        results["rounds"].append({
-            "round": round_num,
-            "user_input": question,
-            "ai_response": response,
-            "response_time": round(response_time, 2),
-            "response_length": len(response),
-            "temperature": temperature
-        })
-        
-        # 避免API限流
-        time.sleep(1)
-    
-    # 分析结果
-    response_lengths = [r["response_length"] for r in results["rounds"]]
-    response_times = [r["response_time"] for r in results["rounds"]]
-    responses = [r["ai_response"] for r in results["rounds"]]
+
+
+def start_test(philosopher_id: str, test_case: Dict[str, Any], conversation_history: List[Dict[str, str]],
+               checkpoint: Optional[Checkpoint] = None, writer: Optional[ResultWriter] = None) -> Dict[str, Any]:
+    """
+    创建测试用例的结果骨架：有断点时恢复已完成的轮次并重建 conversation_history，
+    流式输出时写入用例开始记录（以及恢复的轮次）
+    """
+    results = new_test_result(philosopher_id, test_case)
+    if checkpoint:
+        checkpoint.restore(philosopher_id, test_case, results, conversation_history)
+    if writer:
+        writer.begin_test(results)
+        for record in results["rounds"]:
+            writer.write_round(philosopher_id, test_case['test_id'], record)
+    return results
+
+
+def record_round(results: Dict[str, Any], record: Dict[str, Any], checkpoint: Optional[Checkpoint] = None,
+                 writer: Optional[ResultWriter] = None):
+    """记录一轮结果，同时写入断点和流式结果"""
+    results["rounds"].append(record)
+    with span("persist"):
+        if checkpoint:
+            checkpoint.append(results["philosopher"], results["test_id"], record)
+        if writer:
+            writer.write_round(results["philosopher"], results["test_id"], record)
+
+
+def finish_test(results: Dict[str, Any], writer: Optional[ResultWriter] = None, **analysis_options):
+    """分析测试用例的所有轮次并记录结束时间（analysis_options 传给 analyze_rounds）"""
+    with span("analysis", test_id=results["test_id"]):
+        results["analysis"] = analyze_rounds(results["rounds"], **analysis_options)
+    results["end_time"] = datetime.now().isoformat()
+    if writer:
+        writer.end_test(results)
+
+
+def make_round_record(round_num: int, question: str, response: str, response_time: float, temperature: float,
+                      timing: Dict[str, float] = None, aborted: bool = False,
+                      usage: Dict[str, Any] = None) -> Dict[str, Any]:
+    """生成单轮对话记录"""
+    record = {
+        "round": round_num,
+        "user_input": question,
+        "ai_response": response,
+        "response_time": round(response_time, 2),
+        "response_length": len(response),
+        "temperature": temperature
+    }
+    if timing:
+        record["timing"] = timing
+    if usage:
+        record["usage"] = usage
+    if aborted:
+        record["aborted"] = True  # 流式模式下超过金句字数上限被提前中止
+    return record
+
+
+def analyze_rounds(rounds: List[Dict[str, Any]], min_chars: int = 15, max_chars: int = 30,
+                   recognition_keywords: Sequence[str] = ()) -> Dict[str, Any]:
+    """
+    分析一个测试用例的所有轮次
+    min_chars / max_chars 为长度合规区间（金句式 15-30 字，生产提示词 20-50 字）；
+    指定 recognition_keywords 时统计包含其中任一关键词的回复数（毒舌式认可）
+    """
+    response_lengths = [r["response_length"] for r in rounds]
+    response_times = [r["response_time"] for r in rounds]
+    responses = [r["ai_response"] for r in rounds]
     
     # 检测重复
     unique_responses = len(set(responses))
     repetition_rate = 1 - (unique_responses / len(responses))
     
-    results["analysis"] = {
+    analysis = {
         "avg_response_length": round(sum(response_lengths) / len(response_lengths), 1),
         "min_response_length": min(response_lengths),
         "max_response_length": max(response_lengths),
         "avg_response_time": round(sum(response_times) / len(response_times), 2),
+        **response_time_fields(response_times),
         "unique_responses": unique_responses,
         "total_responses": len(responses),
         "repetition_rate": round(repetition_rate * 100, 1),
-        "length_compliance": sum(1 for l in response_lengths if 15 <= l <= 30) / len(response_lengths) * 100
+        "near_repetition_rate": near_repetition_rate(responses),
+        "length_compliance": sum(1 for l in response_lengths if min_chars <= l <= max_chars) / len(response_lengths) * 100,
+        "multiline_count": sum(1 for r in responses if '\n' in r.strip()),
+        **usage_fields(rounds),
     }
-    
-    results["end_time"] = datetime.now().isoformat()
-    
+    if recognition_keywords:
+        analysis["recognition_count"] = sum(1 for r in responses if any(k in r for k in recognition_keywords))
+    return analysis
+
+
+def print_analysis(analysis: Dict[str, Any], length_range: Sequence[int] = (15, 30)):
+    """打印单个测试用例的分析结果"""
     print(f"\n分析结果:")
-    print(f"- 平均字数: {results['analysis']['avg_response_length']} 字")
-    print(f"- 字数范围: {results['analysis']['min_response_length']}-{results['analysis']['max_response_length']} 字")
-    print(f"- 长度合规率: {results['analysis']['length_compliance']:.1f}% (15-30字)")
-    print(f"- 平均响应时间: {results['analysis']['avg_response_time']} 秒")
-    print(f"- 重复率: {results['analysis']['repetition_rate']}%")
-    print(f"- 唯一回复数: {results['analysis']['unique_responses']}/{results['analysis']['total_responses']}")
-    
-    return results
+    print(f"- 平均字数: {analysis['avg_response_length']} 字")
+    print(f"- 字数范围: {analysis['min_response_length']}-{analysis['max_response_length']} 字")
+    print(f"- 长度合规率: {analysis['length_compliance']:.1f}% ({length_range[0]}-{length_range[1]}字)")
+    if analysis.get('multiline_count'):
+        print(f"- 多行回复数: {analysis['multiline_count']}/{analysis['total_responses']}")
+    if "recognition_count" in analysis:
+        print(f"- 毒舌式认可次数: {analysis['recognition_count']}")
+    print(f"- 平均响应时间: {analysis['avg_response_time']} 秒")
+    print(f"- 响应时间分位数: p50 {analysis['p50_response_time']}秒 / p90 {analysis['p90_response_time']}秒 / "
+          f"p99 {analysis['p99_response_time']}秒 / 最大 {analysis['max_response_time']}秒")
+    print(f"- 重复率: {analysis['repetition_rate']}% (近似重复: {analysis['near_repetition_rate']}%)")
+    print(f"- 唯一回复数: {analysis['unique_responses']}/{analysis['total_responses']}")
+    if "total_prompt_tokens" in analysis:
+        print(f"- Token: prompt {analysis['total_prompt_tokens']} / completion {analysis['total_completion_tokens']}"
+              f"{'（估算）' if analysis['usage_estimated'] else ''}, 单轮最大 prompt {analysis['max_prompt_tokens']}, "
+              f"费用 {analysis['estimated_cost']} 元")
 
 
-def run_all_tests():
-    """运行所有测试"""
+def new_suite_result(checkpoint: Optional[Checkpoint] = None) -> Dict[str, Any]:
+    """创建整套测试的结果骨架（从断点续跑时沿用断点记录的开始时间）"""
     all_results = {
         "test_suite": "金句式超级毒舌系统测试",
         "version": "1.0",
+        "prompt_version": prompt_version(),
         "start_time": datetime.now().isoformat(),
         "philosophers": {}
     }
+    if checkpoint:
+        checkpoint.restore_suite(all_results)
+    return all_results
+
+
+def result_path(output_dir: str, prefix: str, extension: str) -> str:
+    """带时间戳的结果文件路径，例如 <output_dir>/test-results-20251028-094036.json"""
+    return os.path.join(output_dir, f'{prefix}-{datetime.now().strftime("%Y%m%d-%H%M%S")}.{extension}')
+
+
+def open_result_writer(result_format: str, checkpoint: Optional[Checkpoint] = None, output_dir: str = TESTS_DIR,
+                       prefix: str = "test-results", suite: Optional[Dict[str, Any]] = None) -> Optional[ResultWriter]:
+    """
+    result_format 为 jsonl 时创建流式结果文件（边跑边写），否则返回 None（结束时一次写出 JSON）
+    suite 为写进 header 的整套测试字段，默认 new_suite_result(checkpoint)
+    """
+    if result_format != "jsonl":
+        return None
+    output_file = result_path(output_dir, prefix, "jsonl")
+    print(f"流式结果文件: {output_file}")
+    return ResultWriter(output_file, suite or new_suite_result(checkpoint))
+
+
+def save_results(all_results: Dict[str, Any], writer: Optional[ResultWriter] = None, output_dir: str = TESTS_DIR,
+                 prefix: str = "test-results") -> str:
+    """保存测试结果（JSON，或为流式结果写入 footer）并生成总结报告"""
+    all_results["http"] = get_client().stats()
     
-    for philosopher_id, test_cases in TEST_CASES.items():
-        print(f"\n\n{'#'*80}")
-        print(f"# 开始测试哲学家: {PHILOSOPHER_PROMPTS[philosopher_id]}")
-        print(f"{'#'*80}\n")
-        
-        philosopher_results = []
-        
-        for test_case in test_cases:
-            result = run_single_test(philosopher_id, test_case)
-            philosopher_results.append(result)
-            
-            # 每个测试用例之间暂停
-            time.sleep(2)
-        
-        all_results["philosophers"][philosopher_id] = {
-            "name": PHILOSOPHER_PROMPTS[philosopher_id],
-            "test_count": len(philosopher_results),
-            "results": philosopher_results
-        }
-    
-    all_results["end_time"] = datetime.now().isoformat()
-    
-    # 保存结果
-    output_file = f'/home/ubuntu/the-toxic-philosopher/tests/test-results-{datetime.now().strftime("%Y%m%d-%H%M%S")}.json'
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(all_results, f, ensure_ascii=False, indent=2)
+    if writer:
+        writer.close(**{k: v for k, v in all_results.items() if k not in HEADER_KEYS and k != "philosophers"})
+        output_file = writer.path
+    else:
+        output_file = result_path(output_dir, prefix, "json")
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(all_results, f, ensure_ascii=False, indent=2)
     
     print(f"\n\n{'#'*80}")
     print(f"# 所有测试完成！")
     print(f"# 结果已保存到: {output_file}")
     print(f"{'#'*80}\n")
     
+    get_client().print_stats()
+    print()
+    
     # 生成总结报告
-    generate_summary_report(all_results, output_file)
+    generate_summary_report(StreamedSuite(output_file) if writer else all_results, output_file)
+    export_trace(output_file)
     
     return output_file
 
 
-def generate_summary_report(results: Dict[str, Any], json_file: str):
-    """生成总结报告"""
-    report_file = json_file.replace('.json', '-summary.md')
+def _suite_tests(suite, philosopher_id: Optional[str] = None):
+    """遍历结果中的测试用例（被中断、没有分析结果的用例当场补算）"""
+    min_chars, max_chars = suite.info.get("length_range", (15, 30))
+    for test_result in suite.tests(philosopher_id):
+        if not test_result["rounds"]:
+            continue
+        if not test_result["analysis"]:
+            test_result = dict(test_result, analysis=analyze_rounds(test_result["rounds"], min_chars, max_chars))
+        yield test_result
+
+
+def generate_summary_report(results, json_file: str):
+    """
+    生成总结报告
+    results 可以是嵌套的结果 dict，也可以是 StreamedSuite（流式结果文件分两遍读取，每次只保留一个对话）
+    """
+    suite = as_suite(results)
+    info = suite.info
+    report_file = os.path.splitext(json_file)[0] + '-summary.md'
+    min_chars, max_chars = info.get("length_range", (15, 30))
+    
+    # 第一遍：按哲学家汇总，同时累积延迟草图和 token 曲线
+    thresholds = Thresholds.from_env()
+    totals: Dict[str, Dict[str, Any]] = {}
+    latency_groups: Dict[str, LatencyProfile] = {}
+    token_profiles = []
+    for test_result in _suite_tests(suite):
+        name = PHILOSOPHER_PROMPTS.get(test_result["philosopher"], test_result["philosopher"])
+        analysis = test_result["analysis"]
+        total = totals.setdefault(name, {"tests": 0, "rounds": 0, "length": 0.0, "compliance": 0.0,
+                                         "repetition": 0.0, "near_repetition": 0.0})
+        total["tests"] += 1
+        total["rounds"] += len(test_result["rounds"])
+        total["length"] += analysis["avg_response_length"]
+        total["compliance"] += analysis["length_compliance"]
+        total["repetition"] += analysis["repetition_rate"]
+        total["near_repetition"] += analysis.get("near_repetition_rate", 0)
+        latency_groups.setdefault(name, LatencyProfile()).add_rounds(test_result["rounds"])
+        token_profiles.append({"name": f"{name} / {test_result['test_id']}",
+                               "profile": profile_rounds(test_result["rounds"], thresholds)})
     
     with open(report_file, 'w', encoding='utf-8') as f:
-        f.write("# 金句式超级毒舌系统 - 测试报告\n\n")
-        f.write(f"**测试时间**: {results['start_time']} ~ {results['end_time']}\n\n")
-        f.write(f"**测试版本**: {results['version']}\n\n")
+        f.write(f"# {info['test_suite']} - 测试报告\n\n")
+        f.write(f"**测试时间**: {info['start_time']} ~ {info['end_time']}\n\n")
+        f.write(f"**测试版本**: {info['version']}\n\n")
         f.write("---\n\n")
         
         f.write("## 总体统计\n\n")
-        f.write("| 哲学家 | 测试用例数 | 总对话轮数 | 平均字数 | 长度合规率 | 重复率 |\n")
-        f.write("|:---|:---:|:---:|:---:|:---:|:---:|\n")
+        f.write("| 哲学家 | 测试用例数 | 总对话轮数 | 平均字数 | 长度合规率 | 重复率 | 近似重复率 |\n")
+        f.write("|:---|:---:|:---:|:---:|:---:|:---:|:---:|\n")
         
-        for philosopher_id, data in results["philosophers"].items():
-            total_rounds = sum(len(r["rounds"]) for r in data["results"])
-            avg_length = sum(r["analysis"]["avg_response_length"] for r in data["results"]) / len(data["results"])
-            avg_compliance = sum(r["analysis"]["length_compliance"] for r in data["results"]) / len(data["results"])
-            avg_repetition = sum(r["analysis"]["repetition_rate"] for r in data["results"]) / len(data["results"])
-            
-            f.write(f"| {data['name']} | {data['test_count']} | {total_rounds} | {avg_length:.1f}字 | {avg_compliance:.1f}% | {avg_repetition:.1f}% |\n")
+        for name, total in totals.items():
+            count = total["tests"]
+            f.write(f"| {name} | {count} | {total['rounds']} | {total['length'] / count:.1f}字 | "
+                    f"{total['compliance'] / count:.1f}% | {total['repetition'] / count:.1f}% | "
+                    f"{total['near_repetition'] / count:.1f}% |\n")
         
+        f.write("\n")
+        f.write(format_latency_section(latency_groups, merge_profiles(latency_groups.values())))
+        f.write("\n")
+        f.write(format_token_section(token_profiles, thresholds))
         f.write("\n---\n\n")
         
-        # 详细结果
-        for philosopher_id, data in results["philosophers"].items():
-            f.write(f"## {data['name']} - 详细测试结果\n\n")
+        # 第二遍：详细结果
+        for philosopher_id in suite.philosophers():
+            name = PHILOSOPHER_PROMPTS.get(philosopher_id, philosopher_id)
+            f.write(f"## {name} - 详细测试结果\n\n")
             
-            for test_result in data["results"]:
+            for test_result in _suite_tests(suite, philosopher_id):
                 f.write(f"### {test_result['test_name']} ({test_result['test_id']})\n\n")
                 f.write(f"**描述**: {test_result['description']}\n\n")
                 
                 f.write("**分析结果**:\n")
                 f.write(f"- 平均字数: {test_result['analysis']['avg_response_length']} 字\n")
                 f.write(f"- 字数范围: {test_result['analysis']['min_response_length']}-{test_result['analysis']['max_response_length']} 字\n")
-                f.write(f"- 长度合规率: {test_result['analysis']['length_compliance']:.1f}% (15-30字)\n")
+                f.write(f"- 长度合规率: {test_result['analysis']['length_compliance']:.1f}% ({min_chars}-{max_chars}字)\n")
                 f.write(f"- 平均响应时间: {test_result['analysis']['avg_response_time']} 秒\n")
-                f.write(f"- 重复率: {test_result['analysis']['repetition_rate']}%\n")
+                if "p90_response_time" in test_result['analysis']:
+                    f.write(f"- 响应时间分位数: p50 {test_result['analysis']['p50_response_time']}秒 / "
+                            f"p90 {test_result['analysis']['p90_response_time']}秒 / "
+                            f"p99 {test_result['analysis']['p99_response_time']}秒 / "
+                            f"最大 {test_result['analysis']['max_response_time']}秒\n")
+                if test_result['analysis'].get('multiline_count'):
+                    f.write(f"- 多行回复数: {test_result['analysis']['multiline_count']}/{test_result['analysis']['total_responses']}\n")
+                if "recognition_count" in test_result['analysis']:
+                    f.write(f"- 毒舌式认可次数: {test_result['analysis']['recognition_count']}\n")
+                f.write(f"- 重复率: {test_result['analysis']['repetition_rate']}%"
+                        f" (近似重复: {test_result['analysis'].get('near_repetition_rate', '-')}%)\n")
                 f.write(f"- 唯一回复数: {test_result['analysis']['unique_responses']}/{test_result['analysis']['total_responses']}\n\n")
                 
                 f.write("**对话记录**:\n\n")
                 for round_data in test_result["rounds"]:
                     f.write(f"**第 {round_data['round']} 轮**:\n")
                     f.write(f"- 用户: {round_data['user_input']}\n")
-                    f.write(f"- {data['name']}: {round_data['ai_response']}\n")
-                    f.write(f"- (字数: {round_data['response_length']}, 响应时间: {round_data['response_time']}秒, Temperature: {round_data['temperature']})\n\n")
+                    f.write(f"- {name}: {round_data['ai_response']}\n")
+                    f.write(f"- (字数: {round_data['response_length']}, 响应时间: {round_data['response_time']}秒, Temperature: {round_data['temperature']})\n")
+                    if "ttft" in round_data.get("timing", {}):
+                        f.write(f"- (首 token: {round_data['timing']['ttft']}秒{', 超长已中止' if round_data.get('aborted') else ''})\n")
+                    f.write("\n")
                 
                 f.write("---\n\n")
     
@@ -277,19 +365,6 @@ def generate_summary_report(results: Dict[str, Any], json_file: str):
 
 
 if __name__ == "__main__":
-    print("="*80)
-    print(" 金句式超级毒舌系统 - 自动化测试")
-    print("="*80)
-    print()
-    print("测试配置:")
-    print(f"- 哲学家数量: {len(TEST_CASES)}")
-    print(f"- 每位哲学家的测试用例: 5个")
-    print(f"- 每个测试用例的对话轮数: 10轮")
-    print(f"- 总测试轮数: {len(TEST_CASES) * 5 * 10} 轮")
-    print()
-    print("开始测试...\n")
-    
-    result_file = run_all_tests()
-    
-    print(f"\n测试完成！结果文件: {result_file}")
-
+    # 全部测试用例由统一执行器的 full 预设运行，等价于 python -m runner --preset full
+    from runner import main
+    main(["--preset", "full"] + sys.argv[1:])
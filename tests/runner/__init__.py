@@ -0,0 +1,25 @@
+"""
+金句式超级毒舌系统 - 统一测试执行器
+原 run_tests.py / streamlined_test.py / quick_test.py / test_freud_only.py / test_10_rounds.py
+五个脚本各自复制了一份对话循环、分析和报告代码，现在都是这里的预设（presets.PRESETS），
+共用同一个执行引擎（engine）和命令行（cli）；原 async_runner.py / wave_scheduler.py / speculative_sampling.py
+的并发、波次调度和推测式采样是引擎的调度方式（--schedule）和采样方式（--candidates，sampling）
+"""
+
+from .presets import PRESETS, Preset, load_case_catalogue, select_cases
+from .engine import SCHEDULES, ConversationState, run_conversation, run_suite
+from .sampling import SpeculativeSampler
+from .cli import main
+
+__all__ = [
+    "PRESETS",
+    "Preset",
+    "load_case_catalogue",
+    "select_cases",
+    "SCHEDULES",
+    "ConversationState",
+    "run_conversation",
+    "run_suite",
+    "SpeculativeSampler",
+    "main",
+]
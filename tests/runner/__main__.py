@@ -0,0 +1,10 @@
+"""python -m runner（在 tests/ 目录下）或 python tests/runner"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from runner.cli import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+统一执行器命令行
+用法（在 tests/ 目录下）:
+    python -m runner                                   # 全部测试用例（原 run_tests.py）
+    python -m runner --preset streamlined              # 每位哲学家 1 个核心用例（原 streamlined_test.py）
+    python -m runner --preset quick                    # 只测尼采（原 quick_test.py）
+    python -m runner --preset freud                    # 弗洛伊德金句式修复验证（原 test_freud_only.py）
+    python -m runner --preset ten-rounds               # 生产提示词 10 轮对话（原 test_10_rounds.py）
+    python -m runner --philosophers kant freud --rounds 5 --concurrency 4 --output-dir /tmp/results
+    python -m runner --concurrency 5                   # 对话之间并发（原 async_runner.py）
+    python -m runner --schedule wave --concurrency 10  # 按轮次滚动调度（原 wave_scheduler.py）
+    python -m runner --candidates 3 --concurrency 5    # 每轮推测式采样 3 个候选（原 speculative_sampling.py）
+    python -m runner --list                            # 列出预设和可选用例
+"""
+
+import argparse
+import os
+from typing import List, Optional
+
+from http_client import add_client_arguments, configure_client_from_args
+from response_cache import CacheMissError
+from checkpoint import add_checkpoint_arguments, open_checkpoint_from_args
+from result_stream import add_result_arguments
+from span_recorder import add_trace_arguments, configure_tracing_from_args
+from run_tests import TESTS_DIR, PHILOSOPHER_PROMPTS
+from .presets import PRESETS, load_case_catalogue, select_cases
+from .engine import SCHEDULES, run_suite
+from .sampling import DEFAULT_SPREAD, SpeculativeSampler
+
+
+def print_catalogue():
+    """列出全部预设和用例"""
+    print("预设:")
+    for preset in PRESETS.values():
+        cases = ", ".join(preset.cases) if preset.cases is not None else "test-cases.json 全部用例"
+        print(f"  {preset.name:<12} {preset.title}（{preset.min_chars}-{preset.max_chars}字；{cases}）")
+    print()
+    print("用例:")
+    for philosopher_id, cases in load_case_catalogue().items():
+        for case in cases:
+            print(f"  {case['test_id']:<24} {PHILOSOPHER_PROMPTS.get(philosopher_id, philosopher_id)} - "
+                  f"{case['name']}（{len(case['questions'])}轮）")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m runner", description="金句式超级毒舌系统 - 统一测试执行器")
+    parser.add_argument("--preset", choices=list(PRESETS), default="full", help="测试预设，默认 full")
+    parser.add_argument("--philosophers", nargs="+", choices=list(PHILOSOPHER_PROMPTS), metavar="ID",
+                        help="只运行这些哲学家的用例")
+    parser.add_argument("--cases", nargs="+", metavar="TEST_ID", help="指定测试用例（覆盖预设自带的用例）")
+    parser.add_argument("--rounds", type=int, help="每个用例的对话轮数（默认用例自带的轮数，超出时循环使用问题）")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="同时进行的对话数（wave 调度时为全局在途请求上限），默认 1（顺序运行并打印完整对话）")
+    parser.add_argument("--schedule", choices=SCHEDULES, default="conversation",
+                        help="对话之间的调度方式：conversation 每段对话占一个并发名额（默认），"
+                             "wave 以轮次为单位滚动补发，并统计加速比")
+    parser.add_argument("--candidates", type=int, default=1,
+                        help="每轮同时采样的候选数，大于 1 时取第一个满足预设字数、单行、不重复的候选，默认 1")
+    parser.add_argument("--spread", type=float, default=DEFAULT_SPREAD,
+                        help=f"推测式采样候选之间的 temperature 间隔，默认 {DEFAULT_SPREAD}")
+    parser.add_argument("--output-dir", default=os.environ.get("TEST_OUTPUT_DIR", TESTS_DIR),
+                        help="结果文件和总结报告的输出目录（默认 tests/，也可用 TEST_OUTPUT_DIR 指定）")
+    parser.add_argument("--list", action="store_true", help="列出预设和可选用例后退出")
+    add_client_arguments(parser)
+    add_checkpoint_arguments(parser)
+    add_result_arguments(parser)
+    add_trace_arguments(parser)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print_catalogue()
+        return
+    if args.concurrency < 1 or args.candidates < 1:
+        parser.error("--concurrency 和 --candidates 必须 >= 1")
+    if args.rounds is not None and args.rounds < 1:
+        parser.error("--rounds 必须 >= 1")
+
+    preset = PRESETS[args.preset]
+    if preset.prompt_mode == "production" and args.abort_over_limit:
+        parser.error(f"生产提示词要求 {preset.min_chars}-{preset.max_chars} 字，不能使用 --abort-over-limit")
+    try:
+        selection = select_cases(preset, args.philosophers, args.cases, args.rounds)
+    except ValueError as e:
+        parser.error(str(e))
+    if not selection:
+        parser.error("没有选中任何测试用例")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    in_flight = args.concurrency * args.candidates
+    configure_client_from_args(args, pool_size=in_flight)
+    configure_tracing_from_args(args)
+
+    print("="*80)
+    print(f" {preset.title}")
+    print("="*80)
+    print()
+    print("测试配置:")
+    print(f"- 预设: {preset.name}")
+    print(f"- 哲学家数量: {len(dict.fromkeys(pid for pid, _ in selection))}")
+    print(f"- 测试用例数: {len(selection)}")
+    print(f"- 总测试轮数: {sum(len(case['questions']) for _, case in selection)} 轮")
+    print(f"- 长度要求: {preset.min_chars}-{preset.max_chars}字")
+    print(f"- 并发对话数: {args.concurrency}（{args.schedule} 调度）")
+    if args.candidates > 1:
+        print(f"- 推测式采样: 每轮 {args.candidates} 个候选，temperature 间隔 {args.spread}")
+    print()
+
+    sampler = None
+    if args.candidates > 1:
+        sampler = SpeculativeSampler(args.candidates, args.spread, preset.min_chars, preset.max_chars,
+                                     max_workers=in_flight)
+    checkpoint = open_checkpoint_from_args(args)
+    print("开始测试...\n")
+    try:
+        result_file, passed = run_suite(preset, selection, args.concurrency, checkpoint, args.format, args.output_dir,
+                                        args.schedule, sampler)
+    except CacheMissError as e:
+        raise SystemExit(f"\n❌ {e}（--cache replay 只用已录制的回复，请先用 --cache record 重新录制），测试中止")
+    finally:
+        if checkpoint:
+            checkpoint.close()
+        if sampler:
+            sampler.close()
+
+    print(f"\n测试完成！结果文件: {result_file}")
+    if passed is not None:
+        print("\n✅ 修复成功！符合金句式要求。" if passed else "\n❌ 仍需改进。")
@@ -0,0 +1,323 @@
+"""
+统一执行引擎
+每个 (哲学家, 测试用例) 是一段独立的多轮对话（ConversationState），同一段对话内的轮次始终串行。
+对话之间有两种调度方式（--schedule）：
+  - conversation: concurrency 为 1 时按顺序运行并打印完整对话，大于 1 时各段对话在线程池里并发
+    （原 async_runner.py）
+  - wave: 以轮次为单位滚动调度，某段对话的一轮完成后立即补发它的下一轮，全局在途请求不超过 concurrency，
+    补位时按哲学家轮转保证公平，并统计墙钟时间与各轮延迟之和（原 wave_scheduler.py）
+每轮可以只发一个请求，也可以用推测式采样（--candidates N，原 speculative_sampling.py）同时发 N 个候选取第一个合规的。
+请求经过共享的 DeepSeekClient，回复缓存、限流、流式等由 --cache / --stream 等客户端参数控制；
+断点续跑和流式结果沿用 run_tests 的 start_test / record_round / finish_test；
+--trace 开启时每轮记一个 round span，其中包含 assemble 及请求、写盘各阶段的 span
+"""
+
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from checkpoint import Checkpoint
+from response_cache import CacheMissError
+from result_stream import ResultWriter
+from span_recorder import span
+from anti_repetition_index import AntiRepetitionIndex
+from run_tests import (
+    TESTS_DIR,
+    PHILOSOPHER_PROMPTS,
+    request_round,
+    start_test,
+    record_round,
+    finish_test,
+    make_round_record,
+    print_analysis,
+    new_suite_result,
+    open_result_writer,
+    save_results,
+)
+from .presets import Preset
+from .sampling import SpeculativeSampler
+
+SCHEDULES = ("conversation", "wave")
+
+
+class ConversationState:
+    """单个测试用例的对话状态机：ready -> in_flight -> ready ... -> done"""
+
+    def __init__(self, philosopher_id: str, test_case: Dict[str, Any], preset: Preset,
+                 checkpoint: Optional[Checkpoint] = None, writer: Optional[ResultWriter] = None,
+                 sampler: Optional[SpeculativeSampler] = None):
+        self.philosopher_id = philosopher_id
+        self.test_case = test_case
+        self.preset = preset
+        self.checkpoint = checkpoint
+        self.writer = writer
+        self.sampler = sampler
+        self.history: List[Dict[str, str]] = []
+        self.results = start_test(philosopher_id, test_case, self.history, checkpoint, writer)
+        self.resumed = len(self.results["rounds"])
+        self.round_num = self.resumed
+        self.in_flight = False
+        # 推测式采样按本段对话已有的回复检查近似重复（从断点恢复的轮次也算）
+        self.index = AntiRepetitionIndex() if sampler else None
+        if self.index is not None:
+            for message in self.history:
+                if message["role"] == "assistant":
+                    self.index.add(message["content"])
+
+    @property
+    def tag(self) -> str:
+        return f"[{PHILOSOPHER_PROMPTS.get(self.philosopher_id, self.philosopher_id)}/{self.test_case['test_id']}]"
+
+    @property
+    def done(self) -> bool:
+        return self.round_num >= len(self.test_case['questions'])
+
+    @property
+    def ready(self) -> bool:
+        return not self.done and not self.in_flight
+
+    def next_request(self) -> Tuple[str, List[Dict[str, str]], float, Dict[str, Any]]:
+        """拼装下一轮的请求 (question, messages, temperature, chat_options)，并把状态置为 in_flight"""
+        question = self.test_case['questions'][self.round_num]
+        with span("assemble"):
+            messages, temperature, chat_options = self.preset.build_round(self.philosopher_id, self.history,
+                                                                          question)
+        self.in_flight = True
+        return question, messages, temperature, chat_options
+
+    def execute(self, messages: List[Dict[str, str]], temperature: float,
+                chat_options: Dict[str, Any]) -> Tuple[Dict[str, Any], float, float]:
+        """发出一轮请求（可在工作线程中调用），返回 (result, 响应时间, 实际使用的 temperature)"""
+        if self.sampler:
+            result = self.sampler.sample(messages, temperature, self.index, **chat_options)
+            return result, result["response_time"], result["temperature"]
+        start_time = time.time()
+        result = request_round(messages, temperature, **chat_options)
+        return result, time.time() - start_time, temperature
+
+    def complete(self, question: str, result: Dict[str, Any], response_time: float, temperature: float) -> str:
+        """记录一轮的结果，回到 ready（或 done），返回记录的回复"""
+        response = result["content"].strip() if self.preset.prompt_mode == "production" else result["content"]
+        self.round_num += 1
+        self.history.append({"role": "user", "content": question})
+        self.history.append({"role": "assistant", "content": response})
+        if self.index is not None:
+            self.index.add(response)
+        record = make_round_record(self.round_num, question, response, response_time, temperature,
+                                   result["timing"], result.get("aborted", False), result["usage"])
+        if "speculative" in result:
+            record["speculative"] = result["speculative"]
+        record_round(self.results, record, self.checkpoint, self.writer)
+        self.in_flight = False
+        return response
+
+    def finish(self) -> Dict[str, Any]:
+        """分析全部轮次；流式输出时轮次已写入文件，不在内存里保留"""
+        finish_test(self.results, self.writer, **self.preset.analysis_options())
+        if self.writer:
+            self.history = []
+            self.results["rounds"] = []
+        return self.results
+
+
+def run_conversation(philosopher_id: str, test_case: Dict[str, Any], preset: Preset,
+                     checkpoint: Optional[Checkpoint] = None, writer: Optional[ResultWriter] = None,
+                     verbose: bool = True, sampler: Optional[SpeculativeSampler] = None) -> Dict[str, Any]:
+    """
+    运行一个测试用例的全部轮次（指定 checkpoint 时跳过已完成的轮次；每完成一轮写一次断点和流式结果）
+    verbose 为 False 时每轮只打印一行摘要，适合并发运行
+    """
+    name = PHILOSOPHER_PROMPTS.get(philosopher_id, philosopher_id)
+    if verbose:
+        print(f"\n{'='*80}")
+        print(f"测试: {test_case['name']} ({test_case['test_id']})")
+        print(f"哲学家: {name}")
+        print(f"{'='*80}\n")
+
+    state = ConversationState(philosopher_id, test_case, preset, checkpoint, writer, sampler)
+    if state.resumed:
+        print(f"从断点恢复 {state.resumed} 轮\n" if verbose else f"{state.tag} 从断点恢复 {state.resumed} 轮")
+
+    while not state.done:
+        with span("round", philosopher=philosopher_id, test_id=test_case['test_id'], round=state.round_num + 1):
+            question, messages, temperature, chat_options = state.next_request()
+            result, response_time, temperature = state.execute(messages, temperature, chat_options)
+            response = state.complete(question, result, response_time, temperature)
+
+        if verbose:
+            print(f"第 {state.round_num} 轮:")
+            print(f"用户: {question}")
+            print(f"{name}: {response}")
+            print(f"(响应时间: {response_time:.2f}秒, 字数: {len(response)}字, Temperature: {temperature})")
+            if "ttft" in result["timing"]:
+                print(f"(首 token: {result['timing']['ttft']}秒{', 超长已中止' if result.get('aborted') else ''})")
+            if '\n' in response.strip():
+                print(f"⚠️  警告：检测到多行回复（{len(response.strip().splitlines())}行）")
+            print()
+        else:
+            print(f"{state.tag} 第 {state.round_num} 轮: {len(response)}字, {response_time:.2f}秒")
+
+    results = state.finish()
+    if verbose:
+        print_analysis(results["analysis"], preset.length_range)
+    return results
+
+
+def fair_order(states: List[ConversationState], wave_index: int) -> List[ConversationState]:
+    """按哲学家轮转交错排列，并且每个波次轮换起始哲学家，避免同一位哲学家总是排在最后"""
+    queues: "OrderedDict[str, List[ConversationState]]" = OrderedDict()
+    for state in states:
+        queues.setdefault(state.philosopher_id, []).append(state)
+
+    philosopher_ids = list(queues)
+    if philosopher_ids:
+        shift = wave_index % len(philosopher_ids)
+        philosopher_ids = philosopher_ids[shift:] + philosopher_ids[:shift]
+
+    ordered = []
+    while any(queues[p] for p in philosopher_ids):
+        for philosopher_id in philosopher_ids:
+            if queues[philosopher_id]:
+                ordered.append(queues[philosopher_id].pop(0))
+    return ordered
+
+
+def _timed_round(state: ConversationState, messages, temperature, chat_options, round_num: int):
+    with span("round", philosopher=state.philosopher_id, test_id=state.test_case['test_id'], round=round_num):
+        return state.execute(messages, temperature, chat_options)
+
+
+def run_waves(states: List[ConversationState], concurrency: int) -> Dict[str, Any]:
+    """
+    滚动调度所有对话：某段对话的一轮完成后立即补发它的下一轮（在并发上限内按哲学家轮转补位），
+    不等同一批里最慢的对话；每次补发记为一个波次，返回调度统计
+    """
+    waves = []
+    round_latency_sum = 0.0
+    max_in_flight = 0
+    suite_start = time.time()
+
+    for state in states:
+        if state.done:
+            state.finish()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures: Dict[Future, Any] = {}
+        wave_index = 0
+        try:
+            while True:
+                ready = [s for s in states if s.ready]
+                slots = concurrency - len(futures)
+                if ready and slots > 0:
+                    batch = fair_order(ready, wave_index)[:slots]
+                    for state in batch:
+                        question, messages, temperature, chat_options = state.next_request()
+                        future = pool.submit(_timed_round, state, messages, temperature, chat_options,
+                                             state.round_num + 1)
+                        futures[future] = (state, question)
+                    max_in_flight = max(max_in_flight, len(futures))
+                    waves.append({"wave": wave_index + 1, "size": len(batch),
+                                  "start": round(time.time() - suite_start, 2)})
+                    wave_index += 1
+                if not futures:
+                    break
+
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    state, question = futures.pop(future)
+                    result, response_time, temperature = future.result()
+                    round_latency_sum += response_time
+                    response = state.complete(question, result, response_time, temperature)
+                    print(f"{state.tag} 第 {state.round_num} 轮: {len(response)}字, {response_time:.2f}秒")
+                    if state.done:
+                        state.finish()
+                        print(f"{state.tag} 完成，剩余 {sum(1 for s in states if not s.done)} 个对话")
+        except CacheMissError:
+            for future in futures:
+                future.cancel()
+            raise
+
+    wall_clock = time.time() - suite_start
+    return {
+        "max_concurrency": concurrency,
+        "max_in_flight": max_in_flight,
+        "conversations": len(states),
+        "waves": waves,
+        "wall_clock": round(wall_clock, 2),
+        "round_latency_sum": round(round_latency_sum, 2),
+        "speedup": round(round_latency_sum / wall_clock, 2) if wall_clock > 0 else 0,
+    }
+
+
+def print_scheduler_stats(stats: Dict[str, Any]):
+    print()
+    print("调度统计:")
+    print(f"- 对话数: {stats['conversations']}, 波次数: {len(stats['waves'])}, 并发上限: {stats['max_concurrency']}"
+          f"（实际最多 {stats['max_in_flight']}）")
+    print(f"- 整套测试墙钟时间: {stats['wall_clock']} 秒")
+    print(f"- 各轮延迟之和: {stats['round_latency_sum']} 秒")
+    print(f"- 加速比: {stats['speedup']}x")
+
+
+def run_suite(preset: Preset, selection: List[Tuple[str, Dict[str, Any]]], concurrency: int = 1,
+              checkpoint: Optional[Checkpoint] = None, result_format: str = "json",
+              output_dir: str = TESTS_DIR, schedule: str = "conversation",
+              sampler: Optional[SpeculativeSampler] = None) -> Tuple[str, Optional[bool]]:
+    """
+    运行选中的全部测试用例，结果格式与 run_tests.py 一致（输出到 output_dir），
+    返回 (结果文件路径, 预设的通过判定)
+    schedule 为对话之间的调度方式（SCHEDULES），指定 sampler 时每轮用推测式采样
+    """
+    if schedule not in SCHEDULES:
+        raise ValueError(f"未知的调度方式: {schedule}（可选 {', '.join(SCHEDULES)}）")
+    all_results = new_suite_result(checkpoint)
+    all_results.update(test_suite=preset.title, preset=preset.name, length_range=list(preset.length_range))
+    writer = open_result_writer(result_format, checkpoint, output_dir, preset.output_prefix, all_results)
+
+    if schedule == "wave":
+        states = [ConversationState(philosopher_id, test_case, preset, checkpoint, writer, sampler)
+                  for philosopher_id, test_case in selection]
+        all_results["scheduler"] = run_waves(states, concurrency)
+        completed = [state.results for state in states]
+        print_scheduler_stats(all_results["scheduler"])
+    elif concurrency == 1:
+        completed = []
+        for index, (philosopher_id, test_case) in enumerate(selection):
+            if index == 0 or selection[index - 1][0] != philosopher_id:
+                print(f"\n\n{'#'*80}")
+                print(f"# 开始测试哲学家: {PHILOSOPHER_PROMPTS.get(philosopher_id, philosopher_id)}")
+                print(f"{'#'*80}\n")
+            completed.append(run_conversation(philosopher_id, test_case, preset, checkpoint, writer,
+                                              sampler=sampler))
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            futures = [pool.submit(run_conversation, philosopher_id, test_case, preset, checkpoint, writer, False,
+                                   sampler)
+                       for philosopher_id, test_case in selection]
+            try:
+                completed = [future.result() for future in futures]
+            except CacheMissError:
+                for future in futures:
+                    future.cancel()
+                raise
+
+    if writer is None:
+        for philosopher_id in dict.fromkeys(pid for pid, _ in selection):
+            philosopher_results = [r for r in completed if r["philosopher"] == philosopher_id]
+            all_results["philosophers"][philosopher_id] = {
+                "name": PHILOSOPHER_PROMPTS.get(philosopher_id, philosopher_id),
+                "test_count": len(philosopher_results),
+                "results": philosopher_results
+            }
+
+    all_results["end_time"] = datetime.now().isoformat()
+    if sampler:
+        print()
+        sampler.print_stats()
+        all_results["speculative"] = sampler.stats()
+    passed = preset.verdict([r["analysis"] for r in completed])
+    if passed is not None:
+        all_results["passed"] = passed
+    return save_results(all_results, writer, output_dir, preset.output_prefix), passed
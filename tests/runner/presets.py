@@ -0,0 +1,129 @@
+"""
+测试预设与用例选择
+原来五个测试脚本之间的差异（测什么用例、怎么拼提示词、长度要求、输出文件名、通过标准）都收在 Preset 里，
+用例统一来自 test-cases.json（完整用例）和 preset-cases.json（精简版 / 10轮对话等预设专用用例）
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from prompt_registry import PRODUCTION_MAX_TOKENS, build_production_messages, get_dynamic_temperature
+from run_tests import TESTS_DIR, TEST_CASES, build_messages, load_system_prompt
+
+PRESET_CASES_FILE = os.path.join(TESTS_DIR, 'preset-cases.json')
+
+# jinju: 生产提示词 + 金句式回复要求（max_tokens 80）；production: 与 aiService.ts 相同的拼装和参数
+PROMPT_MODES = ("jinju", "production")
+
+# 生产环境的请求参数（与 ai_service.AIService 一致）
+PRODUCTION_CHAT_OPTIONS = {"max_tokens": PRODUCTION_MAX_TOKENS, "frequency_penalty": 0.7, "presence_penalty": 0.4}
+
+# 毒舌式认可的关键词（原 test_10_rounds.py）
+RECOGNITION_KEYWORDS = ('不错', '看来', '终于', '虽然')
+
+PHILOSOPHER_ORDER = ("socrates", "nietzsche", "wittgenstein", "kant", "freud")
+
+
+class Preset:
+    """一组测试配置；cases 为 None 时运行 test-cases.json 的全部用例"""
+
+    def __init__(self, name: str, title: str, cases: Optional[Sequence[str]] = None, prompt_mode: str = "jinju",
+                 min_chars: int = 15, max_chars: int = 30, output_prefix: str = "test-results",
+                 recognition_keywords: Sequence[str] = (), pass_compliance: Optional[float] = None):
+        if prompt_mode not in PROMPT_MODES:
+            raise ValueError(f"未知的提示词拼装方式: {prompt_mode}")
+        self.name = name
+        self.title = title
+        self.cases = list(cases) if cases is not None else None
+        self.prompt_mode = prompt_mode
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.output_prefix = output_prefix
+        self.recognition_keywords = tuple(recognition_keywords)
+        self.pass_compliance = pass_compliance
+
+    @property
+    def length_range(self) -> Tuple[int, int]:
+        return self.min_chars, self.max_chars
+
+    def analysis_options(self) -> Dict[str, Any]:
+        """传给 analyze_rounds / finish_test 的参数"""
+        return {"min_chars": self.min_chars, "max_chars": self.max_chars,
+                "recognition_keywords": self.recognition_keywords}
+
+    def build_round(self, philosopher_id: str, conversation_history: List[Dict[str, str]],
+                    question: str) -> Tuple[List[Dict[str, str]], float, Dict[str, Any]]:
+        """按预设的拼装方式生成一轮请求：(messages, temperature, 传给 request_round 的参数)"""
+        if self.prompt_mode == "production":
+            messages, temperature = build_production_messages(
+                philosopher_id, conversation_history + [{"role": "user", "content": question}])
+            return messages, temperature, PRODUCTION_CHAT_OPTIONS
+        messages = build_messages(load_system_prompt(philosopher_id), conversation_history, question)
+        return messages, get_dynamic_temperature(len(conversation_history)), {}
+
+    def verdict(self, analyses: List[Dict[str, Any]]) -> Optional[bool]:
+        """有通过标准的预设（弗洛伊德修复验证）：每个用例合规率达标且没有多行回复；其余预设返回 None"""
+        if self.pass_compliance is None:
+            return None
+        return all(a["length_compliance"] >= self.pass_compliance and a["multiline_count"] == 0 for a in analyses)
+
+
+PRESETS: Dict[str, Preset] = {preset.name: preset for preset in (
+    Preset("full", "金句式超级毒舌系统测试"),
+    Preset("streamlined", "金句式超级毒舌系统 - 精简版测试",
+           cases=[f"{pid}_streamlined" for pid in PHILOSOPHER_ORDER],
+           output_prefix="streamlined-test-results"),
+    Preset("quick", "快速测试 - 尼采（软弱逃避测试）", cases=["nietzsche_streamlined"],
+           output_prefix="quick-test-result"),
+    Preset("freud", "弗洛伊德单独测试 - 验证金句式修复效果", cases=["freud_streamlined"],
+           output_prefix="freud-fix-test-result", pass_compliance=80),
+    Preset("ten-rounds", "毒舌哲学家 - 10轮对话测试", cases=[f"{pid}_10rounds" for pid in PHILOSOPHER_ORDER],
+           prompt_mode="production", min_chars=20, max_chars=50, output_prefix="10-rounds-test",
+           recognition_keywords=RECOGNITION_KEYWORDS),
+)}
+
+
+def load_case_catalogue() -> Dict[str, List[Dict[str, Any]]]:
+    """test-cases.json 与 preset-cases.json 合并后的用例目录（按哲学家分组）"""
+    catalogue = {pid: list(cases) for pid, cases in TEST_CASES.items()}
+    with open(PRESET_CASES_FILE, 'r', encoding='utf-8') as f:
+        for pid, cases in json.load(f).items():
+            catalogue.setdefault(pid, []).extend(cases)
+    return catalogue
+
+
+def fit_questions(questions: List[str], rounds: Optional[int]) -> List[str]:
+    """截取前 rounds 轮；rounds 超过用例长度时循环使用问题"""
+    if rounds is None:
+        return questions
+    return [questions[i % len(questions)] for i in range(rounds)]
+
+
+def select_cases(preset: Preset, philosophers: Optional[Sequence[str]] = None,
+                 case_ids: Optional[Sequence[str]] = None,
+                 rounds: Optional[int] = None) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    选出要运行的 (哲学家, 测试用例)：case_ids 优先于预设自带的用例，philosophers 再按哲学家过滤
+    未知的用例 ID 抛 ValueError
+    """
+    catalogue = load_case_catalogue()
+    index = {case['test_id']: (pid, case) for pid, cases in catalogue.items() for case in cases}
+    if case_ids:
+        selected_ids = list(case_ids)
+    elif preset.cases is not None:
+        selected_ids = preset.cases
+    else:
+        selected_ids = [case['test_id'] for cases in TEST_CASES.values() for case in cases]
+
+    unknown = [test_id for test_id in selected_ids if test_id not in index]
+    if unknown:
+        raise ValueError(f"未知的测试用例: {', '.join(unknown)}")
+
+    selection = []
+    for test_id in selected_ids:
+        pid, case = index[test_id]
+        if philosophers and pid not in philosophers:
+            continue
+        selection.append((pid, dict(case, questions=fit_questions(case['questions'], rounds))))
+    return selection
@@ -0,0 +1,209 @@
+"""
+推测式并行采样（best-of-N）
+每轮以预设给出的 temperature 为中心同时发出 N 个不同 temperature 的请求，
+返回第一个通过长度约束（预设的字数区间、单行、不与之前的回复近似重复）的候选，其余候选取消
+（流式模式下直接断开连接；非流式请求已发出无法取消，但不再等待，它们消耗的 token 仍计入统计）。
+由执行引擎在 --candidates 大于 1 时使用；候选通过率受取消影响会偏低，单次采样的基线用 --candidates 1 对照
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional
+
+from http_client import get_client
+from token_profiler import round_usage
+from anti_repetition_index import AntiRepetitionIndex
+from latency_stats import LatencySketch
+from response_cache import CacheMissError
+
+DEFAULT_CANDIDATES = 3
+DEFAULT_SPREAD = 0.15
+
+
+def candidate_temperatures(base: float, count: int, spread: float = DEFAULT_SPREAD) -> List[float]:
+    """以 base 为中心交替向两侧展开：base, base-spread, base+spread, base-2*spread ...（限制在 0-2）"""
+    temperatures = []
+    for i in range(count):
+        step = (i + 1) // 2
+        offset = -step * spread if i % 2 else step * spread
+        temperatures.append(round(min(2.0, max(0.0, base + offset)), 2))
+    return temperatures
+
+
+def check_candidate(text: str, min_chars: int, max_chars: int,
+                    index: Optional[AntiRepetitionIndex] = None) -> List[str]:
+    """返回候选回复违反的约束（空列表表示通过）：error / length / multiline / repeat"""
+    if text.startswith("[API错误"):
+        return ["error"]
+    failures = []
+    stripped = text.strip()
+    if not min_chars <= len(stripped) <= max_chars:
+        failures.append("length")
+    if '\n' in stripped:
+        failures.append("multiline")
+    if index is not None and index.check(stripped) is not None:
+        failures.append("repeat")
+    return failures
+
+
+class SpeculativeSampler:
+    """每轮并发采样 N 个候选，取第一个通过约束的候选"""
+
+    def __init__(self, candidates: int = DEFAULT_CANDIDATES, spread: float = DEFAULT_SPREAD,
+                 min_chars: int = 15, max_chars: int = 30, max_workers: Optional[int] = None):
+        self.candidates = candidates
+        self.spread = spread
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.pool = ThreadPoolExecutor(max_workers=max_workers or candidates)
+        self._lock = threading.Lock()
+        self._outstanding: List[Future] = []
+        self.totals = {
+            "rounds": 0, "passed_rounds": 0,
+            "candidates": 0, "completed_candidates": 0, "passed_candidates": 0, "cancelled_candidates": 0,
+            "selected_tokens": 0, "total_tokens": 0,
+        }
+        self.candidate_latency = LatencySketch()  # 所有完成的候选
+        self.selected_latency = LatencySketch()   # 每轮选中候选的延迟
+
+    @staticmethod
+    def _request(messages, temperature, cancel_event, chat_options):
+        start = time.time()
+        try:
+            result = get_client().chat(messages, temperature=temperature, cancel_event=cancel_event, **chat_options)
+            result = dict(result, usage=round_usage(messages, result["content"], result.get("usage")))
+        except CacheMissError:
+            raise
+        except Exception as e:
+            result = {"content": f"[API错误: {str(e)}]", "usage": None, "timing": {}}
+        result["temperature"] = temperature
+        result["response_time"] = time.time() - start
+        return result
+
+    def _check(self, text: str, index: Optional[AntiRepetitionIndex] = None) -> List[str]:
+        return check_candidate(text, self.min_chars, self.max_chars, index)
+
+    def _account(self, result: Dict[str, Any]):
+        """统计一个已结束的候选（包括选出结果之后才结束的）"""
+        with self._lock:
+            if result["usage"]:
+                self.totals["total_tokens"] += result["usage"]["total_tokens"]
+            if result.get("aborted"):
+                self.totals["cancelled_candidates"] += 1
+                return
+            self.totals["completed_candidates"] += 1
+            self.candidate_latency.add(result["response_time"])
+            if not result["failures"]:
+                self.totals["passed_candidates"] += 1
+
+    def sample(self, messages: List[Dict[str, str]], base_temperature: float,
+               index: Optional[AntiRepetitionIndex] = None, **chat_options) -> Dict[str, Any]:
+        """
+        并发请求 N 个候选，返回第一个通过约束的候选；都不通过时返回违反约束最少的候选
+        返回值在 request_round 的基础上增加 temperature / response_time / failures / speculative
+        """
+        cancel_event = threading.Event()
+        start = time.time()
+        futures = {self.pool.submit(self._request, messages, t, cancel_event, chat_options): t
+                   for t in candidate_temperatures(base_temperature, self.candidates, self.spread)}
+        finished: List[Dict[str, Any]] = []
+        winner = None
+        pending = set(futures)
+
+        try:
+            while pending and winner is None:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    result["failures"] = self._check(result["content"], index)
+                    self._account(result)
+                    finished.append(result)
+                    if winner is None and not result["failures"] and not result.get("aborted"):
+                        winner = result
+        except CacheMissError:
+            cancel_event.set()
+            for future in pending:
+                future.cancel()
+            raise
+
+        if winner is not None and pending:
+            # 取消其余候选：尚未开始的直接取消，流式请求在下一个片段到达时断开
+            cancel_event.set()
+            for future in pending:
+                if future.cancel():
+                    with self._lock:
+                        self.totals["cancelled_candidates"] += 1
+                else:
+                    future.add_done_callback(self._late_result)
+                    with self._lock:
+                        self._outstanding.append(future)
+
+        if winner is None:
+            winner = min(finished, key=lambda r: (len(r["failures"]),
+                                                  abs(len(r["content"].strip()) - self.max_chars)))
+
+        latency = time.time() - start
+        with self._lock:
+            self.totals["rounds"] += 1
+            self.totals["candidates"] += len(futures)
+            self.totals["passed_rounds"] += 0 if winner["failures"] else 1
+            if winner["usage"]:
+                self.totals["selected_tokens"] += winner["usage"]["total_tokens"]
+            self.selected_latency.add(latency)
+
+        winner = dict(winner)
+        winner["speculative"] = {
+            "candidates": len(futures),
+            "finished_before_pick": len(finished),
+            "temperatures": sorted(futures.values()),
+            "failures": [r["failures"] for r in finished],
+        }
+        winner["response_time"] = latency
+        return winner
+
+    def _late_result(self, future: Future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        result = future.result()
+        result["failures"] = self._check(result["content"])  # 选中结果已入库，这里不再检查重复
+        self._account(result)
+
+    def drain(self):
+        """等待已选出结果后仍在进行的候选结束（用于准确统计 token）"""
+        with self._lock:
+            outstanding, self._outstanding = self._outstanding, []
+        wait(outstanding)
+
+    def stats(self) -> Dict[str, Any]:
+        """合规率提升、额外 token 与延迟"""
+        self.drain()
+        t = self.totals
+        candidate = self.candidate_latency.summary()
+        selected = self.selected_latency.summary()
+        return {
+            **t,
+            "candidates_per_round": self.candidates,
+            "spread": self.spread,
+            "candidate_pass_rate": round(t["passed_candidates"] / t["completed_candidates"] * 100, 1)
+            if t["completed_candidates"] else None,
+            "selected_compliance": round(t["passed_rounds"] / t["rounds"] * 100, 1) if t["rounds"] else None,
+            "token_overhead": round(t["total_tokens"] / t["selected_tokens"], 2) if t["selected_tokens"] else None,
+            "candidate_latency": candidate,
+            "selected_latency": selected,
+        }
+
+    def print_stats(self):
+        stats = self.stats()
+        print("推测式采样统计:")
+        print(f"- 每轮候选数: {stats['candidates_per_round']} (temperature 间隔 {stats['spread']})")
+        print(f"- 合规率: 候选通过率 {stats['candidate_pass_rate']}% -> best-of-N {stats['selected_compliance']}%")
+        print(f"- token 消耗: {stats['total_tokens']} (选中回复 {stats['selected_tokens']}, {stats['token_overhead']} 倍)")
+        print(f"- 候选: 完成 {stats['completed_candidates']} / 取消 {stats['cancelled_candidates']} / 共 {stats['candidates']}")
+        if stats["candidate_latency"]["count"]:
+            print(f"- 延迟 p50/p90: 单个候选 {stats['candidate_latency']['p50']}/{stats['candidate_latency']['p90']}秒, "
+                  f"best-of-N {stats['selected_latency']['p50']}/{stats['selected_latency']['p90']}秒")
+
+    def close(self):
+        self.drain()
+        self.pool.shutdown(cancel_futures=True)
@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+评论截图审核基准测试
+在本机起一个视觉模型替身（/v1/chat/completions，按 --model-latency 模拟识别耗时），在隔离的 DATA_DIR 上
+先后以 SCREENSHOT_PIPELINE=off（原来的做法：原图 base64 直接发给模型）和开启预处理管线两种方式启动服务端，
+把 server/data/uploads 里的截图逐张 POST 到 /api/analyze-screenshot，对比：
+  - 发给模型的字节数（请求体和其中的图片）
+  - 模型调用次数、被缓存挡掉的请求数（重复上传、重新编码的同一张截图）
+  - 审核延迟 p50/p90/p99（首轮和重复轮分开统计），以及模型侧的最大并发
+
+--variants 为每张 PNG 额外生成一份“像素相同、文件不同”的副本（重新压缩 IDAT 并加一个 tEXt 块），
+模拟用户重新截图 / 转存后再提交；--repeat 控制整组截图提交几轮
+
+用法:
+    python screenshot_benchmark.py
+    python screenshot_benchmark.py --repeat 3 --variants --concurrency 8 --model-latency 1500
+    python screenshot_benchmark.py --max-model-concurrency 2
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+import argparse
+import base64
+import json
+import shutil
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from latency_stats import LatencySketch
+from span_recorder import span, add_trace_arguments, configure_tracing_from_args, export_trace
+from load_generator import (
+    REPO_ROOT,
+    ServerClient,
+    start_local_server,
+    wait_for_server,
+    error_kind,
+    _ms,
+)
+from run_tests import TESTS_DIR, result_path
+
+DEFAULT_PORT = 3100  # 避开开发服务端的 3000
+DEFAULT_MODEL_PORT = 8792
+UPLOADS_DIR = os.path.join(REPO_ROOT, "server", "data", "uploads")
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+MODES = ("off", "on")
+MODE_LABELS = {"off": "原图直发", "on": "预处理 + 缓存"}
+
+
+class ModelStandIn:
+    """进程内的视觉模型替身：记录请求字节数、图片字节数和最大并发"""
+
+    def __init__(self, port: int, latency: float):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.reset()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{port}/v1"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def reset(self):
+        with self.lock:
+            self.calls = 0
+            self.request_bytes = 0
+            self.image_bytes = 0
+            self.mime_types: Counter = Counter()
+            self.in_flight = 0
+            self.max_in_flight = 0
+
+    def _record(self, body: bytes) -> int:
+        """统计一次调用，返回请求里图片的字节数"""
+        image = 0
+        mime = "-"
+        for message in json.loads(body).get("messages", []):
+            content = message.get("content")
+            for part in content if isinstance(content, list) else []:
+                url = (part.get("image_url") or {}).get("url", "")
+                if url.startswith("data:"):
+                    header, _, data = url.partition(",")
+                    mime = header[5:].split(";")[0]
+                    image += len(base64.b64decode(data))
+        with self.lock:
+            self.calls += 1
+            self.request_bytes += len(body)
+            self.image_bytes += image
+            self.mime_types[mime] += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        return image
+
+    def _handler(self):
+        stand_in = self
+
+        class ModelHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if not self.path.endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                image = stand_in._record(body)
+                try:
+                    time.sleep(stand_in.latency)
+                finally:
+                    with stand_in.lock:
+                        stand_in.in_flight -= 1
+                reply = {"username": "benchuser", "comment": "基准测试评论",
+                         "comment_time": "昨天 21:58", "is_comment": True}
+                payload = json.dumps({
+                    "id": f"chatcmpl-bench-{stand_in.calls}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": "gpt-4o-mini",
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": json.dumps(reply, ensure_ascii=False)}}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                }, ensure_ascii=False).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return ModelHandler
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {"calls": self.calls, "request_bytes": self.request_bytes, "image_bytes": self.image_bytes,
+                    "mime_types": dict(self.mime_types), "max_in_flight": self.max_in_flight}
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def png_variant(content: bytes) -> Optional[bytes]:
+    """像素不变、字节不同的 PNG 副本：IDAT 换个压缩级别重新压缩，IEND 前加一个 tEXt 块"""
+    if not content.startswith(PNG_SIGNATURE):
+        return None
+    chunks: List[Tuple[bytes, bytes]] = []
+    idat = b""
+    pos = len(PNG_SIGNATURE)
+    while pos + 8 <= len(content):
+        length = int.from_bytes(content[pos:pos + 4], "big")
+        kind = content[pos + 4:pos + 8]
+        data = content[pos + 8:pos + 8 + length]
+        pos += 12 + length
+        if kind == b"IDAT":
+            if not idat:
+                chunks.append((b"IDAT", b""))
+            idat += data
+        else:
+            chunks.append((kind, data))
+        if kind == b"IEND":
+            break
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return len(data).to_bytes(4, "big") + kind + data + zlib.crc32(kind + data).to_bytes(4, "big")
+
+    out = [PNG_SIGNATURE]
+    for kind, data in chunks:
+        if kind == b"IDAT":
+            data = zlib.compress(zlib.decompress(idat), 1)
+        elif kind == b"IEND":
+            out.append(chunk(b"tEXt", b"Software\x00screenshot-benchmark"))
+        out.append(chunk(kind, data))
+    return b"".join(out)
+
+
+def load_screenshots(uploads_dir: str, variants: bool) -> List[Dict[str, Any]]:
+    """读取上传目录里的截图（按文件名排序），可选追加重新编码的副本"""
+    shots = []
+    for name in sorted(os.listdir(uploads_dir)):
+        path = os.path.join(uploads_dir, name)
+        if not os.path.isfile(path) or not name.lower().endswith((".png", ".jpg", ".jpeg", ".webp", ".gif")):
+            continue
+        with open(path, "rb") as f:
+            content = f.read()
+        mime = "image/png" if name.lower().endswith(".png") else "image/jpeg"
+        shots.append({"name": name, "content": content, "mime": mime, "variant": False})
+    if variants:
+        for shot in list(shots):
+            content = png_variant(shot["content"])
+            if content is not None:
+                shots.append({"name": "variant-" + shot["name"], "content": content, "mime": shot["mime"],
+                              "variant": True})
+    return shots
+
+
+def run_mode(mode: str, shots: List[Dict[str, Any]], model: ModelStandIn, args: argparse.Namespace
+             ) -> Dict[str, Any]:
+    """以一种方式启动服务端，把全部截图提交 --repeat 轮"""
+    data_dir = tempfile.mkdtemp(prefix=f"screenshot-bench-{mode}-")
+    env = {
+        "DATA_DIR": data_dir,
+        "OPENAI_BASE_URL": model.url,
+        "OPENAI_API_KEY": "local",
+        "API2D_API_KEY": "local",
+        "HAIHUB_API_KEY": "local",
+        "SCREENSHOT_PIPELINE": mode,
+        "SCREENSHOT_MAX_CONCURRENCY": str(args.max_model_concurrency),
+        # 全部请求来自本机同一个 IP，放开 analyze-screenshot 的按 IP 限流
+        "SCREENSHOT_RATE_LIMIT": str(len(shots) * args.repeat + 1),
+    }
+    server = ServerClient(f"http://127.0.0.1:{args.port}", pool_size=args.concurrency, timeout=args.timeout)
+    process = start_local_server(args.port, env)
+    rounds = []
+    total = LatencySketch()
+    errors: Counter = Counter()
+    try:
+        wait_for_server(server, process)
+        model.reset()
+
+        def submit(shot: Dict[str, Any]) -> Tuple[float, Optional[str]]:
+            start = time.perf_counter()
+            try:
+                response = server.analyze_screenshot(shot["name"], shot["content"], shot["mime"])
+                error = None if response.status_code in (200, 400) else f"HTTP {response.status_code}"
+            except requests.RequestException as e:
+                error = error_kind(e)
+            return time.perf_counter() - start, error
+
+        for round_num in range(1, args.repeat + 1):
+            before = model.stats()
+            latency = LatencySketch()
+            round_start = time.perf_counter()
+            with span("round", mode=mode, round=round_num), ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                for seconds, error in pool.map(submit, shots):
+                    latency.add(seconds)
+                    total.add(seconds)
+                    if error:
+                        errors[error] += 1
+            after = model.stats()
+            rounds.append({
+                "round": round_num,
+                "requests": len(shots),
+                "model_calls": after["calls"] - before["calls"],
+                "image_bytes": after["image_bytes"] - before["image_bytes"],
+                "wall_seconds": round(time.perf_counter() - round_start, 3),
+                "p50": latency.quantile(50),
+                "p99": latency.quantile(99),
+            })
+            print(f"  [{mode}] 第 {round_num} 轮：{len(shots)} 张，模型调用 {rounds[-1]['model_calls']} 次，"
+                  f"图片 {rounds[-1]['image_bytes'] / 1024:.0f}KB，p50 {_ms(rounds[-1]['p50'])}")
+    finally:
+        server.close()
+        process.terminate()
+        process.wait(timeout=10)
+        if args.keep_data:
+            print(f"数据目录保留在 {data_dir}")
+        else:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    model_stats = model.stats()
+    requests_total = len(shots) * args.repeat
+    return {
+        "mode": mode,
+        "requests": requests_total,
+        "errors": dict(errors),
+        "model": model_stats,
+        "avoided_calls": requests_total - model_stats["calls"],
+        "p50": total.quantile(50),
+        "p90": total.quantile(90),
+        "p99": total.quantile(99),
+        "max": total.max if total.count else None,
+        "rounds": rounds,
+    }
+
+
+def _ratio(new: float, old: float) -> str:
+    return f"{new / old:.1%}" if old else "-"
+
+
+def generate_summary_report(report: Dict[str, Any], json_file: str):
+    """生成截图审核基准测试总结报告（Markdown）"""
+    report_file = os.path.splitext(json_file)[0] + '-summary.md'
+    config = report["config"]
+    modes = report["modes"]
+    off, on = modes["off"], modes["on"]
+
+    with open(report_file, 'w', encoding='utf-8') as f:
+        f.write("# 金句式超级毒舌系统 - 截图审核基准测试\n\n")
+        f.write(f"**测试时间**: {report['start_time']} ~ {report['end_time']}\n\n")
+        f.write(f"**配置**: {config['screenshots']} 张截图（原始 {config['originals']} 张，总计 "
+                f"{config['screenshot_bytes'] / 1024:.0f}KB），提交 {config['repeat']} 轮，客户端并发 {config['concurrency']}；"
+                f"模型替身耗时 {config['model_latency']}ms，服务端模型并发上限 {config['max_model_concurrency']}\n\n")
+        f.write("---\n\n")
+
+        f.write("## 对比\n\n")
+        f.write(f"| 指标 | {MODE_LABELS['off']} | {MODE_LABELS['on']} | 比例 |\n")
+        f.write("|:---|:---:|:---:|:---:|\n")
+        f.write(f"| 模型调用 | {off['model']['calls']} | {on['model']['calls']} | "
+                f"{_ratio(on['model']['calls'], off['model']['calls'])} |\n")
+        f.write(f"| 发给模型的图片 | {off['model']['image_bytes'] / 1024:.0f}KB | {on['model']['image_bytes'] / 1024:.0f}KB | "
+                f"{_ratio(on['model']['image_bytes'], off['model']['image_bytes'])} |\n")
+        f.write(f"| 发给模型的请求体 | {off['model']['request_bytes'] / 1024:.0f}KB | "
+                f"{on['model']['request_bytes'] / 1024:.0f}KB | "
+                f"{_ratio(on['model']['request_bytes'], off['model']['request_bytes'])} |\n")
+        f.write(f"| 缓存挡掉的请求 | {off['avoided_calls']} | {on['avoided_calls']} | - |\n")
+        for key in ("p50", "p90", "p99", "max"):
+            f.write(f"| 审核延迟 {key} | {_ms(off[key])} | {_ms(on[key])} | {_ratio(on[key] or 0, off[key] or 0)} |\n")
+        f.write(f"| 模型侧最大并发 | {off['model']['max_in_flight']} | {on['model']['max_in_flight']} | - |\n")
+        f.write(f"| 错误 | {sum(off['errors'].values())} | {sum(on['errors'].values())} | - |\n")
+        f.write("\n")
+
+        f.write("## 各轮\n\n")
+        f.write("| 方式 | 轮次 | 模型调用 | 图片 | 耗时 | p50 | p99 |\n")
+        f.write("|:---|:---:|:---:|:---:|:---:|:---:|:---:|\n")
+        for mode in MODES:
+            for r in modes[mode]["rounds"]:
+                f.write(f"| {MODE_LABELS[mode]} | {r['round']} | {r['model_calls']}/{r['requests']} | "
+                        f"{r['image_bytes'] / 1024:.0f}KB | {r['wall_seconds']}秒 | {_ms(r['p50'])} | {_ms(r['p99'])} |\n")
+        f.write("\n")
+
+        errors = {mode: modes[mode]["errors"] for mode in MODES if modes[mode]["errors"]}
+        if errors:
+            f.write("## 错误\n\n")
+            for mode, counts in errors.items():
+                f.write(f"- {MODE_LABELS[mode]}: " + "，".join(f"{k} × {v}" for k, v in counts.items()) + "\n")
+
+    print(f"总结报告已保存到: {report_file}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="评论截图审核：预处理 + 缓存管线与原图直发的对比（本地模型替身）")
+    parser.add_argument("--uploads-dir", default=UPLOADS_DIR, help="截图目录，默认 server/data/uploads")
+    parser.add_argument("--repeat", type=int, default=2, help="整组截图提交几轮，默认 2")
+    parser.add_argument("--variants", action="store_true", help="为每张 PNG 追加一份重新编码（像素相同）的副本")
+    parser.add_argument("--concurrency", type=int, default=4, help="客户端同时提交的请求数，默认 4")
+    parser.add_argument("--model-latency", type=float, default=800, help="模型替身每次识别的耗时（毫秒），默认 800")
+    parser.add_argument("--max-model-concurrency", type=int, default=4,
+                        help="服务端同时调用模型的上限（SCREENSHOT_MAX_CONCURRENCY），默认 4")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"本地服务端端口，默认 {DEFAULT_PORT}")
+    parser.add_argument("--model-port", type=int, default=DEFAULT_MODEL_PORT,
+                        help=f"模型替身端口，默认 {DEFAULT_MODEL_PORT}")
+    parser.add_argument("--timeout", type=float, default=120.0, help="单次请求超时（秒），默认 120")
+    parser.add_argument("--keep-data", action="store_true", help="保留服务端数据目录（默认结束后删除）")
+    parser.add_argument("--output-dir", default=os.environ.get("TEST_OUTPUT_DIR", TESTS_DIR),
+                        help="结果文件和总结报告的输出目录")
+    add_trace_arguments(parser)
+    args = parser.parse_args()
+
+    if args.repeat < 1 or args.concurrency < 1 or args.max_model_concurrency < 1:
+        parser.error("--repeat / --concurrency / --max-model-concurrency 必须 >= 1")
+    configure_tracing_from_args(args)
+
+    shots = load_screenshots(args.uploads_dir, args.variants)
+    if not shots:
+        parser.error(f"{args.uploads_dir} 里没有截图")
+
+    print("="*80)
+    print(" 金句式超级毒舌系统 - 截图审核基准测试")
+    print("="*80)
+    print(f"{len(shots)} 张截图，提交 {args.repeat} 轮\n")
+
+    start_time = datetime.now().isoformat()
+    model = ModelStandIn(args.model_port, args.model_latency / 1000.0)
+    modes: Dict[str, Any] = {}
+    try:
+        for mode in MODES:
+            print(f"{MODE_LABELS[mode]}（SCREENSHOT_PIPELINE={mode}）")
+            modes[mode] = run_mode(mode, shots, model, args)
+            print()
+    finally:
+        model.close()
+
+    off, on = modes["off"], modes["on"]
+    print(f"模型调用 {off['model']['calls']} -> {on['model']['calls']}，"
+          f"图片 {off['model']['image_bytes'] / 1024:.0f}KB -> {on['model']['image_bytes'] / 1024:.0f}KB，"
+          f"p50 {_ms(off['p50'])} -> {_ms(on['p50'])}")
+
+    report = {
+        "test_suite": "截图审核基准测试",
+        "start_time": start_time,
+        "end_time": datetime.now().isoformat(),
+        "config": {"uploads_dir": args.uploads_dir, "screenshots": len(shots),
+                   "originals": sum(1 for s in shots if not s["variant"]),
+                   "screenshot_bytes": sum(len(s["content"]) for s in shots),
+                   "repeat": args.repeat, "variants": args.variants, "concurrency": args.concurrency,
+                   "model_latency": args.model_latency, "max_model_concurrency": args.max_model_concurrency},
+        "modes": modes,
+    }
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_file = result_path(args.output_dir, "screenshot-benchmark", "json")
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"结果已保存到: {output_file}")
+    generate_summary_report(report, output_file)
+    export_trace(output_file)
+
+
+if __name__ == "__main__":
+    main()
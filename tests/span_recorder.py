@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+热路径耗时分段记录
+每轮对话拆成若干阶段（消息拼装 assemble、限流等待 rate_limit_wait、发送到首字节 send、读响应体 body、
+解析 parse / 流式读取 stream、写断点和结果 persist、分析 analysis），每段记一个 span。
+默认不开启：span() 直接返回空上下文，几乎没有开销；开启后每个 span 只追加一个元组（无锁，依赖 GIL），
+结束时导出为 OpenMetrics 文本（各阶段耗时直方图、最大并发）和 Chrome trace JSON
+（chrome://tracing 或 https://ui.perfetto.dev 打开，按线程查看并发和卡顿）
+
+用法:
+    python -m runner --preset streamlined --concurrency 10 --trace
+    python span_recorder.py bench            # 测量单个 span 的记录开销
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+import argparse
+import contextlib
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# 超过该数量的 span 直接丢弃（只计数），防止长时间运行占满内存
+DEFAULT_MAX_SPANS = 1_000_000
+
+# OpenMetrics 直方图分桶边界（秒），覆盖微秒级的拼装到几十秒的请求
+STAGE_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+METRIC_PREFIX = "harness"
+
+_NULL_SPAN = contextlib.nullcontext()
+
+# (阶段名, 开始, 结束, 线程 ID, 附加属性)，时间为 time.perf_counter() 秒
+SpanTuple = Tuple[str, float, float, int, Optional[Dict[str, Any]]]
+
+
+class _Span:
+    __slots__ = ("recorder", "name", "attrs", "start")
+
+    def __init__(self, recorder: "SpanRecorder", name: str, attrs: Optional[Dict[str, Any]]):
+        self.recorder = recorder
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.recorder.record(self.name, self.start, time.perf_counter(), self.attrs)
+        return False
+
+
+class SpanRecorder:
+    """进程内的 span 记录器（多线程可同时写入）"""
+
+    def __init__(self, max_spans: int = DEFAULT_MAX_SPANS):
+        self.max_spans = max_spans
+        self.origin = time.perf_counter()
+        self.wall_origin = time.time()
+        self.dropped = 0
+        self._spans: List[SpanTuple] = []
+        self._threads: Dict[int, str] = {}
+
+    def record(self, name: str, start: float, end: float, attrs: Optional[Dict[str, Any]] = None):
+        """记录一个已经结束的 span（start / end 为 time.perf_counter() 的值）"""
+        if len(self._spans) >= self.max_spans:
+            self.dropped += 1
+            return
+        ident = threading.get_ident()
+        if ident not in self._threads:
+            self._threads[ident] = threading.current_thread().name
+        self._spans.append((name, start, end, ident, attrs))
+
+    def span(self, name: str, **attrs) -> _Span:
+        return _Span(self, name, attrs or None)
+
+    def spans(self) -> List[SpanTuple]:
+        return list(self._spans)
+
+    def stage_stats(self) -> Dict[str, Dict[str, Any]]:
+        """按阶段汇总：次数、总耗时、最大耗时、直方图计数和最大并发"""
+        durations: Dict[str, List[float]] = {}
+        edges: Dict[str, List[Tuple[float, int]]] = {}
+        for name, start, end, _, _ in self._spans:
+            durations.setdefault(name, []).append(end - start)
+            edges.setdefault(name, []).extend(((start, 1), (end, -1)))
+
+        stats = {}
+        for name, values in durations.items():
+            buckets = [sum(1 for v in values if v <= le) for le in STAGE_BUCKETS]
+            in_flight = peak = 0
+            for _, delta in sorted(edges[name], key=lambda edge: (edge[0], edge[1])):  # 同一时刻先结束再开始
+                in_flight += delta
+                peak = max(peak, in_flight)
+            stats[name] = {"count": len(values), "sum": sum(values), "max": max(values),
+                           "buckets": buckets, "max_concurrency": peak}
+        return stats
+
+    def to_openmetrics(self) -> str:
+        """OpenMetrics 文本格式（以 # EOF 结尾）"""
+        stats = self.stage_stats()
+        duration = f"{METRIC_PREFIX}_stage_duration_seconds"
+        concurrency = f"{METRIC_PREFIX}_stage_concurrency_max"
+        dropped = f"{METRIC_PREFIX}_spans_dropped"
+        lines = [
+            f"# TYPE {duration} histogram",
+            f"# UNIT {duration} seconds",
+            f"# HELP {duration} Duration of each stage of a conversation round.",
+        ]
+        for name, stage in stats.items():
+            for le, count in zip(STAGE_BUCKETS, stage["buckets"]):
+                lines.append(f'{duration}_bucket{{stage="{name}",le="{le}"}} {count}')
+            lines.append(f'{duration}_bucket{{stage="{name}",le="+Inf"}} {stage["count"]}')
+            lines.append(f'{duration}_count{{stage="{name}"}} {stage["count"]}')
+            lines.append(f'{duration}_sum{{stage="{name}"}} {stage["sum"]:.6f}')
+        lines.append(f"# TYPE {concurrency} gauge")
+        lines.append(f"# HELP {concurrency} Peak number of spans of a stage open at the same time.")
+        for name, stage in stats.items():
+            lines.append(f'{concurrency}{{stage="{name}"}} {stage["max_concurrency"]}')
+        lines.append(f"# TYPE {dropped} counter")
+        lines.append(f"# HELP {dropped} Spans discarded after the recorder reached max_spans.")
+        lines.append(f"{dropped}_total {self.dropped}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Chrome trace 事件格式（X 事件，时间单位微秒，每个线程一行）"""
+        tids = {ident: index for index, ident in enumerate(self._threads, 1)}
+        events = [{"name": "thread_name", "ph": "M", "pid": 1, "tid": tids[ident], "args": {"name": name}}
+                  for ident, name in self._threads.items()]
+        for name, start, end, ident, attrs in self._spans:
+            event = {"name": name, "cat": "round", "ph": "X", "pid": 1, "tid": tids[ident],
+                     "ts": round((start - self.origin) * 1e6, 1), "dur": round((end - start) * 1e6, 1)}
+            if attrs:
+                event["args"] = attrs
+            events.append(event)
+        return {"traceEvents": events, "displayTimeUnit": "ms",
+                "otherData": {"start_time": self.wall_origin, "dropped_spans": self.dropped}}
+
+    def write(self, stem: str) -> Tuple[str, str]:
+        """写出 <stem>-metrics.txt 和 <stem>-trace.json，返回两个路径"""
+        metrics_file = stem + "-metrics.txt"
+        trace_file = stem + "-trace.json"
+        with open(metrics_file, 'w', encoding='utf-8') as f:
+            f.write(self.to_openmetrics())
+        with open(trace_file, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome_trace(), f, ensure_ascii=False)
+        return metrics_file, trace_file
+
+    def print_summary(self):
+        """打印各阶段耗时汇总"""
+        stats = self.stage_stats()
+        print("耗时分段:")
+        print(f"  {'阶段':<16} {'次数':>8} {'总耗时':>10} {'平均':>10} {'最大':>10} {'最大并发':>8}")
+        for name, stage in sorted(stats.items(), key=lambda item: -item[1]["sum"]):
+            print(f"  {name:<16} {stage['count']:>8} {stage['sum']:>9.3f}s {stage['sum'] / stage['count'] * 1000:>8.2f}ms "
+                  f"{stage['max'] * 1000:>8.2f}ms {stage['max_concurrency']:>8}")
+        if self.dropped:
+            print(f"  （超过上限丢弃 {self.dropped} 个 span）")
+
+
+_recorder: Optional[SpanRecorder] = None
+
+
+def get_recorder() -> Optional[SpanRecorder]:
+    """当前开启的记录器（未开启时为 None）"""
+    return _recorder
+
+
+def enable_tracing(max_spans: int = DEFAULT_MAX_SPANS) -> SpanRecorder:
+    """开启记录（替换掉之前的记录器）"""
+    global _recorder
+    _recorder = SpanRecorder(max_spans)
+    return _recorder
+
+
+def span(name: str, **attrs):
+    """with span("assemble"): ... ；未开启时返回空上下文"""
+    recorder = _recorder
+    if recorder is None:
+        return _NULL_SPAN
+    return _Span(recorder, name, attrs or None)
+
+
+def record_span(name: str, start: float, end: float, **attrs):
+    """记录手动计时的 span（start / end 为 time.perf_counter() 的值）；未开启时什么都不做"""
+    recorder = _recorder
+    if recorder is not None:
+        recorder.record(name, start, end, attrs or None)
+
+
+def add_trace_arguments(parser: argparse.ArgumentParser):
+    """为测试脚本添加耗时分段记录参数"""
+    group = parser.add_argument_group("耗时分段")
+    group.add_argument("--trace", action="store_true",
+                       default=os.environ.get("HARNESS_TRACE", "") not in ("", "0"),
+                       help="记录每轮各阶段耗时，结束时在结果文件旁写出 -metrics.txt（OpenMetrics）"
+                            "和 -trace.json（Chrome trace）；也可用 HARNESS_TRACE=1 开启")
+    group.add_argument("--trace-max-spans", type=int, default=DEFAULT_MAX_SPANS,
+                       help=f"最多记录的 span 数，默认 {DEFAULT_MAX_SPANS}")
+
+
+def configure_tracing_from_args(args: argparse.Namespace) -> Optional[SpanRecorder]:
+    """根据 add_trace_arguments 解析出的参数开启记录"""
+    if not args.trace:
+        return None
+    return enable_tracing(args.trace_max_spans)
+
+
+def export_trace(result_file: str) -> Optional[Tuple[str, str]]:
+    """记录开启时，在结果文件旁写出 OpenMetrics 和 Chrome trace 并打印汇总"""
+    recorder = _recorder
+    if recorder is None:
+        return None
+    recorder.print_summary()
+    metrics_file, trace_file = recorder.write(os.path.splitext(result_file)[0])
+    print(f"OpenMetrics: {metrics_file}")
+    print(f"Chrome trace: {trace_file}")
+    return metrics_file, trace_file
+
+
+def measure_overhead(iterations: int = 200_000) -> Dict[str, float]:
+    """单个 span 的平均开销（纳秒）：未开启 / 开启"""
+    global _recorder
+    previous = _recorder
+    results = {}
+    try:
+        for label, recorder in (("disabled", None), ("enabled", SpanRecorder(iterations))):
+            _recorder = recorder
+            start = time.perf_counter()
+            for _ in range(iterations):
+                with span("bench"):
+                    pass
+            results[label] = (time.perf_counter() - start) / iterations * 1e9
+    finally:
+        _recorder = previous
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="耗时分段记录工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    bench = subparsers.add_parser("bench", help="测量单个 span 的记录开销")
+    bench.add_argument("--iterations", type=int, default=200_000)
+    args = parser.parse_args()
+
+    overhead = measure_overhead(args.iterations)
+    print(f"未开启: {overhead['disabled']:.0f} ns / span")
+    print(f"开启:   {overhead['enabled']:.0f} ns / span")
+
+
+if __name__ == "__main__":
+    main()
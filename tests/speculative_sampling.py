@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+金句式超级毒舌系统 - 推测式并行采样（best-of-N）
+每轮同时发出 N 个不同 temperature 的请求，取第一个满足金句约束的候选（实现见 runner/sampling.py）；
+统一执行器的推测式采样，等价于 python -m runner --candidates 3 --concurrency 5（其余参数原样传入，可覆盖默认值）
+
+用法:
+    python speculative_sampling.py --mock --candidates 3 --stream
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+from runner import main
+from runner.sampling import DEFAULT_CANDIDATES
+
+DEFAULT_CONCURRENCY = 5
+
+if __name__ == "__main__":
+    main(["--preset", "full", "--candidates", str(DEFAULT_CANDIDATES), "--concurrency", str(DEFAULT_CONCURRENCY)]
+         + sys.argv[1:])
@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""
+体验码存储规模基准
+按不同数据量（默认 1 万 / 5 万 / 10 万条体验码和申请记录，可加到 100 万）预先生成 codes.json 和
+applications.json（格式与 saveCodes / saveApplications 写出的一致），用 DATA_DIR 指向隔离的数据目录
+启动本地服务端，再并发压测管理端和用户端的几个接口：
+  stats         - GET /api/admin/stats（读全量 codes.json + 按时间排序全部申请记录）
+  codes_page    - GET /api/admin/codes?page=1&limit=50
+  codes_default - GET /api/admin/codes（路由默认 limit=1000）
+  verify_code   - POST /api/verify-code（每次用一个新的 active 体验码，会写回两个文件）
+  generate_batch- POST /api/admin/generate-batch（每次 --batch-size 个用户，整文件重写）
+前三个只读，先跑；后两个会改数据，最后跑。每种数据量汇总各接口的吞吐、延迟分位数、错误，
+以及相对最小数据量的延迟倍数，看各接口随数据量怎样变慢
+
+--engines 指定要对比的本地存储引擎（服务端的 STORAGE_ENGINE）：json 是原来的整文件读写，
+indexed 是带索引的追加写存储（record-store.ts）；每个引擎用同一份生成数据的副本，
+报告里另给出 indexed 相对 json 的 p50 加速比和吞吐倍数
+
+用法:
+    python store_benchmark.py                                   # 默认 10000 50000 100000，两种引擎
+    python store_benchmark.py --sizes 10000 100000 1000000 --requests 200 --concurrency 8
+    python store_benchmark.py --sizes 50000 --ops verify_code stats --engines indexed --keep-data
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+import argparse
+import json
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from latency_stats import LatencySketch
+from span_recorder import span, add_trace_arguments, configure_tracing_from_args, export_trace
+from load_generator import (
+    DEFAULT_ADMIN_PASSWORD,
+    ServerClient,
+    error_kind,
+    start_local_server,
+    wait_for_server,
+    _ms,
+)
+from run_tests import TESTS_DIR, result_path
+
+DEFAULT_SIZES = (10_000, 50_000, 100_000)
+DEFAULT_PORT = 3100  # 避开开发服务端的 3000
+DEFAULT_REQUESTS = 200
+DEFAULT_DURATION = 30.0
+DEFAULT_BATCH_SIZE = 20
+
+# 服务端 storage-adapter.ts 的本地存储引擎
+ENGINES = ("json", "indexed")
+
+# 只读接口在前，改数据的接口在后（verify_code 把码标记为已用，generate_batch 追加新码）
+OPERATIONS = ("stats", "codes_page", "codes_default", "verify_code", "generate_batch")
+
+CODE_PREFIX = "PHIL2024"  # server/utils/code-generator.ts
+CODE_CHARS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+
+# 合成数据的状态和来源分布（按序号取模，结果可复现）
+CODE_STATUS_CYCLE = ("active",) * 12 + ("used",) * 7 + ("expired",)
+CODE_SOURCE_CYCLE = ("batch",) * 7 + ("self_apply",) * 2 + ("manual",)
+APPLICATION_STATUS_CYCLE = ("approved",) * 6 + ("activated",) * 2 + ("rejected", "pending")
+
+
+def seed_code(index: int) -> str:
+    """第 index 个合成体验码，6 位 36 进制序号，保证唯一"""
+    chars = []
+    for _ in range(6):
+        index, rem = divmod(index, len(CODE_CHARS))
+        chars.append(CODE_CHARS[rem])
+    return f"{CODE_PREFIX}-{''.join(reversed(chars))}"
+
+
+def synthesize_codes(count: int, base_time: datetime) -> List[Dict[str, Any]]:
+    """生成 count 条体验码记录（字段同 code-manager.ts 的 AccessCode），越靠后越新"""
+    codes = []
+    for i in range(count):
+        status = CODE_STATUS_CYCLE[i % len(CODE_STATUS_CYCLE)]
+        created = base_time + timedelta(seconds=i)
+        user_name = f"bench{i:07d}"
+        codes.append({
+            "id": f"{int(created.timestamp() * 1000)}-{i:07d}",
+            "code": seed_code(i),
+            "status": status,
+            "userId": user_name,
+            "userName": user_name,
+            "createdAt": created.isoformat(timespec="milliseconds") + "Z",
+            "usedAt": (created + timedelta(hours=1)).isoformat(timespec="milliseconds") + "Z"
+            if status == "used" else None,
+            "expiresAt": None,
+            "maxUses": 1,
+            "currentUses": 1 if status == "used" else 0,
+            "source": CODE_SOURCE_CYCLE[i % len(CODE_SOURCE_CYCLE)],
+            "note": "基准测试",
+        })
+    return codes
+
+
+def synthesize_applications(count: int, base_time: datetime) -> List[Dict[str, Any]]:
+    """生成 count 条申请记录（字段同 application-manager.ts 的 Application）"""
+    applications = []
+    for i in range(count):
+        status = APPLICATION_STATUS_CYCLE[i % len(APPLICATION_STATUS_CYCLE)]
+        applied = (base_time + timedelta(seconds=i)).isoformat(timespec="milliseconds") + "Z"
+        application = {
+            "id": f"app-{i:07d}",
+            "userName": f"bench{i:07d}",
+            "wechatId": f"wx_bench{i:07d}",
+            "screenshot": "",
+            "status": status,
+            "appliedAt": applied,
+        }
+        if status != "pending":
+            application["reviewedAt"] = applied
+        if status in ("approved", "rejected"):
+            application["aiVerification"] = {"extractedName": f"bench{i:07d}", "comment": f"基准评论 {i}",
+                                             "confidence": 0.9, "verifiedAt": applied}
+        if status in ("approved", "activated"):
+            application["code"] = seed_code(i)
+        if status == "rejected":
+            application["rejectReason"] = "基准测试"
+        applications.append(application)
+    return applications
+
+
+def code_stats(codes: List[Dict[str, Any]]) -> Dict[str, int]:
+    """与 code-manager.ts 的 calculateStats 相同"""
+    statuses = Counter(c["status"] for c in codes)
+    sources = Counter(c["source"] for c in codes)
+    return {"total": len(codes), "active": statuses["active"], "used": statuses["used"],
+            "expired": statuses["expired"], "batch": sources["batch"], "selfApply": sources["self_apply"]}
+
+
+def seed_data_dir(data_dir: str, size: int) -> Dict[str, Any]:
+    """在 data_dir 写入 size 条体验码和申请记录，返回文件大小、耗时和可用于激活的体验码"""
+    start = time.perf_counter()
+    base_time = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=size)
+    codes = synthesize_codes(size, base_time)
+    applications = synthesize_applications(size, base_time)
+    os.makedirs(data_dir, exist_ok=True)
+    codes_file = os.path.join(data_dir, "codes.json")
+    applications_file = os.path.join(data_dir, "applications.json")
+    # indent=2 与服务端 JSON.stringify(data, null, 2) 一致，文件大小和解析开销才有可比性
+    with open(codes_file, 'w', encoding='utf-8') as f:
+        json.dump({"codes": codes, "stats": code_stats(codes)}, f, ensure_ascii=False, indent=2)
+    with open(applications_file, 'w', encoding='utf-8') as f:
+        json.dump({"applications": applications}, f, ensure_ascii=False, indent=2)
+    return {
+        "seed_seconds": round(time.perf_counter() - start, 2),
+        "codes_bytes": os.path.getsize(codes_file),
+        "applications_bytes": os.path.getsize(applications_file),
+        "active_codes": [c["code"] for c in codes if c["status"] == "active"],
+    }
+
+
+class OperationStats:
+    """单个接口的延迟草图和错误计数（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = LatencySketch()
+        self.ok = 0
+        self.errors = Counter()
+
+    def observe(self, elapsed: float, error: Optional[str] = None):
+        with self._lock:
+            self.latency.add(elapsed)
+            if error is None:
+                self.ok += 1
+            else:
+                self.errors[error] += 1
+
+    def report(self, wall_clock: float) -> Dict[str, Any]:
+        errors = sum(self.errors.values())
+        return {
+            "count": self.ok + errors,
+            "errors": errors,
+            "error_kinds": dict(self.errors.most_common()),
+            "wall_clock": round(wall_clock, 2),
+            "ops_per_sec": round(self.ok / wall_clock, 2) if wall_clock > 0 else 0,
+            "latency": self.latency.summary(digits=4),
+        }
+
+
+def run_operation(op: str, call: Callable[[int], Dict[str, Any]], requests_budget: int, duration: float,
+                  concurrency: int, check: Optional[Callable[[Dict[str, Any]], Optional[str]]] = None
+                  ) -> Dict[str, Any]:
+    """用 concurrency 个线程反复调用 call(序号)，直到发满 requests_budget 次或超过 duration 秒"""
+    stats = OperationStats()
+    counter = iter(range(requests_budget))
+    counter_lock = threading.Lock()
+    start = time.perf_counter()
+    deadline = start + duration
+
+    def worker():
+        while time.perf_counter() < deadline:
+            with counter_lock:
+                index = next(counter, None)
+            if index is None:
+                return
+            call_start = time.perf_counter()
+            try:
+                with span(op):
+                    result = call(index)
+                error = check(result) if check else None
+            except Exception as e:
+                error = error_kind(e)
+            stats.observe(time.perf_counter() - call_start, error)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    return stats.report(time.perf_counter() - start)
+
+
+def operation_calls(server: ServerClient, token: str, active_codes: List[str], batch_size: int, run_id: str
+                    ) -> Dict[str, Tuple[Callable[[int], Dict[str, Any]], Optional[Callable]]]:
+    """各接口的调用方式和结果检查"""
+    def verify(index: int) -> Dict[str, Any]:
+        return server.verify_code(active_codes[index])
+
+    def generate(index: int) -> Dict[str, Any]:
+        names = [f"batch-{run_id}-{index:05d}-{j:03d}" for j in range(batch_size)]
+        return server.generate_batch(token, names, "基准测试")
+
+    return {
+        "stats": (lambda index: server.stats(token), None),
+        "codes_page": (lambda index: server.list_codes(token, page=1, limit=50), None),
+        "codes_default": (lambda index: server.list_codes(token), None),
+        "verify_code": (verify, lambda data: None if data.get("valid") else f"invalid: {data.get('message')}"),
+        "generate_batch": (generate, lambda data: None if data.get("count") == batch_size else "short batch"),
+    }
+
+
+def run_engine(engine: str, size: int, data_dir: str, active_codes: List[str], args: argparse.Namespace,
+               run_id: str) -> Dict[str, Dict[str, Any]]:
+    """用指定存储引擎（STORAGE_ENGINE）在 data_dir 上启动服务端，依次压测各接口"""
+    server = ServerClient(f"http://127.0.0.1:{args.port}", pool_size=args.concurrency, timeout=args.timeout)
+    process = start_local_server(args.port, {"DATA_DIR": data_dir, "STORAGE_ENGINE": engine})
+    operations = {}
+    try:
+        wait_for_server(server, process)
+        token = server.login(args.admin_password)
+        calls = operation_calls(server, token, active_codes, args.batch_size, f"{run_id}-{engine}")
+        for op in args.ops:
+            budget = min(args.requests, len(active_codes)) if op == "verify_code" else args.requests
+            call, check = calls[op]
+            with span("operation", engine=engine, size=size, op=op):
+                operations[op] = run_operation(op, call, budget, args.duration, args.concurrency, check)
+            stats = operations[op]
+            print(f"  [{engine}] {op:<15} {stats['ops_per_sec']:>9}/s  p50 {_ms(stats['latency'].get('p50')):>9}  "
+                  f"p99 {_ms(stats['latency'].get('p99')):>9}  错误 {stats['errors']}")
+    finally:
+        server.close()
+        process.terminate()
+        process.wait(timeout=10)
+    return operations
+
+
+def benchmark_size(size: int, args: argparse.Namespace, run_id: str) -> List[Dict[str, Any]]:
+    """生成一种数据量的数据，每个存储引擎各用一份副本压测（改数据的接口不会互相影响）"""
+    seed_dir = tempfile.mkdtemp(prefix=f"store-bench-{size}-")
+    template_dir = os.path.join(seed_dir, "seed")
+    print(f"生成 {size} 条体验码和申请记录 -> {template_dir}")
+    with span("seed", size=size):
+        seed = seed_data_dir(template_dir, size)
+    active_codes = seed.pop("active_codes")
+    print(f"  codes.json {seed['codes_bytes'] / 1e6:.1f}MB，applications.json "
+          f"{seed['applications_bytes'] / 1e6:.1f}MB，耗时 {seed['seed_seconds']} 秒")
+
+    results = []
+    try:
+        for engine in args.engines:
+            data_dir = os.path.join(seed_dir, engine)
+            shutil.copytree(template_dir, data_dir)
+            operations = run_engine(engine, size, data_dir, active_codes, args, run_id)
+            results.append({"size": size, "engine": engine, **seed, "operations": operations})
+    finally:
+        if args.keep_data:
+            print(f"  数据目录保留在 {seed_dir}")
+        else:
+            shutil.rmtree(seed_dir, ignore_errors=True)
+    return results
+
+
+def scaling_table(results: List[Dict[str, Any]], ops: List[str]) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+    """各引擎各接口 p50 / 吞吐相对最小数据量的倍数"""
+    scaling = {}
+    for engine in dict.fromkeys(r["engine"] for r in results):
+        engine_results = [r for r in results if r["engine"] == engine]
+        for op in ops:
+            rows = [(r["size"], r["operations"].get(op)) for r in engine_results]
+            rows = [(size, stats) for size, stats in rows if stats and stats["latency"].get("count")]
+            if not rows:
+                continue
+            base = rows[0][1]
+            scaling.setdefault(engine, {})[op] = [{
+                "size": size,
+                "p50_ratio": _ratio(stats["latency"]["p50"], base["latency"]["p50"], 2),
+                "ops_ratio": _ratio(stats["ops_per_sec"], base["ops_per_sec"], 3),
+            } for size, stats in rows]
+    return scaling
+
+
+def engine_comparison(results: List[Dict[str, Any]], ops: List[str], baseline: str = "json",
+                      candidate: str = "indexed") -> List[Dict[str, Any]]:
+    """同一数据量下 candidate 相对 baseline 的 p50 加速比和吞吐倍数"""
+    by_key = {(r["engine"], r["size"]): r["operations"] for r in results}
+    rows = []
+    for size in sorted({r["size"] for r in results}):
+        base_ops, cand_ops = by_key.get((baseline, size)), by_key.get((candidate, size))
+        if not base_ops or not cand_ops:
+            continue
+        for op in ops:
+            base, cand = base_ops.get(op), cand_ops.get(op)
+            if not base or not cand or not base["latency"].get("count") or not cand["latency"].get("count"):
+                continue
+            rows.append({"size": size, "op": op,
+                         "p50_speedup": _ratio(base["latency"]["p50"], cand["latency"]["p50"], 1),
+                         "ops_ratio": _ratio(cand["ops_per_sec"], base["ops_per_sec"], 1)})
+    return rows
+
+
+def _ratio(numerator: float, denominator: float, digits: int) -> Optional[float]:
+    return round(numerator / denominator, digits) if denominator else None
+
+
+def generate_summary_report(report: Dict[str, Any], json_file: str):
+    """生成存储基准总结报告（Markdown）"""
+    report_file = os.path.splitext(json_file)[0] + '-summary.md'
+    config = report["config"]
+
+    with open(report_file, 'w', encoding='utf-8') as f:
+        f.write("# 金句式超级毒舌系统 - 体验码存储规模基准\n\n")
+        f.write(f"**测试时间**: {report['start_time']} ~ {report['end_time']}\n\n")
+        f.write(f"**配置**: 存储引擎 {', '.join(config['engines'])}，每个接口最多 {config['requests']} 次 / "
+                f"{config['duration']} 秒，并发 {config['concurrency']}，每批生成 {config['batch_size']} 个\n\n")
+        f.write("---\n\n")
+
+        f.write("## 数据量\n\n")
+        f.write("| 记录数 | codes.json | applications.json | 生成耗时 |\n")
+        f.write("|:---:|:---:|:---:|:---:|\n")
+        for result in {r["size"]: r for r in report["results"]}.values():
+            f.write(f"| {result['size']} | {result['codes_bytes'] / 1e6:.1f}MB | "
+                    f"{result['applications_bytes'] / 1e6:.1f}MB | {result['seed_seconds']}秒 |\n")
+        f.write("\n")
+
+        f.write("## 各接口统计\n\n")
+        f.write("| 接口 | 引擎 | 记录数 | 次数 | 错误 | 吞吐 (次/秒) | 平均 | p50 | p90 | p99 | 最大 |\n")
+        f.write("|:---|:---:|:---:|:---:|:---:|:---:|:---:|:---:|:---:|:---:|:---:|\n")
+        for op in config["ops"]:
+            for result in report["results"]:
+                stats = result["operations"].get(op)
+                if not stats:
+                    continue
+                latency = stats["latency"]
+                f.write(f"| {op} | {result['engine']} | {result['size']} | {stats['count']} | {stats['errors']} | "
+                        f"{stats['ops_per_sec']} | {_ms(latency.get('avg'))} | {_ms(latency.get('p50'))} | "
+                        f"{_ms(latency.get('p90'))} | {_ms(latency.get('p99'))} | {_ms(latency.get('max'))} |\n")
+        f.write("\n")
+
+        if report["scaling"]:
+            f.write("## 随数据量的变化（相对最小数据量）\n\n")
+            f.write("| 接口 | 引擎 | 记录数 | p50 倍数 | 吞吐倍数 |\n")
+            f.write("|:---|:---:|:---:|:---:|:---:|\n")
+            for engine, by_op in report["scaling"].items():
+                for op, rows in by_op.items():
+                    for row in rows:
+                        f.write(f"| {op} | {engine} | {row['size']} | {row['p50_ratio']} | {row['ops_ratio']} |\n")
+            f.write("\n")
+
+        if report["comparison"]:
+            f.write("## indexed 相对 json\n\n")
+            f.write("| 接口 | 记录数 | p50 加速比 | 吞吐倍数 |\n")
+            f.write("|:---|:---:|:---:|:---:|\n")
+            for row in report["comparison"]:
+                f.write(f"| {row['op']} | {row['size']} | {row['p50_speedup']}x | {row['ops_ratio']}x |\n")
+            f.write("\n")
+
+        errors = [(op, result["engine"], result["size"], kind, count) for result in report["results"]
+                  for op, stats in result["operations"].items() for kind, count in stats["error_kinds"].items()]
+        if errors:
+            f.write("## 错误\n\n")
+            f.write("| 接口 | 引擎 | 记录数 | 错误 | 次数 |\n")
+            f.write("|:---|:---:|:---:|:---|:---:|\n")
+            for op, engine, size, kind, count in errors:
+                f.write(f"| {op} | {engine} | {size} | {kind} | {count} |\n")
+
+    print(f"总结报告已保存到: {report_file}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="体验码存储随数据量的吞吐和延迟基准（对比本地存储引擎）")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="体验码和申请记录的条数，默认 10000 50000 100000")
+    parser.add_argument("--ops", nargs="+", choices=OPERATIONS, default=list(OPERATIONS),
+                        help="要压测的接口（按 只读 -> 改数据 的固定顺序执行），默认全部")
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES),
+                        help="要对比的本地存储引擎（服务端 STORAGE_ENGINE），默认 json indexed")
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS,
+                        help=f"每个接口最多请求次数，默认 {DEFAULT_REQUESTS}")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION,
+                        help=f"每个接口最长压测时间（秒），默认 {DEFAULT_DURATION:.0f}")
+    parser.add_argument("--concurrency", type=int, default=4, help="并发请求数，默认 4")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"generate_batch 每次生成的体验码数，默认 {DEFAULT_BATCH_SIZE}")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"本地服务端端口，默认 {DEFAULT_PORT}")
+    parser.add_argument("--timeout", type=float, default=120.0, help="单次请求超时（秒），默认 120")
+    parser.add_argument("--admin-password", default=os.environ.get("ADMIN_PASSWORD", DEFAULT_ADMIN_PASSWORD),
+                        help="管理员密码（默认读取 ADMIN_PASSWORD）")
+    parser.add_argument("--keep-data", action="store_true", help="保留生成的数据目录（默认结束后删除）")
+    parser.add_argument("--output-dir", default=os.environ.get("TEST_OUTPUT_DIR", TESTS_DIR),
+                        help="结果文件和总结报告的输出目录")
+    add_trace_arguments(parser)
+    args = parser.parse_args()
+
+    if any(size < 1 for size in args.sizes):
+        parser.error("--sizes 必须 >= 1")
+    if args.requests < 1 or args.concurrency < 1 or args.batch_size < 1:
+        parser.error("--requests / --concurrency / --batch-size 必须 >= 1")
+    args.sizes = sorted(set(args.sizes))
+    args.ops = [op for op in OPERATIONS if op in args.ops]
+    args.engines = list(dict.fromkeys(args.engines))
+    configure_tracing_from_args(args)
+
+    print("="*80)
+    print(" 金句式超级毒舌系统 - 体验码存储规模基准")
+    print("="*80)
+    print()
+
+    start_time = datetime.now().isoformat()
+    run_id = datetime.now().strftime("%Y%m%d%H%M%S")
+    results = [result for size in args.sizes for result in benchmark_size(size, args, run_id)]
+
+    report = {
+        "test_suite": "体验码存储规模基准",
+        "start_time": start_time,
+        "end_time": datetime.now().isoformat(),
+        "config": {"sizes": args.sizes, "engines": args.engines, "ops": args.ops, "requests": args.requests,
+                   "duration": args.duration, "concurrency": args.concurrency, "batch_size": args.batch_size},
+        "results": results,
+        "scaling": scaling_table(results, args.ops),
+        "comparison": engine_comparison(results, args.ops),
+    }
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_file = result_path(args.output_dir, "store-benchmark", "json")
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"\n结果已保存到: {output_file}")
+    generate_summary_report(report, output_file)
+    export_trace(output_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Token 用量与上下文成本分析
+生产环境每轮都会带上最多 200 条历史消息和 100 条之前的 AI 回复，提示词 token 随轮次持续增长；
+这里记录每轮的 prompt / completion token（优先用 API 返回的 usage，离线或缺失时用本地估算），
+画出 token 随轮次的增长曲线，并标出成本或延迟首次超过阈值的轮次
+
+用法:
+    python token_profiler.py test-results-xxx.json --max-prompt-tokens 8000 --max-latency 5
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+import argparse
+import math
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+from result_formats import iter_conversations, load_conversations
+
+# DeepSeek 官方给出的换算：1 个中文字符约 0.6 token，1 个英文字符约 0.3 token
+CJK_TOKENS_PER_CHAR = 0.6
+OTHER_TOKENS_PER_CHAR = 0.3
+MESSAGE_OVERHEAD_TOKENS = 4  # 每条消息的角色标记等额外开销
+
+# 价格（元 / 百万 tokens），可用环境变量覆盖
+PRICE_INPUT = float(os.environ.get("DEEPSEEK_PRICE_INPUT", "2"))
+PRICE_CACHED_INPUT = float(os.environ.get("DEEPSEEK_PRICE_CACHED_INPUT", "0.5"))
+PRICE_OUTPUT = float(os.environ.get("DEEPSEEK_PRICE_OUTPUT", "8"))
+
+_CJK = re.compile(r'[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]')
+
+
+def estimate_text_tokens(text: str) -> int:
+    """本地估算一段文本的 token 数（无需分词器）"""
+    cjk = len(_CJK.findall(text))
+    return math.ceil(cjk * CJK_TOKENS_PER_CHAR + (len(text) - cjk) * OTHER_TOKENS_PER_CHAR)
+
+
+def estimate_prompt_tokens(messages: List[Dict[str, str]]) -> int:
+    """本地估算一次请求的 prompt token 数"""
+    return sum(estimate_text_tokens(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+
+def round_usage(messages: List[Dict[str, str]], content: str, api_usage: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    单轮 token 用量：API 返回了 usage 时直接使用，否则按本地估算（estimated=True）
+    返回 {prompt_tokens, completion_tokens, total_tokens[, prompt_cache_hit_tokens], estimated}
+    """
+    if api_usage and "prompt_tokens" in api_usage:
+        usage = {
+            "prompt_tokens": api_usage["prompt_tokens"],
+            "completion_tokens": api_usage.get("completion_tokens", 0),
+            "total_tokens": api_usage.get("total_tokens",
+                                          api_usage["prompt_tokens"] + api_usage.get("completion_tokens", 0)),
+            "estimated": False,
+        }
+        if "prompt_cache_hit_tokens" in api_usage:
+            usage["prompt_cache_hit_tokens"] = api_usage["prompt_cache_hit_tokens"]
+        return usage
+
+    prompt_tokens = estimate_prompt_tokens(messages)
+    completion_tokens = estimate_text_tokens(content)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "estimated": True,
+    }
+
+
+def usage_cost(usage: Dict[str, Any]) -> float:
+    """单轮费用（元），命中上下文缓存的 prompt token 按缓存价计"""
+    cached = usage.get("prompt_cache_hit_tokens", 0)
+    return ((usage["prompt_tokens"] - cached) * PRICE_INPUT + cached * PRICE_CACHED_INPUT
+            + usage["completion_tokens"] * PRICE_OUTPUT) / 1_000_000
+
+
+class Thresholds:
+    """告警阈值（为 None 表示不检查），默认值读取 PROFILE_MAX_* 环境变量"""
+
+    def __init__(self, prompt_tokens: Optional[int] = None, round_cost: Optional[float] = None,
+                 latency: Optional[float] = None):
+        self.prompt_tokens = prompt_tokens
+        self.round_cost = round_cost
+        self.latency = latency
+
+    @classmethod
+    def from_env(cls) -> "Thresholds":
+        def read(name, default, cast):
+            value = os.environ.get(name, default)
+            return cast(value) if value not in ("", "0") else None
+
+        return cls(
+            prompt_tokens=read("PROFILE_MAX_PROMPT_TOKENS", "8000", int),
+            round_cost=read("PROFILE_MAX_ROUND_COST", "0.02", float),
+            latency=read("PROFILE_MAX_LATENCY", "5", float),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"prompt_tokens": self.prompt_tokens, "round_cost": self.round_cost, "latency": self.latency}
+
+
+def profile_rounds(rounds: Iterable[Dict[str, Any]], thresholds: Thresholds) -> Dict[str, Any]:
+    """
+    分析一个对话的 token 增长
+    返回 {points: [每轮用量], totals, crossings: {prompt_tokens / round_cost / latency: 首次超过阈值的轮次或 None}}
+    没有 usage 记录的轮次（旧结果文件）会被跳过
+    """
+    points = []
+    crossings = {"prompt_tokens": None, "round_cost": None, "latency": None}
+    for round_data in rounds:
+        usage = round_data.get("usage")
+        if not usage:
+            continue
+        point = {
+            "round": round_data["round"],
+            "prompt_tokens": usage["prompt_tokens"],
+            "completion_tokens": usage["completion_tokens"],
+            "cost": usage_cost(usage),
+            "response_time": round_data.get("response_time", 0),
+            "estimated": usage.get("estimated", False),
+        }
+        points.append(point)
+
+        checks = {
+            "prompt_tokens": (thresholds.prompt_tokens, point["prompt_tokens"]),
+            "round_cost": (thresholds.round_cost, point["cost"]),
+            "latency": (thresholds.latency, point["response_time"]),
+        }
+        for name, (limit, value) in checks.items():
+            if crossings[name] is None and limit is not None and value > limit:
+                crossings[name] = point["round"]
+
+    return {
+        "points": points,
+        "totals": {
+            "prompt_tokens": sum(p["prompt_tokens"] for p in points),
+            "completion_tokens": sum(p["completion_tokens"] for p in points),
+            "cost": round(sum(p["cost"] for p in points), 6),
+            "estimated": any(p["estimated"] for p in points),
+        },
+        "crossings": crossings,
+    }
+
+
+def usage_fields(rounds: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """分析结果中的 token 字段（没有 usage 记录时返回空字典）"""
+    usages = [r["usage"] for r in rounds if r.get("usage")]
+    if not usages:
+        return {}
+    return {
+        "total_prompt_tokens": sum(u["prompt_tokens"] for u in usages),
+        "total_completion_tokens": sum(u["completion_tokens"] for u in usages),
+        "max_prompt_tokens": max(u["prompt_tokens"] for u in usages),
+        "estimated_cost": round(sum(usage_cost(u) for u in usages), 6),
+        "usage_estimated": any(u.get("estimated") for u in usages),
+    }
+
+
+def _growth_by_round(profiles: List[Dict[str, Any]]) -> Dict[int, Dict[str, float]]:
+    rounds: Dict[int, List[Dict[str, Any]]] = {}
+    for profile in profiles:
+        for point in profile["points"]:
+            rounds.setdefault(point["round"], []).append(point)
+    return {
+        round_num: {
+            "samples": len(points),
+            "prompt_tokens": sum(p["prompt_tokens"] for p in points) / len(points),
+            "completion_tokens": sum(p["completion_tokens"] for p in points) / len(points),
+            "cost": sum(p["cost"] for p in points) / len(points),
+            "response_time": sum(p["response_time"] for p in points) / len(points),
+        }
+        for round_num, points in sorted(rounds.items())
+    }
+
+
+def format_token_section(conversations: List[Dict[str, Any]], thresholds: Thresholds, width: int = 40) -> str:
+    """
+    生成报告中的 "Token 用量" 章节
+    conversations 为 [{"name": 对话名, "profile": profile_rounds(...) 的结果}]
+    """
+    profiles = [c["profile"] for c in conversations]
+    growth = _growth_by_round(profiles)
+    if not growth:
+        return "## Token 用量\n\n结果中没有 usage 记录\n"
+
+    estimated = any(p["totals"]["estimated"] for p in profiles)
+    lines = ["## Token 用量\n"]
+    if estimated:
+        lines.append("（部分轮次没有 API usage，按本地估算：中文 0.6 token/字，其他 0.3 token/字）\n")
+    lines.append(f"**阈值**: prompt {thresholds.prompt_tokens or '-'} tokens, "
+                 f"单轮费用 {thresholds.round_cost or '-'} 元, 延迟 {thresholds.latency or '-'} 秒\n")
+
+    lines.append("**Token 随轮次增长（各对话平均）**:\n")
+    lines.append("| 轮次 | 样本数 | prompt tokens | completion tokens | 单轮费用 | 平均延迟 |")
+    lines.append("|:---:|:---:|:---:|:---:|:---:|:---:|")
+    for round_num, row in growth.items():
+        lines.append(f"| {round_num} | {row['samples']} | {row['prompt_tokens']:.0f} | {row['completion_tokens']:.0f} | "
+                     f"{row['cost']:.5f}元 | {row['response_time']:.2f}秒 |")
+
+    peak = max(row["prompt_tokens"] for row in growth.values()) or 1
+    lines.append("\n```")
+    for round_num, row in growth.items():
+        bar = "█" * round(row["prompt_tokens"] / peak * width)
+        marker = " ◀ 超过阈值" if thresholds.prompt_tokens and row["prompt_tokens"] > thresholds.prompt_tokens else ""
+        lines.append(f"第{round_num:>3}轮 | {bar} {row['prompt_tokens']:.0f}{marker}")
+    lines.append("```\n")
+
+    flagged = [c for c in conversations if any(v is not None for v in c["profile"]["crossings"].values())]
+    lines.append("**超过阈值的对话**:\n")
+    if not flagged:
+        lines.append("无\n")
+    else:
+        lines.append("| 对话 | prompt 超限轮次 | 费用超限轮次 | 延迟超限轮次 | 总费用 |")
+        lines.append("|:---|:---:|:---:|:---:|:---:|")
+        for conversation in flagged:
+            crossings = conversation["profile"]["crossings"]
+            lines.append(f"| {conversation['name']} | {crossings['prompt_tokens'] or '-'} | "
+                         f"{crossings['round_cost'] or '-'} | {crossings['latency'] or '-'} | "
+                         f"{conversation['profile']['totals']['cost']:.5f}元 |")
+
+    totals = {key: sum(p["totals"][key] for p in profiles) for key in ("prompt_tokens", "completion_tokens", "cost")}
+    lines.append(f"\n**合计**: prompt {totals['prompt_tokens']} tokens, completion {totals['completion_tokens']} tokens, "
+                 f"费用 {totals['cost']:.4f} 元\n")
+    return "\n".join(lines)
+
+
+def profile_conversations(conversations: Iterable[Dict[str, Any]], thresholds: Thresholds) -> List[Dict[str, Any]]:
+    """逐个分析对话（可以是生成器，只保留每个对话的 token 曲线）"""
+    return [
+        {"name": f"{c['philosopher']} / {c['test_id']}", "profile": profile_rounds(c["rounds"], thresholds)}
+        for c in conversations
+    ]
+
+
+def profile_results(data: Dict[str, Any], thresholds: Thresholds) -> List[Dict[str, Any]]:
+    """分析任意格式结果文件中的所有对话"""
+    return profile_conversations(iter_conversations(data), thresholds)
+
+
+def main():
+    defaults = Thresholds.from_env()
+    parser = argparse.ArgumentParser(description="分析结果文件的 token 增长和上下文成本")
+    parser.add_argument("result_file", help="测试结果文件（.json / .jsonl）")
+    parser.add_argument("--max-prompt-tokens", type=int, default=defaults.prompt_tokens,
+                        help="prompt token 阈值（环境变量 PROFILE_MAX_PROMPT_TOKENS）")
+    parser.add_argument("--max-round-cost", type=float, default=defaults.round_cost,
+                        help="单轮费用阈值，单位元（环境变量 PROFILE_MAX_ROUND_COST）")
+    parser.add_argument("--max-latency", type=float, default=defaults.latency,
+                        help="单轮延迟阈值，单位秒（环境变量 PROFILE_MAX_LATENCY）")
+    parser.add_argument("--output", help="Markdown 输出路径（默认打印到终端）")
+    args = parser.parse_args()
+
+    thresholds = Thresholds(args.max_prompt_tokens, args.max_round_cost, args.max_latency)
+    markdown = format_token_section(profile_conversations(load_conversations(args.result_file), thresholds), thresholds)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(markdown)
+        print(f"Token 报告已保存到: {args.output}")
+    else:
+        print(markdown)
+
+
+if __name__ == "__main__":
+    main()
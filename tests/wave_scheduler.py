@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+金句式超级毒舌系统 - 批量波次调度器
+以轮次为单位滚动调度：某个对话的一轮完成后立即补发它的下一轮，全局并发上限内按哲学家轮转补位，
+最后对比整套测试的墙钟时间与各轮延迟之和；
+统一执行器的 wave 调度，等价于 python -m runner --schedule wave --concurrency 10（其余参数原样传入，可覆盖默认值）
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+from runner import main
+
+DEFAULT_CONCURRENCY = 10
+
+if __name__ == "__main__":
+    main(["--preset", "full", "--schedule", "wave", "--concurrency", str(DEFAULT_CONCURRENCY)] + sys.argv[1:])
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+企业微信批量发送吞吐测试
+用 mock_wechat_webhook.py 在本机起一个群机器人替身（带限速窗口和失败注入），在隔离的 DATA_DIR 上
+启动服务端，批量生成 --users 个体验码后调用 POST /api/admin/batch-send（background=true）创建后台
+发送任务，轮询 GET /api/admin/batch-send/jobs/:id 直到完成，记录：
+  - 创建任务的响应时间（原来的接口要在同一个请求里发完全部消息）
+  - 发送耗时、吞吐、重试次数、最终失败数，以及进度时间线
+  - 替身侧的送达数、重复送达、被限速次数、窗口内最多送达数（不应超过限额）、最大并发
+--restart-after N 在已完成 N 条后重启服务端，检查任务能否从持久化的进度继续（重复送达即重启时正在发送的消息）
+
+服务端的限速、并发和重试参数通过 WECHAT_SEND_* 环境变量传入（见 wechat-sender.ts 的 defaultDeliveryOptions）
+
+用法:
+    python wechat_delivery_test.py                                  # 200 个用户，替身 600 条/分钟
+    python wechat_delivery_test.py --users 1000 --rate-per-min 1200 --concurrency 8 --fail-rate 0.05
+    python wechat_delivery_test.py --users 300 --restart-after 100
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(__file__))
+
+import argparse
+import json
+import shutil
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from span_recorder import span, add_trace_arguments, configure_tracing_from_args, export_trace
+from load_generator import (
+    DEFAULT_ADMIN_PASSWORD,
+    ServerClient,
+    start_local_server,
+    wait_for_server,
+    _ms,
+)
+from run_tests import TESTS_DIR, result_path
+
+DEFAULT_USERS = 200
+DEFAULT_PORT = 3100  # 避开开发服务端的 3000
+DEFAULT_WEBHOOK_PORT = 8791  # mock_wechat_webhook.py 的默认端口
+DEFAULT_RATE_PER_MIN = 600
+DEFAULT_RATE_WINDOW = 60.0
+DEFAULT_GROW_BATCH = 5000
+LEGACY_INTERVAL = 1.0  # 原来 batchSendToWechat 每条之间 sleep(1000)
+
+
+class WebhookStandIn:
+    """mock_wechat_webhook.py 子进程和它的统计接口"""
+
+    def __init__(self, port: int, args: argparse.Namespace):
+        self.url = f"http://127.0.0.1:{port}"
+        self.webhook_url = f"{self.url}/cgi-bin/webhook/send?key=delivery-test"
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.join(TESTS_DIR, "mock_wechat_webhook.py"), "--port", str(port),
+             "--rate-limit", str(args.webhook_limit), "--rate-window", str(args.rate_window),
+             "--fail-rate", str(args.fail_rate), "--http-error-rate", str(args.http_error_rate),
+             "--latency", str(args.webhook_latency)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+        deadline = time.time() + 10
+        while time.time() < deadline:
+            try:
+                self.stats()
+                return
+            except requests.RequestException:
+                if self.process.poll() is not None:
+                    raise SystemExit(f"Webhook 替身启动失败（退出码 {self.process.returncode}）")
+                time.sleep(0.2)
+        raise SystemExit(f"10 秒内没有连上 Webhook 替身 {self.url}")
+
+    def stats(self) -> Dict[str, Any]:
+        response = requests.get(f"{self.url}/__stats", timeout=5)
+        response.raise_for_status()
+        return response.json()
+
+    def close(self):
+        self.process.terminate()
+        self.process.wait(timeout=10)
+
+
+def server_env(data_dir: str, args: argparse.Namespace) -> Dict[str, str]:
+    """服务端的数据目录和发送参数"""
+    return {
+        "DATA_DIR": data_dir,
+        "WECHAT_SEND_RATE_PER_MIN": str(args.rate_per_min),
+        "WECHAT_SEND_BURST": str(args.burst),
+        "WECHAT_SEND_CONCURRENCY": str(args.concurrency),
+        "WECHAT_SEND_MAX_ATTEMPTS": str(args.max_attempts),
+        "WECHAT_SEND_RETRY_BASE_MS": str(args.retry_base_ms),
+    }
+
+
+def generate_codes(server: ServerClient, token: str, users: int, grow_batch: int, run_id: str) -> List[str]:
+    """批量生成 users 个体验码，返回 id"""
+    ids: List[str] = []
+    while len(ids) < users:
+        count = min(grow_batch, users - len(ids))
+        names = [f"wx-{run_id}-{len(ids) + j:06d}" for j in range(count)]
+        data = server.generate_batch(token, names, "发送测试")
+        ids.extend(c["id"] for c in data["codes"])
+    return ids
+
+
+def restart_server(process: subprocess.Popen, server: ServerClient, port: int, env: Dict[str, str]
+                   ) -> subprocess.Popen:
+    """结束服务端进程再用同一个数据目录启动"""
+    process.terminate()
+    process.wait(timeout=10)
+    process = start_local_server(port, env)
+    wait_for_server(server, process)
+    return process
+
+
+def run_delivery(args: argparse.Namespace, webhook: WebhookStandIn, run_id: str) -> Dict[str, Any]:
+    """生成体验码、创建后台发送任务并轮询到结束"""
+    data_dir = tempfile.mkdtemp(prefix="wechat-delivery-")
+    env = server_env(data_dir, args)
+    server = ServerClient(f"http://127.0.0.1:{args.port}", pool_size=2, timeout=args.timeout)
+    process = start_local_server(args.port, env)
+    timeline: List[Dict[str, Any]] = []
+    restarts = []
+    try:
+        wait_for_server(server, process)
+        token = server.login(args.admin_password)
+        with span("generate", users=args.users):
+            code_ids = generate_codes(server, token, args.users, args.grow_batch, run_id)
+        print(f"已生成 {len(code_ids)} 个体验码")
+
+        enqueue_start = time.perf_counter()
+        with span("enqueue", users=args.users):
+            job = server.batch_send(token, code_ids, webhook.webhook_url)["job"]
+        enqueue_seconds = time.perf_counter() - enqueue_start
+        print(f"任务 {job['id']} 已创建，响应 {_ms(enqueue_seconds)}")
+
+        start = time.perf_counter()
+        deadline = start + args.max_wait
+        last_printed = -1
+        while True:
+            try:
+                job = server.delivery_job(token, job["id"])["job"]
+            except requests.RequestException:
+                time.sleep(args.poll)
+                continue
+            elapsed = time.perf_counter() - start
+            timeline.append({"t": round(elapsed, 2), "done": job["done"], "sent": job["sent"],
+                             "failed": job["failed"], "retries": job["retries"]})
+            if job["done"] // max(1, args.users // 10) != last_printed:
+                last_printed = job["done"] // max(1, args.users // 10)
+                print(f"  {elapsed:7.1f}s  完成 {job['done']}/{job['total']}  成功 {job['sent']}  "
+                      f"失败 {job['failed']}  重试 {job['retries']}")
+            if job["status"] in ("completed", "cancelled"):
+                break
+            if args.restart_after and not restarts and job["done"] >= args.restart_after:
+                print(f"  完成 {job['done']} 条后重启服务端")
+                restart_start = time.perf_counter()
+                with span("restart"):
+                    process = restart_server(process, server, args.port, env)
+                restarts.append({"after_done": job["done"], "seconds": round(time.perf_counter() - restart_start, 2)})
+            if time.perf_counter() > deadline:
+                print(f"  超过 {args.max_wait:.0f} 秒没有完成，停止等待")
+                break
+            time.sleep(args.poll)
+        send_seconds = time.perf_counter() - start
+    finally:
+        server.close()
+        process.terminate()
+        process.wait(timeout=10)
+        if args.keep_data:
+            print(f"数据目录保留在 {data_dir}")
+        else:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    done = job["done"]
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "total": job["total"],
+        "sent": job["sent"],
+        "failed": job["failed"],
+        "retries": job["retries"],
+        "failures": job.get("failures", [])[:20],
+        "enqueue_seconds": round(enqueue_seconds, 4),
+        "send_seconds": round(send_seconds, 2),
+        "per_sec": round(done / send_seconds, 2) if send_seconds > 0 else None,
+        "per_min": round(done * 60 / send_seconds, 1) if send_seconds > 0 else None,
+        "legacy_estimate_seconds": round(job["total"] * (LEGACY_INTERVAL + args.webhook_latency / 1000), 1),
+        "restarts": restarts,
+        "timeline": timeline,
+    }
+
+
+def generate_summary_report(report: Dict[str, Any], json_file: str):
+    """生成批量发送吞吐测试总结报告（Markdown）"""
+    report_file = os.path.splitext(json_file)[0] + '-summary.md'
+    config = report["config"]
+    delivery = report["delivery"]
+    webhook = report["webhook"]
+
+    with open(report_file, 'w', encoding='utf-8') as f:
+        f.write("# 金句式超级毒舌系统 - 企业微信批量发送吞吐测试\n\n")
+        f.write(f"**测试时间**: {report['start_time']} ~ {report['end_time']}\n\n")
+        f.write(f"**配置**: {config['users']} 个用户；服务端限速 {config['rate_per_min']} 条/分钟（突发 {config['burst']}），"
+                f"并发 {config['concurrency']}，最多尝试 {config['max_attempts']} 次，首次重试等待 {config['retry_base_ms']}ms；"
+                f"替身限额 {config['webhook_limit'] or '不限'} 条 / {config['rate_window']} 秒，系统繁忙 {config['fail_rate']:.0%}，"
+                f"HTTP 502 {config['http_error_rate']:.0%}，处理时间 {config['webhook_latency']}ms\n\n")
+        f.write("---\n\n")
+
+        f.write("## 发送任务\n\n")
+        f.write("| 指标 | 数值 |\n")
+        f.write("|:---|:---:|\n")
+        f.write(f"| 任务状态 | {delivery['status']} |\n")
+        f.write(f"| 创建任务响应 | {_ms(delivery['enqueue_seconds'])} |\n")
+        f.write(f"| 成功 / 失败 / 总数 | {delivery['sent']} / {delivery['failed']} / {delivery['total']} |\n")
+        f.write(f"| 重试次数 | {delivery['retries']} |\n")
+        f.write(f"| 发送耗时 | {delivery['send_seconds']}秒 |\n")
+        f.write(f"| 吞吐 | {delivery['per_sec']} 条/秒（{delivery['per_min']} 条/分钟） |\n")
+        f.write(f"| 原逐条发送估算 | {delivery['legacy_estimate_seconds']}秒（在一个 HTTP 请求内） |\n")
+        for restart in delivery["restarts"]:
+            f.write(f"| 重启 | 完成 {restart['after_done']} 条后，{restart['seconds']}秒恢复 |\n")
+        f.write("\n")
+
+        f.write("## Webhook 替身\n\n")
+        f.write("| 指标 | 数值 |\n")
+        f.write("|:---|:---:|\n")
+        f.write(f"| 请求数 | {webhook['requests']} |\n")
+        f.write(f"| 送达 / 用户数 | {webhook['delivered']} / {webhook['unique_users']} |\n")
+        f.write(f"| 重复送达 | {webhook['duplicates']} |\n")
+        f.write(f"| 被限速（45009） | {webhook['rate_limited']} |\n")
+        f.write(f"| 系统繁忙 / HTTP 502 | {webhook['busy']} / {webhook['http_errors']} |\n")
+        f.write(f"| 窗口内最多送达 | {webhook['max_per_window']}（限额 {webhook['rate_limit'] or '不限'}） |\n")
+        f.write(f"| 最大并发 | {webhook['max_in_flight']} |\n")
+        f.write("\n")
+
+        if delivery["failures"]:
+            f.write("## 最终失败（前 20 条）\n\n")
+            f.write("| 用户 | 尝试次数 | 错误 |\n")
+            f.write("|:---|:---:|:---|\n")
+            for failure in delivery["failures"]:
+                f.write(f"| {failure['userName']} | {failure['attempts']} | {failure.get('error') or '-'} |\n")
+
+    print(f"总结报告已保存到: {report_file}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="企业微信批量发送任务的吞吐、限速和重试测试（本地 Webhook 替身）")
+    parser.add_argument("--users", type=int, default=DEFAULT_USERS, help=f"发送的用户数，默认 {DEFAULT_USERS}")
+    parser.add_argument("--rate-per-min", type=int, default=DEFAULT_RATE_PER_MIN,
+                        help=f"服务端每分钟最多发送条数（WECHAT_SEND_RATE_PER_MIN），默认 {DEFAULT_RATE_PER_MIN}")
+    parser.add_argument("--burst", type=int, default=1, help="服务端令牌桶容量（WECHAT_SEND_BURST），默认 1")
+    parser.add_argument("--concurrency", type=int, default=4, help="服务端并发发送数（WECHAT_SEND_CONCURRENCY），默认 4")
+    parser.add_argument("--max-attempts", type=int, default=5, help="每条最多尝试次数（WECHAT_SEND_MAX_ATTEMPTS），默认 5")
+    parser.add_argument("--retry-base-ms", type=int, default=500,
+                        help="首次重试等待（WECHAT_SEND_RETRY_BASE_MS），默认 500")
+    parser.add_argument("--webhook-limit", type=int, default=None,
+                        help="替身每个窗口的限额，默认与 --rate-per-min 换算到窗口内的条数相同；0 为不限")
+    parser.add_argument("--rate-window", type=float, default=DEFAULT_RATE_WINDOW,
+                        help=f"替身限速窗口（秒），默认 {DEFAULT_RATE_WINDOW:.0f}")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="替身返回系统繁忙的概率，默认 0")
+    parser.add_argument("--http-error-rate", type=float, default=0.0, help="替身返回 HTTP 502 的概率，默认 0")
+    parser.add_argument("--webhook-latency", type=float, default=50, help="替身每个请求的处理时间（毫秒），默认 50")
+    parser.add_argument("--restart-after", type=int, default=0, help="完成这么多条后重启一次服务端，默认不重启")
+    parser.add_argument("--poll", type=float, default=0.5, help="轮询任务进度的间隔（秒），默认 0.5")
+    parser.add_argument("--max-wait", type=float, default=1800.0, help="最长等待任务完成的时间（秒），默认 1800")
+    parser.add_argument("--grow-batch", type=int, default=DEFAULT_GROW_BATCH,
+                        help=f"生成体验码时每次 generate-batch 的个数，默认 {DEFAULT_GROW_BATCH}")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"本地服务端端口，默认 {DEFAULT_PORT}")
+    parser.add_argument("--webhook-port", type=int, default=DEFAULT_WEBHOOK_PORT,
+                        help=f"Webhook 替身端口，默认 {DEFAULT_WEBHOOK_PORT}")
+    parser.add_argument("--timeout", type=float, default=120.0, help="单次请求超时（秒），默认 120")
+    parser.add_argument("--admin-password", default=os.environ.get("ADMIN_PASSWORD", DEFAULT_ADMIN_PASSWORD),
+                        help="管理员密码（默认读取 ADMIN_PASSWORD）")
+    parser.add_argument("--keep-data", action="store_true", help="保留服务端数据目录（默认结束后删除）")
+    parser.add_argument("--output-dir", default=os.environ.get("TEST_OUTPUT_DIR", TESTS_DIR),
+                        help="结果文件和总结报告的输出目录")
+    add_trace_arguments(parser)
+    args = parser.parse_args()
+
+    if args.users < 1 or args.rate_per_min < 1 or args.concurrency < 1 or args.max_attempts < 1:
+        parser.error("--users / --rate-per-min / --concurrency / --max-attempts 必须 >= 1")
+    if args.restart_after >= args.users:
+        parser.error("--restart-after 必须小于 --users")
+    if args.webhook_limit is None:
+        args.webhook_limit = max(1, round(args.rate_per_min * args.rate_window / 60))
+    configure_tracing_from_args(args)
+
+    print("="*80)
+    print(" 金句式超级毒舌系统 - 企业微信批量发送吞吐测试")
+    print("="*80)
+    print()
+
+    start_time = datetime.now().isoformat()
+    run_id = datetime.now().strftime("%Y%m%d%H%M%S")
+    webhook = WebhookStandIn(args.webhook_port, args)
+    try:
+        delivery = run_delivery(args, webhook, run_id)
+        webhook_stats = webhook.stats()
+    finally:
+        webhook.close()
+
+    print(f"\n送达 {webhook_stats['delivered']}（重复 {webhook_stats['duplicates']}），被限速 {webhook_stats['rate_limited']} 次，"
+          f"窗口内最多 {webhook_stats['max_per_window']} 条，吞吐 {delivery['per_sec']} 条/秒")
+
+    report = {
+        "test_suite": "企业微信批量发送吞吐测试",
+        "start_time": start_time,
+        "end_time": datetime.now().isoformat(),
+        "config": {"users": args.users, "rate_per_min": args.rate_per_min, "burst": args.burst,
+                   "concurrency": args.concurrency, "max_attempts": args.max_attempts,
+                   "retry_base_ms": args.retry_base_ms, "webhook_limit": args.webhook_limit,
+                   "rate_window": args.rate_window, "fail_rate": args.fail_rate,
+                   "http_error_rate": args.http_error_rate, "webhook_latency": args.webhook_latency,
+                   "restart_after": args.restart_after},
+        "delivery": delivery,
+        "webhook": webhook_stats,
+    }
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_file = result_path(args.output_dir, "wechat-delivery", "json")
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"结果已保存到: {output_file}")
+    generate_summary_report(report, output_file)
+    export_trace(output_file)
+
+
+if __name__ == "__main__":
+    main()